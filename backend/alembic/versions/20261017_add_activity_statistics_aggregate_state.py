@@ -0,0 +1,49 @@
+"""Add aggregate_state to activity_statistics
+
+Revision ID: add_activity_stats_aggregate_state
+Revises: 20260514_add_form_cells
+Create Date: 2026-10-17 00:00:00.000000+00:00
+
+增量统计的累加状态。已有记录该列为空，首次更新时会自动全量重算并填充。
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_activity_stats_aggregate_state"
+down_revision: Union[str, None] = "20260514_add_form_cells"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add aggregate_state column to activity_statistics table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'activity_statistics' in inspector.get_table_names():
+        columns = [col['name'] for col in inspector.get_columns('activity_statistics')]
+
+        if 'aggregate_state' not in columns:
+            op.add_column(
+                'activity_statistics',
+                sa.Column('aggregate_state', sa.JSON(), nullable=True, comment='增量统计累加状态'),
+            )
+
+
+def downgrade() -> None:
+    """Remove aggregate_state column from activity_statistics table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'activity_statistics' in inspector.get_table_names():
+        columns = [col['name'] for col in inspector.get_columns('activity_statistics')]
+
+        if 'aggregate_state' in columns:
+            op.drop_column('activity_statistics', 'aggregate_state')
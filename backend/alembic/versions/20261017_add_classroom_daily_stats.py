@@ -0,0 +1,63 @@
+"""Add classroom_daily_stats table
+
+Revision ID: add_classroom_daily_stats
+Revises: add_dashboard_snapshots
+Create Date: 2026-10-17 00:00:00.000000+00:00
+
+班级每日统计汇总（考勤、正面行为、纪律、值日）。
+升级后执行 scripts/rebuild_classroom_daily_stats.py 根据已有记录生成汇总。
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_classroom_daily_stats"
+down_revision: Union[str, None] = "add_dashboard_snapshots"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create classroom_daily_stats table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'classroom_daily_stats' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'classroom_daily_stats',
+        sa.Column('classroom_id', sa.Integer(), nullable=False),
+        sa.Column('student_id', sa.Integer(), nullable=False, comment='学生ID，0 表示班级合计'),
+        sa.Column('day', sa.Date(), nullable=False, comment='统计日期（本地时区）'),
+        sa.Column('attendance_sessions', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attendance_present', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attendance_late', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attendance_leave', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('attendance_absent', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('positive_records', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('positive_points', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('positive_points_by_type', sa.JSON(), nullable=False, comment='各类型积分'),
+        sa.Column('discipline_records', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('discipline_by_type', sa.JSON(), nullable=False, comment='各类型记录数'),
+        sa.Column('duty_assignments', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('duty_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.text('NOW()')),
+        sa.ForeignKeyConstraint(['classroom_id'], ['classrooms.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('classroom_id', 'student_id', 'day'),
+    )
+
+
+def downgrade() -> None:
+    """Drop classroom_daily_stats table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'classroom_daily_stats' in inspector.get_table_names():
+        op.drop_table('classroom_daily_stats')
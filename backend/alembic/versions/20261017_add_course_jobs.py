@@ -0,0 +1,72 @@
+"""Add course_jobs table
+
+Revision ID: add_course_jobs
+Revises: add_activity_stats_aggregate_state
+Create Date: 2026-10-17 00:00:00.000000+00:00
+
+课程导入后台任务：持久化任务状态、进度和阶段检查点。
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_course_jobs"
+down_revision: Union[str, None] = "add_activity_stats_aggregate_state"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create course_jobs table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'course_jobs' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'course_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_type', sa.String(length=20), nullable=False, server_default='import'),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending', comment='任务状态'),
+        sa.Column('params', sa.JSON(), nullable=False, server_default='{}', comment='任务参数'),
+        sa.Column('work_dir', sa.String(length=500), nullable=True, comment='工作目录'),
+        sa.Column('stage', sa.String(length=50), nullable=True, comment='当前阶段'),
+        sa.Column('progress', sa.Float(), nullable=False, server_default='0', comment='进度百分比'),
+        sa.Column('message', sa.String(length=500), nullable=True, comment='进度说明'),
+        sa.Column('state', sa.JSON(), nullable=False, server_default='{}', comment='阶段检查点'),
+        sa.Column('result', sa.JSON(), nullable=True, comment='导入结果'),
+        sa.Column('error', sa.Text(), nullable=True, comment='错误信息'),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.false(), comment='是否请求取消'),
+        sa.Column('worker_id', sa.String(length=64), nullable=True, comment='执行该任务的 worker'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0', comment='执行次数'),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True, comment='最近心跳时间'),
+        sa.Column('created_by', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('NOW()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('NOW()')),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['created_by'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_course_jobs_id'), 'course_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_course_jobs_created_by'), 'course_jobs', ['created_by'], unique=False)
+    op.create_index('ix_course_jobs_status_id', 'course_jobs', ['status', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop course_jobs table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'course_jobs' in inspector.get_table_names():
+        op.drop_index('ix_course_jobs_status_id', table_name='course_jobs')
+        op.drop_index(op.f('ix_course_jobs_created_by'), table_name='course_jobs')
+        op.drop_index(op.f('ix_course_jobs_id'), table_name='course_jobs')
+        op.drop_table('course_jobs')
@@ -0,0 +1,48 @@
+"""Add dashboard_snapshots table
+
+Revision ID: add_dashboard_snapshots
+Revises: add_file_blobs
+Create Date: 2026-10-17 00:00:00.000000+00:00
+
+管理员数据看板的统计快照，定期刷新，看板接口直接读取。
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_dashboard_snapshots"
+down_revision: Union[str, None] = "add_file_blobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create dashboard_snapshots table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'dashboard_snapshots' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'dashboard_snapshots',
+        sa.Column('name', sa.String(length=50), nullable=False, comment='快照名称'),
+        sa.Column('data', sa.JSON(), nullable=False, comment='统计结果'),
+        sa.Column('computed_at', sa.DateTime(), nullable=False, comment='统计时间'),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    """Drop dashboard_snapshots table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'dashboard_snapshots' in inspector.get_table_names():
+        op.drop_table('dashboard_snapshots')
@@ -0,0 +1,50 @@
+"""Add file_blobs table
+
+Revision ID: add_file_blobs
+Revises: add_course_jobs
+Create Date: 2026-10-17 00:00:00.000000+00:00
+
+内容寻址文件存储：按 SHA-256 记录文件大小和引用次数。
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_file_blobs"
+down_revision: Union[str, None] = "add_course_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create file_blobs table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'file_blobs' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'file_blobs',
+        sa.Column('sha256', sa.String(length=64), nullable=False, comment='文件内容的 SHA-256'),
+        sa.Column('size', sa.BigInteger(), nullable=False, server_default='0', comment='文件大小（字节）'),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0', comment='引用次数'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('NOW()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('NOW()')),
+        sa.PrimaryKeyConstraint('sha256'),
+    )
+
+
+def downgrade() -> None:
+    """Drop file_blobs table"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'file_blobs' in inspector.get_table_names():
+        op.drop_table('file_blobs')
@@ -0,0 +1,70 @@
+"""Add lesson list pagination and search indexes
+
+Revision ID: add_lesson_search_indexes
+Revises: add_classroom_daily_stats
+Create Date: 2026-10-17 00:00:00.000000+00:00
+
+教案列表游标分页索引 (updated_at, id)，以及标题/简介/标签检索文本的 pg_trgm GIN 索引。
+数据库无法安装 pg_trgm 时跳过检索索引，检索仍可用但需要扫表。
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "add_lesson_search_indexes"
+down_revision: Union[str, None] = "add_classroom_daily_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 与 app/services/lesson_search.py 中的 SEARCH_DOCUMENT 保持一致
+SEARCH_DOCUMENT = (
+    "(title || ' ' || coalesce(description, '') || ' ' || coalesce(CAST(CAST(tags AS JSONB) AS TEXT), ''))"
+)
+
+
+def upgrade() -> None:
+    """Create lesson pagination and search indexes"""
+
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+
+    if 'lessons' not in inspector.get_table_names():
+        return
+
+    existing_indexes = {index['name'] for index in inspector.get_indexes('lessons')}
+    if 'ix_lessons_updated_at_id' not in existing_indexes:
+        op.create_index('ix_lessons_updated_at_id', 'lessons', ['updated_at', 'id'])
+
+    if 'ix_lessons_search_trgm' in existing_indexes:
+        return
+
+    available = conn.execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')")
+    ).scalar()
+    if not available:
+        print("警告: 数据库没有 pg_trgm 扩展，跳过教案检索索引")
+        return
+
+    try:
+        # 创建扩展需要相应权限，失败时只回滚到保存点，不影响其他迁移
+        with conn.begin_nested():
+            conn.execute(sa.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except sa.exc.DBAPIError as exc:
+        print(f"警告: 无法创建 pg_trgm 扩展，跳过教案检索索引: {exc}")
+        return
+
+    op.execute(
+        f"CREATE INDEX IF NOT EXISTS ix_lessons_search_trgm ON lessons "
+        f"USING gin ({SEARCH_DOCUMENT} gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    """Drop lesson pagination and search indexes"""
+
+    op.execute("DROP INDEX IF EXISTS ix_lessons_search_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_lessons_updated_at_id")
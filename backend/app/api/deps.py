@@ -7,11 +7,11 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 from app.core.config import settings
 from app.core.database import get_db
 from app.models import User, UserRole, ClassroomMembership, RoleInClass, Classroom
+from app.services.auth_cache import Principal, principal_cache
 
 from typing import Optional, cast, List
 
@@ -23,7 +23,7 @@ oauth2_scheme_optional = OAuth2PasswordBearer(
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
-) -> User:
+) -> Principal:
     """获取当前用户"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -41,16 +41,7 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    result = await db.execute(
-        select(User)
-        .options(
-            selectinload(User.region),
-            selectinload(User.school),
-            selectinload(User.grade),
-        )
-        .where(User.id == int(user_id))
-    )
-    user = result.scalar_one_or_none()
+    user = await principal_cache.load(db, int(user_id))
 
     if user is None:
         raise credentials_exception
@@ -58,17 +49,13 @@ async def get_current_user(
     if not isinstance(user.is_active, bool) or not cast(bool, user.is_active):
         raise HTTPException(status_code=400, detail="用户未激活")
 
-    user.region_name = user.region.name if user.region else None  # type: ignore[attr-defined]
-    user.school_name = user.school.name if user.school else None  # type: ignore[attr-defined]
-    user.grade_name = user.grade.name if user.grade else None  # type: ignore[attr-defined]
-
     return user
 
 
 async def get_current_user_optional(
     token: Optional[str] = Depends(oauth2_scheme_optional),
     db: AsyncSession = Depends(get_db),
-) -> Optional[User]:
+) -> Optional[Principal]:
     """获取当前用户（可选，不强制认证）"""
     if token is None:
         return None
@@ -83,16 +70,7 @@ async def get_current_user_optional(
     except JWTError:
         return None
 
-    result = await db.execute(
-        select(User)
-        .options(
-            selectinload(User.region),
-            selectinload(User.school),
-            selectinload(User.grade),
-        )
-        .where(User.id == int(user_id))
-    )
-    user = result.scalar_one_or_none()
+    user = await principal_cache.load(db, int(user_id))
 
     if (
         user is None
@@ -101,10 +79,6 @@ async def get_current_user_optional(
     ):
         return None
 
-    user.region_name = user.region.name if user.region else None  # type: ignore[attr-defined]
-    user.school_name = user.school.name if user.school else None  # type: ignore[attr-defined]
-    user.grade_name = user.grade.name if user.grade else None  # type: ignore[attr-defined]
-
     return user
 
 
@@ -150,7 +124,7 @@ def get_current_student(current_user: User = Depends(get_current_user)) -> User:
 async def get_current_user_from_token(
     token: str,
     db: AsyncSession,
-) -> Optional[User]:
+) -> Optional[Principal]:
     """从 JWT Token 获取当前用户（用于 WebSocket 认证）"""
     
     try:
@@ -165,17 +139,8 @@ async def get_current_user_from_token(
         if user_id is None:
             return None
         
-        # 查询用户
-        result = await db.execute(
-            select(User)
-            .options(
-                selectinload(User.region),
-                selectinload(User.school),
-                selectinload(User.grade),
-            )
-            .where(User.id == int(user_id))
-        )
-        user = result.scalar_one_or_none()
+        # 查询用户（优先使用缓存）
+        user = await principal_cache.load(db, int(user_id))
         
         if user is None:
             return None
@@ -183,10 +148,6 @@ async def get_current_user_from_token(
         if not isinstance(user.is_active, bool) or not cast(bool, user.is_active):
             return None
         
-        user.region_name = user.region.name if user.region else None  # type: ignore[attr-defined]
-        user.school_name = user.school.name if user.school else None  # type: ignore[attr-defined]
-        user.grade_name = user.grade.name if user.grade else None  # type: ignore[attr-defined]
-        
         return user
     
     except JWTError:
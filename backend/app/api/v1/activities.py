@@ -3,11 +3,10 @@
 """
 
 from datetime import datetime
-from statistics import mean
 from typing import Any, Dict, List, Optional, Union, cast
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, Integer, cast as sql_cast
+from sqlalchemy import select, func, and_, cast as sql_cast
 
 from app.api import deps
 from app.models.user import User, UserRole
@@ -49,6 +48,14 @@ from app.schemas.activity import (
 from app.services.formative_assessment import (
     recompute_formative_assessment,
 )
+from app.services.activity_statistics import (
+    SubmissionChange,
+    apply_submission_changes,
+    recompute_statistics,
+    refresh_flowchart_metrics,
+    refresh_peer_review_statistics,
+    submission_contribution,
+)
 
 router = APIRouter()
 
@@ -434,6 +441,7 @@ async def create_submission(
 
         if existing:
             # 更新现有草稿
+            previous = submission_contribution(existing)
             setattr(existing, "responses", cast(dict[str, Any], data.responses or {}))
             if data.process_trace is not None:
                 setattr(existing, "process_trace", cast(List[Dict[str, Any]], data.process_trace))
@@ -444,6 +452,10 @@ async def create_submission(
             if data.attempt_no is not None:
                 setattr(existing, "attempt_no", cast(int, data.attempt_no))
             setattr(existing, "updated_at", datetime.utcnow())
+            await db.flush()
+            await apply_submission_changes(
+                db, final_cell_id, data.lesson_id, [(previous, submission_contribution(existing))]
+            )
             await db.commit()
             await db.refresh(existing)
             return existing
@@ -482,6 +494,10 @@ async def create_submission(
         )
 
         db.add(submission)
+        await db.flush()
+        await apply_submission_changes(
+            db, final_cell_id, data.lesson_id, [(None, submission_contribution(submission))]
+        )
         await db.commit()
         await db.refresh(submission)
 
@@ -580,15 +596,14 @@ async def create_and_submit(
             setattr(submission, "auto_graded", False)
         
         db.add(submission)
-        await db.commit()
-        await db.refresh(submission)
+        await db.flush()
         
-        # 更新统计数据
-        await _update_statistics(
-            db,
-            final_cell_id,
-            data.lesson_id,
+        # 更新统计数据（与提交在同一事务内）
+        await apply_submission_changes(
+            db, final_cell_id, data.lesson_id, [(None, submission_contribution(submission))]
         )
+        await db.commit()
+        await db.refresh(submission)
         
         # 更新过程性评估
         phase_value = data.activity_phase
@@ -662,6 +677,8 @@ async def update_submission(
     if submission_status != ActivitySubmissionStatus.DRAFT:
         raise HTTPException(status_code=400, detail="已提交的作业不能修改")
 
+    previous = submission_contribution(submission)
+
     # 更新字段
     if data.responses is not None:
         setattr(submission, "responses", cast(dict[str, Any], data.responses))
@@ -691,6 +708,14 @@ async def update_submission(
 
     setattr(submission, "updated_at", datetime.utcnow())
 
+    await db.flush()
+    cell_id = cast(int, submission.cell_id)
+    statistics = await apply_submission_changes(
+        db, cell_id, cast(int, submission.lesson_id), [(previous, submission_contribution(submission))]
+    )
+    if data.flowchart_snapshot is not None:
+        await refresh_flowchart_metrics(db, cell_id, statistics)
+
     await db.commit()
     await db.refresh(submission)
 
@@ -718,6 +743,8 @@ async def submit_activity(
     if submission_student_id != current_user_id:
         raise HTTPException(status_code=403, detail="无权操作")
 
+    previous = submission_contribution(submission)
+
     # 🔍 调试：检查提交的 responses 数据
     print(f"🔍 submit_activity: 收到提交数据", {
         "submission_id": submission_id,
@@ -794,16 +821,19 @@ async def submit_activity(
     else:
         setattr(submission, "auto_graded", False)
 
-    await db.commit()
-    await db.refresh(submission)
+    await db.flush()
 
-    # 更新统计数据
-    await _update_statistics(
+    # 更新统计数据（与提交在同一事务内）
+    await apply_submission_changes(
         db,
         cast(int, submission.cell_id),
         cast(int, submission.lesson_id),
+        [(previous, submission_contribution(submission))],
     )
 
+    await db.commit()
+    await db.refresh(submission)
+
     phase_value = cast(Optional[str], getattr(submission, "activity_phase", None))
 
     await recompute_formative_assessment(
@@ -1199,6 +1229,8 @@ async def grade_submission(
     if submission_status != ActivitySubmissionStatus.SUBMITTED:
         raise HTTPException(status_code=400, detail="只能评分已提交的作业")
 
+    previous = submission_contribution(submission)
+
     # 更新评分
     setattr(submission, "score", cast(float, data.score))
     setattr(submission, "teacher_feedback", cast(str, data.teacher_feedback))
@@ -1207,21 +1239,27 @@ async def grade_submission(
     setattr(submission, "status", ActivitySubmissionStatus.GRADED)
 
     # 如果有分项分数，更新 responses 中的 score 字段
+    # 复制后整体赋值，原地修改 JSON 列不会被 SQLAlchemy 检测到
     if data.item_scores:
+        responses = dict(cast(dict[str, Any], submission.responses) or {})
         for item_id, item_score in data.item_scores.items():
-            if item_id in cast(dict[str, Any], submission.responses):
-                cast(dict[str, Any], submission.responses)[item_id][
-                    "score"
-                ] = item_score
+            if isinstance(responses.get(item_id), dict):
+                responses[item_id] = {**responses[item_id], "score": item_score}
+        setattr(submission, "responses", responses)
 
-    await db.commit()
-    await db.refresh(submission)
+    await db.flush()
 
-    # 更新统计数据
-    await _update_statistics(
-        db, cast(int, submission.cell_id), cast(int, submission.lesson_id)
+    # 更新统计数据（与评分在同一事务内）
+    await apply_submission_changes(
+        db,
+        cast(int, submission.cell_id),
+        cast(int, submission.lesson_id),
+        [(previous, submission_contribution(submission))],
     )
 
+    await db.commit()
+    await db.refresh(submission)
+
     phase_value = cast(Optional[str], getattr(submission, "activity_phase", None))
 
     await recompute_formative_assessment(
@@ -1289,7 +1327,7 @@ async def bulk_grade_submissions(
         raise HTTPException(status_code=403, detail="权限不足")
 
     graded_count = 0
-    cells_to_update: set[tuple[int, int]] = set()
+    cell_changes: Dict[tuple[int, int], List[SubmissionChange]] = {}
     recompute_targets: set[tuple[int, int, Optional[str]]] = set()
 
     for submission_id in data.submission_ids:
@@ -1300,15 +1338,16 @@ async def bulk_grade_submissions(
             == ActivitySubmissionStatus.SUBMITTED
         ):
             phase_value = cast(Optional[str], getattr(submission, "activity_phase", None))
+            previous = submission_contribution(submission)
             setattr(submission, "score", cast(float, data.score))
             setattr(submission, "teacher_feedback", cast(str, data.teacher_feedback))
             setattr(submission, "graded_by", cast(int, current_user.id))
             setattr(submission, "graded_at", datetime.utcnow())
             setattr(submission, "status", ActivitySubmissionStatus.GRADED)
             graded_count += 1
-            cells_to_update.add(
-                (cast(int, submission.cell_id), cast(int, submission.lesson_id))
-            )
+            cell_changes.setdefault(
+                (cast(int, submission.cell_id), cast(int, submission.lesson_id)), []
+            ).append((previous, submission_contribution(submission)))
             recompute_targets.add(
                 (
                     cast(int, submission.lesson_id),
@@ -1317,10 +1356,13 @@ async def bulk_grade_submissions(
                 )
             )
 
-    await db.commit()
+    await db.flush()
+
+    # 每个 Cell 只更新一次统计，应用本次所有提交的增量
+    for (cell_id, lesson_id), changes in cell_changes.items():
+        await apply_submission_changes(db, cell_id, lesson_id, changes)
 
-    for cell_id, lesson_id in cells_to_update:
-        await _update_statistics(db, cell_id, lesson_id)
+    await db.commit()
 
     for lesson_id, student_id, phase in recompute_targets:
         await recompute_formative_assessment(
@@ -1436,6 +1478,8 @@ async def assign_peer_reviews(
             db.add(peer_review)
             assigned_count += 1
 
+    await db.flush()
+    await refresh_peer_review_statistics(db, data.cell_id)
     await db.commit()
 
     return {"assigned_count": assigned_count}
@@ -1527,6 +1571,8 @@ async def submit_peer_review(
     setattr(review, "status", PeerReviewStatus.COMPLETED)
     setattr(review, "completed_at", datetime.utcnow())
 
+    await db.flush()
+    await refresh_peer_review_statistics(db, cast(int, review.cell_id))
     await db.commit()
     await db.refresh(review)
 
@@ -1630,28 +1676,37 @@ async def get_cell_statistics(
     statistics = result.scalar_one_or_none()
 
     if not statistics:
-        # 如果不存在，创建一个
+        # 如果不存在，全量计算一次（之后由提交变更增量维护）
         cell = await db.get(Cell, actual_cell_id)
         if not cell:
             raise HTTPException(status_code=404, detail="Cell 不存在")
 
-        statistics = ActivityStatistics(
-            cell_id=actual_cell_id,
-            lesson_id=cast(int, cell.lesson_id),
-        )
-        db.add(statistics)
+        statistics = await recompute_statistics(db, actual_cell_id, cast(int, cell.lesson_id))
         await db.commit()
         await db.refresh(statistics)
 
-        # 立即计算统计数据
-        await _update_statistics(db, actual_cell_id, cast(int, cell.lesson_id))
+    return statistics
 
-        # 重新加载
-        result = await db.execute(
-            select(ActivityStatistics).where(ActivityStatistics.cell_id == actual_cell_id)
-        )
-        statistics = result.scalar_one()
 
+@router.post("/cells/{cell_id}/statistics/recompute", response_model=ActivityStatisticsResponse)
+async def recompute_cell_statistics(
+    cell_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """全量重算活动统计（修复增量统计偏差）"""
+
+    current_role = cast(UserRole, current_user.role)
+    if current_role != UserRole.TEACHER:
+        raise HTTPException(status_code=403, detail="权限不足")
+
+    cell = await db.get(Cell, cell_id)
+    if not cell:
+        raise HTTPException(status_code=404, detail="Cell 不存在")
+
+    statistics = await recompute_statistics(db, cell_id, cast(int, cell.lesson_id))
+    await db.commit()
+    await db.refresh(statistics)
     return statistics
 
 
@@ -1669,6 +1724,8 @@ async def sync_offline_submissions(
     synced_count = 0
     failed_count = 0
     conflicts = []
+    cell_changes: Dict[tuple[int, int], List[SubmissionChange]] = {}
+    flowchart_cells: set[int] = set()
 
     for submission_data in data.submissions:
         try:
@@ -1697,6 +1754,7 @@ async def sync_offline_submissions(
                     continue
 
                 # 更新现有提交
+                previous = submission_contribution(existing)
                 setattr(
                     existing,
                     "responses",
@@ -1735,9 +1793,13 @@ async def sync_offline_submissions(
                         snapshot_payload,
                         student_id=cast(int, current_user.id),
                     )
+                    flowchart_cells.add(cast(int, existing.cell_id))
                 setattr(existing, "version", cast(int, existing.version) + 1)
                 setattr(existing, "synced", cast(bool, True))
                 setattr(existing, "updated_at", cast(datetime, datetime.utcnow()))
+                cell_changes.setdefault(
+                    (cast(int, existing.cell_id), cast(int, existing.lesson_id)), []
+                ).append((previous, submission_contribution(existing)))
                 synced_count += 1
             else:
                 # 创建新提交
@@ -1765,12 +1827,22 @@ async def sync_offline_submissions(
                         snapshot_payload,
                         student_id=cast(int, current_user.id),
                     )
+                    flowchart_cells.add(cast(int, submission.cell_id))
+                cell_changes.setdefault(
+                    (cast(int, submission.cell_id), cast(int, submission.lesson_id)), []
+                ).append((None, submission_contribution(submission)))
                 synced_count += 1
 
         except Exception as e:
             print(f"同步失败: {e}")
             failed_count += 1
 
+    await db.flush()
+    for (cell_id, lesson_id), changes in cell_changes.items():
+        statistics = await apply_submission_changes(db, cell_id, lesson_id, changes)
+        if cell_id in flowchart_cells:
+            await refresh_flowchart_metrics(db, cell_id, statistics)
+
     await db.commit()
 
     return OfflineSyncResponse(
@@ -1976,236 +2048,3 @@ async def _save_flowchart_snapshot(
     await db.flush()
 
     return flowchart_snapshot
-
-
-async def _update_statistics(db: AsyncSession, cell_id: int, lesson_id: int):
-    """更新活动统计数据"""
-
-    # 查找或创建统计记录
-    result = await db.execute(
-        select(ActivityStatistics).where(ActivityStatistics.cell_id == cell_id)
-    )
-    statistics = result.scalar_one_or_none()
-
-    if not statistics:
-        statistics = ActivityStatistics(cell_id=cell_id, lesson_id=lesson_id)
-        db.add(statistics)
-
-    # 计算各种统计数据
-    result = await db.execute(
-        select(
-            func.count(ActivitySubmission.id).label("total"),
-            func.sum(
-                func.cast(
-                    ActivitySubmission.status == ActivitySubmissionStatus.DRAFT, Integer
-                )
-            ).label("draft"),
-            func.sum(
-                func.cast(
-                    ActivitySubmission.status == ActivitySubmissionStatus.SUBMITTED,
-                    Integer,
-                )
-            ).label("submitted"),
-            func.sum(
-                func.cast(
-                    ActivitySubmission.status == ActivitySubmissionStatus.GRADED,
-                    Integer,
-                )
-            ).label("graded"),
-            func.avg(ActivitySubmission.score).label("avg_score"),
-            func.max(ActivitySubmission.score).label("max_score"),
-            func.min(ActivitySubmission.score).label("min_score"),
-            func.avg(ActivitySubmission.time_spent).label("avg_time"),
-        ).where(ActivitySubmission.cell_id == cell_id)
-    )
-    stats = result.one()
-
-    total_students = int(stats.total or 0)
-    draft_count = int(stats.draft or 0)
-    submitted_count = int(stats.submitted or 0)
-    graded_count = int(stats.graded or 0)
-    average_score = float(stats.avg_score) if stats.avg_score is not None else None
-    highest_score = float(stats.max_score) if stats.max_score is not None else None
-    lowest_score = float(stats.min_score) if stats.min_score is not None else None
-    average_time_spent = int(stats.avg_time) if stats.avg_time is not None else None
-
-    setattr(statistics, "total_students", total_students)
-    setattr(statistics, "draft_count", draft_count)
-    setattr(statistics, "submitted_count", submitted_count)
-    setattr(statistics, "graded_count", graded_count)
-    setattr(statistics, "average_score", average_score)
-    setattr(statistics, "highest_score", highest_score)
-    setattr(statistics, "lowest_score", lowest_score)
-    setattr(statistics, "average_time_spent", average_time_spent)
-    setattr(statistics, "updated_at", datetime.utcnow())
-
-    # 互评统计
-    result = await db.execute(
-        select(func.count(PeerReview.id), func.avg(PeerReview.score)).where(
-            PeerReview.cell_id == cell_id
-        )
-    )
-    peer_stats = result.one()
-    peer_review_count = int(peer_stats[0] or 0)
-    avg_peer_review_score = float(peer_stats[1]) if peer_stats[1] is not None else None
-
-    setattr(statistics, "peer_review_count", peer_review_count)
-    setattr(statistics, "avg_peer_review_score", avg_peer_review_score)
-
-    # 题目级统计
-    submissions_result = await db.execute(
-        select(ActivitySubmission).where(ActivitySubmission.cell_id == cell_id)
-    )
-    submissions = submissions_result.scalars().all()
-
-    item_aggregates: Dict[str, Dict[str, Any]] = {}
-    for submission in submissions:
-        responses = submission.responses or {}
-        for item_id, item_value in responses.items():
-            if not isinstance(item_value, dict):
-                continue
-            aggregate = item_aggregates.setdefault(
-                item_id,
-                {
-                    "attempts": 0,
-                    "correct_count": 0,
-                    "scores": [],
-                    "options": {},
-                    "knowledge": {},
-                    "times": [],
-                },
-            )
-            aggregate["attempts"] += 1
-
-            if item_value.get("is_correct"):
-                aggregate["correct_count"] += 1
-
-            score = item_value.get("score")
-            if isinstance(score, (int, float)):
-                aggregate["scores"].append(float(score))
-
-            time_spent = item_value.get("time_spent")
-            if isinstance(time_spent, (int, float)):
-                aggregate["times"].append(float(time_spent))
-
-            answer = item_value.get("answer") or item_value.get("value")
-            if isinstance(answer, list):
-                for option in answer:
-                    key = str(option)
-                    aggregate["options"][key] = aggregate["options"].get(key, 0) + 1
-            elif answer is not None:
-                key = str(answer)
-                aggregate["options"][key] = aggregate["options"].get(key, 0) + 1
-
-            knowledge_tags = item_value.get("knowledge_tags") or item_value.get("tags")
-            if isinstance(knowledge_tags, list):
-                for tag in knowledge_tags:
-                    tag_key = str(tag)
-                    aggregate["knowledge"][tag_key] = (
-                        aggregate["knowledge"].get(tag_key, 0) + 1
-                    )
-
-    existing_stats_result = await db.execute(
-        select(ActivityItemStatistic).where(ActivityItemStatistic.cell_id == cell_id)
-    )
-    existing_stats = {
-        cast(str, stat.item_id): stat
-        for stat in existing_stats_result.scalars().all()
-    }
-
-    summary_payload: Dict[str, Any] = {}
-
-    for item_id, aggregate in item_aggregates.items():
-        attempts = aggregate["attempts"]
-        accuracy = (
-            round(aggregate["correct_count"] / attempts, 4) if attempts else None
-        )
-        avg_score = (
-            round(mean(aggregate["scores"]), 2) if aggregate["scores"] else None
-        )
-        avg_time = round(mean(aggregate["times"]), 2) if aggregate["times"] else None
-
-        summary_payload[item_id] = {
-            "attempts": attempts,
-            "correct_count": aggregate["correct_count"],
-            "accuracy": accuracy,
-            "avg_score": avg_score,
-            "avg_time_spent": avg_time,
-            "option_distribution": aggregate["options"],
-            "knowledge_stats": aggregate["knowledge"],
-        }
-
-        stat_record = existing_stats.get(item_id)
-        if stat_record:
-            setattr(stat_record, "attempts", attempts)
-            setattr(stat_record, "correct_count", aggregate["correct_count"])
-            setattr(stat_record, "avg_score", avg_score)
-            setattr(stat_record, "avg_time_spent", avg_time)
-            setattr(stat_record, "option_distribution", aggregate["options"])
-            setattr(
-                stat_record, "score_distribution", {"values": aggregate["scores"]}
-            )
-            setattr(stat_record, "knowledge_stats", aggregate["knowledge"])
-            setattr(stat_record, "updated_at", datetime.utcnow())
-        else:
-            stat_record = ActivityItemStatistic(
-                cell_id=cell_id,
-                lesson_id=lesson_id,
-                item_id=item_id,
-                attempts=attempts,
-                correct_count=aggregate["correct_count"],
-                avg_score=avg_score,
-                avg_time_spent=avg_time,
-                option_distribution=aggregate["options"],
-                score_distribution={"values": aggregate["scores"]},
-                knowledge_stats=aggregate["knowledge"],
-            )
-            db.add(stat_record)
-
-    # 移除已经不存在的题目统计
-    removed_item_ids = set(existing_stats.keys()) - set(item_aggregates.keys())
-    for item_id in removed_item_ids:
-        await db.delete(existing_stats[item_id])
-
-    setattr(statistics, "item_statistics", summary_payload or None)
-
-    # 流程图统计
-    flowchart_result = await db.execute(
-        select(FlowchartSnapshot).where(FlowchartSnapshot.cell_id == cell_id)
-    )
-    flowchart_snapshots = flowchart_result.scalars().all()
-
-    flowchart_metrics: Optional[Dict[str, Any]] = None
-    if flowchart_snapshots:
-        updated_values = [
-            cast(datetime, snapshot.updated_at)
-            for snapshot in flowchart_snapshots
-            if snapshot.updated_at is not None
-        ]
-        version_values = [
-            cast(int, snapshot.version or 0) for snapshot in flowchart_snapshots
-        ]
-
-        latest_updated = max(updated_values) if updated_values else None
-        max_version = max(version_values) if version_values else None
-
-        flowchart_metrics = {
-            "snapshot_count": len(flowchart_snapshots),
-            "latest_updated_at": latest_updated.isoformat() if latest_updated is not None else None,
-            "max_version": max_version,
-        }
-        numeric_aggregates: Dict[str, List[float]] = {}
-        for snapshot in flowchart_snapshots:
-            analysis_data = snapshot.analysis or {}
-            if not isinstance(analysis_data, dict):
-                continue
-            for key, value in analysis_data.items():
-                if isinstance(value, (int, float)):
-                    numeric_aggregates.setdefault(key, []).append(float(value))
-
-        for key, values in numeric_aggregates.items():
-            flowchart_metrics[f"avg_{key}"] = round(mean(values), 2)
-
-    setattr(statistics, "flowchart_metrics", flowchart_metrics)
-
-    await db.commit()
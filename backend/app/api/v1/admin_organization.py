@@ -14,6 +14,7 @@ from datetime import datetime
 from app.core.database import get_db
 from app.models import User, Region, School, Grade, Classroom
 from app.api.deps import get_current_admin
+from app.services.auth_cache import principal_cache
 
 
 router = APIRouter()
@@ -333,6 +334,8 @@ async def update_region(
         setattr(region, field, value)
 
     await db.commit()
+    # 区域名称缓存在认证用户信息中
+    await principal_cache.clear_all_workers()
     await db.refresh(region)
 
     return RegionResponse.model_validate(region)
@@ -537,6 +540,8 @@ async def update_school(
         setattr(school, field, value)
 
     await db.commit()
+    # 学校名称缓存在认证用户信息中
+    await principal_cache.clear_all_workers()
     await db.refresh(school)
 
     # 重新查询以加载region关系
@@ -3,18 +3,26 @@
 提供用户账号的增删改查、状态管理、密码重置等功能
 """
 
-from typing import Any, List, Optional, cast
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from typing import Any, AsyncIterator, List, Optional, Tuple, cast
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from sqlalchemy import select, func, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel, EmailStr, field_validator
+from pydantic import BaseModel, EmailStr, ValidationError, field_validator
 from datetime import datetime
 
 from app.core.database import get_db
 from app.core.validators import normalize_user_role
 from app.models import User, UserRole, Region, School, Grade, Classroom
 from app.api.deps import get_current_admin
-from app.core.security import get_password_hash
+from app.services.auth_cache import principal_cache
+from app.core.security import get_password_hash_async
+from app.services.user_import import (
+    UserImportError,
+    bulk_create_users,
+    iter_import_file,
+    parse_user_row,
+)
 from app.core.config import settings
 import secrets
 import string
@@ -301,7 +309,7 @@ async def create_user(
         raise HTTPException(status_code=400, detail="邮箱已存在")
 
     # 创建用户
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash_async(user_data.password)
     scope_ids = await _validate_scope_ids(
         db,
         region_id=user_data.region_id,
@@ -381,6 +389,7 @@ async def update_user(
         setattr(user, field, value)
 
     await db.commit()
+    await principal_cache.invalidate_all_workers(user_id)
 
     refreshed_user = await _fetch_user_with_relations(db, cast(int, user.id))
     if refreshed_user is None:
@@ -409,6 +418,7 @@ async def delete_user(
 
     await db.delete(user)
     await db.commit()
+    await principal_cache.invalidate_all_workers(user_id)
 
     return {"message": "用户删除成功"}
 
@@ -434,6 +444,7 @@ async def toggle_user_status(
     current_status = bool(getattr(user, "is_active"))
     setattr(user, "is_active", not current_status)
     await db.commit()
+    await principal_cache.invalidate_all_workers(user_id)
 
     updated_status = bool(getattr(user, "is_active"))
     return {
@@ -459,7 +470,7 @@ async def reset_user_password(
     # 生成新密码（8位随机密码，包含字母和数字）
     alphabet = string.ascii_letters + string.digits
     new_password = "".join(secrets.choice(alphabet) for _ in range(8))
-    setattr(user, "hashed_password", get_password_hash(new_password))
+    setattr(user, "hashed_password", await get_password_hash_async(new_password))
 
     await db.commit()
 
@@ -473,67 +484,22 @@ async def reset_user_password(
     }
 
 
-@router.post("/batch-import")
-async def batch_import_users(
-    import_data: BatchImportRequest,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_admin),
-) -> Any:
-    """批量导入用户"""
+async def _import_user_batches(
+    db: AsyncSession, batches: AsyncIterator[List[Tuple[int, UserCreate]]], errors: List[str]
+) -> List[int]:
+    """逐批创建用户，每批单独提交，返回创建的用户 ID"""
+    created_user_ids: List[int] = []
+    async for batch in batches:
+        created_ids, batch_errors = await bulk_create_users(db, batch)
+        await db.commit()
+        created_user_ids.extend(created_ids)
+        errors.extend(batch_errors)
+    return created_user_ids
 
-    created_user_ids: list[int] = []
-    errors = []
-
-    for i, user_data in enumerate(import_data.users):
-        try:
-            # 检查用户名是否已存在
-            existing_user = await db.execute(
-                select(User).where(User.username == user_data.username)
-            )
-            if existing_user.scalar_one_or_none():
-                errors.append(f"第{i+1}行：用户名 {user_data.username} 已存在")
-                continue
-
-            # 检查邮箱是否已存在
-            existing_email = await db.execute(
-                select(User).where(User.email == user_data.email)
-            )
-            if existing_email.scalar_one_or_none():
-                errors.append(f"第{i+1}行：邮箱 {user_data.email} 已存在")
-                continue
-
-            # 创建用户
-            hashed_password = get_password_hash(user_data.password)
-            scope_ids = await _validate_scope_ids(
-                db,
-                region_id=user_data.region_id,
-                school_id=user_data.school_id,
-                grade_id=user_data.grade_id,
-                classroom_id=user_data.classroom_id,
-            )
-            # 确保 is_active 有默认值，如果为 None 则设为 True
-            is_active = user_data.is_active if user_data.is_active is not None else True
-            user = User(
-                username=user_data.username,
-                email=user_data.email,
-                hashed_password=hashed_password,
-                full_name=user_data.full_name,
-                role=user_data.role,
-                is_active=is_active,
-                **scope_ids,
-            )
-
-            db.add(user)
-            await db.flush()  # 获取ID但不提交
-            created_user_ids.append(cast(int, user.id))
-
-        except HTTPException as exc:
-            errors.append(f"第{i+1}行：{exc.detail}")
-        except Exception as e:
-            errors.append(f"第{i+1}行：{str(e)}")
-
-    await db.commit()
 
+async def _batch_import_response(
+    db: AsyncSession, created_user_ids: List[int], errors: List[str]
+) -> dict:
     created_users: list[UserResponse] = []
     if created_user_ids:
         result = await db.execute(
@@ -560,6 +526,78 @@ async def batch_import_users(
     }
 
 
+@router.post("/batch-import")
+async def batch_import_users(
+    import_data: BatchImportRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """批量导入用户"""
+
+    errors: List[str] = []
+    batch_size = settings.USER_IMPORT_BATCH_SIZE
+
+    async def batches() -> AsyncIterator[List[Tuple[int, UserCreate]]]:
+        rows = list(enumerate(import_data.users, start=1))
+        for start in range(0, len(rows), batch_size):
+            yield rows[start:start + batch_size]
+
+    created_user_ids = await _import_user_batches(db, batches(), errors)
+    return await _batch_import_response(db, created_user_ids, errors)
+
+
+@router.post("/batch-import/file")
+async def batch_import_users_file(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_admin),
+) -> Any:
+    """
+    上传 CSV / XLSX 文件批量导入用户
+
+    文件逐行读取，每 USER_IMPORT_BATCH_SIZE 行为一批导入并提交；
+    错误信息中的行号为文件中的行号（表头为第 1 行）。
+    """
+
+    try:
+        rows = await asyncio.to_thread(iter_import_file, file.filename or "", file.file)
+    except UserImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    errors: List[str] = []
+    batch_size = settings.USER_IMPORT_BATCH_SIZE
+
+    def read_batch() -> List[Tuple[int, UserCreate]]:
+        batch: List[Tuple[int, UserCreate]] = []
+        for row_no, raw in rows:
+            try:
+                batch.append((row_no, UserCreate(**parse_user_row(raw))))
+            except ValidationError as e:
+                messages = "; ".join(
+                    f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+                )
+                errors.append(f"第{row_no}行：{messages}")
+            except ValueError as e:
+                errors.append(f"第{row_no}行：{e}")
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    async def batches() -> AsyncIterator[List[Tuple[int, UserCreate]]]:
+        while True:
+            # 文件解析在线程中进行，不阻塞事件循环
+            batch = await asyncio.to_thread(read_batch)
+            if not batch:
+                return
+            yield batch
+
+    try:
+        created_user_ids = await _import_user_batches(db, batches(), errors)
+    except UserImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await _batch_import_response(db, created_user_ids, errors)
+
+
 @router.get("/export/template")
 async def download_import_template(
     current_user: User = Depends(get_current_admin),
@@ -6,67 +6,26 @@ from datetime import datetime, timedelta
 from typing import Any, cast
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import JWTError, jwt
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import get_current_user
 from app.core.config import settings
 from app.core.database import get_db
-from app.core.security import create_access_token, verify_password, get_password_hash
+from app.core.security import (
+    create_access_token,
+    get_password_hash_async,
+    verify_password_async,
+)
 from app.models import User
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.token import Token
+from app.services.auth_cache import principal_cache
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
-) -> User:
-    """获取当前用户"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="无法验证凭据",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id = payload.get("sub")
-        if not isinstance(user_id, str):
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    result = await db.execute(
-        select(User)
-        .options(
-            selectinload(User.region),
-            selectinload(User.school),
-            selectinload(User.grade),
-        )
-        .where(User.id == int(user_id))
-    )
-    user = result.scalar_one_or_none()
-
-    if user is None:
-        raise credentials_exception
-
-    if not cast(bool, user.is_active):
-        raise HTTPException(status_code=400, detail="用户未激活")
-
-    # 预先填充组织信息，方便序列化
-    user.region_name = user.region.name if user.region else None  # type: ignore[attr-defined]
-    user.school_name = user.school.name if user.school else None  # type: ignore[attr-defined]
-    user.grade_name = user.grade.name if user.grade else None  # type: ignore[attr-defined]
-
-    return user
-
-
 async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
@@ -95,7 +54,7 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)) -> A
     user = User(
         email=user_in.email,
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
         full_name=user_in.full_name,
         role=user_in.role,
     )
@@ -126,7 +85,7 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not verify_password(form_data.password, cast(str, user.hashed_password)):
+    if not await verify_password_async(form_data.password, cast(str, user.hashed_password)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
@@ -144,6 +103,7 @@ async def login(
     # 更新最后登录时间
     user.last_login = datetime.utcnow()
     await db.commit()
+    principal_cache.invalidate(cast(int, user.id))
 
     # 创建访问令牌
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -28,7 +28,7 @@ from app.schemas.cell import (
     ContestSubmissionResponse,
 )
 from app.api.deps import get_current_active_user
-from app.services.ai_qa import ai_qa_service
+from app.services.ai_qa import AIResponse, ai_qa_service, sse_response
 
 router = APIRouter()
 
@@ -81,6 +81,9 @@ async def get_qa_suggestions(
         question=cell.content.get("question", ""),
         lesson_title=cell.lesson.title if cell.lesson else None,
         limit=5,
+        db=db,
+        lesson_id=cast(int, cell.lesson_id),
+        cell_id=cell_id,
     )
 
     return {"suggestions": suggestions, "cell_id": cell_id}
@@ -366,10 +369,21 @@ async def execute_cell(
 # ==================== QA Cell API ====================
 
 
+def _save_qa_answer(cell: Cell, question: str, answer: str, is_ai_answer: bool) -> None:
+    """把问答写入Cell内容（整体赋值，JSON 列的原地修改不会被检测到）"""
+    cell.content = {
+        **(cell.content or {}),
+        "question": question,
+        "answer": answer,
+        "isAIAnswer": is_ai_answer,
+    }
+
+
 @router.post("/{cell_id}/ask", response_model=QAAnswerResponse)
 async def ask_question(
     cell_id: int,
     question_request: QAQuestionRequest,
+    stream: bool = Query(False, description="以 SSE 流式返回AI回答（token / done / error 事件），完成后保存回答"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
@@ -380,6 +394,29 @@ async def ask_question(
     if cell_type != CellType.QA:
         raise HTTPException(status_code=400, detail="此Cell类型不支持问答")
 
+    if stream and question_request.ask_ai:
+        async def finish(ai_response: AIResponse) -> dict:
+            # 回答完整返回后才保存；客户端中途断开时不会调用
+            _save_qa_answer(cell, question_request.question, ai_response.answer, True)
+            await db.commit()
+            return QAAnswerResponse(
+                answer=ai_response.answer,
+                is_ai_answer=True,
+                confidence=ai_response.confidence,
+                response_time=ai_response.response_time,
+                first_token_time=ai_response.first_token_time,
+            ).model_dump()
+
+        return sse_response(
+            ai_qa_service.stream_question(
+                question=question_request.question,
+                context=f"Cell ID: {cell_id}",
+                lesson_title=cell.lesson.title if cell.lesson else None,
+                cell_content=cast(Optional[dict], getattr(cell, "content", None)),
+            ),
+            finish,
+        )
+
     import time
 
     start_time = time.time()
@@ -407,13 +444,7 @@ async def ask_question(
             response_time = (time.time() - start_time) * 1000
 
         # 更新Cell内容
-        cell.content.update(
-            {
-                "question": question_request.question,
-                "answer": answer,
-                "isAIAnswer": is_ai_answer,
-            }
-        )
+        _save_qa_answer(cell, question_request.question, answer, is_ai_answer)
         await db.commit()
 
         return QAAnswerResponse(
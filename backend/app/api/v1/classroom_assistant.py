@@ -6,7 +6,7 @@
 from datetime import datetime, timedelta, date
 from typing import Any, List, Optional, Dict, cast
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func, and_, or_, desc, asc, case, join
+from sqlalchemy import select, func, and_, or_, desc, asc, join
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -72,6 +72,9 @@ from app.api.deps import (
     check_classroom_permission,
     get_classroom_membership,
 )
+from app.services.classroom_member_import import import_classroom_members
+from app.services.classroom_stats import load_period_stats, refresh_daily_stats
+from app.services.leaderboard import Leaderboard, leaderboards, load_leaderboard_entries, week_start
 
 router = APIRouter()
 
@@ -79,102 +82,6 @@ router = APIRouter()
 # ==================== 工具函数 ====================
 
 
-async def find_user_by_identifiers(
-    db: AsyncSession,
-    user_id: Optional[int] = None,
-    full_name: Optional[str] = None,
-    email: Optional[str] = None,
-    username: Optional[str] = None,
-    student_no: Optional[str] = None,
-    student_id_number: Optional[str] = None,
-    classroom_id: Optional[int] = None,
-) -> Optional[User]:
-    """
-    根据多个标识字段查找用户
-    
-    查找优先级：
-    1. user_id（如果提供，直接查询）
-    2. student_id_number（学籍号，唯一标识，跟随学生整个学习经历） - 最优先
-    3. email（如果提供，直接查询）
-    4. username（如果提供，直接查询）
-    5. student_no（通过ClassroomMembership查找，班级内的学号）
-    6. full_name（如果提供，模糊匹配）
-    """
-    # 优先级1: 如果提供了user_id，直接查询
-    if user_id:
-        return await db.get(User, user_id)
-    
-    # 优先级2: 通过学籍号查找（最优先，因为学籍号是唯一且不变的）
-    if student_id_number:
-        result = await db.execute(
-            select(User).where(User.student_id_number == student_id_number)
-        )
-        user = result.scalar_one_or_none()
-        if user:
-            return user
-    
-    # 优先级3: 通过email查找
-    if email:
-        result = await db.execute(
-            select(User).where(User.email == email)
-        )
-        user = result.scalar_one_or_none()
-        if user:
-            return user
-    
-    # 优先级4: 通过username查找
-    if username:
-        result = await db.execute(
-            select(User).where(User.username == username)
-        )
-        user = result.scalar_one_or_none()
-        if user:
-            return user
-    
-    # 优先级5: 通过student_no查找（班级内的学号，通过ClassroomMembership查找）
-    if student_no:
-        # 如果提供了classroom_id，优先在该班级中查找
-        if classroom_id:
-            result = await db.execute(
-                select(ClassroomMembership)
-                .options(selectinload(ClassroomMembership.user))
-                .where(
-                    ClassroomMembership.student_no == student_no,
-                    ClassroomMembership.classroom_id == classroom_id,
-                )
-            )
-            membership = result.scalar_one_or_none()
-            if membership and membership.user:
-                return membership.user
-        
-        # 在其他班级中查找
-        result = await db.execute(
-            select(ClassroomMembership)
-            .options(selectinload(ClassroomMembership.user))
-            .where(ClassroomMembership.student_no == student_no)
-            .limit(1)
-        )
-        membership = result.scalar_one_or_none()
-        if membership and membership.user:
-            return membership.user
-    
-    # 优先级6: 通过full_name查找（模糊匹配，如果只有一个结果则返回）
-    if full_name:
-        result = await db.execute(
-            select(User).where(User.full_name.ilike(f"%{full_name}%"))
-        )
-        users = result.scalars().all()
-        if len(users) == 1:
-            return users[0]
-        elif len(users) > 1:
-            # 如果有多个匹配，尝试精确匹配
-            for user in users:
-                if user.full_name == full_name:
-                    return user
-    
-    return None
-
-
 def get_behavior_type_points(behavior_type: PositiveBehaviorType) -> int:
     """获取行为类型对应的积分"""
     points_map = {
@@ -458,90 +365,9 @@ async def batch_import_classroom_members(
             ],
         )
     
-    created_members: List[ClassroomMembershipResponse] = []
-    errors: List[str] = []
-    
-    for i, member_data in enumerate(data.members):
-        try:
-            # 根据提供的标识字段查找用户
-            user = await find_user_by_identifiers(
-                db,
-                user_id=member_data.user_id,
-                student_id_number=member_data.student_id_number,
-                full_name=member_data.full_name,
-                email=member_data.email,
-                username=member_data.username,
-                student_no=member_data.student_no,
-                classroom_id=classroom_id,
-            )
-            
-            if not user:
-                # 构建错误信息，显示尝试匹配的字段
-                identifiers = []
-                if member_data.user_id:
-                    identifiers.append(f"用户ID={member_data.user_id}")
-                if member_data.student_id_number:
-                    identifiers.append(f"学籍号={member_data.student_id_number}")
-                if member_data.full_name:
-                    identifiers.append(f"姓名={member_data.full_name}")
-                if member_data.email:
-                    identifiers.append(f"邮箱={member_data.email}")
-                if member_data.username:
-                    identifiers.append(f"用户名={member_data.username}")
-                if member_data.student_no:
-                    identifiers.append(f"学号={member_data.student_no}")
-                
-                errors.append(f"第{i+1}行：未找到匹配的用户（{', '.join(identifiers)}）")
-                continue
-            
-            # 检查是否已是成员
-            existing_result = await db.execute(
-                select(ClassroomMembership).where(
-                    ClassroomMembership.classroom_id == classroom_id,
-                    ClassroomMembership.user_id == user.id,
-                )
-            )
-            existing = existing_result.scalar_one_or_none()
-            
-            # 使用提供的student_no或保持现有的
-            final_student_no = member_data.student_no if member_data.student_no else existing.student_no if existing else None
-            
-            if existing:
-                if existing.is_active:
-                    errors.append(f"第{i+1}行：用户 {user.username} ({user.full_name or '未设置姓名'}) 已是该班级的成员")
-                    continue
-                else:
-                    # 重新激活并更新信息
-                    existing.role_in_class = member_data.role_in_class
-                    existing.is_active = True
-                    existing.student_no = final_student_no
-                    existing.seat_no = member_data.seat_no
-                    existing.cadre_title = member_data.cadre_title
-                    existing.is_primary_class = member_data.is_primary_class
-                    await db.flush()
-                    await db.refresh(existing)
-                    created_members.append(ClassroomMembershipResponse.model_validate(existing))
-                    continue
-            
-            # 创建新成员关系
-            new_membership = ClassroomMembership(
-                classroom_id=classroom_id,
-                user_id=user.id,
-                role_in_class=member_data.role_in_class,
-                student_no=final_student_no,
-                seat_no=member_data.seat_no,
-                cadre_title=member_data.cadre_title,
-                is_primary_class=member_data.is_primary_class,
-                is_active=True,
-            )
-            db.add(new_membership)
-            await db.flush()
-            await db.refresh(new_membership)
-            created_members.append(ClassroomMembershipResponse.model_validate(new_membership))
-            
-        except Exception as e:
-            errors.append(f"第{i+1}项：处理失败 - {str(e)}")
-            continue
+    # 批量匹配用户并写入成员关系，查询次数与名单行数无关
+    memberships, errors = await import_classroom_members(db, classroom_id, data.members)
+    created_members = [ClassroomMembershipResponse.model_validate(m) for m in memberships]
     
     await db.commit()
     
@@ -802,6 +628,7 @@ async def create_attendance_session(
         entries.append(entry)
     
     db.add_all(entries)
+    await refresh_daily_stats(db, classroom_id, now)
     await db.commit()
     await db.refresh(session)
     
@@ -948,6 +775,7 @@ async def update_attendance_entry(
         entry.updated_by_user_id = current_user.id
         entry.updated_at = datetime.utcnow()
     
+    await refresh_daily_stats(db, session.classroom_id, session.started_at)
     await db.commit()
     await db.refresh(entry)
     
@@ -988,6 +816,7 @@ async def mark_all_present(
         entry.status = AttendanceStatus.PRESENT
         entry.updated_by_user_id = current_user.id
         entry.updated_at = datetime.utcnow()
+    await refresh_daily_stats(db, session.classroom_id, session.started_at)
     await db.commit()
     
     return {"message": "已标记全部出勤"}
@@ -1116,8 +945,12 @@ async def create_positive_behavior(
         recorded_by_user_id=membership.user_id,
     )
     db.add(behavior)
+    await db.flush()
+    await db.refresh(behavior, ["recorded_at"])
+    await refresh_daily_stats(db, classroom_id, behavior.recorded_at)
     await db.commit()
     await db.refresh(behavior)
+    leaderboards.record(classroom_id, behavior.student_id, behavior.points, behavior.recorded_at)
     
     return PositiveBehaviorResponse.model_validate(behavior)
 
@@ -1189,6 +1022,8 @@ async def get_positive_behavior_leaderboard(
     classroom_id: int,
     from_date: Optional[datetime] = Query(None, description="开始日期"),
     to_date: Optional[datetime] = Query(None, description="结束日期"),
+    period: Optional[str] = Query(None, pattern="^week$", description="week: 本周（周一 00:00 UTC 起），忽略起止日期"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="只返回前 N 名（本人不在其中时附在最后）"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Any:
@@ -1219,47 +1054,32 @@ async def get_positive_behavior_leaderboard(
     settings = classroom.settings or {} if classroom else {}
     show_publicly = settings.get("show_positive_behaviors_publicly", False)
     
-    # 如果学生查询且未公开，只返回本人
-    if not is_management and not show_publicly:
-        # 只返回当前用户的统计
-        query = select(
-            PositiveBehavior.student_id,
-            func.sum(PositiveBehavior.points).label("total_points"),
-            func.count(PositiveBehavior.id).label("record_count"),
-        ).where(
-            PositiveBehavior.classroom_id == classroom_id,
-            PositiveBehavior.student_id == current_user.id,
-        )
+    # 全部时间和本周的排名走缓存，任意起止时间直接统计
+    if period == "week":
+        board = await leaderboards.get(db, classroom_id, since=week_start())
+    elif from_date is None and to_date is None:
+        board = await leaderboards.get(db, classroom_id)
     else:
-        # 返回全班统计
-        query = select(
-            PositiveBehavior.student_id,
-            func.sum(PositiveBehavior.points).label("total_points"),
-            func.count(PositiveBehavior.id).label("record_count"),
-        ).where(PositiveBehavior.classroom_id == classroom_id)
-    
-    # 时间范围筛选
-    if from_date:
-        query = query.where(PositiveBehavior.recorded_at >= from_date)
-    if to_date:
-        query = query.where(PositiveBehavior.recorded_at <= to_date)
+        board = Leaderboard(await load_leaderboard_entries(db, classroom_id, from_date, to_date))
+    
+    def to_response(entry, rank=None):
+        return PositiveBehaviorLeaderboardEntry(
+            student_id=entry.student_id,
+            student_name=entry.student_name,
+            total_points=entry.total_points,
+            record_count=entry.record_count,
+            rank=rank,
+        )
     
-    query = query.group_by(PositiveBehavior.student_id).order_by(desc("total_points"))
+    # 如果学生查询且未公开，只返回本人（不含名次）
+    if not is_management and not show_publicly:
+        entry = board.get(current_user.id)
+        return [to_response(entry)] if entry else []
     
-    result = await db.execute(query)
-    rows = result.all()
-    
-    # 加载用户信息
-    leaderboard = []
-    for row in rows:
-        user = await db.get(User, row.student_id)
-        if user:
-            leaderboard.append(PositiveBehaviorLeaderboardEntry(
-                student_id=user.id,
-                student_name=user.full_name or user.username,
-                total_points=int(row.total_points) if row.total_points else 0,
-                record_count=int(row.record_count) if row.record_count else 0,
-            ))
+    leaderboard = [to_response(entry, rank) for rank, entry in board.top(limit)]
+    own_entry = board.get(current_user.id)
+    if limit and own_entry and all(item.student_id != current_user.id for item in leaderboard):
+        leaderboard.append(to_response(own_entry, board.rank_of(current_user.id)))
     
     return leaderboard
 
@@ -1349,6 +1169,9 @@ async def create_discipline_record(
         recorded_by_user_id=membership.user_id,
     )
     db.add(record)
+    await db.flush()
+    await db.refresh(record, ["recorded_at"])
+    await refresh_daily_stats(db, classroom_id, record.recorded_at)
     await db.commit()
     await db.refresh(record)
     
@@ -1507,6 +1330,7 @@ async def generate_duty_assignments(
     
     if assignments:
         db.add_all(assignments)
+        await refresh_daily_stats(db, classroom_id, *(a.duty_date for a in assignments))
         await db.commit()
     
     return {"message": f"已生成 {len(assignments)} 个值日任务"}
@@ -1559,6 +1383,7 @@ async def update_duty_assignment(
         assignment.completed_by_user_id = None
         assignment.completed_at = None
     
+    await refresh_daily_stats(db, assignment.classroom_id, assignment.duty_date)
     await db.commit()
     await db.refresh(assignment)
     
@@ -1568,180 +1393,82 @@ async def update_duty_assignment(
 # ==================== 统计 ====================
 
 
-@router.get("/classrooms/{classroom_id}/stats", response_model=ClassroomStatsResponse)
-async def get_classroom_stats(
-    classroom_id: int,
-    from_date: Optional[datetime] = Query(None, description="开始日期"),
-    to_date: Optional[datetime] = Query(None, description="结束日期"),
-    db: AsyncSession = Depends(get_db),
-    membership: ClassroomMembership = Depends(require_classroom_member),
-) -> Any:
-    """获取班级统计"""
-    # 默认时间范围：最近30天
-    if not to_date:
-        to_date = datetime.utcnow()
-    if not from_date:
-        from_date = to_date - timedelta(days=30)
-    
-    # 出勤统计 - 先统计会话数
-    session_count_query = select(
-        func.count(AttendanceSession.id).label("total_sessions")
-    ).where(
-        AttendanceSession.classroom_id == classroom_id,
-        AttendanceSession.started_at >= from_date,
-        AttendanceSession.started_at <= to_date,
-    )
-    session_count_result = await db.execute(session_count_query)
-    total_sessions = session_count_result.scalar() or 0
-    
-    # 统计各状态的条目数
-    attendance_query = select(
-        func.sum(
-            case((AttendanceEntry.status == AttendanceStatus.PRESENT, 1), else_=0)
-        ).label("present_count"),
-        func.sum(
-            case((AttendanceEntry.status == AttendanceStatus.LATE, 1), else_=0)
-        ).label("late_count"),
-        func.sum(
-            case((AttendanceEntry.status == AttendanceStatus.LEAVE, 1), else_=0)
-        ).label("leave_count"),
-        func.sum(
-            case((AttendanceEntry.status == AttendanceStatus.ABSENT, 1), else_=0)
-        ).label("absent_count"),
-    ).select_from(
-        join(AttendanceSession, AttendanceEntry, AttendanceSession.id == AttendanceEntry.session_id)
-    ).where(
-        AttendanceSession.classroom_id == classroom_id,
-        AttendanceSession.started_at >= from_date,
-        AttendanceSession.started_at <= to_date,
-    )
-    
-    attendance_result = await db.execute(attendance_query)
-    attendance_row = attendance_result.first()
-    
+def build_stats_sections(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """根据区间内累加的每日汇总生成各项统计，没有记录的项为 None"""
     attendance_stats = None
-    if total_sessions > 0:
-        present_count = int(attendance_row.present_count or 0) if attendance_row else 0
-        late_count = int(attendance_row.late_count or 0) if attendance_row else 0
-        leave_count = int(attendance_row.leave_count or 0) if attendance_row else 0
-        absent_count = int(attendance_row.absent_count or 0) if attendance_row else 0
-        
-        total_entries = present_count + late_count + leave_count + absent_count
-        attendance_rate = present_count / total_entries if total_entries > 0 else 0.0
-        
+    if totals["attendance_sessions"] > 0:
+        present_count = totals["attendance_present"]
+        total_entries = (
+            present_count
+            + totals["attendance_late"]
+            + totals["attendance_leave"]
+            + totals["attendance_absent"]
+        )
         attendance_stats = AttendanceStats(
-            total_sessions=int(total_sessions),
+            total_sessions=totals["attendance_sessions"],
             present_count=present_count,
-            late_count=late_count,
-            leave_count=leave_count,
-            absent_count=absent_count,
-            attendance_rate=attendance_rate,
+            late_count=totals["attendance_late"],
+            leave_count=totals["attendance_leave"],
+            absent_count=totals["attendance_absent"],
+            attendance_rate=present_count / total_entries if total_entries > 0 else 0.0,
         )
-    
-    # 正面行为统计
-    positive_query = select(
-        func.sum(PositiveBehavior.points).label("total_points"),
-        func.count(PositiveBehavior.id).label("total_records"),
-    ).where(
-        PositiveBehavior.classroom_id == classroom_id,
-        PositiveBehavior.recorded_at >= from_date,
-        PositiveBehavior.recorded_at <= to_date,
-    )
-    
-    positive_result = await db.execute(positive_query)
-    positive_row = positive_result.first()
-    
+
     positive_stats = None
-    if positive_row and positive_row.total_records:
-        # 按类型统计积分
-        points_by_type_query = select(
-            PositiveBehavior.behavior_type,
-            func.sum(PositiveBehavior.points).label("points"),
-        ).where(
-            PositiveBehavior.classroom_id == classroom_id,
-            PositiveBehavior.recorded_at >= from_date,
-            PositiveBehavior.recorded_at <= to_date,
-        ).group_by(PositiveBehavior.behavior_type)
-        
-        points_by_type_result = await db.execute(points_by_type_query)
-        points_by_type = {
-            row.behavior_type: int(row.points or 0) for row in points_by_type_result.all()
-        }
+    if totals["positive_records"]:
         positive_stats = PositiveBehaviorStats(
-            total_points=int(positive_row.total_points or 0),
-            total_records=int(positive_row.total_records),
-            points_by_type=points_by_type,
+            total_points=totals["positive_points"],
+            total_records=totals["positive_records"],
+            points_by_type=totals["positive_points_by_type"],
         )
-    
-    # 纪律统计
-    discipline_query = select(
-        func.count(DisciplineRecord.id).label("total_records"),
-    ).where(
-        DisciplineRecord.classroom_id == classroom_id,
-        DisciplineRecord.recorded_at >= from_date,
-        DisciplineRecord.recorded_at <= to_date,
-    )
-    
-    discipline_result = await db.execute(discipline_query)
-    discipline_row = discipline_result.first()
-    
+
     discipline_stats = None
-    if discipline_row and discipline_row.total_records:
-        # 按类型统计
-        records_by_type_query = select(
-            DisciplineRecord.event_type,
-            func.count(DisciplineRecord.id).label("count"),
-        ).where(
-            DisciplineRecord.classroom_id == classroom_id,
-            DisciplineRecord.recorded_at >= from_date,
-            DisciplineRecord.recorded_at <= to_date,
-        ).group_by(DisciplineRecord.event_type)
-        
-        records_by_type_result = await db.execute(records_by_type_query)
-        records_by_type = {
-            row.event_type: int(row.count or 0) for row in records_by_type_result.all()
-        }
+    if totals["discipline_records"]:
         discipline_stats = DisciplineStats(
-            total_records=int(discipline_row.total_records),
-            records_by_type=records_by_type,
+            total_records=totals["discipline_records"],
+            records_by_type=totals["discipline_by_type"],
         )
-    
-    # 值日统计
-    duty_query = select(
-        func.count(DutyAssignment.id).label("total_assignments"),
-        func.sum(
-            case((DutyAssignment.status == DutyAssignmentStatus.COMPLETED, 1), else_=0)
-        ).label("completed_count"),
-    ).where(
-        DutyAssignment.classroom_id == classroom_id,
-        DutyAssignment.duty_date >= from_date,
-        DutyAssignment.duty_date <= to_date,
-    )
-    
-    duty_result = await db.execute(duty_query)
-    duty_row = duty_result.first()
-    
-    total_duty = int(duty_row.total_assignments or 0)
-    completed_duty = int(duty_row.completed_count or 0)
-    duty_completion_rate = completed_duty / total_duty if total_duty > 0 else 0.0
-    
+
     duty_stats = None
+    total_duty = totals["duty_assignments"]
     if total_duty:
+        completed_duty = totals["duty_completed"]
         duty_stats = DutyStats(
             total_assignments=total_duty,
             completed_count=completed_duty,
             pending_count=total_duty - completed_duty,
-            completion_rate=duty_completion_rate,
+            completion_rate=completed_duty / total_duty,
         )
-    
+
+    return {
+        "attendance": attendance_stats,
+        "positive_behaviors": positive_stats,
+        "discipline": discipline_stats,
+        "duty": duty_stats,
+    }
+
+
+@router.get("/classrooms/{classroom_id}/stats", response_model=ClassroomStatsResponse)
+async def get_classroom_stats(
+    classroom_id: int,
+    from_date: Optional[datetime] = Query(None, description="开始日期"),
+    to_date: Optional[datetime] = Query(None, description="结束日期"),
+    db: AsyncSession = Depends(get_db),
+    membership: ClassroomMembership = Depends(require_classroom_member),
+) -> Any:
+    """获取班级统计（按统计时区的整天累加每日汇总，包含开始和结束日期当天）"""
+    # 默认时间范围：最近30天
+    if not to_date:
+        to_date = datetime.utcnow()
+    if not from_date:
+        from_date = to_date - timedelta(days=30)
+
+    totals = await load_period_stats(db, classroom_id, from_date, to_date)
+
     return ClassroomStatsResponse(
         classroom_id=classroom_id,
         period_start=from_date,
         period_end=to_date,
-        attendance=attendance_stats,
-        positive_behaviors=positive_stats,
-        discipline=discipline_stats,
-        duty=duty_stats,
+        **build_stats_sections(totals),
     )
 
 
@@ -1752,7 +1479,7 @@ async def get_my_stats(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Any:
-    """获取学生本人统计"""
+    """获取学生本人统计（按统计时区的整天累加每日汇总，包含开始和结束日期当天）"""
     # 默认时间范围：最近30天
     if not to_date:
         to_date = datetime.utcnow()
@@ -1777,159 +1504,14 @@ async def get_my_stats(
         (m for m in memberships if m.is_primary_class), memberships[0]
     )
     classroom_id = primary_membership.classroom_id
-    
-    # 出勤统计
-    attendance_query = select(
-        func.count(AttendanceSession.id).label("total_sessions"),
-        func.sum(
-            case((AttendanceEntry.status == AttendanceStatus.PRESENT, 1), else_=0)
-        ).label("present_count"),
-        func.sum(
-            case((AttendanceEntry.status == AttendanceStatus.LATE, 1), else_=0)
-        ).label("late_count"),
-        func.sum(
-            case((AttendanceEntry.status == AttendanceStatus.LEAVE, 1), else_=0)
-        ).label("leave_count"),
-        func.sum(
-            case((AttendanceEntry.status == AttendanceStatus.ABSENT, 1), else_=0)
-        ).label("absent_count"),
-    ).select_from(
-        join(AttendanceSession, AttendanceEntry, AttendanceSession.id == AttendanceEntry.session_id)
-    ).where(
-        AttendanceSession.classroom_id == classroom_id,
-        AttendanceEntry.student_id == current_user.id,
-        AttendanceSession.started_at >= from_date,
-        AttendanceSession.started_at <= to_date,
-    )
-    
-    attendance_result = await db.execute(attendance_query)
-    attendance_row = attendance_result.first()
-    
-    attendance_stats = None
-    if attendance_row and attendance_row.total_sessions:
-        total_entries = (
-            (attendance_row.present_count or 0)
-            + (attendance_row.late_count or 0)
-            + (attendance_row.leave_count or 0)
-            + (attendance_row.absent_count or 0)
-        )
-        attendance_rate = (
-            (attendance_row.present_count or 0) / total_entries if total_entries > 0 else 0.0
-        )
-        attendance_stats = AttendanceStats(
-            total_sessions=int(attendance_row.total_sessions),
-            present_count=int(attendance_row.present_count or 0),
-            late_count=int(attendance_row.late_count or 0),
-            leave_count=int(attendance_row.leave_count or 0),
-            absent_count=int(attendance_row.absent_count or 0),
-            attendance_rate=attendance_rate,
-        )
-    
-    # 正面行为统计
-    positive_query = select(
-        func.sum(PositiveBehavior.points).label("total_points"),
-        func.count(PositiveBehavior.id).label("total_records"),
-    ).where(
-        PositiveBehavior.student_id == current_user.id,
-        PositiveBehavior.classroom_id == classroom_id,
-        PositiveBehavior.recorded_at >= from_date,
-        PositiveBehavior.recorded_at <= to_date,
-    )
-    
-    positive_result = await db.execute(positive_query)
-    positive_row = positive_result.first()
-    
-    positive_stats = None
-    if positive_row and positive_row.total_records:
-        points_by_type_query = select(
-            PositiveBehavior.behavior_type,
-            func.sum(PositiveBehavior.points).label("points"),
-        ).where(
-            PositiveBehavior.student_id == current_user.id,
-            PositiveBehavior.classroom_id == classroom_id,
-            PositiveBehavior.recorded_at >= from_date,
-            PositiveBehavior.recorded_at <= to_date,
-        ).group_by(PositiveBehavior.behavior_type)
-        
-        points_by_type_result = await db.execute(points_by_type_query)
-        points_by_type = {
-            row.behavior_type: int(row.points) for row in points_by_type_result.all()
-        }
-        positive_stats = PositiveBehaviorStats(
-            total_points=int(positive_row.total_points or 0),
-            total_records=int(positive_row.total_records),
-            points_by_type=points_by_type,
-        )
-    
-    # 纪律统计
-    discipline_query = select(
-        func.count(DisciplineRecord.id).label("total_records"),
-    ).where(
-        DisciplineRecord.student_id == current_user.id,
-        DisciplineRecord.classroom_id == classroom_id,
-        DisciplineRecord.recorded_at >= from_date,
-        DisciplineRecord.recorded_at <= to_date,
-    )
-    
-    discipline_result = await db.execute(discipline_query)
-    discipline_row = discipline_result.first()
-    
-    discipline_stats = None
-    if discipline_row and discipline_row.total_records:
-        records_by_type_query = select(
-            DisciplineRecord.event_type,
-            func.count(DisciplineRecord.id).label("count"),
-        ).where(
-            DisciplineRecord.student_id == current_user.id,
-            DisciplineRecord.classroom_id == classroom_id,
-            DisciplineRecord.recorded_at >= from_date,
-            DisciplineRecord.recorded_at <= to_date,
-        ).group_by(DisciplineRecord.event_type)
-        
-        records_by_type_result = await db.execute(records_by_type_query)
-        records_by_type = {
-            row.event_type: int(row.count) for row in records_by_type_result.all()
-        }
-        discipline_stats = DisciplineStats(
-            total_records=int(discipline_row.total_records),
-            records_by_type=records_by_type,
-        )
-    
-    # 值日统计
-    duty_query = select(
-        func.count(DutyAssignment.id).label("total_assignments"),
-        func.sum(
-            case((DutyAssignment.status == DutyAssignmentStatus.COMPLETED, 1), else_=0)
-        ).label("completed_count"),
-    ).where(
-        DutyAssignment.assignee_user_id == current_user.id,
-        DutyAssignment.classroom_id == classroom_id,
-        DutyAssignment.duty_date >= from_date,
-        DutyAssignment.duty_date <= to_date,
+
+    totals = await load_period_stats(
+        db, classroom_id, from_date, to_date, student_id=current_user.id
     )
-    
-    duty_result = await db.execute(duty_query)
-    duty_row = duty_result.first()
-    
-    total_duty = int(duty_row.total_assignments or 0)
-    completed_duty = int(duty_row.completed_count or 0)
-    duty_completion_rate = completed_duty / total_duty if total_duty > 0 else 0.0
-    
-    duty_stats = None
-    if total_duty:
-        duty_stats = DutyStats(
-            total_assignments=total_duty,
-            completed_count=completed_duty,
-            pending_count=total_duty - completed_duty,
-            completion_rate=duty_completion_rate,
-        )
-    
+
     return StudentStatsResponse(
         student_id=current_user.id,
         period_start=from_date,
         period_end=to_date,
-        attendance=attendance_stats,
-        positive_behaviors=positive_stats,
-        discipline=discipline_stats,
-        duty=duty_stats,
+        **build_stats_sections(totals),
     )
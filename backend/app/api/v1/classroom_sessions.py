@@ -1327,7 +1327,7 @@ async def send_initial_state(websocket: WebSocket, session: ClassSession, db: As
         }
     }
     
-    await websocket.send_text(json.dumps(message))
+    manager.send_to_websocket(websocket, message)
 
 
 async def handle_client_message(
@@ -1343,11 +1343,11 @@ async def handle_client_message(
     
     if message_type == "ping":
         # 心跳响应
-        await websocket.send_text(json.dumps({
+        manager.send_to_websocket(websocket, {
             "type": "pong",
             "timestamp": datetime.utcnow().isoformat(),
             "data": {}
-        }))
+        })
     
     elif message_type == "update_progress":
         # 更新学生进度
@@ -1503,14 +1503,14 @@ async def websocket_teacher_session_endpoint(
     )
     
     # 6. 发送初始连接确认
-    await websocket.send_text(json.dumps({
+    manager.send_to_websocket(websocket, {
         "type": "teacher_connected",
         "timestamp": datetime.utcnow().isoformat(),
         "data": {
             "session_id": session_id,
             "teacher_id": teacher_id,
         }
-    }))
+    })
     
     try:
         # 7. 监听客户端消息（心跳、请求统计等）
@@ -1521,10 +1521,10 @@ async def websocket_teacher_session_endpoint(
             
             if message_type == "ping":
                 # 心跳响应
-                await websocket.send_text(json.dumps({
+                manager.send_to_websocket(websocket, {
                     "type": "pong",
                     "timestamp": datetime.utcnow().isoformat(),
-                }))
+                })
             
             elif message_type == "request_statistics":
                 # 请求统计信息
@@ -1563,7 +1563,7 @@ async def websocket_teacher_session_endpoint(
                         data=stats
                     )
                     
-                    await websocket.send_text(json.dumps(event))
+                    manager.send_to_websocket(websocket, event.encode())
     
     except WebSocketDisconnect:
         print(f"🔌 教师 {teacher_id} 断开连接（会话 {session_id}）")
@@ -1732,14 +1732,14 @@ async def websocket_teacher_lesson_endpoint(
     )
     
     # 6. 发送初始连接确认
-    await websocket.send_text(json.dumps({
+    manager.send_to_websocket(websocket, {
         "type": "teacher_connected",
         "timestamp": datetime.utcnow().isoformat(),
         "data": {
             "lesson_id": lesson_id,
             "teacher_id": teacher_id,
         }
-    }))
+    })
     
     try:
         # 7. 监听客户端消息（心跳、请求统计等）
@@ -1750,10 +1750,10 @@ async def websocket_teacher_lesson_endpoint(
             
             if message_type == "ping":
                 # 心跳响应
-                await websocket.send_text(json.dumps({
+                manager.send_to_websocket(websocket, {
                     "type": "pong",
                     "timestamp": datetime.utcnow().isoformat(),
-                }))
+                })
             
             elif message_type == "request_statistics":
                 # 请求统计信息
@@ -1795,7 +1795,7 @@ async def websocket_teacher_lesson_endpoint(
                         data=stats
                     )
                     
-                    await websocket.send_text(json.dumps(event))
+                    manager.send_to_websocket(websocket, event.encode())
     
     except WebSocketDisconnect:
         print(f"🔌 教师 {teacher_id} 断开连接（教案 {lesson_id}）")
@@ -2,7 +2,7 @@
 课程导出导入 API
 """
 
-from typing import Any, List, Optional, Dict, Set, cast
+from typing import Any, AsyncIterator, List, Optional, Dict, Set, cast
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,15 +12,18 @@ import json
 import io
 import os
 import re
-import zipfile
 import tempfile
+import uuid
 from pathlib import Path
 from datetime import datetime
 
-from app.core.database import get_db
-from app.models import Subject, Grade, Course, Chapter, Lesson, Resource, User, UserRole
-from app.models.lesson import LessonStatus
+from app.core.database import AsyncSessionLocal, get_db
+from app.models import Course, Chapter, Lesson, User, UserRole
 from app.api.deps import get_current_user, get_current_admin, get_current_researcher
+from app.models.course_job import CourseJob
+from app.services.course_import import detect_import_format, run_course_import
+from app.services.course_jobs import course_job_runner, serialize_job
+from app.services.zip_stream import FileSource, stream_zip
 
 router = APIRouter()
 
@@ -116,220 +119,6 @@ def url_to_file_path(url: str) -> Optional[str]:
     return None
 
 
-async def _process_zip_import(zip_content: bytes, current_user: User) -> tuple[Dict, Dict[str, str]]:
-    """
-    处理ZIP文件导入
-    返回: (导入数据字典, URL映射字典)
-    """
-    from app.services.upload import upload_service
-    from fastapi import UploadFile
-    
-    url_mapping = {}
-    import_data = None
-    
-    # 创建临时目录
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # 解压ZIP文件
-        zip_path = os.path.join(temp_dir, "import.zip")
-        with open(zip_path, "wb") as f:
-            f.write(zip_content)
-        
-        try:
-            zip_file = zipfile.ZipFile(zip_path, 'r')
-        except zipfile.BadZipFile as e:
-            raise HTTPException(400, f"ZIP文件格式错误或已损坏: {str(e)}")
-        except Exception as e:
-            raise HTTPException(400, f"无法打开ZIP文件: {str(e)}")
-        
-        with zip_file:
-            # 读取JSON数据
-            try:
-                file_list = zip_file.namelist()
-            except Exception as e:
-                raise HTTPException(400, f"无法读取ZIP文件列表: {str(e)}")
-            
-            if file_list is None:
-                raise HTTPException(400, "ZIP文件损坏或格式不正确")
-            
-            if "data.json" not in file_list:
-                available_files = ", ".join(file_list[:10])  # 显示前10个文件名
-                if len(file_list) > 10:
-                    available_files += f" ... (共 {len(file_list)} 个文件)"
-                raise HTTPException(400, f"ZIP文件中缺少data.json。可用文件: {available_files}")
-            
-            json_content = zip_file.read("data.json")
-            
-            # 根据导出函数的实现，data.json 使用 UTF-8 编码
-            # 优先尝试 UTF-8，如果失败再尝试其他编码
-            import_data = None
-            last_decode_error = None
-            last_json_error = None
-            
-            # 优先使用 UTF-8（导出时使用的编码）
-            try:
-                decoded_content = json_content.decode('utf-8')
-                import_data = json.loads(decoded_content)
-            except UnicodeDecodeError as e:
-                last_decode_error = f"UTF-8解码失败: {str(e)}"
-                # 如果 UTF-8 失败，尝试其他编码
-                encodings = ['utf-8-sig', 'gbk', 'gb2312', 'gb18030']
-                for encoding in encodings:
-                    try:
-                        decoded_content = json_content.decode(encoding)
-                        try:
-                            import_data = json.loads(decoded_content)
-                            break  # 成功解析，跳出循环
-                        except json.JSONDecodeError as e:
-                            last_json_error = f"编码 {encoding}: JSON解析失败 - {str(e)}"
-                            continue
-                    except UnicodeDecodeError as e:
-                        continue  # 尝试下一个编码
-            except json.JSONDecodeError as e:
-                last_json_error = f"UTF-8编码JSON解析失败: {str(e)}"
-                # 显示错误位置附近的内容
-                try:
-                    decoded_content = json_content.decode('utf-8', errors='replace')
-                    if hasattr(e, 'pos') and e.pos is not None:
-                        start = max(0, e.pos - 100)
-                        end = min(len(decoded_content), e.pos + 100)
-                        context = decoded_content[start:end].replace('\n', '\\n').replace('\r', '\\r')
-                        last_json_error += f" (位置 {e.pos} 附近: ...{context}...)"
-                except:
-                    pass
-            
-            if import_data is None:
-                error_msg = "无法解析ZIP文件中的data.json。"
-                if last_json_error:
-                    error_msg += f" {last_json_error}"
-                elif last_decode_error:
-                    error_msg += f" {last_decode_error}"
-                else:
-                    error_msg += " 请确保文件是有效的JSON格式。"
-                raise HTTPException(400, error_msg)
-            
-            # 处理资源文件
-            resources_dir = os.path.join(temp_dir, "resources")
-            os.makedirs(resources_dir, exist_ok=True)
-            
-            # 提取所有资源文件
-            for file_info in zip_file.filelist:
-                if file_info.filename.startswith("resources/") and not file_info.is_dir():
-                    # 提取文件
-                    zip_file.extract(file_info.filename, temp_dir)
-                    file_path = os.path.join(temp_dir, file_info.filename)
-                    
-                    # 上传文件到服务器
-                    original_filename = os.path.basename(file_info.filename)
-                    
-                    # 读取文件内容
-                    with open(file_path, "rb") as f:
-                        file_content = f.read()
-                    
-                    # 创建UploadFile对象（使用BytesIO）
-                    from io import BytesIO
-                    file_stream = BytesIO(file_content)
-                    upload_file = UploadFile(
-                        filename=original_filename,
-                        file=file_stream
-                    )
-                    
-                    # 上传文件
-                    try:
-                        upload_result = await upload_service.upload_file(upload_file)
-                        
-                        # 检查上传结果
-                        if not upload_result or "file_url" not in upload_result:
-                            print(f"警告: 文件 {original_filename} 上传失败或返回格式不正确")
-                            continue
-                        
-                        # 记录URL映射
-                        old_url = f"/uploads/resources/{original_filename}"
-                        new_url = upload_result["file_url"]
-                        url_mapping[old_url] = new_url
-                    except Exception as e:
-                        print(f"警告: 上传文件 {original_filename} 时出错: {str(e)}")
-                        continue
-                    
-                    # 也映射文件名（不包含路径）
-                    url_mapping[original_filename] = new_url
-                    url_mapping[f"resources/{original_filename}"] = new_url
-        
-        # 确保 import_data 不为 None
-        if import_data is None:
-            raise HTTPException(400, "ZIP文件处理失败：无法解析data.json")
-    
-    return import_data, url_mapping
-
-
-def _update_urls_in_data(data: Dict, url_mapping: Dict[str, str]) -> Dict:
-    """
-    更新数据中的URL引用
-    """
-    if data is None:
-        raise ValueError("data 不能为 None")
-    if url_mapping is None:
-        url_mapping = {}
-    
-    import copy
-    data = copy.deepcopy(data)
-    
-    def update_urls_in_content(content: Any) -> Any:
-        """递归更新内容中的URL"""
-        if isinstance(content, dict):
-            # 更新字典中的URL字段
-            for key, value in content.items():
-                if key in ["file_url", "thumbnail_url", "cover_image_url", "videoUrl", "video_url", 
-                          "preview_url", "download_url"] and isinstance(value, str):
-                    # 尝试匹配URL
-                    for old_url, new_url in url_mapping.items():
-                        if old_url in value or value.endswith(old_url.split("/")[-1]):
-                            content[key] = new_url
-                            break
-                elif key == "html" and isinstance(value, str):
-                    # 更新HTML中的URL
-                    html = value
-                    for old_url, new_url in url_mapping.items():
-                        # 替换各种可能的URL格式
-                        html = html.replace(old_url, new_url)
-                        filename = old_url.split("/")[-1]
-                        if filename in html:
-                            html = html.replace(f"/uploads/resources/{filename}", new_url)
-                            html = html.replace(f'"/uploads/resources/{filename}"', f'"{new_url}"')
-                            html = html.replace(f"'/uploads/resources/{filename}'", f"'{new_url}'")
-                    content[key] = html
-                else:
-                    content[key] = update_urls_in_content(value)
-            return content
-        elif isinstance(content, list):
-            return [update_urls_in_content(item) for item in content]
-        else:
-            return content
-    
-    # 更新教案内容
-    for lesson in data.get("lessons", []):
-        lesson["content"] = update_urls_in_content(lesson.get("content", []))
-        if "cover_image_url" in lesson and lesson["cover_image_url"]:
-            cover_image_url = lesson["cover_image_url"]
-            if isinstance(cover_image_url, str):
-                for old_url, new_url in url_mapping.items():
-                    if old_url in cover_image_url:
-                        lesson["cover_image_url"] = new_url
-                        break
-    
-    # 更新资源URL
-    for resource in data.get("resources", []):
-        for key in ["file_url", "thumbnail_url"]:
-            if key in resource and resource[key]:
-                resource_url = resource[key]
-                if isinstance(resource_url, str):
-                    for old_url, new_url in url_mapping.items():
-                        if old_url in resource_url:
-                            resource[key] = new_url
-                            break
-    
-    return data
-
-
 def collect_all_files(export_data: Dict, lesson_data_list: List[Dict], resource_data_list: List[Dict]) -> Dict[str, str]:
     """
     收集所有需要导出的文件
@@ -378,6 +167,118 @@ def collect_all_files(export_data: Dict, lesson_data_list: List[Dict], resource_
     return files_map
 
 
+# 流式导出时每批读取的教案数量
+LESSON_EXPORT_BATCH_SIZE = 50
+
+
+def _lesson_export_data(lesson: Lesson, course_code: str, chapter_code_map: Dict[int, str]) -> Dict:
+    """构建单个教案的导出数据"""
+    return {
+        "course_code": course_code,
+        "chapter_code": (
+            chapter_code_map.get(lesson.chapter_id)
+            if lesson.chapter_id
+            else None
+        ),
+        "title": lesson.title,
+        "description": lesson.description,
+        "status": lesson.status.value,
+        "content": lesson.content,
+        "tags": lesson.tags,
+        "cover_image_url": lesson.cover_image_url,
+        "difficulty_level": (
+            lesson.difficulty_level.value if lesson.difficulty_level else None
+        ),
+        "estimated_duration": lesson.estimated_duration,
+        "reference_notes": lesson.reference_notes,
+    }
+
+
+async def _iter_lesson_json(
+    course_specs: List[tuple],
+    files_map: Dict[str, str],
+) -> AsyncIterator[str]:
+    """
+    逐个教案生成 data.json 中 lessons 数组的内容
+
+    course_specs: [(course_id, course_code, chapter_code_map), ...]
+    教案按 id 分批读取，写出后即释放；教案引用的文件同时记录到 files_map。
+    使用独立的数据库会话，响应流式输出期间不依赖请求的会话。
+    """
+    first = True
+    async with AsyncSessionLocal() as session:
+        for course_id, course_code, chapter_code_map in course_specs:
+            last_id = 0
+            while True:
+                result = await session.execute(
+                    select(Lesson)
+                    .where(Lesson.course_id == course_id, Lesson.id > last_id)
+                    .order_by(Lesson.id)
+                    .limit(LESSON_EXPORT_BATCH_SIZE)
+                )
+                lessons = result.scalars().all()
+                if not lessons:
+                    break
+
+                for lesson in lessons:
+                    lesson_data = _lesson_export_data(lesson, course_code, chapter_code_map)
+                    files_map.update(collect_all_files({}, [lesson_data], []))
+                    text = json.dumps(lesson_data, ensure_ascii=False, indent=2, default=str)
+                    yield text if first else ",\n" + text
+                    first = False
+
+                last_id = lessons[-1].id
+                session.expunge_all()
+
+
+async def _course_export_entries(
+    export_data: Dict,
+    course_specs: List[tuple],
+    files_map: Dict[str, str],
+) -> AsyncIterator[tuple]:
+    """
+    按顺序生成导出 ZIP 的条目：data.json（教案逐个写出）、资源文件、manifest.json
+
+    export_data["data"]["lessons"] 留空，由 course_specs 对应的教案流式填充。
+    """
+    # 用占位符把 data.json 拆成 lessons 数组前后两段
+    placeholder = f"__lessons_{uuid.uuid4().hex}__"
+    export_data["data"]["lessons"] = placeholder
+    document = json.dumps(export_data, ensure_ascii=False, indent=2, default=str)
+    head, tail = document.split(json.dumps(placeholder), 1)
+
+    async def data_json() -> AsyncIterator[str]:
+        yield head + "["
+        async for piece in _iter_lesson_json(course_specs, files_map):
+            yield piece
+        yield "]" + tail
+
+    yield "data.json", data_json()
+
+    # data.json 写完后 files_map 已包含教案引用的文件
+    for zip_path, file_path in list(files_map.items()):
+        yield zip_path, FileSource(file_path)
+
+    manifest = {
+        "version": "1.0",
+        "export_time": datetime.utcnow().isoformat(),
+        "files": list(files_map.keys()),
+        "file_count": len(files_map)
+    }
+    yield "manifest.json", json.dumps(manifest, indent=2)
+
+
+def _zip_download_response(entries: Any, filename: str) -> StreamingResponse:
+    """以流式 ZIP 返回下载"""
+    import urllib.parse
+    quoted = urllib.parse.quote(filename)
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quoted}"},
+    )
+
+
 @router.get("/export-template")
 async def get_export_template():
     """获取课程导出模板"""
@@ -483,7 +384,6 @@ async def export_course(
             selectinload(Course.subject),
             selectinload(Course.grade),
             selectinload(Course.chapters).selectinload(Chapter.resources),
-            selectinload(Course.lessons),
         )
         .where(Course.id == course_id)
     )
@@ -576,68 +476,13 @@ async def export_course(
                 }
                 export_data["data"]["resources"].append(resource_data)
 
-    # 处理教案数据
-    if include_lessons:
-        for lesson in course.lessons:
-            lesson_data = {
-                "course_code": course.code,
-                "chapter_code": (
-                    chapter_code_map.get(lesson.chapter_id)
-                    if lesson.chapter_id
-                    else None
-                ),
-                "title": lesson.title,
-                "description": lesson.description,
-                "status": lesson.status.value,
-                "content": lesson.content,
-                "tags": lesson.tags,
-                "cover_image_url": lesson.cover_image_url,
-                "difficulty_level": (
-                    lesson.difficulty_level.value if lesson.difficulty_level else None
-                ),
-                "estimated_duration": lesson.estimated_duration,
-                "reference_notes": lesson.reference_notes,
-            }
-            export_data["data"]["lessons"].append(lesson_data)
+    # 资源文件；教案及其引用的文件在打包时逐个读取
+    files_map = collect_all_files(export_data, [], export_data["data"]["resources"])
+    course_specs = [(course.id, course.code, chapter_code_map)] if include_lessons else []
 
-    # 收集所有需要导出的文件
-    lesson_data_list = export_data["data"].get("lessons", [])
-    resource_data_list = export_data["data"].get("resources", [])
-    files_map = collect_all_files(export_data, lesson_data_list, resource_data_list)
-    
-    # 创建ZIP文件
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # 添加JSON数据
-        json_str = json.dumps(export_data, ensure_ascii=False, indent=2, default=str)
-        zip_file.writestr("data.json", json_str.encode("utf-8"))
-        
-        # 添加所有资源文件
-        for zip_path, file_path in files_map.items():
-            try:
-                zip_file.write(file_path, zip_path)
-            except Exception as e:
-                # 如果文件不存在或无法读取，记录错误但继续
-                print(f"警告: 无法添加文件 {file_path}: {str(e)}")
-        
-        # 创建文件清单
-        manifest = {
-            "version": "1.0",
-            "export_time": datetime.utcnow().isoformat(),
-            "files": list(files_map.keys()),
-            "file_count": len(files_map)
-        }
-        zip_file.writestr("manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
-    
-    zip_buffer.seek(0)
-    
-    # 返回ZIP文件下载
-    import urllib.parse
-    filename = urllib.parse.quote(f"{course.name}_导出.zip")
-    return StreamingResponse(
-        zip_buffer,
-        media_type="application/zip",
-        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"},
+    return _zip_download_response(
+        _course_export_entries(export_data, course_specs, files_map),
+        f"{course.name}_导出.zip",
     )
 
 
@@ -657,7 +502,6 @@ async def export_all_courses(
             selectinload(Course.subject),
             selectinload(Course.grade),
             selectinload(Course.chapters).selectinload(Chapter.resources),
-            selectinload(Course.lessons),
         )
         .where(Course.is_active == True)
         .order_by(Course.subject_id, Course.grade_id)
@@ -686,6 +530,7 @@ async def export_all_courses(
     # 收集所有学科和年级
     subjects_dict = {}
     grades_dict = {}
+    course_specs = []
 
     for course in courses:
         # 收集学科
@@ -761,76 +606,20 @@ async def export_all_courses(
                     }
                     export_data["data"]["resources"].append(resource_data)
 
-        # 处理教案数据
+        # 教案在打包时逐个读取
         if include_lessons:
-            for lesson in course.lessons:
-                lesson_data = {
-                    "course_code": course.code,
-                    "chapter_code": (
-                        chapter_code_map.get(lesson.chapter_id)
-                        if lesson.chapter_id
-                        else None
-                    ),
-                    "title": lesson.title,
-                    "description": lesson.description,
-                    "status": lesson.status.value,
-                    "content": lesson.content,
-                    "tags": lesson.tags,
-                    "cover_image_url": lesson.cover_image_url,
-                    "difficulty_level": (
-                        lesson.difficulty_level.value
-                        if lesson.difficulty_level
-                        else None
-                    ),
-                    "estimated_duration": lesson.estimated_duration,
-                    "reference_notes": lesson.reference_notes,
-                }
-                export_data["data"]["lessons"].append(lesson_data)
+            course_specs.append((course.id, course.code, chapter_code_map))
 
     # 添加学科和年级数据
     export_data["data"]["subjects"] = list(subjects_dict.values())
     export_data["data"]["grades"] = list(grades_dict.values())
 
-    # 收集所有需要导出的文件
-    lesson_data_list = export_data["data"].get("lessons", [])
-    resource_data_list = export_data["data"].get("resources", [])
-    files_map = collect_all_files(export_data, lesson_data_list, resource_data_list)
-    
-    # 创建ZIP文件
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        # 添加JSON数据
-        json_str = json.dumps(export_data, ensure_ascii=False, indent=2, default=str)
-        zip_file.writestr("data.json", json_str.encode("utf-8"))
-        
-        # 添加所有资源文件
-        for zip_path, file_path in files_map.items():
-            try:
-                zip_file.write(file_path, zip_path)
-            except Exception as e:
-                # 如果文件不存在或无法读取，记录错误但继续
-                print(f"警告: 无法添加文件 {file_path}: {str(e)}")
-        
-        # 创建文件清单
-        manifest = {
-            "version": "1.0",
-            "export_time": datetime.utcnow().isoformat(),
-            "files": list(files_map.keys()),
-            "file_count": len(files_map)
-        }
-        zip_file.writestr("manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
-    
-    zip_buffer.seek(0)
-    
-    # 返回ZIP文件下载
-    import urllib.parse
-    filename = urllib.parse.quote(
-        f"完整课程体系导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-    )
-    return StreamingResponse(
-        zip_buffer,
-        media_type="application/zip",
-        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"},
+    # 资源文件；教案及其引用的文件在打包时逐个读取
+    files_map = collect_all_files(export_data, [], export_data["data"]["resources"])
+
+    return _zip_download_response(
+        _course_export_entries(export_data, course_specs, files_map),
+        f"完整课程体系导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
     )
 
 
@@ -841,661 +630,112 @@ async def import_courses(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_admin_or_researcher),
 ):
-    """导入课程数据（支持ZIP和JSON格式）"""
+    """
+    导入课程数据（支持ZIP和JSON格式）
+
+    在请求中同步完成导入，适合小文件；大文件请使用 POST /import/jobs 提交后台任务。
+    """
 
     # 验证文件类型
     if not file.filename:
         raise HTTPException(400, "文件名不能为空")
-    
+
     # 先读取文件内容以检测实际格式
     content = await file.read()
-    
+
     if len(content) == 0:
         raise HTTPException(400, "上传的文件为空")
-    
-    # 通过文件头（魔数）检测实际文件格式
-    # ZIP 文件签名: PK\x03\x04 或 PK\x05\x06 (空ZIP) 或 PK\x07\x08
-    is_zip_by_content = (
-        len(content) >= 4 and 
-        content[:2] == b'PK' and 
-        content[2:4] in [b'\x03\x04', b'\x05\x06', b'\x07\x08', b'\x50\x4b']
-    )
-    
-    # JSON 文件通常以 { 或 [ 开头（去除BOM后）
-    is_json_by_content = False
-    if len(content) > 0:
-        # 尝试检测 UTF-8 BOM
-        if content.startswith(b'\xef\xbb\xbf'):
-            content_start = content[3:].lstrip()
-        else:
-            content_start = content.lstrip()
-        
-        # 检查是否以 JSON 字符开头
-        try:
-            first_char = content_start[0:1]
-            is_json_by_content = first_char in [b'{', b'[']
-        except (IndexError, TypeError):
-            pass
-    
-    # 根据扩展名和实际内容判断文件类型
-    is_zip_by_ext = file.filename.lower().endswith(".zip")
-    is_json_by_ext = file.filename.lower().endswith(".json")
-    
-    # 如果扩展名和实际内容不匹配，给出警告并使用实际内容类型
-    if is_zip_by_ext and not is_zip_by_content and is_json_by_content:
-        # 扩展名是 .zip 但内容是 JSON
-        is_zip = False
-        is_json = True
-    elif is_json_by_ext and not is_json_by_content and is_zip_by_content:
-        # 扩展名是 .json 但内容是 ZIP（这是当前的情况）
-        is_zip = True
-        is_json = False
-    else:
-        # 使用扩展名判断，但优先使用实际内容
-        if is_zip_by_content:
-            is_zip = True
-            is_json = False
-        elif is_json_by_content:
-            is_zip = False
-            is_json = True
-        else:
-            # 使用扩展名
-            is_zip = is_zip_by_ext
-            is_json = is_json_by_ext
-    
-    if not (is_zip or is_json):
-        raise HTTPException(400, "文件必须是ZIP或JSON格式。检测到文件扩展名: " + file.filename)
+
+    file_format = detect_import_format(content, file.filename)
 
     try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            source_path = os.path.join(work_dir, "upload")
+            with open(source_path, "wb") as f:
+                f.write(content)
+            del content
+
+            return await run_course_import(
+                db, source_path, file_format, overwrite_existing, current_user, work_dir
+            )
 
-        # URL映射：旧URL -> 新URL（用于更新导入后的文件引用）
-        url_mapping = {}
-        
-        # 如果是ZIP文件，解压并处理文件
-        if is_zip:
-            import_data, url_mapping = await _process_zip_import(content, current_user)
-        else:
-            # JSON文件，尝试多种编码格式解析
-            # 注意：latin-1 可以解码任何字节，但可能产生乱码，所以放在最后
-            import_data = None
-            encodings = ['utf-8', 'utf-8-sig', 'gbk', 'gb2312', 'gb18030', 'latin-1']
-            last_decode_error = None
-            last_json_error = None
-            successful_decodings = []  # 记录成功解码但JSON解析失败的编码
-            decoded_preview = None  # 记录解码后的内容预览
-            
-            for encoding in encodings:
-                try:
-                    decoded_content = content.decode(encoding)
-                    # 检查解码后的内容是否看起来像JSON（以 { 或 [ 开头）
-                    stripped_content = decoded_content.strip()
-                    
-                    # 对于 latin-1，额外检查是否包含乱码字符（如果包含大量非ASCII且不是中文，可能是乱码）
-                    if encoding == 'latin-1':
-                        # 检查是否包含中文字符或常见的JSON字符
-                        has_chinese = any('\u4e00' <= char <= '\u9fff' for char in decoded_content[:500])
-                        has_json_chars = '{' in decoded_content[:100] or '[' in decoded_content[:100]
-                        # 如果既没有中文也没有JSON字符，可能是乱码
-                        if not has_chinese and not has_json_chars:
-                            continue
-                    
-                    if not (stripped_content.startswith('{') or stripped_content.startswith('[')):
-                        # 解码成功但内容不像JSON，记录并继续
-                        successful_decodings.append(encoding)
-                        if not decoded_preview:
-                            decoded_preview = decoded_content[:200]  # 保存前200个字符用于调试
-                        continue
-                    
-                    try:
-                        import_data = json.loads(decoded_content)
-                        break  # 成功解析，跳出循环
-                    except json.JSONDecodeError as e:
-                        last_json_error = f"编码 {encoding}: JSON解析失败 - {str(e)}"
-                        if hasattr(e, 'pos') and e.pos is not None:
-                            # 显示错误位置附近的内容
-                            start = max(0, e.pos - 50)
-                            end = min(len(decoded_content), e.pos + 50)
-                            context = decoded_content[start:end].replace('\n', '\\n').replace('\r', '\\r')
-                            last_json_error += f" (位置 {e.pos} 附近: ...{context}...)"
-                        successful_decodings.append(encoding)
-                        if not decoded_preview:
-                            decoded_preview = decoded_content[:200]  # 保存前200个字符用于调试
-                        continue
-                except UnicodeDecodeError as e:
-                    last_decode_error = f"编码 {encoding}: 解码失败 - {str(e)}"
-                    continue  # 尝试下一个编码
-            
-            if import_data is None:
-                # 构建详细的错误信息
-                error_msg = "无法解析JSON文件。"
-                
-                if successful_decodings:
-                    # 过滤掉 latin-1，因为它可能产生乱码
-                    valid_encodings = [e for e in successful_decodings if e != 'latin-1']
-                    if valid_encodings:
-                        error_msg += f" 文件可以解码为: {', '.join(valid_encodings)}，但JSON格式无效。"
-                    elif 'latin-1' in successful_decodings:
-                        error_msg += " 文件可能使用了非标准编码，解码后内容可能不正确。"
-                    
-                    if last_json_error:
-                        error_msg += f" {last_json_error}"
-                    
-                    # 显示解码后的内容预览（如果有）
-                    if decoded_preview:
-                        preview = decoded_preview.replace('\n', '\\n').replace('\r', '\\r')
-                        if len(preview) > 100:
-                            preview = preview[:100] + "..."
-                        error_msg += f" 文件开头内容: {preview}"
-                elif last_decode_error:
-                    error_msg += f" 无法解码文件内容。最后尝试: {last_decode_error}"
-                else:
-                    error_msg += " 请确保文件是有效的JSON格式且使用UTF-8或GBK编码。"
-                
-                raise HTTPException(400, error_msg)
+    except HTTPException:
+        # 重新抛出 HTTPException，保持原始错误信息
+        raise
+    except Exception as e:
+        # 记录详细错误信息用于调试
+        import traceback
+        error_trace = traceback.format_exc()
+        print(f"导入失败 - 详细错误信息:\n{error_trace}")
+        raise HTTPException(400, f"导入失败: {str(e)}")
 
-        # 验证数据格式
-        if import_data is None:
-            raise HTTPException(400, "导入数据为空，请检查文件格式")
-        
-        if not isinstance(import_data, dict):
-            raise HTTPException(400, f"无效的导入文件格式：期望字典类型，实际为 {type(import_data).__name__}")
-        
-        # 确保 import_data 是字典类型后再检查 "data" 字段
-        if not isinstance(import_data, dict) or "data" not in import_data:
-            raise HTTPException(400, "无效的导入文件格式：缺少 'data' 字段")
 
-        data = import_data.get("data")
-        
-        # 验证 data 字段
-        if data is None:
-            raise HTTPException(400, "无效的导入文件格式：'data' 字段为空")
-        
-        if not isinstance(data, dict):
-            raise HTTPException(400, f"无效的导入文件格式：'data' 字段必须是字典类型，实际为 {type(data).__name__}")
-        
-        # 更新URL引用（如果有文件映射）
-        if url_mapping:
-            data = _update_urls_in_data(data, url_mapping)
-
-        # 导入结果统计
-        import_result = {
-            "subjects": {"created": 0, "skipped": 0},
-            "grades": {"created": 0, "skipped": 0},
-            "courses": {"created": 0, "skipped": 0},
-            "chapters": {"created": 0, "skipped": 0},
-            "lessons": {"created": 0, "skipped": 0},
-            "resources": {"created": 0, "skipped": 0},
-            "errors": [],
-        }
+async def _get_import_job(db: AsyncSession, job_id: int, current_user: User) -> CourseJob:
+    """获取导入任务（只有提交者和管理员可以查看）"""
+    job = await db.get(CourseJob, job_id)
+    if not job:
+        raise HTTPException(404, "导入任务不存在")
+    if job.created_by != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(403, "无权查看该导入任务")
+    return job
 
-        # 创建映射字典
-        subject_code_map = {}
-        grade_level_map = {}
-        course_code_map = {}
-        chapter_code_map = {}
 
-        # 1. 导入学科
-        # 注意：学科是共享的基础数据，即使overwrite_existing=True也不应该更新现有学科
-        # 避免因为导入某个课程而污染系统中其他课程使用的学科数据
-        subjects = data.get("subjects") or []
-        for subject_data in subjects:
-            try:
-                # 检查是否已存在
-                existing = await db.execute(
-                    select(Subject).where(Subject.code == subject_data["code"])
-                )
-                existing_subject = existing.scalar_one_or_none()
-
-                subject_id_value = None
-
-                if existing_subject:
-                    # 学科已存在，直接使用现有学科，不更新（避免污染共享数据）
-                    import_result["subjects"]["skipped"] += 1
-                    subject_id_value = existing_subject.id
-                else:
-                    # 创建新学科
-                    subject = Subject(**subject_data)
-                    db.add(subject)
-                    await db.commit()
-                    await db.refresh(subject)
-                    import_result["subjects"]["created"] += 1
-                    subject_id_value = subject.id
-
-                if subject_id_value is not None:
-                    subject_code_map[subject_data["code"]] = subject_id_value
-
-            except Exception as e:
-                import_result["errors"].append(
-                    f"导入学科失败 {subject_data.get('name', '')}: {str(e)}"
-                )
+@router.post("/import/jobs", status_code=202)
+async def submit_import_job(
+    file: UploadFile = File(...),
+    overwrite_existing: bool = Form(False),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin_or_researcher),
+):
+    """
+    提交后台导入任务（支持ZIP和JSON格式）
 
-        # 2. 导入年级
-        # 注意：年级是共享的基础数据，即使overwrite_existing=True也不应该更新现有年级
-        # 避免因为导入某个课程而污染系统中其他课程使用的年级数据
-        grades = data.get("grades") or []
-        for grade_data in grades:
-            try:
-                # 验证必需字段
-                if "level" not in grade_data:
-                    import_result["errors"].append(
-                        f"导入年级失败 {grade_data.get('name', '未知')}: 缺少必需字段 'level'"
-                    )
-                    continue
-                
-                # 确保 level 是整数类型
-                try:
-                    grade_level = int(grade_data["level"])
-                except (ValueError, TypeError):
-                    import_result["errors"].append(
-                        f"导入年级失败 {grade_data.get('name', '未知')}: 'level' 必须是整数，当前值为 {grade_data['level']}"
-                    )
-                    continue
-                
-                # 检查是否已存在
-                existing = await db.execute(
-                    select(Grade).where(Grade.level == grade_level)
-                )
-                existing_grade = existing.scalar_one_or_none()
-
-                grade_id_value = None
-
-                if existing_grade:
-                    # 年级已存在，直接使用现有年级，不更新（避免污染共享数据）
-                    import_result["grades"]["skipped"] += 1
-                    grade_id_value = existing_grade.id
-                else:
-                    # 创建新年级，确保使用转换后的整数 level
-                    grade_data_copy = grade_data.copy()
-                    grade_data_copy["level"] = grade_level
-                    grade = Grade(**grade_data_copy)
-                    db.add(grade)
-                    await db.commit()
-                    await db.refresh(grade)
-                    import_result["grades"]["created"] += 1
-                    grade_id_value = grade.id
-
-                if grade_id_value is not None:
-                    grade_level_map[grade_level] = grade_id_value
-
-            except Exception as e:
-                import_result["errors"].append(
-                    f"导入年级失败 {grade_data.get('name', '未知')}: {str(e)}"
-                )
+    文件保存后立即返回任务ID，通过 GET /import/jobs/{job_id} 查询进度和结果。
+    """
+    if not file.filename:
+        raise HTTPException(400, "文件名不能为空")
 
-        # 3. 导入课程
-        courses = data.get("courses") or []
-        for course_data in courses:
-            try:
-                # 验证必需字段
-                if "subject_code" not in course_data:
-                    import_result["errors"].append(
-                        f"导入课程失败 {course_data.get('name', '未知')}: 缺少必需字段 'subject_code'"
-                    )
-                    continue
-                
-                if "grade_level" not in course_data:
-                    import_result["errors"].append(
-                        f"导入课程失败 {course_data.get('name', '未知')}: 缺少必需字段 'grade_level'"
-                    )
-                    continue
-                
-                # 确保 grade_level 是整数类型，以便正确匹配
-                try:
-                    course_grade_level = int(course_data["grade_level"])
-                except (ValueError, TypeError):
-                    import_result["errors"].append(
-                        f"导入课程失败 {course_data.get('name', '未知')}: 'grade_level' 必须是整数，当前值为 {course_data['grade_level']}"
-                    )
-                    continue
-                
-                # 获取学科和年级ID
-                subject_id = subject_code_map.get(course_data["subject_code"])
-                grade_id = grade_level_map.get(course_grade_level)
-
-                if not subject_id:
-                    import_result["errors"].append(
-                        f"导入课程失败 {course_data.get('name', '未知')}: 学科代码 '{course_data['subject_code']}' 不存在（请确保在导入文件中包含该学科）"
-                    )
-                    continue
-                
-                if not grade_id:
-                    import_result["errors"].append(
-                        f"导入课程失败 {course_data.get('name', '未知')}: 年级级别 {course_grade_level} 不存在（请确保在导入文件中包含该年级，且 level 值为 {course_grade_level}）"
-                    )
-                    continue
-
-                # 验证 course_code 字段
-                if "code" not in course_data or not course_data["code"]:
-                    import_result["errors"].append(
-                        f"导入课程失败 {course_data.get('name', '未知')}: 缺少必需字段 'code'（课程代码）"
-                    )
-                    continue
-
-                course_code = course_data["code"]
-
-                # 优先使用 course_code 来检查课程是否已存在
-                # 这样可以区分同一学科和年级的不同课程（如"智慧农业"和"信息科技"）
-                existing = await db.execute(
-                    select(Course).where(Course.code == course_code)
-                )
-                existing_course = existing.scalar_one_or_none()
-
-                course_id_value = None
-
-                if existing_course:
-                    # 如果找到相同 code 的课程，检查学科和年级是否匹配
-                    if existing_course.subject_id != subject_id or existing_course.grade_id != grade_id:
-                        import_result["errors"].append(
-                            f"导入课程失败 {course_data.get('name', '未知')}: 课程代码 '{course_code}' 已存在，但属于不同的学科或年级（现有：学科ID={existing_course.subject_id}, 年级ID={existing_course.grade_id}；导入：学科ID={subject_id}, 年级ID={grade_id}）"
-                        )
-                        continue
-
-                    if overwrite_existing:
-                        # 更新现有课程
-                        for key, value in course_data.items():
-                            if key not in ["subject_code", "grade_level", "code"]:
-                                setattr(existing_course, key, value)
-                        await db.commit()
-                        import_result["courses"]["skipped"] += 1
-                    else:
-                        import_result["courses"]["skipped"] += 1
-                    course_id_value = existing_course.id
-                else:
-                    # 检查是否已有相同学科和年级的课程（但 code 不同）
-                    # 如果存在，给出警告但允许创建（因为可能是不同的课程）
-                    duplicate_check = await db.execute(
-                        select(Course).where(
-                            Course.subject_id == subject_id,
-                            Course.grade_id == grade_id,
-                            Course.name == course_data.get("name", "")
-                        )
-                    )
-                    duplicate_course = duplicate_check.scalar_one_or_none()
-                    
-                    if duplicate_course:
-                        # 如果名称也相同，则认为是重复课程
-                        import_result["errors"].append(
-                            f"导入课程失败 {course_data.get('name', '未知')}: 已存在相同名称、学科和年级的课程（代码：{duplicate_course.code}）。如需更新，请使用相同的课程代码或启用覆盖选项。"
-                        )
-                        continue
-
-                    # 创建新课程
-                    course = Course(
-                        subject_id=subject_id,
-                        grade_id=grade_id,
-                        name=course_data["name"],
-                        code=course_code,
-                        description=course_data.get("description"),
-                        is_active=course_data.get("is_active", True),
-                        display_order=course_data.get("display_order", 0),
-                        created_by=current_user.id,
-                    )
-                    db.add(course)
-                    await db.commit()
-                    await db.refresh(course)
-                    import_result["courses"]["created"] += 1
-                    course_id_value = course.id
-
-                if course_id_value is not None:
-                    course_code_map[course_code] = course_id_value
-
-            except Exception as e:
-                import_result["errors"].append(
-                    f"导入课程失败 {course_data.get('name', '')}: {str(e)}"
-                )
+    job = await course_job_runner.submit_import(db, file, overwrite_existing, current_user)
+    return serialize_job(job)
 
-        # 4. 导入章节
-        chapters = data.get("chapters") or []
-        for chapter_data in chapters:
-            try:
-                # 获取课程ID
-                course_id = course_code_map.get(chapter_data["course_code"])
-                if not course_id:
-                    import_result["errors"].append(
-                        f"章节 {chapter_data.get('name', '')} 的课程不存在"
-                    )
-                    continue
-
-                # 处理父章节关系
-                parent_id = None
-                if chapter_data.get("parent_code"):
-                    parent_id = chapter_code_map.get(chapter_data["parent_code"])
-                    if not parent_id:
-                        import_result["errors"].append(
-                            f"章节 {chapter_data.get('name', '')} 的父章节不存在"
-                        )
-                        continue
-
-                # 检查是否已存在
-                existing = await db.execute(
-                    select(Chapter).where(
-                        Chapter.course_id == course_id,
-                        Chapter.code == chapter_data["code"],
-                    )
-                )
-                existing_chapter = existing.scalar_one_or_none()
-
-                chapter_id_value = None
-
-                if existing_chapter:
-                    if overwrite_existing:
-                        # 更新现有章节
-                        for key, value in chapter_data.items():
-                            if key not in ["course_code", "parent_code"]:
-                                setattr(existing_chapter, key, value)
-                        setattr(existing_chapter, "parent_id", parent_id)
-                        await db.commit()
-                        import_result["chapters"]["skipped"] += 1
-                    else:
-                        import_result["chapters"]["skipped"] += 1
-                    chapter_id_value = existing_chapter.id
-                else:
-                    # 创建新章节
-                    chapter = Chapter(
-                        course_id=course_id,
-                        parent_id=parent_id,
-                        name=chapter_data["name"],
-                        code=chapter_data["code"],
-                        description=chapter_data.get("description"),
-                        display_order=chapter_data.get("display_order", 0),
-                        is_active=chapter_data.get("is_active", True),
-                    )
-                    db.add(chapter)
-                    await db.commit()
-                    await db.refresh(chapter)
-                    import_result["chapters"]["created"] += 1
-                    chapter_id_value = chapter.id
-
-                if chapter_id_value is not None:
-                    chapter_code_map[chapter_data["code"]] = chapter_id_value
-
-            except Exception as e:
-                import_result["errors"].append(
-                    f"导入章节失败 {chapter_data.get('name', '')}: {str(e)}"
-                )
 
-        # 5. 导入教案
-        lessons = data.get("lessons") or []
-        for lesson_data in lessons:
-            try:
-                # 获取课程ID
-                course_id = course_code_map.get(lesson_data["course_code"])
-                if not course_id:
-                    import_result["errors"].append(
-                        f"教案 {lesson_data.get('title', '')} 的课程不存在"
-                    )
-                    continue
-
-                # 获取章节ID
-                chapter_id = None
-                if lesson_data.get("chapter_code"):
-                    chapter_id = chapter_code_map.get(lesson_data["chapter_code"])
-                    if not chapter_id:
-                        import_result["errors"].append(
-                            f"教案 {lesson_data.get('title', '')} 的章节不存在"
-                        )
-                        continue
-
-                # 检查是否已存在
-                existing = await db.execute(
-                    select(Lesson).where(
-                        Lesson.course_id == course_id,
-                        Lesson.title == lesson_data["title"],
-                    )
-                )
-                existing_lesson = existing.scalar_one_or_none()
-
-                if existing_lesson:
-                    if overwrite_existing:
-                        # 更新现有教案
-                        for key, value in lesson_data.items():
-                            if key not in ["course_code", "chapter_code"]:
-                                setattr(existing_lesson, key, value)
-                        setattr(existing_lesson, "chapter_id", chapter_id)
-                        await db.commit()
-                        import_result["lessons"]["skipped"] += 1
-                    else:
-                        import_result["lessons"]["skipped"] += 1
-                else:
-                    # 创建新教案
-                    # 导入的教案默认设置为PUBLISHED状态，实现共享功能
-                    # 因为教师导出教案就表示愿意与他人分享
-                    imported_status = lesson_data.get("status", "draft")
-                    # 如果导出时是已发布状态，保持已发布；如果是草稿，也设为已发布（共享）
-                    if imported_status and imported_status in ["published", "draft"]:
-                        final_status = LessonStatus.PUBLISHED
-                    elif imported_status:
-                        try:
-                            final_status = LessonStatus(imported_status)
-                        except (ValueError, TypeError):
-                            final_status = LessonStatus.PUBLISHED
-                    else:
-                        final_status = LessonStatus.PUBLISHED
-                    
-                    lesson = Lesson(
-                        course_id=course_id,
-                        chapter_id=chapter_id,
-                        title=lesson_data["title"],
-                        description=lesson_data.get("description"),
-                        status=final_status,
-                        content=lesson_data.get("content", []),
-                        tags=lesson_data.get("tags", []),
-                        cover_image_url=lesson_data.get("cover_image_url"),
-                        difficulty_level=lesson_data.get("difficulty_level"),
-                        estimated_duration=lesson_data.get("estimated_duration"),
-                        reference_notes=lesson_data.get("reference_notes"),
-                        creator_id=current_user.id,
-                    )
-                    # 如果是已发布状态，设置发布时间
-                    if final_status == LessonStatus.PUBLISHED:
-                        setattr(lesson, "published_at", datetime.utcnow())
-                    db.add(lesson)
-                    await db.commit()
-                    await db.refresh(lesson)
-                    import_result["lessons"]["created"] += 1
-
-            except Exception as e:
-                import_result["errors"].append(
-                    f"导入教案失败 {lesson_data.get('title', '')}: {str(e)}"
-                )
+@router.get("/import/jobs")
+async def list_import_jobs(
+    limit: int = 20,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin_or_researcher),
+):
+    """当前用户最近的导入任务"""
+    result = await db.execute(
+        select(CourseJob)
+        .where(CourseJob.created_by == current_user.id)
+        .order_by(CourseJob.id.desc())
+        .limit(min(max(limit, 1), 100))
+    )
+    return [serialize_job(job) for job in result.scalars().all()]
 
-        # 6. 导入资源
-        resources = data.get("resources") or []
-        for resource_data in resources:
-            try:
-                # 获取章节ID
-                chapter_id = chapter_code_map.get(resource_data["chapter_code"])
-                if not chapter_id:
-                    import_result["errors"].append(
-                        f"资源 {resource_data.get('title', '')} 的章节不存在"
-                    )
-                    continue
-
-                # 检查是否已存在
-                existing = await db.execute(
-                    select(Resource).where(
-                        Resource.chapter_id == chapter_id,
-                        Resource.title == resource_data["title"],
-                    )
-                )
-                existing_resource = existing.scalar_one_or_none()
-
-                if existing_resource:
-                    if overwrite_existing:
-                        # 更新现有资源
-                        for key, value in resource_data.items():
-                            if key != "chapter_code":
-                                setattr(existing_resource, key, value)
-                        await db.commit()
-                        import_result["resources"]["skipped"] += 1
-                    else:
-                        import_result["resources"]["skipped"] += 1
-                else:
-                    # 创建新资源
-                    resource = Resource(
-                        chapter_id=chapter_id,
-                        title=resource_data["title"],
-                        description=resource_data.get("description"),
-                        resource_type=resource_data["resource_type"],
-                        file_url=resource_data.get("file_url"),
-                        file_size=resource_data.get("file_size"),
-                        page_count=resource_data.get("page_count"),
-                        thumbnail_url=resource_data.get("thumbnail_url"),
-                        is_official=resource_data.get("is_official", False),
-                        is_downloadable=resource_data.get("is_downloadable", True),
-                        is_active=resource_data.get("is_active", True),
-                        display_order=resource_data.get("display_order", 0),
-                        created_by=current_user.id,
-                    )
-                    db.add(resource)
-                    await db.commit()
-                    await db.refresh(resource)
-                    import_result["resources"]["created"] += 1
-
-            except Exception as e:
-                import_result["errors"].append(
-                    f"导入资源失败 {resource_data.get('title', '')}: {str(e)}"
-                )
 
-        return {
-            "message": "导入完成",
-            "result": import_result,
-            "summary": {
-                "total_created": sum(
-                    import_result[key]["created"]
-                    for key in [
-                        "subjects",
-                        "grades",
-                        "courses",
-                        "chapters",
-                        "lessons",
-                        "resources",
-                    ]
-                ),
-                "total_skipped": sum(
-                    import_result[key]["skipped"]
-                    for key in [
-                        "subjects",
-                        "grades",
-                        "courses",
-                        "chapters",
-                        "lessons",
-                        "resources",
-                    ]
-                ),
-                "total_errors": len(import_result["errors"]),
-            },
-        }
+@router.get("/import/jobs/{job_id}")
+async def get_import_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin_or_researcher),
+):
+    """查询导入任务的状态、进度和结果"""
+    job = await _get_import_job(db, job_id, current_user)
+    return serialize_job(job)
 
-    except HTTPException:
-        # 重新抛出 HTTPException，保持原始错误信息
-        raise
-    except Exception as e:
-        # 记录详细错误信息用于调试
-        import traceback
-        error_trace = traceback.format_exc()
-        print(f"导入失败 - 详细错误信息:\n{error_trace}")
-        raise HTTPException(400, f"导入失败: {str(e)}")
+
+@router.post("/import/jobs/{job_id}/cancel")
+async def cancel_import_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin_or_researcher),
+):
+    """取消导入任务（执行中的任务在处理下一个条目前停止，已导入的内容会保留）"""
+    job = await _get_import_job(db, job_id, current_user)
+    job = await course_job_runner.request_cancel(db, job)
+    return serialize_job(job)
 
 
 @router.get("/lessons/{lesson_id}/export")
@@ -1599,43 +839,19 @@ async def export_lesson(
             print(f"警告: 收集文件时出错: {str(e)}")
             files_map = {}
         
-        # 创建ZIP文件
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            # 添加JSON数据
-            json_str = json.dumps(export_data, indent=2, ensure_ascii=False)
-            zip_file.writestr("data.json", json_str.encode("utf-8"))
-            
-            # 添加所有资源文件
-            for zip_path, file_path in files_map.items():
-                try:
-                    if os.path.exists(file_path):
-                        zip_file.write(file_path, zip_path)
-                    else:
-                        print(f"警告: 文件不存在 {file_path}")
-                except Exception as e:
-                    # 如果文件不存在或无法读取，记录错误但继续
-                    print(f"警告: 无法添加文件 {file_path}: {str(e)}")
-            
-            # 创建文件清单
-            manifest = {
-                "version": "1.0",
-                "export_time": datetime.utcnow().isoformat(),
-                "files": list(files_map.keys()),
-                "file_count": len(files_map)
-            }
-            zip_file.writestr("manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
-        
-        zip_buffer.seek(0)
-        
-        # 返回ZIP文件下载
-        import urllib.parse
-        filename = urllib.parse.quote(f"{lesson.title}_导出.zip")
-        return StreamingResponse(
-            zip_buffer,
-            media_type="application/zip",
-            headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"},
-        )
+        # 创建文件清单
+        manifest = {
+            "version": "1.0",
+            "export_time": datetime.utcnow().isoformat(),
+            "files": list(files_map.keys()),
+            "file_count": len(files_map)
+        }
+        entries = [("data.json", json.dumps(export_data, indent=2, ensure_ascii=False))]
+        entries.extend((zip_path, FileSource(file_path)) for zip_path, file_path in files_map.items())
+        entries.append(("manifest.json", json.dumps(manifest, indent=2)))
+
+        # 返回ZIP文件下载（边读取文件边输出）
+        return _zip_download_response(entries, f"{lesson.title}_导出.zip")
     except HTTPException:
         # 重新抛出 HTTPException，保持原始错误信息
         raise
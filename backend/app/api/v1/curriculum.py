@@ -3,7 +3,7 @@
 """
 
 from typing import Any, List, Optional, cast
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -28,6 +28,7 @@ from app.schemas.curriculum import (
     CourseMergeResponse,
 )
 from app.api.v1.auth import get_current_active_user
+from app.services.curriculum_tree import curriculum_tree_cache, etag_matches
 
 router = APIRouter()
 
@@ -426,10 +427,33 @@ async def merge_courses(
 @router.get("/tree", response_model=CurriculumTreeResponse)
 async def get_curriculum_tree(
     include_inactive: bool = Query(False, description="是否包含未启用的项"),
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    """获取完整的课程体系树形结构"""
+    """
+    获取完整的课程体系树形结构
+
+    返回缓存的 JSON 并带 ETag；请求头 If-None-Match 与当前版本一致时返回 304。
+    """
+    headers = {"Cache-Control": "private, no-cache"}
+    cached = curriculum_tree_cache.cached(include_inactive)
+    if cached is not None and etag_matches(if_none_match, cached[1]):
+        return Response(status_code=304, headers={**headers, "ETag": cached[1]})
+
+    body, etag = await curriculum_tree_cache.get(
+        include_inactive, lambda: _build_curriculum_tree(db, include_inactive)
+    )
+    headers["ETag"] = etag
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _build_curriculum_tree(
+    db: AsyncSession, include_inactive: bool
+) -> CurriculumTreeResponse:
+    """从数据库构建课程体系树"""
 
     # 获取所有学科
     subject_query = select(Subject).order_by(Subject.display_order, Subject.id)
@@ -5,7 +5,7 @@ Forms API - 互动表单接口
 from typing import Dict, Any, List
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, Query, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, text
+from sqlalchemy import select
 
 from app.core.database import get_db
 from app.core.auth import get_current_active_user
@@ -20,6 +20,7 @@ from app.schemas.form_cell import (
     FormResults,
     FormOptionResponse,
 )
+from app.services.form_results import load_form_tally
 
 
 router = APIRouter(prefix="/forms", tags=["forms"])
@@ -376,6 +377,10 @@ async def submit_form_response(
     await db.commit()
     await db.refresh(form_response)
 
+    # 同步到实时房间的累计计数
+    from app.websockets.form_ws import form_ws_handler
+    await form_ws_handler.record_response(form_cell_id, form_response.id, response_data.answers)
+
     return form_response
 
 
@@ -411,101 +416,10 @@ async def get_form_results(
             detail="表单不存在"
     )
 
-    # 获取总回答数
-    count_result = await db.execute(
-        select(func.count(FormResponse.id))
-        .where(FormResponse.form_cell_id == form_cell_id)
-    )
-    total_responses = count_result.scalar() or 0
-
-    # 根据表单类型计算选项统计
-    cell_type = form_cell.cell_type
-    options = form_cell.options
-
-    if cell_type == "single_choice":
-        # 单选：计算每个选项的选择次数
-        option_stats = []
-        for opt in options:
-            opt_id = opt.get("id")
-            # 使用 jsonb_array_elements 展开数组，然后过滤
-            count_query = """
-                SELECT COUNT(*)
-                FROM form_responses
-                WHERE form_cell_id = :form_cell_id
-                AND EXISTS (
-                    SELECT 1
-                    FROM jsonb_array_elements(answers) AS ans
-                    WHERE ans->>'option_id' = :opt_id
-                )
-            """
-            count_result = await db.execute(
-                text(count_query),
-                {"form_cell_id": form_cell_id, "opt_id": opt_id}
-            )
-            count = count_result.scalar() or 0
-            percentage = (count / total_responses * 100) if total_responses > 0 else 0
-            option_stats.append({
-                "option_id": opt_id,
-                "text": opt.get("text"),
-                "count": count,
-                "percentage": round(percentage, 2)
-            })
-
-    elif cell_type == "multiple_choice":
-        # 多选：计算每个选项的选择次数
-        option_stats = []
-        for opt in options:
-            opt_id = opt.get("id")
-            count_query = """
-                SELECT COUNT(*)
-                FROM form_responses
-                WHERE form_cell_id = :form_cell_id
-                AND EXISTS (
-                    SELECT 1
-                    FROM jsonb_array_elements(answers) AS ans
-                    WHERE ans->>'option_id' = :opt_id
-                )
-            """
-            count_result = await db.execute(
-                text(count_query),
-                {"form_cell_id": form_cell_id, "opt_id": opt_id}
-            )
-            count = count_result.scalar() or 0
-            percentage = (count / total_responses * 100) if total_responses > 0 else 0
-            option_stats.append({
-                "option_id": opt_id,
-                "text": opt.get("text"),
-                "count": count,
-                "percentage": round(percentage, 2)
-            })
-
-    elif cell_type == "ranking":
-        # 排序：计算每个选项的平均排名
-        option_stats = []
-        for opt in options:
-            opt_id = opt.get("id")
-            # 计算该选项的平均order值
-            avg_query = """
-                SELECT AVG(CAST((ans->>'order') AS NUMERIC))
-                FROM form_responses,
-                     jsonb_array_elements(answers) AS ans
-                WHERE form_cell_id = :form_cell_id
-                AND ans->>'option_id' = :opt_id
-            """
-            avg_result = await db.execute(
-                text(avg_query),
-                {"form_cell_id": form_cell_id, "opt_id": opt_id}
-            )
-            avg_rank = avg_result.scalar() or 0
-            option_stats.append({
-                "option_id": opt_id,
-                "text": opt.get("text"),
-                "average_rank": round(float(avg_rank), 2)
-            })
-
-    else:
-        # 未知类型，返回空统计
-        option_stats = []
+    # 一次分组查询取回所有选项的计数和排名
+    tally = await load_form_tally(db, form_cell_id)
+    total_responses = tally.total_responses
+    option_stats = tally.option_stats(form_cell.cell_type, form_cell.options)
 
     # 计算响应率（这里简化为100%，因为没有记录总参与人数）
     response_rate = 100.0
@@ -8,7 +8,7 @@ from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, desc, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.core.database import get_db
 from app.api import deps
@@ -235,7 +235,25 @@ async def get_learning_paths(
     """
     获取学习路径列表
     """
-    query = select(LearningPath)
+    # 课程数量按路径分组统计，与创建者一起在一次查询中取回
+    lesson_counts = (
+        select(
+            LearningPathLesson.learning_path_id.label("learning_path_id"),
+            func.count(LearningPathLesson.id).label("lesson_count"),
+        )
+        .group_by(LearningPathLesson.learning_path_id)
+        .subquery()
+    )
+    query = (
+        select(
+            LearningPath,
+            func.coalesce(lesson_counts.c.lesson_count, 0),
+            User.full_name,
+            User.username,
+        )
+        .outerjoin(lesson_counts, lesson_counts.c.learning_path_id == LearningPath.id)
+        .outerjoin(User, User.id == LearningPath.creator_id)
+    )
 
     if published_only:
         query = query.where(LearningPath.is_published == True)
@@ -243,34 +261,14 @@ async def get_learning_paths(
     query = query.order_by(desc(LearningPath.created_at)).offset(skip).limit(limit)
 
     result_paths = await db.execute(query)
-    paths = result_paths.scalars().all()
 
     # 组装返回数据
     result = []
-    for path in paths:
+    for path, lesson_count, creator_full_name, creator_username in result_paths.all():
         path_id = _safe_int(getattr(path, "id", None))
-        
-        # 获取课程数量
-        count_result = await db.execute(
-            select(func.count(LearningPathLesson.id)).where(
-                LearningPathLesson.learning_path_id == path_id
-            )
-        )
-        lesson_count = count_result.scalar() or 0
-
-        # 获取创建者信息
-        creator_id = getattr(path, "creator_id", None)
-        creator = None
-        if creator_id:
-            creator_result = await db.execute(select(User).where(User.id == creator_id))
-            creator = creator_result.scalar_one_or_none()
-        
-        creator_full_name = (
-            _safe_optional_str(getattr(creator, "full_name", None)) if creator else None
-        )
-        creator_username = (
-            _safe_optional_str(getattr(creator, "username", None)) if creator else None
-        )
+
+        creator_full_name = _safe_optional_str(creator_full_name)
+        creator_username = _safe_optional_str(creator_username)
         creator_name = creator_full_name or creator_username or "未知"
 
         difficulty_attr = getattr(path, "difficulty_level", None)
@@ -315,27 +313,26 @@ async def get_learning_path(*, db: AsyncSession = Depends(get_db), path_id: int)
     """
     获取学习路径详情
     """
-    result = await db.execute(select(LearningPath).where(LearningPath.id == path_id))
+    # 创建者随路径一起 JOIN 加载，路径中的课程一次 selectin 加载
+    result = await db.execute(
+        select(LearningPath)
+        .options(
+            joinedload(LearningPath.creator),
+            selectinload(LearningPath.path_lessons).joinedload(LearningPathLesson.lesson),
+        )
+        .where(LearningPath.id == path_id)
+    )
     learning_path = result.scalar_one_or_none()
     if not learning_path:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="学习路径不存在")
 
-    # 获取路径中的课程
-    path_lessons_result = await db.execute(
-        select(LearningPathLesson)
-        .where(LearningPathLesson.learning_path_id == path_id)
-        .order_by(LearningPathLesson.order_index)
+    path_lessons = sorted(
+        learning_path.path_lessons, key=lambda pl: _safe_int(getattr(pl, "order_index", None))
     )
-    path_lessons = path_lessons_result.scalars().all()
 
     lessons_details = []
     for pl in path_lessons:
-        lesson_id = getattr(pl, "lesson_id", None)
-        if not lesson_id:
-            continue
-            
-        lesson_result = await db.execute(select(Lesson).where(Lesson.id == lesson_id))
-        lesson = lesson_result.scalar_one_or_none()
+        lesson = pl.lesson
         if not lesson:
             continue
 
@@ -369,13 +366,7 @@ async def get_learning_path(*, db: AsyncSession = Depends(get_db), path_id: int)
             )
         )
 
-    # 获取创建者信息
-    creator_id = getattr(learning_path, "creator_id", None)
-    creator = None
-    if creator_id:
-        creator_result = await db.execute(select(User).where(User.id == creator_id))
-        creator = creator_result.scalar_one_or_none()
-    
+    creator = learning_path.creator
     creator_full_name = (
         _safe_optional_str(getattr(creator, "full_name", None)) if creator else None
     )
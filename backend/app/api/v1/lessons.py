@@ -33,6 +33,17 @@ from app.schemas.lesson import (
     LessonRelatedMaterial,
     LessonRelatedMaterialListResponse,
 )
+from app.services.lesson_search import (
+    SEARCH_DOCUMENT,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    estimate_count,
+    keyset_after,
+    search_pattern,
+    search_rank,
+    trigram_available,
+)
 from app.api.v1.auth import get_current_active_user
 from app.api.deps import get_current_user_optional
 from pydantic import BaseModel, Field
@@ -185,6 +196,8 @@ async def create_lesson(
 async def list_lessons(
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor），指定后忽略 page"),
+    count: str = Query("exact", pattern="^(exact|estimated)$", description="总数计算方式: exact 精确, estimated 估算"),
     status: Optional[str] = Query(None, description="状态筛选: draft, published, archived"),
     search: Optional[str] = None,
     course_id: Optional[int] = Query(None, description="按课程ID筛选"),
@@ -195,7 +208,12 @@ async def list_lessons(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
-    """获取教案列表"""
+    """
+    获取教案列表
+
+    按更新时间倒序（有检索词时按相关度优先）。翻页使用 next_cursor 作为下一次请求的 cursor，
+    page 参数仍然可用（OFFSET 分页），但页数较深时应使用游标。
+    """
     try:
         status_enum = LessonStatus(status.lower()) if status else None
     except ValueError:
@@ -207,14 +225,15 @@ async def list_lessons(
     except ValueError:
         raise HTTPException(status_code=403, detail="当前用户角色无效")
 
-    base_query = select(Lesson).options(
-        selectinload(Lesson.course).selectinload(Course.subject),
-        selectinload(Lesson.course).selectinload(Course.grade),
-        selectinload(Lesson.creator),
-        selectinload(Lesson.lesson_classrooms).selectinload(
-            LessonClassroom.classroom
-        ),
-    )
+    search = search.strip() if search else None
+    cursor_values = None
+    if cursor:
+        try:
+            cursor_values = decode_cursor(cursor, ranked=bool(search))
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+
+    filtered_query = select(Lesson.id)
 
     if user_role == UserRole.STUDENT:
         classroom_id = current_user.classroom_id
@@ -225,26 +244,31 @@ async def list_lessons(
                 page=page,
                 page_size=page_size,
             )
-        base_query = (
-            base_query.join(LessonClassroom)
-            .where(Lesson.status == LessonStatus.PUBLISHED)
-            .where(LessonClassroom.classroom_id == classroom_id)
-            .distinct(Lesson.id)
+        # 子查询代替 JOIN + DISTINCT，保持每个教案一行，可以直接按 (updated_at, id) 翻页
+        filtered_query = (
+            filtered_query.where(Lesson.status == LessonStatus.PUBLISHED)
+            .where(
+                Lesson.id.in_(
+                    select(LessonClassroom.lesson_id).where(
+                        LessonClassroom.classroom_id == classroom_id
+                    )
+                )
+            )
         )
     else:
         # 教师/管理员/教研员
         if creator_only:
             # 如果指定了creator_only=True，只返回当前用户创建的教案
-            base_query = base_query.where(Lesson.creator_id == current_user.id)
+            filtered_query = filtered_query.where(Lesson.creator_id == current_user.id)
             if status_enum:
-                base_query = base_query.where(Lesson.status == status_enum)
+                filtered_query = filtered_query.where(Lesson.status == status_enum)
         else:
             # 默认行为：可以看到自己创建的教案 + 所有已发布的教案（共享教案）
             if status_enum:
                 # 如果指定了状态筛选
                 if status_enum == LessonStatus.PUBLISHED:
                     # 查看已发布教案时，显示自己的 + 所有已发布的
-                    base_query = base_query.where(
+                    filtered_query = filtered_query.where(
                         or_(
                             Lesson.creator_id == current_user.id,
                             Lesson.status == LessonStatus.PUBLISHED
@@ -252,7 +276,7 @@ async def list_lessons(
                     )
                 else:
                     # 查看其他状态时，只显示自己创建的
-                    base_query = base_query.where(
+                    filtered_query = filtered_query.where(
                         and_(
                             Lesson.creator_id == current_user.id,
                             Lesson.status == status_enum
@@ -260,7 +284,7 @@ async def list_lessons(
                     )
             else:
                 # 没有状态筛选时，显示自己创建的 + 所有已发布的
-                base_query = base_query.where(
+                filtered_query = filtered_query.where(
                     or_(
                         Lesson.creator_id == current_user.id,
                         Lesson.status == LessonStatus.PUBLISHED
@@ -268,44 +292,76 @@ async def list_lessons(
                 )
 
     if search:
-        base_query = base_query.where(Lesson.title.ilike(f"%{search}%"))
+        # 标题、简介、标签一起检索，可以走 pg_trgm 表达式索引
+        filtered_query = filtered_query.where(
+            SEARCH_DOCUMENT.ilike(search_pattern(search), escape="\\")
+        )
 
     if course_id:
-        base_query = base_query.where(Lesson.course_id == course_id)
+        filtered_query = filtered_query.where(Lesson.course_id == course_id)
 
     if chapter_id:
-        base_query = base_query.where(Lesson.chapter_id == chapter_id)
+        filtered_query = filtered_query.where(Lesson.chapter_id == chapter_id)
 
     if subject_id or grade_id:
-        base_query = base_query.join(Course)
+        filtered_query = filtered_query.join(Course)
         if subject_id:
-            base_query = base_query.where(Course.subject_id == subject_id)
+            filtered_query = filtered_query.where(Course.subject_id == subject_id)
         if grade_id:
-            base_query = base_query.where(Course.grade_id == grade_id)
+            filtered_query = filtered_query.where(Course.grade_id == grade_id)
+
+    if count == "estimated":
+        total = await estimate_count(db, filtered_query)
+    else:
+        count_query = select(func.count()).select_from(filtered_query.subquery())
+        total = (await db.execute(count_query)).scalar() or 0
+
+    sort_keys = [Lesson.updated_at, Lesson.id]
+    if search:
+        sort_keys.insert(0, search_rank(search, await trigram_available(db)))
 
-    count_subquery = (
-        base_query.with_only_columns(Lesson.id)
-        .order_by(None)
-        .distinct()
-        .subquery()
+    page_query = (
+        filtered_query.with_only_columns(*sort_keys)
+        .order_by(*(key.desc() for key in sort_keys))
+        .limit(page_size + 1)
     )
-    count_query = select(func.count()).select_from(count_subquery)
-    total = (await db.execute(count_query)).scalar() or 0
+    if cursor_values is not None:
+        page_query = page_query.where(keyset_after(sort_keys, cursor_values))
+    elif page > 1:
+        page_query = page_query.offset((page - 1) * page_size)
 
-    if user_role == UserRole.STUDENT:
-        ordered_query = base_query.order_by(Lesson.id, Lesson.updated_at.desc())
-    else:
-        ordered_query = base_query.order_by(Lesson.updated_at.desc())
-    paginated_query = ordered_query.offset((page - 1) * page_size).limit(page_size)
+    rows = (await db.execute(page_query)).all()
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    lesson_ids = [row[-1] for row in rows[:page_size]]
 
-    lessons = (await db.execute(paginated_query)).scalars().all()
-    serialized_lessons = [_lesson_to_response(lesson) for lesson in lessons]
+    lessons_by_id = {}
+    if lesson_ids:
+        lessons_result = await db.execute(
+            select(Lesson)
+            .options(
+                selectinload(Lesson.course).selectinload(Course.subject),
+                selectinload(Lesson.course).selectinload(Course.grade),
+                selectinload(Lesson.creator),
+                selectinload(Lesson.lesson_classrooms).selectinload(
+                    LessonClassroom.classroom
+                ),
+            )
+            .where(Lesson.id.in_(lesson_ids))
+        )
+        lessons_by_id = {lesson.id: lesson for lesson in lessons_result.scalars()}
+    serialized_lessons = [
+        _lesson_to_response(lessons_by_id[lesson_id])
+        for lesson_id in lesson_ids
+        if lesson_id in lessons_by_id
+    ]
 
     return LessonListResponse(
         items=serialized_lessons,
         total=total,
         page=page,
         page_size=page_size,
+        next_cursor=next_cursor,
+        total_is_estimate=count == "estimated",
     )
 
 
@@ -35,7 +35,11 @@ from app.schemas.question import (
     LessonBrief,
     CellBrief,
     QuestionStats,
+    SimilarQuestionItem,
+    SimilarQuestionListResponse,
 )
+from app.core.config import settings
+from app.services.question_index import ANSWERED_STATUSES, question_index
 
 router = APIRouter()
 
@@ -91,6 +95,42 @@ def build_question_list_item(question: Question, answer_count: int = 0) -> dict:
     }
 
 
+async def find_reusable_answer(
+    db: AsyncSession, question: Question
+) -> Optional[Answer]:
+    """
+    查找可以复用回答的相似已解决问题
+
+    只在同一课程的公开、已解决问题中查找（指定了 Cell 时只看该 Cell 的问题），
+    相似度需达到 QUESTION_REUSE_MIN_SCORE；优先使用被采纳的回答，其次教师回答，最后最新的回答。
+    """
+    matches = await question_index.find_similar(
+        db,
+        cast(int, question.lesson_id),
+        f"{question.title}\n{question.content}",
+        limit=1,
+        cell_id=cast(Optional[int], question.cell_id),
+        statuses=(QuestionStatus.RESOLVED,),
+        exclude_id=cast(int, question.id),
+        min_score=settings.QUESTION_REUSE_MIN_SCORE,
+    )
+    if not matches:
+        return None
+
+    result = await db.execute(
+        select(Answer)
+        .options(selectinload(Answer.question))
+        .where(Answer.question_id == matches[0].question_id)
+        .order_by(
+            Answer.is_accepted.desc(),
+            (Answer.answerer_type == AnswererType.TEACHER).desc(),
+            Answer.created_at.desc(),
+        )
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
 # ==================== 学生端API ====================
 
 
@@ -105,7 +145,7 @@ async def create_question(
 
     - 学生在学习课程时提问
     - 可以向教师提问、向AI提问，或同时向两者提问
-    - 如果选择AI提问，会立即生成AI回答
+    - 如果选择AI提问，会立即生成AI回答；已有高度相似的已解决问题时直接复用其回答
     """
     # 验证课程存在
     lesson = await db.get(Lesson, question_in.lesson_id)
@@ -128,10 +168,40 @@ async def create_question(
     db.add(question)
     await db.commit()
     await db.refresh(question)
+    question_index.add(question)
 
     # 如果需要AI回答，创建AI回答（这里暂时使用简单的模拟）
     ai_answer = None
+    reusable = None
     if question_in.ask_type in [AskType.AI, AskType.BOTH]:
+        reusable = await find_reusable_answer(db, question)
+
+    if reusable is not None:
+        # 相似问题已解决，复用其回答，不再调用AI
+        source = reusable.question
+        ai_answer = Answer(
+            question_id=question.id,
+            answerer_type=AnswererType.AI,
+            content=[
+                {
+                    "id": "similar-question",
+                    "cell_type": "text",
+                    "title": "相似问题",
+                    "content": {
+                        "text": f"<p>已有同学问过相似的问题「{source.title}」，以下是该问题的回答：</p>"
+                    },
+                },
+                *(reusable.content or []),
+            ],
+            ai_model="similar-question",
+            ai_prompt_tokens=0,
+            ai_completion_tokens=0,
+        )
+        db.add(ai_answer)
+        setattr(question, "status", QuestionStatus.ANSWERED)
+        await db.commit()
+        question_index.set_status(cast(int, question.lesson_id), cast(int, question.id), QuestionStatus.ANSWERED)
+    elif question_in.ask_type in [AskType.AI, AskType.BOTH]:
         # TODO: 集成真正的AI服务
         # 目前使用模拟回答
         ai_answer = Answer(
@@ -158,6 +228,7 @@ async def create_question(
 
         await db.commit()
         await db.refresh(ai_answer)
+        question_index.set_status(cast(int, question.lesson_id), cast(int, question.id), QuestionStatus.ANSWERED)
 
     # 重新加载问题以包含关联数据
     question = await get_question_or_404(
@@ -297,6 +368,56 @@ async def get_lesson_questions(
     }
 
 
+@router.get("/similar", response_model=SimilarQuestionListResponse)
+async def get_similar_questions(
+    lesson_id: int = Query(..., description="课程ID"),
+    text: str = Query(..., min_length=1, max_length=2000, description="问题标题和内容"),
+    cell_id: Optional[int] = Query(None, description="只查找该Cell下的问题"),
+    answered_only: bool = Query(True, description="只返回已有回答的问题"),
+    limit: int = Query(5, ge=1, le=20),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    查找课程中的相似公开问题
+
+    - 学生提问前提示已有的相似问题，避免重复提问
+    - 按相似度降序返回
+    """
+    lesson = await db.get(Lesson, lesson_id)
+    if not lesson:
+        raise HTTPException(status_code=404, detail="课程不存在")
+
+    matches = await question_index.find_similar(
+        db,
+        lesson_id,
+        text,
+        limit=limit,
+        cell_id=cell_id,
+        statuses=ANSWERED_STATUSES if answered_only else None,
+    )
+    if not matches:
+        return {"items": []}
+
+    result = await db.execute(
+        select(Question).where(Question.id.in_([match.question_id for match in matches]))
+    )
+    questions = {question.id: question for question in result.scalars()}
+    items = [
+        SimilarQuestionItem(
+            id=match.question_id,
+            title=questions[match.question_id].title,
+            content=questions[match.question_id].content,
+            status=questions[match.question_id].status,
+            cell_id=questions[match.question_id].cell_id,
+            score=match.score,
+        )
+        for match in matches
+        if match.question_id in questions
+    ]
+    return {"items": items}
+
+
 @router.get("/{question_id}", response_model=QuestionResponse)
 async def get_question_detail(
     question_id: int,
@@ -347,6 +468,7 @@ async def resolve_question(
 
     setattr(question, "status", QuestionStatus.RESOLVED)
     await db.commit()
+    question_index.set_status(cast(int, question.lesson_id), question_id, QuestionStatus.RESOLVED)
 
     # 重新加载
     question = await get_question_or_404(question_id, db, load_relations=True)
@@ -517,6 +639,9 @@ async def create_answer(
 
     await db.commit()
     await db.refresh(answer)
+    question_index.set_status(
+        cast(int, question.lesson_id), cast(int, question.id), cast(QuestionStatus, question.status)
+    )
 
     # 加载回答者信息
     result = await db.execute(
@@ -2,8 +2,12 @@
 资源管理 API
 """
 
+import asyncio
+import json
+from concurrent.futures.process import BrokenProcessPool
 from typing import List, Optional, cast
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_
 
@@ -18,11 +22,15 @@ from app.schemas.resource import (
 )
 from app.schemas.library_asset import LibraryAssetSummary
 from app.services.upload import upload_service
-from app.services.office_converter import office_converter_service
+from app.services.office_converter import ConversionStatus, office_converter_service
+from app.services.pdf_pages import PageOutOfRange, pdf_page_renderer, resource_file_path
 from app.api.deps import get_current_user, get_current_admin
 
 router = APIRouter()
 
+# 需要转换为PDF才能预览的Office文档
+OFFICE_PREVIEW_EXTENSIONS = ["docx", "doc", "pptx", "ppt"]
+
 
 async def _enrich_resource_response(
     resource: Resource, db: AsyncSession
@@ -385,24 +393,122 @@ async def get_resource_preview(
         "can_preview_directly": file_ext in ["pdf", "jpg", "jpeg", "png", "gif", "webp", "svg"],
         "preview_url": resource.file_url,
         "converted_to_pdf": False,
+        "conversion_status": None,
         "conversion_error": None,
     }
 
-    # 如果是Office文档，尝试获取转换后的PDF
-    if file_ext in ["docx", "doc", "pptx", "ppt"]:
-        try:
-            converted_pdf_url = await office_converter_service.get_converted_pdf_url(
-                cast(str, resource.file_url)
-            )
-            if converted_pdf_url:
-                preview_info["preview_url"] = converted_pdf_url
-                preview_info["converted_to_pdf"] = True
-                preview_info["conversion_method"] = "auto_conversion"
-            else:
-                preview_info["converted_to_pdf"] = False
-                preview_info["conversion_error"] = "无法转换文档为PDF格式，请使用其他预览方式"
-        except Exception as e:
-            preview_info["converted_to_pdf"] = False
-            preview_info["conversion_error"] = f"转换过程中出现错误: {str(e)}"
+    # 如果是Office文档，返回PDF转换状态（未转换时在后台开始转换，不等待）
+    # 转换中时可以订阅 /{resource_id}/preview/events 等待转换完成
+    if file_ext in OFFICE_PREVIEW_EXTENSIONS:
+        status = office_converter_service.get_conversion_status(cast(str, resource.file_url))
+        preview_info["conversion_status"] = status["status"]
+        if status["status"] == ConversionStatus.READY:
+            preview_info["preview_url"] = status["pdf_url"]
+            preview_info["converted_to_pdf"] = True
+            preview_info["conversion_method"] = "auto_conversion"
+        elif status["status"] == ConversionStatus.FAILED:
+            preview_info["conversion_error"] = f"无法转换文档为PDF格式，请使用其他预览方式（{status['error']}）"
 
     return preview_info
+
+
+@router.get("/{resource_id}/preview/events")
+async def watch_resource_conversion(
+    resource_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Office文档PDF转换完成事件（SSE）
+
+    转换完成时发送 converted 事件（data 为 {"preview_url": ...}），失败时发送 failed 事件（{"error": ...}），
+    然后关闭连接；等待期间每 15 秒发送一次注释行保持连接
+    """
+    resource = await db.get(Resource, resource_id)
+    if not resource:
+        raise HTTPException(404, "Resource not found")
+    file_url = cast(Optional[str], resource.file_url) or ""
+    if file_url.rsplit(".", 1)[-1].lower() not in OFFICE_PREVIEW_EXTENSIONS:
+        raise HTTPException(400, "该资源不需要转换")
+    # 等待转换期间不占用数据库连接
+    await db.close()
+
+    async def events():
+        waiter = asyncio.ensure_future(office_converter_service.wait_for_conversion(file_url))
+        try:
+            while True:
+                done, _ = await asyncio.wait({waiter}, timeout=15)
+                if done:
+                    break
+                yield b": keep-alive\n\n"
+            status = waiter.result()
+        finally:
+            waiter.cancel()
+        if status["status"] == ConversionStatus.READY:
+            event, data = "converted", {"preview_url": status["pdf_url"]}
+        else:
+            event, data = "failed", {"error": status["error"]}
+        yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{resource_id}/pages/{page}")
+async def get_resource_page(
+    resource_id: int,
+    page: int,
+    width: int = Query(960, ge=64, le=2048, description="图片宽度（像素），按档位向上取整"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    PDF（或Office文档转换后的PDF）单页预览图（JPEG，页码从 1 开始）
+
+    - 响应头 X-Page-Count 为总页数
+    - Office文档尚未转换完成时返回 202 和转换状态，转换完成后再请求
+    """
+    resource = await db.get(Resource, resource_id)
+    if not resource:
+        raise HTTPException(404, "Resource not found")
+    file_url = cast(Optional[str], resource.file_url) or ""
+    file_ext = file_url.rsplit(".", 1)[-1].lower() if "." in file_url else ""
+
+    if file_ext in OFFICE_PREVIEW_EXTENSIONS:
+        status = office_converter_service.get_conversion_status(file_url)
+        if status["status"] == ConversionStatus.CONVERTING:
+            return JSONResponse(
+                status_code=202,
+                content={"conversion_status": status["status"]},
+                headers={"Retry-After": "5"},
+            )
+        if status["status"] == ConversionStatus.FAILED:
+            raise HTTPException(422, f"文档转换失败: {status['error']}")
+        file_url = status["pdf_url"]
+    elif file_ext != "pdf":
+        raise HTTPException(400, "该资源不支持分页预览")
+
+    pdf_path = resource_file_path(file_url)
+    if pdf_path is None:
+        raise HTTPException(404, "File not found")
+    try:
+        image, page_count = await pdf_page_renderer.get_page_image(pdf_path, page, width)
+    except FileNotFoundError:
+        raise HTTPException(404, "File not found")
+    except PageOutOfRange as e:
+        raise HTTPException(404, str(e))
+    except BrokenProcessPool:
+        # 渲染进程崩溃（BrokenProcessPool 是 RuntimeError 的子类，需先于下面的分支处理），下次请求时重建进程池
+        raise HTTPException(503, "PDF渲染服务暂时不可用，请稍后重试")
+    except RuntimeError as e:
+        # 文件损坏等 PyMuPDF 无法打开的情况
+        raise HTTPException(422, f"无法渲染PDF页面: {e}")
+
+    return Response(
+        image,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "private, max-age=86400", "X-Page-Count": str(page_count)},
+    )
@@ -2,9 +2,9 @@
 学生 AI 助理接口
 """
 
-from typing import List, Optional, Tuple, cast
+from typing import Any, List, Optional, Tuple, cast
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.auth import get_current_active_user
@@ -18,7 +18,7 @@ from app.schemas.assistant import (
     AssistantRequest,
     AssistantResponse,
 )
-from app.services.ai_qa import ai_qa_service
+from app.services.ai_qa import AIResponse, ai_qa_service, sse_response
 
 router = APIRouter()
 
@@ -103,9 +103,10 @@ def _generate_student_feedback(
 @router.post("/query", response_model=AssistantResponse)
 async def query_student_assistant(
     payload: AssistantRequest,
+    stream: bool = Query(False, description="以 SSE 流式返回回答（token / done / error 事件）"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-) -> AssistantResponse:
+) -> Any:
     """
     学生 AI 助手，提供学习建议与知识点总结。
     """
@@ -124,23 +125,38 @@ async def query_student_assistant(
     context_lines = _build_context_lines(payload)
     context_text = "\n".join(context_lines) if context_lines else None
 
+    def build_response(ai_result: AIResponse) -> AssistantResponse:
+        insights, actions, follow_ups = _generate_student_feedback(payload)
+        return AssistantResponse(
+            answer=ai_result.answer,
+            insights=insights,
+            suggested_actions=actions,
+            follow_up_questions=follow_ups,
+            model_used=ai_result.model_used,
+            confidence=ai_result.confidence,
+            response_time_ms=ai_result.response_time,
+            first_token_ms=ai_result.first_token_time,
+            context_used=context_lines,
+        )
+
+    if stream:
+        async def finish(ai_result: AIResponse) -> dict:
+            return build_response(ai_result).model_dump()
+
+        return sse_response(
+            ai_qa_service.stream_question(
+                question=payload.question,
+                context=context_text,
+                lesson_title=lesson_title,
+            ),
+            finish,
+        )
+
     ai_result = await ai_qa_service.ask_question(
         question=payload.question,
         context=context_text,
         lesson_title=lesson_title,
     )
-
-    insights, actions, follow_ups = _generate_student_feedback(payload)
-
-    return AssistantResponse(
-        answer=ai_result.answer,
-        insights=insights,
-        suggested_actions=actions,
-        follow_up_questions=follow_ups,
-        model_used=ai_result.model_used,
-        confidence=ai_result.confidence,
-        response_time_ms=ai_result.response_time,
-        context_used=context_lines,
-    )
+    return build_response(ai_result)
 
 
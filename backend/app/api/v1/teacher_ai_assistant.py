@@ -3,9 +3,9 @@
 """
 
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.v1.auth import get_current_active_user
@@ -21,7 +21,7 @@ from app.schemas.assistant import (
 )
 from app.schemas.question import QuestionStats
 from app.schemas.subject_group import SubjectGroupStatistics
-from app.services.ai_qa import ai_qa_service
+from app.services.ai_qa import AIResponse, ai_qa_service, sse_response
 
 router = APIRouter()
 
@@ -182,9 +182,10 @@ def _generate_structured_feedback(
 @router.post("/query", response_model=AssistantResponse)
 async def query_teacher_assistant(
     payload: AssistantRequest,
+    stream: bool = Query(False, description="以 SSE 流式返回回答（token / done / error 事件）"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-) -> AssistantResponse:
+) -> Any:
     """
     调用 AI 助理，为教师提供课堂洞察与建议。
     """
@@ -203,23 +204,38 @@ async def query_teacher_assistant(
     context_lines = _build_context_lines(payload)
     context_text = "\n".join(context_lines) if context_lines else None
 
+    def build_response(ai_result: AIResponse) -> AssistantResponse:
+        insights, actions, follow_ups = _generate_structured_feedback(payload)
+        return AssistantResponse(
+            answer=ai_result.answer,
+            insights=insights,
+            suggested_actions=actions,
+            follow_up_questions=follow_ups,
+            model_used=ai_result.model_used,
+            confidence=ai_result.confidence,
+            response_time_ms=ai_result.response_time,
+            first_token_ms=ai_result.first_token_time,
+            context_used=context_lines,
+        )
+
+    if stream:
+        async def finish(ai_result: AIResponse) -> dict:
+            return build_response(ai_result).model_dump()
+
+        return sse_response(
+            ai_qa_service.stream_question(
+                question=payload.question,
+                context=context_text,
+                lesson_title=lesson_title,
+            ),
+            finish,
+        )
+
     ai_result = await ai_qa_service.ask_question(
         question=payload.question,
         context=context_text,
         lesson_title=lesson_title,
     )
-
-    insights, actions, follow_ups = _generate_structured_feedback(payload)
-
-    return AssistantResponse(
-        answer=ai_result.answer,
-        insights=insights,
-        suggested_actions=actions,
-        follow_up_questions=follow_ups,
-        model_used=ai_result.model_used,
-        confidence=ai_result.confidence,
-        response_time_ms=ai_result.response_time,
-        context_used=context_lines,
-    )
+    return build_response(ai_result)
 
 
@@ -3,16 +3,42 @@
 用于上传视频、图片等文件到服务器
 """
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from typing import Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 from app.api.deps import get_current_active_user
 from app.models.user import User
+from app.services.chunked_upload import chunked_upload_service
 from app.services.upload import upload_service
 
 router = APIRouter()
 
+# 允许上传的文件类型（可根据需求调整）
+ALLOWED_EXTENSIONS = {
+    # 视频
+    'mp4', 'webm', 'ogg', 'mov', 'avi', 'mkv',
+    # 图片
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'svg',
+    # 文档
+    'pdf', 'doc', 'docx', 'ppt', 'pptx', 'xls', 'xlsx',
+    # 其他
+    'txt', 'md', 'zip', 'rar'
+}
+
+# 普通上传接口的文件大小上限，更大的文件请使用分片上传
+MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
+
+
+def _check_extension(filename: str) -> None:
+    """验证文件类型"""
+    file_ext = filename.split('.')[-1].lower() if '.' in filename else ''
+    if file_ext and file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            400,
+            f"不支持的文件类型: .{file_ext}。支持的类型: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
+        )
+
 
 class UploadResponse(BaseModel):
     """文件上传响应"""
@@ -40,38 +66,107 @@ async def upload_file(
     if not file.filename:
         raise HTTPException(400, "文件名不能为空")
     
-    # 验证文件类型（可选，根据需求调整）
-    allowed_extensions = {
-        # 视频
-        'mp4', 'webm', 'ogg', 'mov', 'avi', 'mkv',
-        # 图片
-        'jpg', 'jpeg', 'png', 'gif', 'webp', 'svg',
-        # 文档
-        'pdf', 'doc', 'docx', 'ppt', 'pptx', 'xls', 'xlsx',
-        # 其他
-        'txt', 'md', 'zip', 'rar'
-    }
-    
-    file_ext = file.filename.split('.')[-1].lower() if '.' in file.filename else ''
-    if file_ext and file_ext not in allowed_extensions:
-        raise HTTPException(
-            400, 
-            f"不支持的文件类型: .{file_ext}。支持的类型: {', '.join(sorted(allowed_extensions))}"
-        )
-    
-    # 验证文件大小（可选，例如限制为 500MB）
-    MAX_FILE_SIZE = 500 * 1024 * 1024  # 500MB
-    # 注意：这里只能检查 Content-Length，实际文件大小需要在上传时检查
-    
+    _check_extension(file.filename)
+
     try:
-        # 使用 upload_service 上传文件
-        upload_result = await upload_service.upload_file(file)
+        # 使用 upload_service 上传文件（分块写入磁盘，超过大小限制时返回 413）
+        upload_result = await upload_service.upload_file(file, max_size=MAX_FILE_SIZE)
         
         return UploadResponse(
             file_url=upload_result["file_url"],
             file_size=upload_result["file_size"],
             filename=file.filename or "unknown"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(500, f"文件上传失败: {str(e)}")
 
+
+# ==================== 分片上传（大文件断点续传） ====================
+
+
+class ChunkedUploadCreate(BaseModel):
+    """创建分片上传会话"""
+    filename: str = Field(..., min_length=1, max_length=255)
+    total_size: int = Field(..., gt=0, description="文件总大小（字节）")
+    sha256: Optional[str] = Field(None, description="文件的 SHA-256（可选，合并时校验）")
+
+
+class ChunkedUploadStatus(BaseModel):
+    """分片上传会话状态"""
+    upload_id: str
+    filename: str
+    total_size: int
+    chunk_size: int
+    chunk_count: int
+    received_chunks: List[int]
+    uploaded_size: int
+    complete: bool
+
+
+@router.post("/chunked", response_model=ChunkedUploadStatus, status_code=201)
+async def create_chunked_upload(
+    payload: ChunkedUploadCreate,
+    current_user: User = Depends(get_current_active_user),
+) -> ChunkedUploadStatus:
+    """
+    创建分片上传会话
+
+    之后按返回的 chunk_size 切分文件，通过
+    PUT /upload/chunked/{upload_id}/chunks/{index} 上传每个分片（请求体为分片原始字节），
+    全部上传后调用 POST /upload/chunked/{upload_id}/complete 合并。
+    中断后可通过 GET /upload/chunked/{upload_id} 查询已上传的分片继续上传。
+    """
+    _check_extension(payload.filename)
+    status = await chunked_upload_service.create_session(
+        current_user.id, payload.filename, payload.total_size, payload.sha256
+    )
+    return ChunkedUploadStatus(**status)
+
+
+@router.get("/chunked/{upload_id}", response_model=ChunkedUploadStatus)
+async def get_chunked_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+) -> ChunkedUploadStatus:
+    """查询分片上传进度"""
+    status = await chunked_upload_service.get_status(upload_id, current_user.id)
+    return ChunkedUploadStatus(**status)
+
+
+@router.put("/chunked/{upload_id}/chunks/{index}", response_model=ChunkedUploadStatus)
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    current_user: User = Depends(get_current_active_user),
+) -> ChunkedUploadStatus:
+    """上传一个分片（请求体为分片原始字节，流式写入磁盘）"""
+    status = await chunked_upload_service.write_chunk(
+        upload_id, current_user.id, index, request.stream()
+    )
+    return ChunkedUploadStatus(**status)
+
+
+@router.post("/chunked/{upload_id}/complete", response_model=UploadResponse)
+async def complete_chunked_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+) -> UploadResponse:
+    """合并分片并保存文件"""
+    result = await chunked_upload_service.complete(upload_id, current_user.id)
+    return UploadResponse(
+        file_url=result["file_url"],
+        file_size=result["file_size"],
+        filename=result["filename"],
+    )
+
+
+@router.delete("/chunked/{upload_id}", status_code=204)
+async def abort_chunked_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_active_user),
+) -> None:
+    """取消分片上传"""
+    await chunked_upload_service.abort(upload_id, current_user.id)
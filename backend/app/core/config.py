@@ -48,6 +48,25 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    # 认证用户缓存：有效期（秒，0 表示不缓存）和最多缓存的用户数
+    AUTH_PRINCIPAL_CACHE_TTL: float = 60.0
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 10000
+    # 班级每日统计的日期所在时区（IANA 名称）；修改后需运行 scripts/rebuild_classroom_daily_stats.py 重建汇总
+    CLASSROOM_STATS_TIMEZONE: str = "Asia/Shanghai"
+    # 正面行为积分榜缓存：有效期（秒，0 表示不缓存）和最多缓存的排名数（每个班级每个时间窗口一个）
+    LEADERBOARD_CACHE_TTL: float = 60.0
+    LEADERBOARD_CACHE_SIZE: int = 2000
+    # 课程体系树缓存有效期（秒，0 表示不缓存；本进程内的修改会立即生效）
+    CURRICULUM_TREE_CACHE_TTL: float = 300.0
+    # 学生问题相似度索引：有效期（秒，0 表示不缓存）和最多缓存的课程数
+    QUESTION_INDEX_TTL: float = 600.0
+    QUESTION_INDEX_MAX_LESSONS: int = 500
+    # 向 AI 提问时复用相似已解决问题回答的最低相似度（0-1，大于 1 表示不复用）
+    QUESTION_REUSE_MIN_SCORE: float = 0.85
+    # 批量导入用户时每批处理的行数（每批单独提交）
+    USER_IMPORT_BATCH_SIZE: int = 500
+    # 密码哈希线程池大小（0 表示按 CPU 核数，最多 4 个）
+    PASSWORD_HASH_WORKERS: int = 0
 
     # CORS - 允许局域网访问
     # 在生产环境中，应该设置具体的域名而不是使用通配符
@@ -95,6 +114,18 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
 
+    # WebSocket 跨 worker 消息总线
+    # memory: 进程内（单 worker）；redis: 通过 Redis Pub/Sub 在多个 worker 间广播
+    WS_BACKPLANE: str = "memory"
+    WS_BACKPLANE_CHANNEL: str = "inspireed:ws"
+
+    # WebSocket 发送队列
+    # 每个连接的待发送消息上限、单条消息发送超时（秒）
+    # 慢连接策略：drop_oldest（丢弃最旧消息）/ drop_newest（丢弃新消息）/ evict（断开连接）
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_TIMEOUT: float = 5.0
+    WS_SLOW_CONSUMER_POLICY: str = "drop_oldest"
+
     # MinIO配置
     MINIO_ENDPOINT: str = "localhost:9000"
     MINIO_ACCESS_KEY: str = "minioadmin"
@@ -118,6 +149,14 @@ class Settings(BaseSettings):
     DEFAULT_AI_MODEL: str = "gpt-3.5-turbo"
     AI_MAX_TOKENS: int = 1000
     AI_TEMPERATURE: float = 0.7
+    # AI 接口：同时进行的上游请求数上限（也是连接池大小）和单次请求超时（秒）
+    AI_MAX_CONCURRENCY: int = 16
+    AI_REQUEST_TIMEOUT: float = 30.0
+    # AI 回答缓存：有效期（秒，0 表示不缓存）和最多缓存的回答数
+    AI_ANSWER_CACHE_TTL: float = 600.0
+    AI_ANSWER_CACHE_SIZE: int = 1000
+    # 共用的流式回答：最慢的客户端落后超过这么多片段时暂停读取上游
+    AI_STREAM_BUFFER_CHUNKS: int = 64
 
     # 邮件配置（可选）
     SMTP_TLS: bool = True
@@ -135,6 +174,44 @@ class Settings(BaseSettings):
     # 文件上传配置 (MVP)
     UPLOAD_DIR: str = "storage"  # 上传文件存储目录
     MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024  # 100MB
+    # 内容寻址存储：引用数为 0 的文件保留多久（秒）后才被垃圾回收删除
+    FILE_STORE_GC_GRACE_SECONDS: int = 24 * 3600
+    # 分片上传（大文件断点续传）：单个文件上限、分片大小、会话无活动多久（秒）后过期
+    CHUNKED_UPLOAD_MAX_SIZE: int = 2 * 1024 * 1024 * 1024  # 2GB
+    CHUNKED_UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # 8MB
+    CHUNKED_UPLOAD_EXPIRE_SECONDS: int = 24 * 3600
+
+    # Office 文档转 PDF（预览）
+    # 同时进行的转换数、单个文件转换超时（秒）、转换失败后多久（秒）内不再重试
+    OFFICE_CONVERT_WORKERS: int = 2
+    OFFICE_CONVERT_TIMEOUT: float = 90.0
+    OFFICE_CONVERT_RETRY_AFTER: float = 300.0
+    # LibreOffice 可执行文件（留空时自动查找 soffice / libreoffice）
+    OFFICE_LIBREOFFICE_BINARY: str = ""
+    # 安装了 unoserver 时，每个转换槽位使用常驻的 LibreOffice 进程
+    OFFICE_USE_UNOSERVER: bool = True
+
+    # PDF 分页预览图
+    # 页面图片磁盘缓存上限（字节，按最近使用淘汰）、渲染进程数（0 表示按 CPU 核数，最多 4 个）、
+    # 渲染一页后预先渲染的后续页数、JPEG 质量
+    PDF_PAGE_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # 2GB
+    PDF_RENDER_WORKERS: int = 0
+    PDF_PAGE_PREFETCH: int = 2
+    PDF_PAGE_JPEG_QUALITY: int = 80
+
+    # 课程导入后台任务
+    # 每个进程的 worker 数量（0 表示本进程不执行任务）、空闲时轮询间隔（秒）、
+    # 心跳间隔（秒）、心跳超时（秒，超时的任务会被其他 worker 接管）、最大执行次数
+    COURSE_JOB_WORKERS: int = 2
+    COURSE_JOB_POLL_INTERVAL: float = 2.0
+    COURSE_JOB_HEARTBEAT_INTERVAL: float = 10.0
+    COURSE_JOB_STALE_SECONDS: int = 120
+    COURSE_JOB_MAX_ATTEMPTS: int = 3
+
+    # 管理员数据看板统计快照
+    # 快照最长使用时间（秒，超过后请求时重新统计）、后台刷新间隔（秒，0 表示不在后台刷新）
+    DASHBOARD_SNAPSHOT_MAX_AGE: int = 300
+    DASHBOARD_SNAPSHOT_REFRESH_INTERVAL: int = 240
 
 
 settings = Settings()
@@ -2,8 +2,12 @@
 安全工具：JWT、密码哈希等
 """
 
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
 
 from jose import jwt
 from passlib.context import CryptContext
@@ -13,6 +17,8 @@ from app.core.config import settings
 # 密码加密上下文
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+T = TypeVar("T")
+
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: Optional[timedelta] = None
@@ -66,3 +72,85 @@ def get_password_hash(password: str) -> str:
         哈希后的密码
     """
     return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """
+    在固定大小的线程池中执行 bcrypt，避免阻塞事件循环
+
+    bcrypt 计算期间会释放 GIL，线程池即可并行利用多个 CPU 核心；
+    线程数固定，超出的任务在池内排队，queued 即排队深度。
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS or min(4, os.cpu_count() or 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+            return self._executor
+
+    def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def _on_done(self, future: "Future[Any]") -> None:
+        # 还在排队时被取消的任务不会执行 _run
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            self.queued += 1
+        future = self._get_executor().submit(self._run, fn, *args)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """在线程池中验证密码（用于异步接口）"""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """在线程池中计算密码哈希（用于异步接口）"""
+    return await password_hasher.run(get_password_hash, password)
+
+
+async def get_password_hashes(passwords: List[str]) -> List[str]:
+    """并行计算多个密码的哈希（批量导入用户），结果顺序与输入一致"""
+    return list(await asyncio.gather(*(get_password_hash_async(p) for p in passwords)))
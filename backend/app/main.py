@@ -14,7 +14,14 @@ import re
 
 from app.core.config import settings
 from app.core.database import init_db, close_db
+from app.core.security import password_hasher
 from app.api.v1 import api_router
+from app.services.websocket_manager import manager as ws_manager
+from app.services.course_jobs import course_job_runner
+from app.services.dashboard_snapshot import dashboard_snapshots
+from app.services.ai_qa import ai_qa_service
+from app.services.office_converter import office_converter_service
+from app.services.pdf_pages import pdf_page_renderer
 
 
 @asynccontextmanager
@@ -24,8 +31,25 @@ async def lifespan(app: FastAPI):
     await init_db()
     print("✅ Database initialized")
 
+    # 订阅 WebSocket 跨 worker 消息总线
+    await ws_manager.start()
+
+    # 启动课程导入后台任务 worker（继续执行上次中断的任务）
+    await course_job_runner.start()
+
+    # 定期刷新管理员数据看板快照
+    await dashboard_snapshots.start()
+
     yield
 
+    await dashboard_snapshots.stop()
+    await course_job_runner.stop()
+    await ws_manager.stop()
+    password_hasher.shutdown()
+    await ai_qa_service.aclose()
+    await office_converter_service.aclose()
+    pdf_page_renderer.shutdown()
+
     # 关闭时清理资源
     await close_db()
     print("👋 Database connection closed")
@@ -44,6 +68,8 @@ cors_config = {
     "allow_credentials": True,
     "allow_methods": ["*"],
     "allow_headers": ["*"],
+    # 条件请求（If-None-Match）需要前端能读取 ETag；PDF 分页预览图通过 X-Page-Count 返回总页数
+    "expose_headers": ["ETag", "X-Page-Count"],
 }
 
 # 如果启用局域网访问，使用正则表达式匹配所有局域网IP
@@ -204,4 +230,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     """健康检查"""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        # 密码哈希线程池：线程数、正在计算、排队中、已完成
+        "password_hash_pool": password_hasher.stats(),
+        # AI问答：请求、缓存命中、合并、上游调用、流式回答数及首个片段延迟
+        "ai_qa": ai_qa_service.summary(),
+    }
@@ -49,6 +49,7 @@ from app.models.classroom_assistant import (
     DisciplineRecord,
     DutyRule,
     DutyAssignment,
+    ClassroomDailyStats,
 )
 from app.models.subject_group import (
     SubjectGroup,
@@ -73,6 +74,9 @@ from app.models.evaluation import (
 from app.models.teacher import (
 from app.models.teacher_position import TeacherPositionType
 from app.models.exam_room import ExamRoom, ExamRoomStudent, ExamProctor
+from app.models.course_job import CourseJob, CourseJobStatus
+from app.models.file_blob import FileBlob
+from app.models.dashboard_snapshot import DashboardSnapshot
 from app.models.form_cell import FormCell, FormResponse
 from app.models.form_cell import FormCell, FormResponse
 
@@ -143,12 +147,17 @@ __all__ = [
     "DisciplineRecord",
     "DutyRule",
     "DutyAssignment",
+    "ClassroomDailyStats",
     "StudentProject",
     "ProjectStatus",
     "ProjectStage",
     "ProjectCell",
     "FormCell",
     "FormResponse",
+    "CourseJob",
+    "CourseJobStatus",
+    "FileBlob",
+    "DashboardSnapshot",
     # 增值评价系统
     "Semester",
     "Exam",
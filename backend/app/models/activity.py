@@ -242,6 +242,10 @@ class ActivityStatistics(Base):
     avg_peer_review_score = Column(Float, nullable=True)
     flowchart_metrics = Column(JSON, nullable=True, default=dict)
 
+    # 增量统计的累加状态（各状态计数、分数/用时分布、题目级计数）
+    # 由 app.services.activity_statistics 维护，为空时会触发全量重算
+    aggregate_state = Column(JSON, nullable=True)
+
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
     )
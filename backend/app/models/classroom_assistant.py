@@ -18,6 +18,7 @@ from sqlalchemy import (
     UniqueConstraint,
     Index,
     SmallInteger,
+    Date,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -346,3 +347,38 @@ class DutyAssignment(Base):
         UniqueConstraint("classroom_id", "duty_date", "assignee_user_id", name="uq_classroom_date_assignee"),
         Index("idx_duty_classroom_date", "classroom_id", "duty_date"),
     )
+
+
+class ClassroomDailyStats(Base):
+    """
+    班级每日统计汇总
+
+    按 (班级, 学生, 日期) 汇总考勤、正面行为、纪律、值日记录，日期为 CLASSROOM_STATS_TIMEZONE 时区的本地日期；
+    student_id=0 的行是整个班级当天的合计（attendance_sessions 为点名会话数）。
+    学生行的 attendance_sessions 为该学生的考勤记录数。
+    记录写入时重新计算受影响的日期，统计接口只需累加区间内的每日汇总。
+    """
+
+    __tablename__ = "classroom_daily_stats"
+
+    classroom_id = Column(
+        Integer, ForeignKey("classrooms.id", ondelete="CASCADE"), primary_key=True
+    )
+    student_id = Column(Integer, primary_key=True, comment="学生ID，0 表示班级合计")
+    day = Column(Date, primary_key=True, comment="统计日期（本地时区）")
+
+    attendance_sessions = Column(Integer, nullable=False, default=0)
+    attendance_present = Column(Integer, nullable=False, default=0)
+    attendance_late = Column(Integer, nullable=False, default=0)
+    attendance_leave = Column(Integer, nullable=False, default=0)
+    attendance_absent = Column(Integer, nullable=False, default=0)
+    positive_records = Column(Integer, nullable=False, default=0)
+    positive_points = Column(Integer, nullable=False, default=0)
+    positive_points_by_type = Column(JSON, nullable=False, default=dict, comment="各类型积分")
+    discipline_records = Column(Integer, nullable=False, default=0)
+    discipline_by_type = Column(JSON, nullable=False, default=dict, comment="各类型记录数")
+    duty_assignments = Column(Integer, nullable=False, default=0)
+    duty_completed = Column(Integer, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
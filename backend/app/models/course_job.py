@@ -0,0 +1,87 @@
+"""
+课程导入后台任务模型
+"""
+
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    String,
+    Text,
+)
+
+from app.core.database import Base
+
+
+class CourseJobStatus(str, Enum):
+    """任务状态"""
+
+    PENDING = "pending"  # 排队中
+    RUNNING = "running"  # 执行中
+    SUCCEEDED = "succeeded"  # 已完成
+    FAILED = "failed"  # 失败
+    CANCELLED = "cancelled"  # 已取消
+
+
+class CourseJob(Base):
+    """
+    课程导入任务
+
+    上传的文件保存在 work_dir 中，由后台 worker 分阶段处理。
+    每个阶段完成后把检查点写入 state，进程重启后从未完成的阶段继续。
+    """
+
+    __tablename__ = "course_jobs"
+    __table_args__ = (
+        Index("ix_course_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # 任务类型（目前只有 import）
+    job_type = Column(String(20), nullable=False, default="import")
+    status = Column(
+        String(20), nullable=False, default=CourseJobStatus.PENDING.value, comment="任务状态"
+    )
+
+    # 任务参数：文件名、文件格式、是否覆盖等
+    params = Column(JSON, nullable=False, default=dict, comment="任务参数")
+    # 工作目录：上传文件和解压内容
+    work_dir = Column(String(500), nullable=True, comment="工作目录")
+
+    # 进度
+    stage = Column(String(50), nullable=True, comment="当前阶段")
+    progress = Column(Float, nullable=False, default=0.0, comment="进度百分比")
+    message = Column(String(500), nullable=True, comment="进度说明")
+    # 检查点：已完成阶段、URL映射、编码映射等
+    state = Column(JSON, nullable=False, default=dict, comment="阶段检查点")
+
+    # 结果
+    result = Column(JSON, nullable=True, comment="导入结果")
+    error = Column(Text, nullable=True, comment="错误信息")
+
+    # 取消与执行信息
+    cancel_requested = Column(Boolean, nullable=False, default=False, comment="是否请求取消")
+    worker_id = Column(String(64), nullable=True, comment="执行该任务的 worker")
+    attempts = Column(Integer, nullable=False, default=0, comment="执行次数")
+    heartbeat_at = Column(DateTime, nullable=True, comment="最近心跳时间")
+
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<CourseJob(id={self.id}, type={self.job_type}, status={self.status})>"
@@ -0,0 +1,24 @@
+"""
+统计快照模型
+"""
+
+from sqlalchemy import JSON, Column, DateTime, String
+
+from app.core.database import Base
+
+
+class DashboardSnapshot(Base):
+    """
+    数据看板的统计快照
+
+    定期重新统计后整体覆盖，看板接口直接读取，不再每次扫描业务表。
+    """
+
+    __tablename__ = "dashboard_snapshots"
+
+    name = Column(String(50), primary_key=True, comment="快照名称")
+    data = Column(JSON, nullable=False, default=dict, comment="统计结果")
+    computed_at = Column(DateTime, nullable=False, comment="统计时间")
+
+    def __repr__(self):
+        return f"<DashboardSnapshot(name={self.name}, computed_at={self.computed_at})>"
@@ -0,0 +1,31 @@
+"""
+内容寻址文件存储模型
+"""
+
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+
+from app.core.database import Base
+
+
+class FileBlob(Base):
+    """
+    按内容哈希存储的文件
+
+    同样内容的文件只保存一份，ref_count 记录引用它的上传次数；
+    引用数降为 0 且超过保留时间后由垃圾回收删除。
+    """
+
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(String(64), primary_key=True, comment="文件内容的 SHA-256")
+    size = Column(BigInteger, nullable=False, default=0, comment="文件大小（字节）")
+    ref_count = Column(Integer, nullable=False, default=0, comment="引用次数")
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self):
+        return f"<FileBlob(sha256={self.sha256[:12]}, size={self.size}, refs={self.ref_count})>"
@@ -13,6 +13,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Enum as SQLEnum,
     JSON,
     UniqueConstraint,
@@ -42,6 +43,10 @@ class Lesson(Base):
     """教案模型"""
 
     __tablename__ = "lessons"
+    __table_args__ = (
+        # 教案列表按 (updated_at, id) 倒序游标分页
+        Index("ix_lessons_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
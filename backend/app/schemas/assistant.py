@@ -74,5 +74,6 @@ class AssistantResponse(BaseModel):
     model_used: Optional[str] = None
     confidence: Optional[float] = None
     response_time_ms: Optional[float] = None
+    first_token_ms: Optional[float] = None  # 流式回答首个片段的延迟
     context_used: List[str] = Field(default_factory=list)
 
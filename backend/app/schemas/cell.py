@@ -113,6 +113,7 @@ class QAAnswerResponse(BaseModel):
     is_ai_answer: bool = Field(..., description="是否为AI回答")
     confidence: Optional[float] = Field(None, description="AI回答置信度")
     response_time: float = Field(..., description="响应时间（毫秒）")
+    first_token_time: Optional[float] = Field(None, description="流式回答首个片段的延迟（毫秒）")
 
 
 class QACellUpdate(BaseModel):
@@ -226,6 +226,7 @@ class PositiveBehaviorLeaderboardEntry(BaseModel):
     student_name: str
     total_points: int
     record_count: int
+    rank: Optional[int] = Field(None, description="名次（同分并列）；只看本人时不返回")
 
 
 # ==================== 纪律记录 ====================
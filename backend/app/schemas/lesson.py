@@ -222,6 +222,8 @@ class LessonListResponse(BaseModel):
     total: int
     page: int
     page_size: int
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有更多数据时为空")
+    total_is_estimate: bool = Field(False, description="total 是否为估算值")
 
 
 class LessonPublishRequest(BaseModel):
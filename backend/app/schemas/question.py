@@ -101,6 +101,23 @@ class QuestionListItem(QuestionInDBBase):
     has_teacher_answer: bool = False
 
 
+class SimilarQuestionItem(BaseModel):
+    """相似问题"""
+
+    id: int
+    title: str
+    content: str
+    status: QuestionStatus
+    cell_id: Optional[int] = None
+    score: float = Field(..., description="相似度（0-1）")
+
+
+class SimilarQuestionListResponse(BaseModel):
+    """相似问题列表（按相似度降序）"""
+
+    items: List[SimilarQuestionItem]
+
+
 class QuestionResponse(QuestionInDBBase):
     """问题响应Schema（带关联信息）"""
 
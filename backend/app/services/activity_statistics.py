@@ -0,0 +1,525 @@
+"""
+活动统计聚合服务
+
+ActivityStatistics / ActivityItemStatistic 由每条提交的"贡献"累加而成。
+提交发生变化时（创建、保存草稿、提交、评分……）只需减去旧贡献、加上新贡献，
+无需重新读取该 Cell 的全部提交；累加状态保存在 ActivityStatistics.aggregate_state 中。
+recompute_statistics 保留全量重算，用于首次建立统计和数据修复。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from statistics import mean
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, cast
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.activity import (
+    ActivityItemStatistic,
+    ActivityStatistics,
+    ActivitySubmission,
+    FlowchartSnapshot,
+    PeerReview,
+)
+
+# aggregate_state 的结构版本，结构变化时递增，旧状态会触发全量重算
+AGGREGATE_STATE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class ItemContribution:
+    """一条提交中单个题目的贡献"""
+
+    is_correct: bool
+    score: Optional[float]
+    time_spent: Optional[float]
+    options: Tuple[str, ...]
+    knowledge: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class SubmissionContribution:
+    """一条提交对统计的贡献（与 ORM 对象脱离的快照）"""
+
+    status: str
+    score: Optional[float]
+    time_spent: Optional[int]
+    items: Tuple[Tuple[str, ItemContribution], ...]
+
+    @property
+    def item_ids(self) -> Set[str]:
+        return {item_id for item_id, _ in self.items}
+
+
+def _item_contribution(item_value: Dict[str, Any]) -> ItemContribution:
+    score = item_value.get("score")
+    time_spent = item_value.get("time_spent")
+
+    answer = item_value.get("answer") or item_value.get("value")
+    if isinstance(answer, list):
+        options = tuple(str(option) for option in answer)
+    elif answer is not None:
+        options = (str(answer),)
+    else:
+        options = ()
+
+    knowledge_tags = item_value.get("knowledge_tags") or item_value.get("tags")
+    knowledge = (
+        tuple(str(tag) for tag in knowledge_tags) if isinstance(knowledge_tags, list) else ()
+    )
+
+    return ItemContribution(
+        is_correct=bool(item_value.get("is_correct")),
+        score=float(score) if isinstance(score, (int, float)) else None,
+        time_spent=float(time_spent) if isinstance(time_spent, (int, float)) else None,
+        options=options,
+        knowledge=knowledge,
+    )
+
+
+def build_contribution(
+    *,
+    status: Any,
+    score: Optional[float],
+    time_spent: Optional[int],
+    responses: Optional[Dict[str, Any]],
+) -> SubmissionContribution:
+    """根据提交字段构建贡献快照"""
+    items = tuple(
+        (str(item_id), _item_contribution(item_value))
+        for item_id, item_value in (responses or {}).items()
+        if isinstance(item_value, dict)
+    )
+    return SubmissionContribution(
+        status=getattr(status, "value", status),
+        score=float(score) if score is not None else None,
+        time_spent=int(time_spent) if time_spent is not None else None,
+        items=items,
+    )
+
+
+def submission_contribution(submission: ActivitySubmission) -> SubmissionContribution:
+    """读取 ORM 提交对象的当前贡献（在修改提交之前调用即可得到"旧贡献"）"""
+    return build_contribution(
+        status=submission.status,
+        score=cast(Optional[float], submission.score),
+        time_spent=cast(Optional[int], submission.time_spent),
+        responses=cast(Optional[Dict[str, Any]], submission.responses),
+    )
+
+
+def _bump(counter: Dict[Any, int], key: Any, delta: int) -> None:
+    value = counter.get(key, 0) + delta
+    if value:
+        counter[key] = value
+    else:
+        counter.pop(key, None)
+
+
+def _expand(counter: Dict[Any, int]) -> List[Any]:
+    values: List[Any] = []
+    for key in sorted(counter):
+        values.extend([key] * counter[key])
+    return values
+
+
+def _pairs(counter: Dict[Any, int]) -> List[List[Any]]:
+    return [[key, count] for key, count in sorted(counter.items())]
+
+
+class ItemAggregate:
+    """单个题目的累加状态"""
+
+    def __init__(self) -> None:
+        self.attempts = 0
+        self.correct_count = 0
+        self.scores: Dict[float, int] = {}
+        self.times: Dict[float, int] = {}
+        self.options: Dict[str, int] = {}
+        self.knowledge: Dict[str, int] = {}
+
+    def add(self, item: ItemContribution, sign: int) -> None:
+        self.attempts += sign
+        if item.is_correct:
+            self.correct_count += sign
+        if item.score is not None:
+            _bump(self.scores, item.score, sign)
+        if item.time_spent is not None:
+            _bump(self.times, item.time_spent, sign)
+        for option in item.options:
+            _bump(self.options, option, sign)
+        for tag in item.knowledge:
+            _bump(self.knowledge, tag, sign)
+
+    def summary(self) -> Dict[str, Any]:
+        scores = _expand(self.scores)
+        times = _expand(self.times)
+        return {
+            "attempts": self.attempts,
+            "correct_count": self.correct_count,
+            "accuracy": round(self.correct_count / self.attempts, 4) if self.attempts else None,
+            "avg_score": round(mean(scores), 2) if scores else None,
+            "avg_time_spent": round(mean(times), 2) if times else None,
+            "option_distribution": dict(self.options),
+            "knowledge_stats": dict(self.knowledge),
+            "score_values": scores,
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "attempts": self.attempts,
+            "correct_count": self.correct_count,
+            "scores": _pairs(self.scores),
+            "times": _pairs(self.times),
+            "options": dict(self.options),
+            "knowledge": dict(self.knowledge),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ItemAggregate":
+        aggregate = cls()
+        aggregate.attempts = int(state.get("attempts", 0))
+        aggregate.correct_count = int(state.get("correct_count", 0))
+        aggregate.scores = {float(k): int(v) for k, v in state.get("scores", [])}
+        aggregate.times = {float(k): int(v) for k, v in state.get("times", [])}
+        aggregate.options = {str(k): int(v) for k, v in (state.get("options") or {}).items()}
+        aggregate.knowledge = {str(k): int(v) for k, v in (state.get("knowledge") or {}).items()}
+        return aggregate
+
+
+class StatisticsAggregate:
+    """一个 Cell 的提交统计累加状态"""
+
+    def __init__(self) -> None:
+        self.status_counts: Dict[str, int] = {}
+        self.scores: Dict[float, int] = {}
+        self.times: Dict[int, int] = {}
+        self.items: Dict[str, ItemAggregate] = {}
+
+    @classmethod
+    def from_contributions(
+        cls, contributions: Iterable[SubmissionContribution]
+    ) -> "StatisticsAggregate":
+        aggregate = cls()
+        for contribution in contributions:
+            aggregate.add(contribution, 1)
+        return aggregate
+
+    def add(self, contribution: SubmissionContribution, sign: int) -> None:
+        """sign=1 加入贡献，sign=-1 移除贡献"""
+        _bump(self.status_counts, contribution.status, sign)
+        if contribution.score is not None:
+            _bump(self.scores, contribution.score, sign)
+        if contribution.time_spent is not None:
+            _bump(self.times, contribution.time_spent, sign)
+        for item_id, item in contribution.items:
+            item_aggregate = self.items.get(item_id)
+            if item_aggregate is None:
+                item_aggregate = self.items[item_id] = ItemAggregate()
+            item_aggregate.add(item, sign)
+            if item_aggregate.attempts == 0:
+                del self.items[item_id]
+
+    def is_consistent(self) -> bool:
+        """计数不应出现负数，否则说明状态已损坏，需要全量重算"""
+        counters: List[Dict[Any, int]] = [self.status_counts, self.scores, self.times]
+        for item in self.items.values():
+            if item.attempts < 0 or item.correct_count < 0:
+                return False
+            counters.extend([item.scores, item.times, item.options, item.knowledge])
+        return all(count > 0 for counter in counters for count in counter.values())
+
+    def summary(self) -> Dict[str, Any]:
+        """ActivityStatistics 的提交/成绩/用时字段"""
+        score_count = sum(self.scores.values())
+        time_count = sum(self.times.values())
+        return {
+            "total_students": sum(self.status_counts.values()),
+            "draft_count": self.status_counts.get("draft", 0),
+            "submitted_count": self.status_counts.get("submitted", 0),
+            "graded_count": self.status_counts.get("graded", 0),
+            "average_score": (
+                sum(score * count for score, count in self.scores.items()) / score_count
+                if score_count
+                else None
+            ),
+            "highest_score": max(self.scores) if self.scores else None,
+            "lowest_score": min(self.scores) if self.scores else None,
+            "average_time_spent": (
+                int(sum(time * count for time, count in self.times.items()) / time_count)
+                if time_count
+                else None
+            ),
+        }
+
+    def item_summaries(self) -> Dict[str, Dict[str, Any]]:
+        return {item_id: item.summary() for item_id, item in self.items.items()}
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "version": AGGREGATE_STATE_VERSION,
+            "status_counts": dict(self.status_counts),
+            "scores": _pairs(self.scores),
+            "times": _pairs(self.times),
+            "items": {item_id: item.to_state() for item_id, item in self.items.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state: Optional[Dict[str, Any]]) -> Optional["StatisticsAggregate"]:
+        """从 aggregate_state 恢复；状态缺失或版本不符时返回 None"""
+        if not state or state.get("version") != AGGREGATE_STATE_VERSION:
+            return None
+        aggregate = cls()
+        aggregate.status_counts = {
+            str(k): int(v) for k, v in (state.get("status_counts") or {}).items()
+        }
+        aggregate.scores = {float(k): int(v) for k, v in state.get("scores", [])}
+        aggregate.times = {int(k): int(v) for k, v in state.get("times", [])}
+        aggregate.items = {
+            str(item_id): ItemAggregate.from_state(item_state)
+            for item_id, item_state in (state.get("items") or {}).items()
+        }
+        return aggregate
+
+
+def _item_payload(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """ActivityStatistics.item_statistics 中单个题目的内容"""
+    return {key: value for key, value in summary.items() if key != "score_values"}
+
+
+async def _write_aggregate(
+    db: AsyncSession,
+    statistics: ActivityStatistics,
+    aggregate: StatisticsAggregate,
+    item_ids: Optional[Set[str]] = None,
+) -> None:
+    """
+    把累加状态写入统计表
+
+    item_ids 为 None 时同步全部题目统计，否则只更新这些题目。
+    """
+    now = datetime.utcnow()
+    cell_id = cast(int, statistics.cell_id)
+
+    for field, value in aggregate.summary().items():
+        setattr(statistics, field, value)
+    setattr(statistics, "aggregate_state", aggregate.to_state())
+    setattr(statistics, "updated_at", now)
+
+    item_summaries = aggregate.item_summaries()
+    setattr(
+        statistics,
+        "item_statistics",
+        {item_id: _item_payload(summary) for item_id, summary in item_summaries.items()} or None,
+    )
+
+    query = select(ActivityItemStatistic).where(ActivityItemStatistic.cell_id == cell_id)
+    if item_ids is not None:
+        if not item_ids:
+            return
+        query = query.where(ActivityItemStatistic.item_id.in_(item_ids))
+    result = await db.execute(query)
+    existing_stats = {cast(str, stat.item_id): stat for stat in result.scalars().all()}
+
+    target_ids = set(item_summaries) if item_ids is None else item_ids
+    for item_id in target_ids | set(existing_stats):
+        summary = item_summaries.get(item_id)
+        stat_record = existing_stats.get(item_id)
+
+        if summary is None:
+            # 题目已经没有任何作答，移除统计
+            if stat_record is not None:
+                await db.delete(stat_record)
+            continue
+
+        values = {
+            "attempts": summary["attempts"],
+            "correct_count": summary["correct_count"],
+            "avg_score": summary["avg_score"],
+            "avg_time_spent": summary["avg_time_spent"],
+            "option_distribution": summary["option_distribution"],
+            "score_distribution": {"values": summary["score_values"]},
+            "knowledge_stats": summary["knowledge_stats"],
+        }
+        if stat_record is not None:
+            for field, value in values.items():
+                setattr(stat_record, field, value)
+            setattr(stat_record, "updated_at", now)
+        else:
+            db.add(
+                ActivityItemStatistic(
+                    cell_id=cell_id,
+                    lesson_id=statistics.lesson_id,
+                    item_id=item_id,
+                    **values,
+                )
+            )
+
+
+async def _get_statistics_for_update(
+    db: AsyncSession, cell_id: int
+) -> Optional[ActivityStatistics]:
+    """读取统计记录并加行锁，避免并发增量更新互相覆盖"""
+    result = await db.execute(
+        select(ActivityStatistics)
+        .where(ActivityStatistics.cell_id == cell_id)
+        .with_for_update()
+    )
+    return result.scalar_one_or_none()
+
+
+async def refresh_peer_review_statistics(
+    db: AsyncSession,
+    cell_id: int,
+    statistics: Optional[ActivityStatistics] = None,
+) -> None:
+    """重新汇总互评统计（单条聚合查询）"""
+    if statistics is None:
+        statistics = await _get_statistics_for_update(db, cell_id)
+        if statistics is None:
+            return
+
+    result = await db.execute(
+        select(func.count(PeerReview.id), func.avg(PeerReview.score)).where(
+            PeerReview.cell_id == cell_id
+        )
+    )
+    peer_stats = result.one()
+    setattr(statistics, "peer_review_count", int(peer_stats[0] or 0))
+    setattr(
+        statistics,
+        "avg_peer_review_score",
+        float(peer_stats[1]) if peer_stats[1] is not None else None,
+    )
+
+
+async def refresh_flowchart_metrics(
+    db: AsyncSession,
+    cell_id: int,
+    statistics: Optional[ActivityStatistics] = None,
+) -> None:
+    """重新汇总流程图快照指标（只读取 analysis/version/updated_at，不加载 graph）"""
+    if statistics is None:
+        statistics = await _get_statistics_for_update(db, cell_id)
+        if statistics is None:
+            return
+
+    result = await db.execute(
+        select(
+            FlowchartSnapshot.analysis,
+            FlowchartSnapshot.version,
+            FlowchartSnapshot.updated_at,
+        ).where(FlowchartSnapshot.cell_id == cell_id)
+    )
+    rows = result.all()
+
+    flowchart_metrics: Optional[Dict[str, Any]] = None
+    if rows:
+        updated_values = [row.updated_at for row in rows if row.updated_at is not None]
+        version_values = [int(row.version or 0) for row in rows]
+        latest_updated = max(updated_values) if updated_values else None
+
+        flowchart_metrics = {
+            "snapshot_count": len(rows),
+            "latest_updated_at": latest_updated.isoformat() if latest_updated is not None else None,
+            "max_version": max(version_values) if version_values else None,
+        }
+        numeric_aggregates: Dict[str, List[float]] = {}
+        for row in rows:
+            analysis_data = row.analysis or {}
+            if not isinstance(analysis_data, dict):
+                continue
+            for key, value in analysis_data.items():
+                if isinstance(value, (int, float)):
+                    numeric_aggregates.setdefault(key, []).append(float(value))
+
+        for key, values in numeric_aggregates.items():
+            flowchart_metrics[f"avg_{key}"] = round(mean(values), 2)
+
+    setattr(statistics, "flowchart_metrics", flowchart_metrics)
+
+
+async def recompute_statistics(db: AsyncSession, cell_id: int, lesson_id: int) -> ActivityStatistics:
+    """
+    全量重算某个 Cell 的统计（首次建立统计或修复数据时使用）
+
+    只读取计算所需的列，不提交事务，由调用方 commit。
+    """
+    statistics = await _get_statistics_for_update(db, cell_id)
+    if statistics is None:
+        statistics = ActivityStatistics(cell_id=cell_id, lesson_id=lesson_id)
+        db.add(statistics)
+
+    result = await db.execute(
+        select(
+            ActivitySubmission.status,
+            ActivitySubmission.score,
+            ActivitySubmission.time_spent,
+            ActivitySubmission.responses,
+        ).where(ActivitySubmission.cell_id == cell_id)
+    )
+    aggregate = StatisticsAggregate.from_contributions(
+        build_contribution(
+            status=row.status,
+            score=row.score,
+            time_spent=row.time_spent,
+            responses=row.responses,
+        )
+        for row in result.all()
+    )
+
+    await _write_aggregate(db, statistics, aggregate)
+    await refresh_peer_review_statistics(db, cell_id, statistics)
+    await refresh_flowchart_metrics(db, cell_id, statistics)
+    return statistics
+
+
+SubmissionChange = Tuple[Optional[SubmissionContribution], Optional[SubmissionContribution]]
+
+
+async def apply_submission_changes(
+    db: AsyncSession,
+    cell_id: int,
+    lesson_id: int,
+    changes: Sequence[SubmissionChange],
+) -> Optional[ActivityStatistics]:
+    """
+    增量更新统计
+
+    changes 为 (旧贡献, 新贡献) 列表：新建提交旧贡献为 None，删除提交新贡献为 None。
+    应在提交变更 flush 之后、commit 之前调用，使统计与提交在同一事务内更新。
+    统计记录不存在或状态不可用时退回全量重算。
+    贡献没有变化时（如内容未变的自动保存）不加锁直接返回 None，
+    避免同一班级的保存请求排队等待同一条统计记录的行锁。
+    """
+    effective_changes = [(before, after) for before, after in changes if before != after]
+    if not effective_changes:
+        return None
+
+    statistics = await _get_statistics_for_update(db, cell_id)
+    aggregate = (
+        StatisticsAggregate.from_state(cast(Optional[Dict[str, Any]], statistics.aggregate_state))
+        if statistics is not None
+        else None
+    )
+    if statistics is None or aggregate is None:
+        return await recompute_statistics(db, cell_id, lesson_id)
+
+    touched_items: Set[str] = set()
+    for before, after in effective_changes:
+        if before is not None:
+            aggregate.add(before, -1)
+            touched_items |= before.item_ids
+        if after is not None:
+            aggregate.add(after, 1)
+            touched_items |= after.item_ids
+
+    if not aggregate.is_consistent():
+        print(f"⚠️ 活动统计累加状态异常（cell_id={cell_id}），执行全量重算")
+        return await recompute_statistics(db, cell_id, lesson_id)
+
+    await _write_aggregate(db, statistics, aggregate, touched_items)
+    return statistics
@@ -1,15 +1,36 @@
 """
 AI问答服务
 提供智能问答功能，支持多种AI模型
+
+同一节课上很多学生会问同一个问题，这里尽量减少重复的上游调用：
+- 所有请求共用一个带连接池的 HTTP 客户端（复用 TCP/TLS 连接），并限制同时进行的上游请求数
+- 相同问题（归一化后的问题 + 课程 + 上下文 + Cell 内容哈希 + 模型）正在请求时，后来者等待同一个结果；
+  流式提问共用同一个上游流，后来者先收到已有的片段，之后的片段分发给每个等待者
+- 上游返回的回答按相同的键缓存（带 TTL 和 LRU 容量上限），模拟回答不缓存
+- 缓存在进程内，多 worker 部署时各自缓存
+
+stream_question 以流式方式逐段返回回答（上游使用 stream 模式），sse_response 把它转为 SSE 响应。
 """
 
 import asyncio
+import hashlib
 import json
+import math
+import statistics
 import time
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict, deque
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Optional, List, Tuple
 from dataclasses import dataclass
 import httpx
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
+from app.services.question_index import question_index
+
+
+# _build_prompt 使用的 Cell 内容字段
+PROMPT_CELL_FIELDS = ("type", "code", "language", "title", "description", "html")
 
 
 @dataclass
@@ -21,12 +42,84 @@ class AIResponse:
     response_time: float
     model_used: str
     tokens_used: Optional[int] = None
+    first_token_time: Optional[float] = None  # 流式回答首个片段的延迟（毫秒）
+
+
+@dataclass
+class AIStreamEvent:
+    """流式回答事件：delta 为新增文本；最后一个事件 done 为 True，result 为完整回答"""
+
+    delta: str = ""
+    done: bool = False
+    result: Optional[AIResponse] = None
+
+
+class AIUpstreamError(Exception):
+    """上游AI接口返回错误"""
+
+
+class _SharedStream:
+    """
+    同一缓存键正在进行的流式上游请求：片段追加到 parts，每个等待者从头读取
+
+    positions 记录每个等待者已取走的片段数，最慢的等待者落后 buffer_size 个片段时上游读取暂停。
+    """
+
+    def __init__(self, buffer_size: int):
+        self.parts: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.buffer_size = max(buffer_size, 1)
+        self.positions: Dict[object, int] = {}
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def join(self) -> object:
+        reader = object()
+        self.positions[reader] = 0
+        return reader
+
+    def leave(self, reader: object) -> None:
+        if self.positions.pop(reader, None) is not None:
+            self.notify()
+
+    async def wait_for_readers(self) -> None:
+        """等待最慢的等待者读到距最新片段 buffer_size 以内"""
+        while self.positions and len(self.parts) - min(self.positions.values()) >= self.buffer_size:
+            await self._changed.wait()
+
+    async def read(self, reader: object) -> AsyncIterator[str]:
+        """从第一个片段开始逐段产出回答，读完已有片段后等待上游的新片段"""
+        index = 0
+        while True:
+            if index < len(self.parts):
+                index += 1
+                self.positions[reader] = index
+                self.notify()
+                yield self.parts[index - 1]
+                continue
+            if self.error is not None:
+                raise self.error
+            if self.finished:
+                return
+            await self._changed.wait()
 
 
 class AIQAService:
     """AI问答服务类"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache_ttl: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        stream_buffer: Optional[int] = None,
+    ):
         self.openai_api_key = getattr(settings, "OPENAI_API_KEY", None)
         self.openai_base_url = getattr(
             settings, "OPENAI_BASE_URL", "https://api.openai.com/v1"
@@ -34,6 +127,127 @@ class AIQAService:
         self.default_model = getattr(settings, "DEFAULT_AI_MODEL", "gpt-3.5-turbo")
         self.max_tokens = getattr(settings, "AI_MAX_TOKENS", 1000)
         self.temperature = getattr(settings, "AI_TEMPERATURE", 0.7)
+        self.cache_ttl = settings.AI_ANSWER_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache_size = settings.AI_ANSWER_CACHE_SIZE if cache_size is None else cache_size
+        self.max_concurrency = settings.AI_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+        self.stream_buffer = settings.AI_STREAM_BUFFER_CHUNKS if stream_buffer is None else stream_buffer
+
+        # 连接池客户端和并发限制在第一次请求时创建（需要在事件循环中）
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._limiter: Optional[asyncio.Semaphore] = None
+        # 缓存键 -> (过期时间, 上游回答)
+        self._answers: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # 缓存键 -> 正在进行的上游请求
+        self._inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+        # 缓存键 -> 正在进行的流式上游请求
+        self._streams: Dict[str, _SharedStream] = {}
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "upstream_calls": 0, "streams": 0}
+        # 最近的流式回答首个片段延迟（毫秒）
+        self._first_token_times: deque = deque(maxlen=1000)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=settings.AI_REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                transport=self._transport,
+            )
+            self._limiter = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def aclose(self) -> None:
+        """关闭连接池（应用关闭时调用）"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._limiter = None
+
+    def summary(self) -> Dict[str, Any]:
+        """请求计数和流式回答首个片段延迟（最近 1000 次的中位数、p95，毫秒）"""
+        summary: Dict[str, Any] = dict(self.stats)
+        times = sorted(self._first_token_times)
+        if times:
+            summary["first_token_ms_p50"] = round(statistics.median(times), 1)
+            summary["first_token_ms_p95"] = round(times[math.ceil(len(times) * 0.95) - 1], 1)
+        return summary
+
+    def _has_api_key(self) -> bool:
+        return bool(
+            self.openai_api_key
+            and self.openai_api_key.strip()
+            and self.openai_api_key != "sk-your-openai-api-key"
+        )
+
+    @staticmethod
+    def _cache_key(
+        question: str,
+        context: Optional[str],
+        lesson_title: Optional[str],
+        cell_content: Optional[Dict[str, Any]],
+        model: str,
+    ) -> str:
+        """
+        归一化问题（忽略大小写、多余空白和句末标点）+ 课程 + 上下文 + Cell 内容哈希 + 模型
+
+        Cell 内容只取写入提示词的字段，问答 Cell 保存的上一次问题和回答不影响缓存键
+        """
+        normalized = " ".join(question.split()).casefold().rstrip("?？。.!！ ")
+        cell_hash = ""
+        prompt_fields = {
+            field: cell_content[field] for field in PROMPT_CELL_FIELDS if field in (cell_content or {})
+        }
+        if prompt_fields:
+            cell_json = json.dumps(prompt_fields, sort_keys=True, ensure_ascii=False, default=str)
+            cell_hash = hashlib.sha256(cell_json.encode()).hexdigest()
+        raw = json.dumps([model, normalized, lesson_title or "", context or "", cell_hash], ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _cached_answer(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._answers.get(key)
+        if entry is None:
+            return None
+        expires_at, answer = entry
+        if expires_at <= time.monotonic():
+            del self._answers[key]
+            return None
+        self._answers.move_to_end(key)
+        return answer
+
+    def _store_answer(self, key: str, answer: Dict[str, Any]) -> None:
+        if self.cache_ttl <= 0 or self.cache_size <= 0:
+            return
+        self._answers[key] = (time.monotonic() + self.cache_ttl, answer)
+        self._answers.move_to_end(key)
+        while len(self._answers) > self.cache_size:
+            self._answers.popitem(last=False)
+
+    async def _get_answer(self, key: str, prompt: str, model: str) -> Dict[str, Any]:
+        """读取缓存；未命中时合并相同的进行中请求，只调用一次上游"""
+        self.stats["requests"] += 1
+        cached = self._cached_answer(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            # 上游请求放在独立任务中，发起者断开连接（被取消）不影响等待同一结果的其他请求
+            task = asyncio.ensure_future(self._fetch_answer(key, prompt, model))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _fetch_answer(self, key: str, prompt: str, model: str) -> Dict[str, Any]:
+        response = await self._call_openai(prompt, model)
+        if not response.get("is_mock"):
+            self._store_answer(key, response)
+        return response
 
     async def ask_question(
         self,
@@ -62,13 +276,10 @@ class AIQAService:
         try:
             # 构建提示词
             prompt = self._build_prompt(question, context, lesson_title, cell_content)
+            key = self._cache_key(question, context, lesson_title, cell_content, model)
 
-            # 调用AI API
-            if model.startswith("gpt"):
-                response = await self._call_openai(prompt, model)
-            else:
-                # 默认使用OpenAI格式
-                response = await self._call_openai(prompt, model)
+            # 调用AI API（默认使用OpenAI格式）
+            response = await self._get_answer(key, prompt, model)
 
             response_time = (time.time() - start_time) * 1000
 
@@ -104,6 +315,146 @@ class AIQAService:
                     model_used=model,
                 )
 
+    async def stream_question(
+        self,
+        question: str,
+        context: Optional[str] = None,
+        lesson_title: Optional[str] = None,
+        cell_content: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None,
+    ) -> AsyncIterator[AIStreamEvent]:
+        """
+        流式提问，参数同 ask_question
+
+        相同问题共用一个上游流（在独立任务中读取），后加入的调用方先收到已有的片段；
+        最慢的调用方落后 stream_buffer 个片段时暂停读取上游，由 TCP 流控反压上游；
+        所有调用方都停止迭代或被取消（客户端断开）时关闭上游连接，不再消耗 token。
+        相同问题的非流式请求正在进行时等待它，一次返回完整回答；命中回答缓存时同样一次返回。
+        上游在返回任何内容前失败时改为模拟回答，已返回部分内容后失败则抛出异常。完整回答写入缓存。
+        """
+        start_time = time.perf_counter()
+        model = model or self.default_model
+        prompt = self._build_prompt(question, context, lesson_title, cell_content)
+        key = self._cache_key(question, context, lesson_title, cell_content, model)
+        self.stats["streams"] += 1
+
+        parts: List[str] = []
+        first_token_time: Optional[float] = None
+        response: Dict[str, Any] = {"confidence": 0.9}
+
+        def on_delta(delta: str) -> AIStreamEvent:
+            nonlocal first_token_time
+            if first_token_time is None:
+                first_token_time = (time.perf_counter() - start_time) * 1000
+                self._first_token_times.append(first_token_time)
+            parts.append(delta)
+            return AIStreamEvent(delta=delta)
+
+        cached = self._cached_answer(key)
+        inflight = self._inflight.get(key) if key not in self._streams else None
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            response = cached
+            yield on_delta(cached["answer"])
+        elif inflight is not None:
+            self.stats["coalesced"] += 1
+            response = await asyncio.shield(inflight)
+            yield on_delta(response["answer"])
+        else:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = _SharedStream(self.stream_buffer)
+                shared.task = asyncio.ensure_future(self._pump_stream(key, shared, prompt, model))
+                self._streams[key] = shared
+            else:
+                self.stats["coalesced"] += 1
+            reader = shared.join()
+            try:
+                async with aclosing(shared.read(reader)) as deltas:
+                    async for delta in deltas:
+                        yield on_delta(delta)
+            except (AIUpstreamError, httpx.HTTPError, ValueError, KeyError, IndexError) as e:
+                if parts:
+                    raise
+                if self._has_api_key():
+                    print(f"AI服务流式调用失败，使用模拟回答: {str(e)}")
+                response = await self._get_mock_response(prompt)
+                for line in response["answer"].splitlines(keepends=True):
+                    yield on_delta(line)
+            finally:
+                shared.leave(reader)
+                if not shared.positions and not shared.finished:
+                    # 最后一个调用方离开：关闭上游，后来的相同问题重新请求
+                    if self._streams.get(key) is shared:
+                        del self._streams[key]
+                    shared.task.cancel()
+                    await asyncio.wait({shared.task})
+
+        yield AIStreamEvent(
+            done=True,
+            result=AIResponse(
+                answer="".join(parts),
+                confidence=response.get("confidence", 0.9),
+                response_time=(time.perf_counter() - start_time) * 1000,
+                model_used="mock" if response.get("is_mock") else model,
+                tokens_used=response.get("tokens_used"),
+                first_token_time=first_token_time,
+            ),
+        )
+
+    async def _pump_stream(self, key: str, shared: _SharedStream, prompt: str, model: str) -> None:
+        """读取上游流写入共享片段；调用方断开不影响其他等待同一回答的调用方"""
+        try:
+            if not self._has_api_key():
+                raise AIUpstreamError("未配置API密钥")
+            async with aclosing(self._stream_openai(prompt, model)) as deltas:
+                async for delta in deltas:
+                    shared.parts.append(delta)
+                    shared.notify()
+                    # 客户端读得慢时暂停读取，由 TCP 流控反压上游
+                    await shared.wait_for_readers()
+            self._store_answer(key, {"answer": "".join(shared.parts), "confidence": 0.9})
+        except Exception as e:
+            shared.error = e
+        finally:
+            shared.finished = True
+            shared.notify()
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+
+    async def _stream_openai(self, prompt: str, model: str) -> AsyncIterator[str]:
+        """以 stream 模式调用OpenAI API，逐段产出回答文本"""
+        headers = {
+            "Authorization": f"Bearer {self.openai_api_key}",
+            "Content-Type": "application/json",
+        }
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+        }
+
+        client = self._get_client()
+        async with self._limiter:
+            self.stats["upstream_calls"] += 1
+            async with client.stream(
+                "POST", f"{self.openai_base_url}/chat/completions", headers=headers, json=data
+            ) as response:
+                if response.status_code != 200:
+                    raise AIUpstreamError(f"OpenAI API错误: {response.status_code}")
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    choices = json.loads(payload).get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        yield delta
+
     def _build_prompt(
         self,
         question: str,
@@ -206,7 +557,7 @@ class AIQAService:
 
     async def _call_openai(self, prompt: str, model: str) -> Dict[str, Any]:
         """调用OpenAI API，失败时自动回退到模拟回答"""
-        if not self.openai_api_key or self.openai_api_key == "sk-your-openai-api-key" or not self.openai_api_key.strip():
+        if not self._has_api_key():
             # 如果没有API密钥或使用默认密钥，返回模拟回答
             return await self._get_mock_response(prompt)
 
@@ -223,26 +574,28 @@ class AIQAService:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            client = self._get_client()
+            async with self._limiter:
+                self.stats["upstream_calls"] += 1
                 response = await client.post(
                     f"{self.openai_base_url}/chat/completions", headers=headers, json=data
                 )
 
-                if response.status_code == 200:
-                    result = response.json()
-                    choice = result["choices"][0]
-                    usage = result.get("usage", {})
+            if response.status_code == 200:
+                result = response.json()
+                choice = result["choices"][0]
+                usage = result.get("usage", {})
 
-                    return {
-                        "answer": choice["message"]["content"],
-                        "confidence": 0.9,
-                        "tokens_used": usage.get("total_tokens", 0),
-                    }
-                else:
-                    # API返回错误状态码，回退到模拟回答
-                    error_msg = f"OpenAI API错误: {response.status_code}"
-                    print(f"AI服务调用失败，使用模拟回答: {error_msg}")
-                    return await self._get_mock_response(prompt)
+                return {
+                    "answer": choice["message"]["content"],
+                    "confidence": 0.9,
+                    "tokens_used": usage.get("total_tokens", 0),
+                }
+            else:
+                # API返回错误状态码，回退到模拟回答
+                error_msg = f"OpenAI API错误: {response.status_code}"
+                print(f"AI服务调用失败，使用模拟回答: {error_msg}")
+                return await self._get_mock_response(prompt)
         except (httpx.TimeoutException, httpx.ConnectError, httpx.RequestError) as e:
             # 网络错误或超时，回退到模拟回答
             print(f"AI服务连接失败，使用模拟回答: {str(e)}")
@@ -316,16 +669,37 @@ def solve_problem():
             "answer": answer,
             "confidence": 0.75,
             "tokens_used": len(answer.split()),
+            "is_mock": True,
         }
 
     async def get_related_questions(
-        self, question: str, lesson_title: Optional[str] = None, limit: int = 3
+        self,
+        question: str,
+        lesson_title: Optional[str] = None,
+        limit: int = 3,
+        db: Optional[AsyncSession] = None,
+        lesson_id: Optional[int] = None,
+        cell_id: Optional[int] = None,
     ) -> List[str]:
-        """获取相关问题建议"""
-        # 这里可以实现相关问题推荐逻辑
-        # 暂时返回一些通用建议
-        suggestions = ["能否详细解释一下这个概念？", "有什么实际应用场景吗？", "如何避免常见错误？"]
+        """
+        获取相关问题建议
 
+        指定 db 和 lesson_id 时优先返回本课程中相似的已回答问题（同一 Cell 的优先），
+        不足 limit 个时用通用建议补足
+        """
+        suggestions: List[str] = []
+        if db is not None and lesson_id is not None and question.strip():
+            matches = []
+            if cell_id is not None:
+                matches = await question_index.find_similar(db, lesson_id, question, limit=limit, cell_id=cell_id)
+            if len(matches) < limit:
+                matches += await question_index.find_similar(db, lesson_id, question, limit=limit * 2)
+            for match in matches:
+                if match.title not in suggestions and len(suggestions) < limit:
+                    suggestions.append(match.title)
+
+        generic = ["能否详细解释一下这个概念？", "有什么实际应用场景吗？", "如何避免常见错误？"]
+        suggestions += [s for s in generic if s not in suggestions]
         return suggestions[:limit]
 
     async def evaluate_answer_quality(
@@ -341,5 +715,45 @@ def solve_problem():
         }
 
 
+def sse_event(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+async def sse_answer_events(
+    stream: AsyncIterator[AIStreamEvent],
+    finish: Callable[[AIResponse], Awaitable[Dict[str, Any]]],
+) -> AsyncIterator[bytes]:
+    """
+    流式回答转为 SSE 事件
+
+    - token：{"text": 新增文本}
+    - done：回答完成后调用 finish(完整回答) 得到的数据（可在 finish 中保存回答）
+    - error：回答中途失败，{"detail": 错误信息}
+    """
+    async with aclosing(stream):
+        try:
+            async for event in stream:
+                if event.done:
+                    yield sse_event("done", await finish(event.result))
+                else:
+                    yield sse_event("token", {"text": event.delta})
+        except Exception as e:
+            print(f"AI流式回答失败: {str(e)}")
+            yield sse_event("error", {"detail": "AI服务暂时不可用，请稍后重试"})
+
+
+def sse_response(
+    stream: AsyncIterator[AIStreamEvent],
+    finish: Callable[[AIResponse], Awaitable[Dict[str, Any]]],
+) -> StreamingResponse:
+    """SSE 响应；客户端断开时 Starlette 取消响应任务，上游请求随之关闭，finish 不会被调用"""
+    return StreamingResponse(
+        sse_answer_events(stream, finish),
+        media_type="text/event-stream",
+        # 禁止代理缓冲，片段到达后立即发送
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # 创建全局实例
 ai_qa_service = AIQAService()
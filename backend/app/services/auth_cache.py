@@ -0,0 +1,186 @@
+"""
+认证用户缓存
+
+每个 HTTP 请求 / WebSocket 连接认证时都需要加载当前用户及其区域、学校、年级名称。
+这里把加载结果缓存为不可变的 Principal 对象（按用户 ID，带 TTL 和 LRU 容量上限），
+命中缓存时认证不再访问数据库。
+
+- 用户信息被管理员修改、禁用、删除时调用 invalidate_all_workers(user_id)
+- 区域 / 学校改名时调用 clear_all_workers()
+- 缓存在进程内，上面两个方法通过 WebSocket 总线（WS_BACKPLANE=redis）通知其他 worker 同时失效；
+  只影响本进程展示的变更（如最后登录时间）可以只调用 invalidate(user_id)
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.organization import Region, School
+from app.models.curriculum import Grade
+from app.models.user import User, UserRole
+from app.services.websocket_manager import manager
+
+# 总线消息类型：其他 worker 上的缓存失效
+INVALIDATION_MESSAGE = "auth_principal_invalidate"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    已认证用户的只读快照
+
+    属性与 User 模型的列同名（不含密码哈希），并附带组织名称，
+    可以直接作为 UserResponse 序列化。
+    """
+
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str]
+    student_id_number: Optional[str]
+    role: UserRole
+    is_active: bool
+    is_superuser: bool
+    avatar_url: Optional[str]
+    region_id: Optional[int]
+    school_id: Optional[int]
+    grade_id: Optional[int]
+    classroom_id: Optional[int]
+    created_at: datetime
+    updated_at: datetime
+    last_login: Optional[datetime]
+    region_name: Optional[str] = None
+    school_name: Optional[str] = None
+    grade_name: Optional[str] = None
+
+    @classmethod
+    def from_user(
+        cls,
+        user: User,
+        region_name: Optional[str] = None,
+        school_name: Optional[str] = None,
+        grade_name: Optional[str] = None,
+    ) -> "Principal":
+        values = {
+            f.name: getattr(user, f.name)
+            for f in fields(cls)
+            if f.name not in ("region_name", "school_name", "grade_name")
+        }
+        return cls(
+            **values,
+            region_name=region_name,
+            school_name=school_name,
+            grade_name=grade_name,
+        )
+
+
+async def load_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    """一次查询加载用户及其区域、学校、年级名称"""
+    result = await db.execute(
+        select(User, Region.name, School.name, Grade.name)
+        .outerjoin(Region, Region.id == User.region_id)
+        .outerjoin(School, School.id == User.school_id)
+        .outerjoin(Grade, Grade.id == User.grade_id)
+        .where(User.id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    user, region_name, school_name, grade_name = row
+    return Principal.from_user(user, region_name, school_name, grade_name)
+
+
+class PrincipalCache:
+    """按用户 ID 缓存 Principal（TTL + LRU）"""
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl = settings.AUTH_PRINCIPAL_CACHE_TTL if ttl is None else ttl
+        self.max_size = settings.AUTH_PRINCIPAL_CACHE_SIZE if max_size is None else max_size
+        self._entries: "OrderedDict[int, Tuple[float, Principal]]" = OrderedDict()
+        # 每次失效都会递增，防止失效前开始的查询把旧数据写回缓存
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return principal
+
+    def put(self, principal: Principal, generation: Optional[int] = None) -> None:
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        if generation is not None and generation != self._generation:
+            return
+        self._entries[principal.id] = (time.monotonic() + self.ttl, principal)
+        self._entries.move_to_end(principal.id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """用户信息变更后调用"""
+        self._generation += 1
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """组织信息变更等影响多个用户时调用"""
+        self._generation += 1
+        self._entries.clear()
+
+    async def invalidate_all_workers(self, user_id: int) -> None:
+        """用户被修改、禁用、删除后调用：本进程和其他 worker 都立即失效"""
+        self.invalidate(user_id)
+        await manager.publish_to_workers(INVALIDATION_MESSAGE, {"user_id": user_id})
+
+    async def clear_all_workers(self) -> None:
+        """清空本进程和其他 worker 的缓存"""
+        self.clear()
+        await manager.publish_to_workers(INVALIDATION_MESSAGE, {"user_id": None})
+
+    async def _on_remote_invalidation(self, payload: dict) -> None:
+        """其他 worker 发布的失效通知"""
+        user_id = payload.get("user_id")
+        if user_id is None:
+            self.clear()
+        else:
+            self.invalidate(int(user_id))
+
+    async def load(self, db: AsyncSession, user_id: int) -> Optional[Principal]:
+        """读取缓存，未命中时从数据库加载"""
+        principal = self.get(user_id)
+        if principal is not None:
+            self.hits += 1
+            return principal
+
+        self.misses += 1
+        generation = self._generation
+        principal = await load_principal(db, user_id)
+        if principal is not None:
+            self.put(principal, generation)
+        return principal
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# 单例实例
+principal_cache = PrincipalCache()
+manager.register_backplane_handler(INVALIDATION_MESSAGE, principal_cache._on_remote_invalidation)
@@ -0,0 +1,283 @@
+"""
+分片上传服务（大文件断点续传）
+
+客户端先创建上传会话，再按固定分片大小逐片上传（分片可以乱序、并发、重试），
+最后请求合并。会话保存在 storage/tmp/chunked/<upload_id>/ 下：
+- meta.json: 会话信息（所属用户、文件名、总大小、分片大小）
+- data: 预分配的目标文件，每个分片直接写到它的偏移位置，合并时无需再复制
+- received/<index>: 分片完整写入后创建的标记，用于断点续传时查询已上传分片
+
+合并时流式计算 SHA-256，然后把 data 直接移动进内容寻址存储。
+会话目录与存储位于同一文件系统，多个 worker 共享存储目录时也能正常工作。
+"""
+
+import asyncio
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+from uuid import uuid4
+
+import aiofiles
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.file_store import file_store, hash_file
+from app.services.upload import upload_service
+
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ChunkedUploadService:
+    """分片上传服务"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.path.join(file_store.tmp_dir, "chunked")
+        os.makedirs(self.root, exist_ok=True)
+
+    # ==================== 会话 ====================
+
+    def _session_dir(self, upload_id: str) -> str:
+        if not UPLOAD_ID_RE.match(upload_id or ""):
+            raise HTTPException(404, "上传会话不存在")
+        return os.path.join(self.root, upload_id)
+
+    def _load_meta(self, upload_id: str, user_id: int) -> Dict[str, Any]:
+        """读取会话信息，会话不存在或不属于当前用户时返回 404"""
+        session_dir = self._session_dir(upload_id)
+        try:
+            with open(os.path.join(session_dir, "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            raise HTTPException(404, "上传会话不存在")
+        if meta.get("user_id") != user_id:
+            raise HTTPException(404, "上传会话不存在")
+        return meta
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _received_chunks(self, upload_id: str) -> list:
+        received_dir = os.path.join(self._session_dir(upload_id), "received")
+        try:
+            return sorted(int(name) for name in os.listdir(received_dir) if name.isdigit())
+        except FileNotFoundError:
+            return []
+
+    def _status(self, meta: Dict[str, Any]) -> Dict[str, Any]:
+        received = self._received_chunks(meta["upload_id"])
+        return {
+            "upload_id": meta["upload_id"],
+            "filename": meta["filename"],
+            "total_size": meta["total_size"],
+            "chunk_size": meta["chunk_size"],
+            "chunk_count": meta["chunk_count"],
+            "received_chunks": received,
+            "uploaded_size": sum(self._chunk_length(meta, index) for index in received),
+            "complete": len(received) == meta["chunk_count"],
+        }
+
+    @staticmethod
+    def _chunk_length(meta: Dict[str, Any], index: int) -> int:
+        """第 index 个分片的长度（最后一片可能较短）"""
+        start = index * meta["chunk_size"]
+        return max(0, min(meta["chunk_size"], meta["total_size"] - start))
+
+    async def create_session(
+        self,
+        user_id: int,
+        filename: str,
+        total_size: int,
+        sha256: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """创建上传会话并预分配目标文件"""
+        if total_size <= 0:
+            raise HTTPException(400, "文件不能为空")
+        if total_size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise HTTPException(
+                413,
+                f"文件大小超过限制（最大 {settings.CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)}MB）",
+            )
+        if sha256 is not None and not re.match(r"^[0-9a-f]{64}$", sha256.lower()):
+            raise HTTPException(400, "sha256 格式不正确")
+
+        # 顺带清理过期会话
+        await asyncio.to_thread(self.purge_expired)
+
+        chunk_size = settings.CHUNKED_UPLOAD_CHUNK_SIZE
+        upload_id = uuid4().hex
+        meta = {
+            "upload_id": upload_id,
+            "user_id": user_id,
+            "filename": os.path.basename(filename),
+            "total_size": total_size,
+            "chunk_size": chunk_size,
+            "chunk_count": (total_size + chunk_size - 1) // chunk_size,
+            "sha256": sha256.lower() if sha256 else None,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+
+        session_dir = os.path.join(self.root, upload_id)
+        os.makedirs(os.path.join(session_dir, "received"))
+        # 稀疏文件：只占用实际写入分片的空间
+        with open(os.path.join(session_dir, "data"), "wb") as f:
+            f.truncate(total_size)
+        with open(os.path.join(session_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        return self._status(meta)
+
+    async def get_status(self, upload_id: str, user_id: int) -> Dict[str, Any]:
+        """查询会话状态（断点续传时用来确定还缺哪些分片）"""
+        return self._status(self._load_meta(upload_id, user_id))
+
+    async def abort(self, upload_id: str, user_id: int) -> None:
+        """取消上传并删除会话"""
+        self._load_meta(upload_id, user_id)
+        await asyncio.to_thread(shutil.rmtree, self._session_dir(upload_id), True)
+
+    # ==================== 分片 ====================
+
+    async def write_chunk(
+        self,
+        upload_id: str,
+        user_id: int,
+        index: int,
+        chunks: AsyncIterator[bytes],
+    ) -> Dict[str, Any]:
+        """
+        把一个分片流式写入目标文件的对应位置
+
+        分片长度必须与会话约定一致；同一分片可以重复上传（覆盖写入）。
+        """
+        meta = self._load_meta(upload_id, user_id)
+        if index < 0 or index >= meta["chunk_count"]:
+            raise HTTPException(400, f"分片序号超出范围（0 - {meta['chunk_count'] - 1}）")
+
+        expected = self._chunk_length(meta, index)
+        session_dir = self._session_dir(upload_id)
+        received_dir = os.path.join(session_dir, "received")
+        marker = os.path.join(received_dir, str(index))
+        # 重传时先撤销旧的"已接收"标记，写入完整后再恢复：
+        # 中途失败（长度不符、客户端断开）的分片按未上传处理，内容已被部分覆盖的分片不会被合并
+        attempt = os.path.join(received_dir, f"{index}.{uuid4().hex}.writing")
+        try:
+            with open(attempt, "w"):
+                pass
+        except FileNotFoundError:
+            raise HTTPException(404, "上传会话不存在")
+        try:
+            os.remove(marker)
+        except FileNotFoundError:
+            pass
+
+        written = 0
+        try:
+            async with aiofiles.open(os.path.join(session_dir, "data"), "r+b") as out:
+                await out.seek(index * meta["chunk_size"])
+                async for piece in chunks:
+                    if not piece:
+                        continue
+                    written += len(piece)
+                    if written > expected:
+                        raise HTTPException(400, f"分片 {index} 长度超出约定（{expected} 字节）")
+                    await out.write(piece)
+            if written != expected:
+                raise HTTPException(400, f"分片 {index} 长度不完整（{written}/{expected} 字节）")
+        except BaseException as e:
+            self._remove_file(attempt)
+            if isinstance(e, FileNotFoundError):
+                raise HTTPException(404, "上传会话不存在")
+            raise
+
+        # 同一分片有其他请求正在重传时，由最后完成的写入恢复标记
+        prefix = f"{index}."
+        others = [
+            name for name in os.listdir(received_dir)
+            if name.startswith(prefix) and name.endswith(".writing") and name != os.path.basename(attempt)
+        ]
+        if others:
+            self._remove_file(attempt)
+        else:
+            os.replace(attempt, marker)
+        # 记录会话最近活动时间
+        os.utime(os.path.join(session_dir, "meta.json"))
+
+        return self._status(meta)
+
+    # ==================== 合并 ====================
+
+    async def complete(
+        self, upload_id: str, user_id: int, generate_thumbnail: bool = False
+    ) -> Dict[str, Any]:
+        """校验所有分片已上传，计算哈希并存入内容寻址存储"""
+        meta = self._load_meta(upload_id, user_id)
+        session_dir = self._session_dir(upload_id)
+
+        missing = sorted(set(range(meta["chunk_count"])) - set(self._received_chunks(upload_id)))
+        if missing:
+            preview = ", ".join(str(i) for i in missing[:20])
+            raise HTTPException(400, f"还有 {len(missing)} 个分片未上传: {preview}")
+
+        # 防止重复合并
+        try:
+            os.mkdir(os.path.join(session_dir, "completing"))
+        except FileExistsError:
+            raise HTTPException(409, "该上传正在合并中")
+
+        data_path = os.path.join(session_dir, "data")
+        try:
+            sha256, size = await asyncio.to_thread(hash_file, data_path)
+            if size != meta["total_size"]:
+                raise HTTPException(400, "文件大小与上传会话不一致")
+            if meta.get("sha256") and meta["sha256"] != sha256:
+                raise HTTPException(400, "文件校验失败（sha256 不一致），请重新上传")
+
+            result = await upload_service.store_assembled_file(
+                data_path, sha256, size, meta["filename"], generate_thumbnail
+            )
+        except HTTPException:
+            await asyncio.to_thread(shutil.rmtree, session_dir, True)
+            raise
+        except Exception:
+            # 内部错误时保留已上传的分片，允许客户端重试合并
+            os.rmdir(os.path.join(session_dir, "completing"))
+            raise
+
+        await asyncio.to_thread(shutil.rmtree, session_dir, True)
+        result["filename"] = meta["filename"]
+        return result
+
+    # ==================== 清理 ====================
+
+    def purge_expired(self, expire_seconds: Optional[int] = None) -> int:
+        """删除长时间没有活动的会话，返回删除的数量（在线程中调用）"""
+        if expire_seconds is None:
+            expire_seconds = settings.CHUNKED_UPLOAD_EXPIRE_SECONDS
+        cutoff = time.time() - expire_seconds
+
+        removed = 0
+        for name in os.listdir(self.root):
+            session_dir = os.path.join(self.root, name)
+            if not os.path.isdir(session_dir):
+                continue
+            meta_path = os.path.join(session_dir, "meta.json")
+            try:
+                last_active = os.path.getmtime(meta_path)
+            except FileNotFoundError:
+                last_active = os.path.getmtime(session_dir)
+            if last_active < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+# 单例实例
+chunked_upload_service = ChunkedUploadService()
@@ -0,0 +1,243 @@
+"""
+批量导入班级成员
+
+导入名单中每行可以用不同字段标识学生，匹配优先级与单个查找一致：
+1. user_id（提供时直接使用，不再尝试其他字段）
+2. student_id_number（学籍号）
+3. email
+4. username
+5. student_no（先在本班查找，再在其他班级查找）
+6. full_name（模糊匹配，唯一结果或精确同名时采用）
+
+按优先级逐级匹配，每一级只对尚未匹配的行收集标识，用一次 IN 查询完成，
+整批名单最多 7 次查询，与行数无关。已有成员关系一次查出，
+新增与重新激活合并为一条多行 INSERT ... ON CONFLICT DO UPDATE。
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.classroom_assistant import ClassroomMembership
+from app.models.user import User
+
+# 单条 INSERT 的最大行数（asyncpg 单条语句最多 32767 个参数）
+UPSERT_CHUNK_SIZE = 1000
+
+
+def describe_identifiers(item: Any) -> str:
+    """列出一行中提供的标识字段，用于错误信息"""
+    identifiers = []
+    if item.user_id:
+        identifiers.append(f"用户ID={item.user_id}")
+    if item.student_id_number:
+        identifiers.append(f"学籍号={item.student_id_number}")
+    if item.full_name:
+        identifiers.append(f"姓名={item.full_name}")
+    if item.email:
+        identifiers.append(f"邮箱={item.email}")
+    if item.username:
+        identifiers.append(f"用户名={item.username}")
+    if item.student_no:
+        identifiers.append(f"学号={item.student_no}")
+    return ", ".join(identifiers)
+
+
+def match_full_name(full_name: str, candidates: Sequence[User]) -> Optional[User]:
+    """
+    在候选用户中按姓名模糊匹配
+
+    只有一个用户的姓名包含该名字时直接采用；多个时只接受姓名完全相同的用户。
+    """
+    needle = full_name.lower()
+    matches = [user for user in candidates if needle in (user.full_name or "").lower()]
+    if len(matches) == 1:
+        return matches[0]
+    for user in matches:
+        if user.full_name == full_name:
+            return user
+    return None
+
+
+async def resolve_member_users(
+    db: AsyncSession,
+    classroom_id: int,
+    members: Sequence[Any],
+) -> List[Optional[User]]:
+    """按优先级批量匹配名单中每一行对应的用户，未匹配的行为 None"""
+    resolved: List[Optional[User]] = [None] * len(members)
+    pending: Set[int] = set(range(len(members)))
+
+    def collect(field: str) -> Dict[Any, List[int]]:
+        """尚未匹配且提供了该字段的行，按字段值分组"""
+        groups: Dict[Any, List[int]] = {}
+        for index in sorted(pending):
+            value = getattr(members[index], field)
+            if value:
+                groups.setdefault(value, []).append(index)
+        return groups
+
+    def assign(groups: Dict[Any, List[int]], found: Dict[Any, User]) -> None:
+        for value, indexes in groups.items():
+            user = found.get(value)
+            if user is None:
+                continue
+            for index in indexes:
+                resolved[index] = user
+                pending.discard(index)
+
+    # 优先级1: user_id，提供时不再尝试其他字段
+    groups = collect("user_id")
+    if groups:
+        result = await db.execute(select(User).where(User.id.in_(list(groups))))
+        assign(groups, {user.id: user for user in result.scalars()})
+        for indexes in groups.values():
+            pending.difference_update(indexes)
+
+    # 优先级2-4: 学籍号、邮箱、用户名（唯一字段）
+    for field, column in (
+        ("student_id_number", User.student_id_number),
+        ("email", User.email),
+        ("username", User.username),
+    ):
+        groups = collect(field)
+        if groups:
+            result = await db.execute(select(User).where(column.in_(list(groups))))
+            assign(groups, {getattr(user, field): user for user in result.scalars()})
+
+    # 优先级5: 班级内学号，先查本班，再查其他班级
+    groups = collect("student_no")
+    if groups:
+        result = await db.execute(
+            select(ClassroomMembership.student_no, User)
+            .join(User, User.id == ClassroomMembership.user_id)
+            .where(
+                ClassroomMembership.classroom_id == classroom_id,
+                ClassroomMembership.student_no.in_(list(groups)),
+            )
+            .order_by(ClassroomMembership.id)
+        )
+        found: Dict[Any, User] = {}
+        for student_no, user in result:
+            found.setdefault(student_no, user)
+        assign(groups, found)
+
+    groups = collect("student_no")
+    if groups:
+        result = await db.execute(
+            select(ClassroomMembership.student_no, User)
+            .join(User, User.id == ClassroomMembership.user_id)
+            .where(ClassroomMembership.student_no.in_(list(groups)))
+            .distinct(ClassroomMembership.student_no)
+            .order_by(ClassroomMembership.student_no, ClassroomMembership.id)
+        )
+        assign(groups, {student_no: user for student_no, user in result})
+
+    # 优先级6: 姓名模糊匹配，一次取出所有可能的候选再逐行筛选
+    groups = collect("full_name")
+    if groups:
+        result = await db.execute(
+            select(User).where(
+                or_(*[User.full_name.icontains(name, autoescape=True) for name in groups])
+            )
+        )
+        candidates = list(result.scalars())
+        found = {}
+        for name in groups:
+            user = match_full_name(name, candidates)
+            if user is not None:
+                found[name] = user
+        assign(groups, found)
+
+    return resolved
+
+
+async def import_classroom_members(
+    db: AsyncSession,
+    classroom_id: int,
+    members: Sequence[Any],
+) -> Tuple[List[ClassroomMembership], List[str]]:
+    """
+    批量导入班级成员（不提交事务）
+
+    已是活跃成员的用户报错跳过；曾经退出的成员重新激活并更新信息。
+    返回 (按名单顺序的成员关系, 错误信息列表)。
+    """
+    users = await resolve_member_users(db, classroom_id, members)
+    errors: List[Tuple[int, str]] = []
+
+    user_ids = {user.id for user in users if user is not None}
+    existing: Dict[int, ClassroomMembership] = {}
+    if user_ids:
+        result = await db.execute(
+            select(ClassroomMembership).where(
+                ClassroomMembership.classroom_id == classroom_id,
+                ClassroomMembership.user_id.in_(user_ids),
+            )
+        )
+        existing = {membership.user_id: membership for membership in result.scalars()}
+
+    def already_member(index: int, user: User) -> None:
+        errors.append(
+            (index, f"第{index + 1}行：用户 {user.username} ({user.full_name or '未设置姓名'}) 已是该班级的成员")
+        )
+
+    rows: List[Dict[str, Any]] = []
+    row_indexes: List[Tuple[int, User]] = []
+    seen: Set[int] = set()
+    for index, (item, user) in enumerate(zip(members, users)):
+        if user is None:
+            errors.append((index, f"第{index + 1}行：未找到匹配的用户（{describe_identifiers(item)}）"))
+            continue
+
+        current = existing.get(user.id)
+        if user.id in seen or (current is not None and current.is_active):
+            already_member(index, user)
+            continue
+        seen.add(user.id)
+
+        rows.append({
+            "classroom_id": classroom_id,
+            "user_id": user.id,
+            "role_in_class": item.role_in_class,
+            # 未提供学号时保留原有学号
+            "student_no": item.student_no or (current.student_no if current is not None else None),
+            "seat_no": item.seat_no,
+            "cadre_title": item.cadre_title,
+            "is_primary_class": item.is_primary_class,
+            "is_active": True,
+        })
+        row_indexes.append((index, user))
+
+    saved: Dict[int, ClassroomMembership] = {}
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(ClassroomMembership).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ClassroomMembership.classroom_id, ClassroomMembership.user_id],
+            set_={
+                "role_in_class": stmt.excluded.role_in_class,
+                "student_no": stmt.excluded.student_no,
+                "seat_no": stmt.excluded.seat_no,
+                "cadre_title": stmt.excluded.cadre_title,
+                "is_primary_class": stmt.excluded.is_primary_class,
+                "is_active": True,
+                "updated_at": func.now(),
+            },
+            # 只重新激活已退出的成员，并发导入时不覆盖活跃成员
+            where=ClassroomMembership.is_active == False,
+        ).returning(ClassroomMembership)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        saved.update({membership.user_id: membership for membership in result.scalars()})
+
+    memberships: List[ClassroomMembership] = []
+    for index, user in row_indexes:
+        membership = saved.get(user.id)
+        if membership is None:
+            already_member(index, user)
+        else:
+            memberships.append(membership)
+
+    errors.sort(key=lambda error: error[0])
+    return memberships, [message for _, message in errors]
@@ -0,0 +1,250 @@
+"""
+班级每日统计汇总
+
+考勤、正面行为、纪律、值日记录按 (班级, 学生, 日期) 汇总到 classroom_daily_stats，
+student_id=0 的行是班级当天的合计。统计接口只需累加区间内的每日汇总，
+不再扫描原始记录：
+- 记录写入后（提交前）调用 refresh，重新计算该班级受影响日期的汇总
+- 重新计算时持有按班级的事务级 advisory 锁，并发写入同一班级时依次计算，不会丢失记录
+- scripts/rebuild_classroom_daily_stats.py 根据已有记录补建全部汇总
+
+日期按 CLASSROOM_STATS_TIMEZONE 时区的本地日期计算（本地凌晨的记录计入当天），
+统计区间按整天累加（from_date、to_date 所在的本地日期都计入；不带时区的时间按 UTC 解释）。
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, cast, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+from app.models.classroom_assistant import (
+    AttendanceEntry,
+    AttendanceSession,
+    AttendanceStatus,
+    ClassroomDailyStats,
+    DisciplineRecord,
+    DutyAssignment,
+    DutyAssignmentStatus,
+    PositiveBehavior,
+)
+
+# student_id=0 表示班级合计
+CLASSROOM_TOTAL = 0
+# advisory 锁的命名空间（第二个参数为班级ID）
+STATS_LOCK_NAMESPACE = 170017
+
+STATUS_COLUMNS = {
+    AttendanceStatus.PRESENT: "attendance_present",
+    AttendanceStatus.LATE: "attendance_late",
+    AttendanceStatus.LEAVE: "attendance_leave",
+    AttendanceStatus.ABSENT: "attendance_absent",
+}
+
+COUNTER_COLUMNS = (
+    "attendance_sessions",
+    "attendance_present",
+    "attendance_late",
+    "attendance_leave",
+    "attendance_absent",
+    "positive_records",
+    "positive_points",
+    "discipline_records",
+    "duty_assignments",
+    "duty_completed",
+)
+BY_TYPE_COLUMNS = ("positive_points_by_type", "discipline_by_type")
+
+
+def stats_timezone() -> ZoneInfo:
+    """统计日期所在的时区"""
+    return ZoneInfo(settings.CLASSROOM_STATS_TIMEZONE)
+
+
+def stats_day(value: Union[datetime, date]) -> date:
+    """记录时间对应的统计日期（统计时区的本地日期；不带时区的时间按 UTC 解释）"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(stats_timezone()).date()
+    return value
+
+
+def _local_day(column):
+    return cast(func.timezone(settings.CLASSROOM_STATS_TIMEZONE, column), Date)
+
+
+def _empty_row(classroom_id: int, student_id: int, day: date) -> Dict[str, Any]:
+    row: Dict[str, Any] = {"classroom_id": classroom_id, "student_id": student_id, "day": day}
+    row.update({column: 0 for column in COUNTER_COLUMNS})
+    row.update({column: {} for column in BY_TYPE_COLUMNS})
+    return row
+
+
+def _enum_value(value: Any) -> str:
+    return getattr(value, "value", value)
+
+
+async def rebuild_daily_stats(
+    db: AsyncSession, classroom_id: int, start_day: date, end_day: date
+) -> int:
+    """
+    根据原始记录重新计算一个班级在 [start_day, end_day] 内的每日汇总（不提交）
+
+    返回写入的汇总行数。会话未自动刷新（autoflush=False），先把本次请求中未写入的记录刷新到数据库。
+    """
+    await db.flush()
+    await db.execute(select(func.pg_advisory_xact_lock(STATS_LOCK_NAMESPACE, classroom_id)))
+
+    tz = stats_timezone()
+    start = datetime.combine(start_day, time.min, tzinfo=tz)
+    end = datetime.combine(end_day + timedelta(days=1), time.min, tzinfo=tz)
+    rows: Dict[Tuple[int, date], Dict[str, Any]] = {}
+
+    def targets(student_id: int, day: date):
+        """学生行与班级合计行"""
+        for key in ((student_id, day), (CLASSROOM_TOTAL, day)):
+            if key not in rows:
+                rows[key] = _empty_row(classroom_id, key[0], key[1])
+            yield rows[key]
+
+    # 考勤：会话数只记在班级合计行，各状态记录数同时记在学生行和合计行
+    session_day = _local_day(AttendanceSession.started_at)
+    in_sessions = (
+        AttendanceSession.classroom_id == classroom_id,
+        AttendanceSession.started_at >= start,
+        AttendanceSession.started_at < end,
+    )
+    result = await db.execute(
+        select(session_day, func.count()).where(*in_sessions).group_by(session_day)
+    )
+    for day, count in result:
+        for row in targets(CLASSROOM_TOTAL, day):
+            row["attendance_sessions"] = count
+
+    result = await db.execute(
+        select(session_day, AttendanceEntry.student_id, AttendanceEntry.status, func.count())
+        .join(AttendanceSession, AttendanceSession.id == AttendanceEntry.session_id)
+        .where(*in_sessions)
+        .group_by(session_day, AttendanceEntry.student_id, AttendanceEntry.status)
+    )
+    for day, student_id, status, count in result:
+        student_row, total_row = targets(student_id, day)
+        student_row["attendance_sessions"] += count
+        column = STATUS_COLUMNS.get(status)
+        if column:
+            student_row[column] += count
+            total_row[column] += count
+
+    # 正面行为
+    behavior_day = _local_day(PositiveBehavior.recorded_at)
+    result = await db.execute(
+        select(
+            behavior_day,
+            PositiveBehavior.student_id,
+            PositiveBehavior.behavior_type,
+            func.count(),
+            func.sum(PositiveBehavior.points),
+        )
+        .where(
+            PositiveBehavior.classroom_id == classroom_id,
+            PositiveBehavior.recorded_at >= start,
+            PositiveBehavior.recorded_at < end,
+        )
+        .group_by(behavior_day, PositiveBehavior.student_id, PositiveBehavior.behavior_type)
+    )
+    for day, student_id, behavior_type, count, points in result:
+        key = _enum_value(behavior_type)
+        for row in targets(student_id, day):
+            row["positive_records"] += count
+            row["positive_points"] += int(points or 0)
+            row["positive_points_by_type"][key] = row["positive_points_by_type"].get(key, 0) + int(points or 0)
+
+    # 纪律记录
+    discipline_day = _local_day(DisciplineRecord.recorded_at)
+    result = await db.execute(
+        select(discipline_day, DisciplineRecord.student_id, DisciplineRecord.event_type, func.count())
+        .where(
+            DisciplineRecord.classroom_id == classroom_id,
+            DisciplineRecord.recorded_at >= start,
+            DisciplineRecord.recorded_at < end,
+        )
+        .group_by(discipline_day, DisciplineRecord.student_id, DisciplineRecord.event_type)
+    )
+    for day, student_id, event_type, count in result:
+        key = _enum_value(event_type)
+        for row in targets(student_id, day):
+            row["discipline_records"] += count
+            row["discipline_by_type"][key] = row["discipline_by_type"].get(key, 0) + count
+
+    # 值日
+    duty_day = _local_day(DutyAssignment.duty_date)
+    result = await db.execute(
+        select(duty_day, DutyAssignment.assignee_user_id, DutyAssignment.status, func.count())
+        .where(
+            DutyAssignment.classroom_id == classroom_id,
+            DutyAssignment.duty_date >= start,
+            DutyAssignment.duty_date < end,
+        )
+        .group_by(duty_day, DutyAssignment.assignee_user_id, DutyAssignment.status)
+    )
+    for day, student_id, status, count in result:
+        for row in targets(student_id, day):
+            row["duty_assignments"] += count
+            if status == DutyAssignmentStatus.COMPLETED:
+                row["duty_completed"] += count
+
+    await db.execute(
+        delete(ClassroomDailyStats).where(
+            ClassroomDailyStats.classroom_id == classroom_id,
+            ClassroomDailyStats.day >= start_day,
+            ClassroomDailyStats.day <= end_day,
+        )
+    )
+    if rows:
+        # executemany 形式，SQLAlchemy 按批拼接多行 INSERT，语句只编译一次
+        await db.execute(insert(ClassroomDailyStats), list(rows.values()))
+    return len(rows)
+
+
+async def refresh_daily_stats(
+    db: AsyncSession, classroom_id: int, *moments: Optional[Union[datetime, date]]
+) -> None:
+    """记录写入后（提交前）调用，重新计算这些时间所在日期的汇总"""
+    days = [stats_day(moment) for moment in moments if moment is not None]
+    if days:
+        await rebuild_daily_stats(db, classroom_id, min(days), max(days))
+
+
+async def load_period_stats(
+    db: AsyncSession,
+    classroom_id: int,
+    from_date: Union[datetime, date],
+    to_date: Union[datetime, date],
+    student_id: int = CLASSROOM_TOTAL,
+) -> Dict[str, Any]:
+    """累加区间内的每日汇总（默认班级合计，传入 student_id 时为该学生），一次查询"""
+    result = await db.execute(
+        select(
+            *(getattr(ClassroomDailyStats, column) for column in COUNTER_COLUMNS + BY_TYPE_COLUMNS)
+        ).where(
+            ClassroomDailyStats.classroom_id == classroom_id,
+            ClassroomDailyStats.student_id == student_id,
+            ClassroomDailyStats.day >= stats_day(from_date),
+            ClassroomDailyStats.day <= stats_day(to_date),
+        )
+    )
+
+    totals: Dict[str, Any] = {column: 0 for column in COUNTER_COLUMNS}
+    totals.update({column: {} for column in BY_TYPE_COLUMNS})
+    for row in result.mappings():
+        for column in COUNTER_COLUMNS:
+            totals[column] += row[column] or 0
+        for column in BY_TYPE_COLUMNS:
+            merged = totals[column]
+            for key, value in (row[column] or {}).items():
+                merged[key] = merged.get(key, 0) + value
+    return totals
@@ -0,0 +1,1053 @@
+"""
+课程导入
+
+导入按阶段执行，同步导入接口和后台导入任务共用这里的实现：
+1. extract: 解析 data.json，解压 ZIP 中的资源文件
+2. copy_files: 把资源文件复制到上传目录，生成旧 URL -> 新 URL 映射
+3. curriculum: 导入学科、年级、课程、章节
+4. lessons: 导入教案
+5. resources: 导入资源
+
+进度和检查点通过 ImportTracker 汇报。后台任务使用的 tracker 会把检查点持久化，
+任务被中断后从未完成的阶段继续；每个条目处理前检查是否已请求取消。
+"""
+
+import asyncio
+import json
+import os
+import zipfile
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.curriculum import Subject, Grade, Course, Chapter, Resource
+from app.models.lesson import Lesson, LessonStatus
+from app.models.user import User
+
+# 导入阶段及其在总进度中的权重
+IMPORT_STAGES: Tuple[str, ...] = ("extract", "copy_files", "curriculum", "lessons", "resources")
+STAGE_WEIGHTS: Dict[str, int] = {
+    "extract": 10,
+    "copy_files": 30,
+    "curriculum": 15,
+    "lessons": 30,
+    "resources": 15,
+}
+STAGE_LABELS: Dict[str, str] = {
+    "extract": "解析导入文件",
+    "copy_files": "复制资源文件",
+    "curriculum": "导入学科、年级、课程和章节",
+    "lessons": "导入教案",
+    "resources": "导入资源",
+}
+
+RESULT_KEYS = ["subjects", "grades", "courses", "chapters", "lessons", "resources"]
+
+
+class ImportCancelled(Exception):
+    """导入已被取消"""
+
+
+class ImportTracker:
+    """
+    导入进度与检查点
+
+    默认实现只在内存中记录，供同步导入使用；后台任务继承它并把进度写入数据库。
+    state 是可 JSON 序列化的检查点：已完成阶段、URL 映射、编码映射和导入统计。
+    """
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        self.state: Dict[str, Any] = state if state is not None else {}
+        self.stage: Optional[str] = None
+        self.total = 0
+        self.done = 0
+
+    @property
+    def completed_stages(self) -> List[str]:
+        return self.state.setdefault("completed_stages", [])
+
+    def is_done(self, stage: str) -> bool:
+        return stage in self.completed_stages
+
+    @property
+    def progress(self) -> float:
+        """总进度百分比（按阶段权重计算）"""
+        value = sum(STAGE_WEIGHTS[stage] for stage in self.completed_stages)
+        if self.stage and self.stage not in self.completed_stages and self.total:
+            value += STAGE_WEIGHTS[self.stage] * min(self.done, self.total) / self.total
+        return round(value * 100 / sum(STAGE_WEIGHTS.values()), 1)
+
+    @property
+    def message(self) -> str:
+        if not self.stage:
+            return ""
+        label = STAGE_LABELS[self.stage]
+        return f"{label} ({self.done}/{self.total})" if self.total else label
+
+    async def start_stage(self, stage: str, total: int) -> None:
+        self.stage = stage
+        self.total = total
+        self.done = 0
+
+    async def advance(self, count: int = 1) -> None:
+        """处理一个条目前调用；后台任务在这里检查取消"""
+        self.done += count
+
+    async def checkpoint(self) -> None:
+        """阶段内保存检查点（仅后台任务需要）"""
+
+    async def finish_stage(self, stage: str) -> None:
+        self.done = self.total
+        if stage not in self.completed_stages:
+            self.completed_stages.append(stage)
+
+
+def detect_import_format(content: bytes, filename: str) -> str:
+    """
+    根据文件头和扩展名判断导入文件格式
+
+    content 只需要文件开头的一段字节。返回 "zip" 或 "json"。
+    """
+    # 通过文件头（魔数）检测实际文件格式
+    # ZIP 文件签名: PK\x03\x04 或 PK\x05\x06 (空ZIP) 或 PK\x07\x08
+    is_zip_by_content = (
+        len(content) >= 4 and
+        content[:2] == b'PK' and
+        content[2:4] in [b'\x03\x04', b'\x05\x06', b'\x07\x08', b'\x50\x4b']
+    )
+
+    # JSON 文件通常以 { 或 [ 开头（去除BOM后）
+    is_json_by_content = False
+    if len(content) > 0:
+        # 尝试检测 UTF-8 BOM
+        if content.startswith(b'\xef\xbb\xbf'):
+            content_start = content[3:].lstrip()
+        else:
+            content_start = content.lstrip()
+
+        # 检查是否以 JSON 字符开头
+        try:
+            first_char = content_start[0:1]
+            is_json_by_content = first_char in [b'{', b'[']
+        except (IndexError, TypeError):
+            pass
+
+    # 根据扩展名和实际内容判断文件类型
+    is_zip_by_ext = filename.lower().endswith(".zip")
+    is_json_by_ext = filename.lower().endswith(".json")
+
+    # 如果扩展名和实际内容不匹配，给出警告并使用实际内容类型
+    if is_zip_by_ext and not is_zip_by_content and is_json_by_content:
+        # 扩展名是 .zip 但内容是 JSON
+        is_zip = False
+        is_json = True
+    elif is_json_by_ext and not is_json_by_content and is_zip_by_content:
+        # 扩展名是 .json 但内容是 ZIP（这是当前的情况）
+        is_zip = True
+        is_json = False
+    else:
+        # 使用扩展名判断，但优先使用实际内容
+        if is_zip_by_content:
+            is_zip = True
+            is_json = False
+        elif is_json_by_content:
+            is_zip = False
+            is_json = True
+        else:
+            # 使用扩展名
+            is_zip = is_zip_by_ext
+            is_json = is_json_by_ext
+
+    if not (is_zip or is_json):
+        raise HTTPException(400, "文件必须是ZIP或JSON格式。检测到文件扩展名: " + filename)
+
+    return "zip" if is_zip else "json"
+
+
+def decode_json_import(content: bytes) -> Any:
+    """解析 JSON 导入文件（尝试多种编码）"""
+    # 注意：latin-1 可以解码任何字节，但可能产生乱码，所以放在最后
+    import_data = None
+    encodings = ['utf-8', 'utf-8-sig', 'gbk', 'gb2312', 'gb18030', 'latin-1']
+    last_decode_error = None
+    last_json_error = None
+    successful_decodings = []  # 记录成功解码但JSON解析失败的编码
+    decoded_preview = None  # 记录解码后的内容预览
+
+    for encoding in encodings:
+        try:
+            decoded_content = content.decode(encoding)
+            # 检查解码后的内容是否看起来像JSON（以 { 或 [ 开头）
+            stripped_content = decoded_content.strip()
+
+            # 对于 latin-1，额外检查是否包含乱码字符（如果包含大量非ASCII且不是中文，可能是乱码）
+            if encoding == 'latin-1':
+                # 检查是否包含中文字符或常见的JSON字符
+                has_chinese = any('\u4e00' <= char <= '\u9fff' for char in decoded_content[:500])
+                has_json_chars = '{' in decoded_content[:100] or '[' in decoded_content[:100]
+                # 如果既没有中文也没有JSON字符，可能是乱码
+                if not has_chinese and not has_json_chars:
+                    continue
+
+            if not (stripped_content.startswith('{') or stripped_content.startswith('[')):
+                # 解码成功但内容不像JSON，记录并继续
+                successful_decodings.append(encoding)
+                if not decoded_preview:
+                    decoded_preview = decoded_content[:200]  # 保存前200个字符用于调试
+                continue
+
+            try:
+                import_data = json.loads(decoded_content)
+                break  # 成功解析，跳出循环
+            except json.JSONDecodeError as e:
+                last_json_error = f"编码 {encoding}: JSON解析失败 - {str(e)}"
+                if hasattr(e, 'pos') and e.pos is not None:
+                    # 显示错误位置附近的内容
+                    start = max(0, e.pos - 50)
+                    end = min(len(decoded_content), e.pos + 50)
+                    context = decoded_content[start:end].replace('\n', '\\n').replace('\r', '\\r')
+                    last_json_error += f" (位置 {e.pos} 附近: ...{context}...)"
+                successful_decodings.append(encoding)
+                if not decoded_preview:
+                    decoded_preview = decoded_content[:200]  # 保存前200个字符用于调试
+                continue
+        except UnicodeDecodeError as e:
+            last_decode_error = f"编码 {encoding}: 解码失败 - {str(e)}"
+            continue  # 尝试下一个编码
+
+    if import_data is None:
+        # 构建详细的错误信息
+        error_msg = "无法解析JSON文件。"
+
+        if successful_decodings:
+            # 过滤掉 latin-1，因为它可能产生乱码
+            valid_encodings = [e for e in successful_decodings if e != 'latin-1']
+            if valid_encodings:
+                error_msg += f" 文件可以解码为: {', '.join(valid_encodings)}，但JSON格式无效。"
+            elif 'latin-1' in successful_decodings:
+                error_msg += " 文件可能使用了非标准编码，解码后内容可能不正确。"
+
+            if last_json_error:
+                error_msg += f" {last_json_error}"
+
+            # 显示解码后的内容预览（如果有）
+            if decoded_preview:
+                preview = decoded_preview.replace('\n', '\\n').replace('\r', '\\r')
+                if len(preview) > 100:
+                    preview = preview[:100] + "..."
+                error_msg += f" 文件开头内容: {preview}"
+        elif last_decode_error:
+            error_msg += f" 无法解码文件内容。最后尝试: {last_decode_error}"
+        else:
+            error_msg += " 请确保文件是有效的JSON格式且使用UTF-8或GBK编码。"
+
+        raise HTTPException(400, error_msg)
+
+    return import_data
+
+
+def decode_zip_data_json(json_content: bytes) -> Any:
+    """解析 ZIP 中的 data.json"""
+    # 根据导出函数的实现，data.json 使用 UTF-8 编码
+    # 优先尝试 UTF-8，如果失败再尝试其他编码
+    import_data = None
+    last_decode_error = None
+    last_json_error = None
+
+    # 优先使用 UTF-8（导出时使用的编码）
+    try:
+        decoded_content = json_content.decode('utf-8')
+        import_data = json.loads(decoded_content)
+    except UnicodeDecodeError as e:
+        last_decode_error = f"UTF-8解码失败: {str(e)}"
+        # 如果 UTF-8 失败，尝试其他编码
+        encodings = ['utf-8-sig', 'gbk', 'gb2312', 'gb18030']
+        for encoding in encodings:
+            try:
+                decoded_content = json_content.decode(encoding)
+                try:
+                    import_data = json.loads(decoded_content)
+                    break  # 成功解析，跳出循环
+                except json.JSONDecodeError as e:
+                    last_json_error = f"编码 {encoding}: JSON解析失败 - {str(e)}"
+                    continue
+            except UnicodeDecodeError as e:
+                continue  # 尝试下一个编码
+    except json.JSONDecodeError as e:
+        last_json_error = f"UTF-8编码JSON解析失败: {str(e)}"
+        # 显示错误位置附近的内容
+        try:
+            decoded_content = json_content.decode('utf-8', errors='replace')
+            if hasattr(e, 'pos') and e.pos is not None:
+                start = max(0, e.pos - 100)
+                end = min(len(decoded_content), e.pos + 100)
+                context = decoded_content[start:end].replace('\n', '\\n').replace('\r', '\\r')
+                last_json_error += f" (位置 {e.pos} 附近: ...{context}...)"
+        except:
+            pass
+
+    if import_data is None:
+        error_msg = "无法解析ZIP文件中的data.json。"
+        if last_json_error:
+            error_msg += f" {last_json_error}"
+        elif last_decode_error:
+            error_msg += f" {last_decode_error}"
+        else:
+            error_msg += " 请确保文件是有效的JSON格式。"
+        raise HTTPException(400, error_msg)
+
+    return import_data
+
+
+def _open_import_zip(source_path: str) -> zipfile.ZipFile:
+    """打开导入 ZIP 文件并检查 data.json 是否存在"""
+    try:
+        zip_file = zipfile.ZipFile(source_path, 'r')
+    except zipfile.BadZipFile as e:
+        raise HTTPException(400, f"ZIP文件格式错误或已损坏: {str(e)}")
+    except Exception as e:
+        raise HTTPException(400, f"无法打开ZIP文件: {str(e)}")
+
+    try:
+        file_list = zip_file.namelist()
+    except Exception as e:
+        zip_file.close()
+        raise HTTPException(400, f"无法读取ZIP文件列表: {str(e)}")
+
+    if "data.json" not in file_list:
+        zip_file.close()
+        available_files = ", ".join(file_list[:10])  # 显示前10个文件名
+        if len(file_list) > 10:
+            available_files += f" ... (共 {len(file_list)} 个文件)"
+        raise HTTPException(400, f"ZIP文件中缺少data.json。可用文件: {available_files}")
+
+    return zip_file
+
+
+def load_import_data(source_path: str, file_format: str) -> Any:
+    """读取并解析导入数据（在线程中调用）"""
+    if file_format == "zip":
+        with _open_import_zip(source_path) as zip_file:
+            return decode_zip_data_json(zip_file.read("data.json"))
+
+    with open(source_path, "rb") as f:
+        return decode_json_import(f.read())
+
+
+def extract_import_resources(source_path: str, work_dir: str) -> List[str]:
+    """把 ZIP 中 resources/ 下的文件解压到工作目录（在线程中调用），返回解压出的文件路径"""
+    extracted = []
+    with _open_import_zip(source_path) as zip_file:
+        for file_info in zip_file.filelist:
+            if file_info.filename.startswith("resources/") and not file_info.is_dir():
+                extracted.append(zip_file.extract(file_info, work_dir))
+    return extracted
+
+
+def list_import_resources(work_dir: str) -> List[str]:
+    """工作目录中已解压的资源文件（按路径排序，保证中断后重新执行时顺序一致）"""
+    resources_dir = os.path.join(work_dir, "resources")
+    paths = []
+    for root, _, files in os.walk(resources_dir):
+        for name in files:
+            paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+async def copy_import_file(file_path: str, url_mapping: Dict[str, str]) -> None:
+    """把一个资源文件登记到文件存储（内容已存在时不复制），并记录 URL 映射"""
+    from app.services.upload import upload_service
+
+    original_filename = os.path.basename(file_path)
+
+    try:
+        upload_result = await upload_service.import_file(file_path)
+    except Exception as e:
+        print(f"警告: 上传文件 {original_filename} 时出错: {str(e)}")
+        return
+
+    # 检查上传结果
+    if not upload_result or "file_url" not in upload_result:
+        print(f"警告: 文件 {original_filename} 上传失败或返回格式不正确")
+        return
+
+    # 记录URL映射（带路径、文件名和ZIP内路径三种形式）
+    new_url = upload_result["file_url"]
+    url_mapping[f"/uploads/resources/{original_filename}"] = new_url
+    url_mapping[original_filename] = new_url
+    url_mapping[f"resources/{original_filename}"] = new_url
+
+
+def update_urls_in_data(data: Dict, url_mapping: Dict[str, str]) -> Dict:
+    """
+    更新数据中的URL引用
+    """
+    if data is None:
+        raise ValueError("data 不能为 None")
+    if url_mapping is None:
+        url_mapping = {}
+
+    import copy
+    data = copy.deepcopy(data)
+
+    def update_urls_in_content(content: Any) -> Any:
+        """递归更新内容中的URL"""
+        if isinstance(content, dict):
+            # 更新字典中的URL字段
+            for key, value in content.items():
+                if key in ["file_url", "thumbnail_url", "cover_image_url", "videoUrl", "video_url",
+                          "preview_url", "download_url"] and isinstance(value, str):
+                    # 尝试匹配URL
+                    for old_url, new_url in url_mapping.items():
+                        if old_url in value or value.endswith(old_url.split("/")[-1]):
+                            content[key] = new_url
+                            break
+                elif key == "html" and isinstance(value, str):
+                    # 更新HTML中的URL
+                    html = value
+                    for old_url, new_url in url_mapping.items():
+                        # 替换各种可能的URL格式
+                        html = html.replace(old_url, new_url)
+                        filename = old_url.split("/")[-1]
+                        if filename in html:
+                            html = html.replace(f"/uploads/resources/{filename}", new_url)
+                            html = html.replace(f'"/uploads/resources/{filename}"', f'"{new_url}"')
+                            html = html.replace(f"'/uploads/resources/{filename}'", f"'{new_url}'")
+                    content[key] = html
+                else:
+                    content[key] = update_urls_in_content(value)
+            return content
+        elif isinstance(content, list):
+            return [update_urls_in_content(item) for item in content]
+        else:
+            return content
+
+    # 更新教案内容
+    for lesson in data.get("lessons", []):
+        lesson["content"] = update_urls_in_content(lesson.get("content", []))
+        if "cover_image_url" in lesson and lesson["cover_image_url"]:
+            cover_image_url = lesson["cover_image_url"]
+            if isinstance(cover_image_url, str):
+                for old_url, new_url in url_mapping.items():
+                    if old_url in cover_image_url:
+                        lesson["cover_image_url"] = new_url
+                        break
+
+    # 更新资源URL
+    for resource in data.get("resources", []):
+        for key in ["file_url", "thumbnail_url"]:
+            if key in resource and resource[key]:
+                resource_url = resource[key]
+                if isinstance(resource_url, str):
+                    for old_url, new_url in url_mapping.items():
+                        if old_url in resource_url:
+                            resource[key] = new_url
+                            break
+
+    return data
+
+
+def validate_import_data(import_data: Any, url_mapping: Dict[str, str]) -> Dict:
+    """检查导入数据格式，返回替换过文件 URL 的 data 部分"""
+    # 验证数据格式
+    if import_data is None:
+        raise HTTPException(400, "导入数据为空，请检查文件格式")
+
+    if not isinstance(import_data, dict):
+        raise HTTPException(400, f"无效的导入文件格式：期望字典类型，实际为 {type(import_data).__name__}")
+
+    # 确保 import_data 是字典类型后再检查 "data" 字段
+    if not isinstance(import_data, dict) or "data" not in import_data:
+        raise HTTPException(400, "无效的导入文件格式：缺少 'data' 字段")
+
+    data = import_data.get("data")
+
+    # 验证 data 字段
+    if data is None:
+        raise HTTPException(400, "无效的导入文件格式：'data' 字段为空")
+
+    if not isinstance(data, dict):
+        raise HTTPException(400, f"无效的导入文件格式：'data' 字段必须是字典类型，实际为 {type(data).__name__}")
+
+    # 更新URL引用（如果有文件映射）
+    if url_mapping:
+        data = update_urls_in_data(data, url_mapping)
+
+    return data
+
+
+def new_import_result() -> Dict[str, Any]:
+    """空的导入结果统计"""
+    result: Dict[str, Any] = {key: {"created": 0, "skipped": 0} for key in RESULT_KEYS}
+    result["errors"] = []
+    return result
+
+
+def import_summary(import_result: Dict[str, Any]) -> Dict[str, Any]:
+    """导入接口的返回内容"""
+    return {
+        "message": "导入完成",
+        "result": import_result,
+        "summary": {
+            "total_created": sum(import_result[key]["created"] for key in RESULT_KEYS),
+            "total_skipped": sum(import_result[key]["skipped"] for key in RESULT_KEYS),
+            "total_errors": len(import_result["errors"]),
+        },
+    }
+
+
+async def import_curriculum(
+    db: AsyncSession,
+    data: Dict,
+    overwrite_existing: bool,
+    current_user: User,
+    import_result: Dict[str, Any],
+    tracker: ImportTracker,
+) -> Tuple[Dict[Any, int], Dict[Any, int]]:
+    """导入学科、年级、课程和章节，返回 (课程代码映射, 章节代码映射)"""
+    total = sum(len(data.get(key) or []) for key in ["subjects", "grades", "courses", "chapters"])
+    await tracker.start_stage("curriculum", total)
+
+    # 创建映射字典
+    subject_code_map = {}
+    grade_level_map = {}
+    course_code_map = {}
+    chapter_code_map = {}
+
+    # 1. 导入学科
+    # 注意：学科是共享的基础数据，即使overwrite_existing=True也不应该更新现有学科
+    # 避免因为导入某个课程而污染系统中其他课程使用的学科数据
+    subjects = data.get("subjects") or []
+    for subject_data in subjects:
+        await tracker.advance()
+        try:
+            # 检查是否已存在
+            existing = await db.execute(
+                select(Subject).where(Subject.code == subject_data["code"])
+            )
+            existing_subject = existing.scalar_one_or_none()
+
+            subject_id_value = None
+
+            if existing_subject:
+                # 学科已存在，直接使用现有学科，不更新（避免污染共享数据）
+                import_result["subjects"]["skipped"] += 1
+                subject_id_value = existing_subject.id
+            else:
+                # 创建新学科
+                subject = Subject(**subject_data)
+                db.add(subject)
+                await db.commit()
+                await db.refresh(subject)
+                import_result["subjects"]["created"] += 1
+                subject_id_value = subject.id
+
+            if subject_id_value is not None:
+                subject_code_map[subject_data["code"]] = subject_id_value
+
+        except Exception as e:
+            import_result["errors"].append(
+                f"导入学科失败 {subject_data.get('name', '')}: {str(e)}"
+            )
+
+    # 2. 导入年级
+    # 注意：年级是共享的基础数据，即使overwrite_existing=True也不应该更新现有年级
+    # 避免因为导入某个课程而污染系统中其他课程使用的年级数据
+    grades = data.get("grades") or []
+    for grade_data in grades:
+        await tracker.advance()
+        try:
+            # 验证必需字段
+            if "level" not in grade_data:
+                import_result["errors"].append(
+                    f"导入年级失败 {grade_data.get('name', '未知')}: 缺少必需字段 'level'"
+                )
+                continue
+
+            # 确保 level 是整数类型
+            try:
+                grade_level = int(grade_data["level"])
+            except (ValueError, TypeError):
+                import_result["errors"].append(
+                    f"导入年级失败 {grade_data.get('name', '未知')}: 'level' 必须是整数，当前值为 {grade_data['level']}"
+                )
+                continue
+
+            # 检查是否已存在
+            existing = await db.execute(
+                select(Grade).where(Grade.level == grade_level)
+            )
+            existing_grade = existing.scalar_one_or_none()
+
+            grade_id_value = None
+
+            if existing_grade:
+                # 年级已存在，直接使用现有年级，不更新（避免污染共享数据）
+                import_result["grades"]["skipped"] += 1
+                grade_id_value = existing_grade.id
+            else:
+                # 创建新年级，确保使用转换后的整数 level
+                grade_data_copy = grade_data.copy()
+                grade_data_copy["level"] = grade_level
+                grade = Grade(**grade_data_copy)
+                db.add(grade)
+                await db.commit()
+                await db.refresh(grade)
+                import_result["grades"]["created"] += 1
+                grade_id_value = grade.id
+
+            if grade_id_value is not None:
+                grade_level_map[grade_level] = grade_id_value
+
+        except Exception as e:
+            import_result["errors"].append(
+                f"导入年级失败 {grade_data.get('name', '未知')}: {str(e)}"
+            )
+
+    # 3. 导入课程
+    courses = data.get("courses") or []
+    for course_data in courses:
+        await tracker.advance()
+        try:
+            # 验证必需字段
+            if "subject_code" not in course_data:
+                import_result["errors"].append(
+                    f"导入课程失败 {course_data.get('name', '未知')}: 缺少必需字段 'subject_code'"
+                )
+                continue
+
+            if "grade_level" not in course_data:
+                import_result["errors"].append(
+                    f"导入课程失败 {course_data.get('name', '未知')}: 缺少必需字段 'grade_level'"
+                )
+                continue
+
+            # 确保 grade_level 是整数类型，以便正确匹配
+            try:
+                course_grade_level = int(course_data["grade_level"])
+            except (ValueError, TypeError):
+                import_result["errors"].append(
+                    f"导入课程失败 {course_data.get('name', '未知')}: 'grade_level' 必须是整数，当前值为 {course_data['grade_level']}"
+                )
+                continue
+
+            # 获取学科和年级ID
+            subject_id = subject_code_map.get(course_data["subject_code"])
+            grade_id = grade_level_map.get(course_grade_level)
+
+            if not subject_id:
+                import_result["errors"].append(
+                    f"导入课程失败 {course_data.get('name', '未知')}: 学科代码 '{course_data['subject_code']}' 不存在（请确保在导入文件中包含该学科）"
+                )
+                continue
+
+            if not grade_id:
+                import_result["errors"].append(
+                    f"导入课程失败 {course_data.get('name', '未知')}: 年级级别 {course_grade_level} 不存在（请确保在导入文件中包含该年级，且 level 值为 {course_grade_level}）"
+                )
+                continue
+
+            # 验证 course_code 字段
+            if "code" not in course_data or not course_data["code"]:
+                import_result["errors"].append(
+                    f"导入课程失败 {course_data.get('name', '未知')}: 缺少必需字段 'code'（课程代码）"
+                )
+                continue
+
+            course_code = course_data["code"]
+
+            # 优先使用 course_code 来检查课程是否已存在
+            # 这样可以区分同一学科和年级的不同课程（如"智慧农业"和"信息科技"）
+            existing = await db.execute(
+                select(Course).where(Course.code == course_code)
+            )
+            existing_course = existing.scalar_one_or_none()
+
+            course_id_value = None
+
+            if existing_course:
+                # 如果找到相同 code 的课程，检查学科和年级是否匹配
+                if existing_course.subject_id != subject_id or existing_course.grade_id != grade_id:
+                    import_result["errors"].append(
+                        f"导入课程失败 {course_data.get('name', '未知')}: 课程代码 '{course_code}' 已存在，但属于不同的学科或年级（现有：学科ID={existing_course.subject_id}, 年级ID={existing_course.grade_id}；导入：学科ID={subject_id}, 年级ID={grade_id}）"
+                    )
+                    continue
+
+                if overwrite_existing:
+                    # 更新现有课程
+                    for key, value in course_data.items():
+                        if key not in ["subject_code", "grade_level", "code"]:
+                            setattr(existing_course, key, value)
+                    await db.commit()
+                    import_result["courses"]["skipped"] += 1
+                else:
+                    import_result["courses"]["skipped"] += 1
+                course_id_value = existing_course.id
+            else:
+                # 检查是否已有相同学科和年级的课程（但 code 不同）
+                # 如果存在，给出警告但允许创建（因为可能是不同的课程）
+                duplicate_check = await db.execute(
+                    select(Course).where(
+                        Course.subject_id == subject_id,
+                        Course.grade_id == grade_id,
+                        Course.name == course_data.get("name", "")
+                    )
+                )
+                duplicate_course = duplicate_check.scalar_one_or_none()
+
+                if duplicate_course:
+                    # 如果名称也相同，则认为是重复课程
+                    import_result["errors"].append(
+                        f"导入课程失败 {course_data.get('name', '未知')}: 已存在相同名称、学科和年级的课程（代码：{duplicate_course.code}）。如需更新，请使用相同的课程代码或启用覆盖选项。"
+                    )
+                    continue
+
+                # 创建新课程
+                course = Course(
+                    subject_id=subject_id,
+                    grade_id=grade_id,
+                    name=course_data["name"],
+                    code=course_code,
+                    description=course_data.get("description"),
+                    is_active=course_data.get("is_active", True),
+                    display_order=course_data.get("display_order", 0),
+                    created_by=current_user.id,
+                )
+                db.add(course)
+                await db.commit()
+                await db.refresh(course)
+                import_result["courses"]["created"] += 1
+                course_id_value = course.id
+
+            if course_id_value is not None:
+                course_code_map[course_code] = course_id_value
+
+        except Exception as e:
+            import_result["errors"].append(
+                f"导入课程失败 {course_data.get('name', '')}: {str(e)}"
+            )
+
+    # 4. 导入章节
+    chapters = data.get("chapters") or []
+    for chapter_data in chapters:
+        await tracker.advance()
+        try:
+            # 获取课程ID
+            course_id = course_code_map.get(chapter_data["course_code"])
+            if not course_id:
+                import_result["errors"].append(
+                    f"章节 {chapter_data.get('name', '')} 的课程不存在"
+                )
+                continue
+
+            # 处理父章节关系
+            parent_id = None
+            if chapter_data.get("parent_code"):
+                parent_id = chapter_code_map.get(chapter_data["parent_code"])
+                if not parent_id:
+                    import_result["errors"].append(
+                        f"章节 {chapter_data.get('name', '')} 的父章节不存在"
+                    )
+                    continue
+
+            # 检查是否已存在
+            existing = await db.execute(
+                select(Chapter).where(
+                    Chapter.course_id == course_id,
+                    Chapter.code == chapter_data["code"],
+                )
+            )
+            existing_chapter = existing.scalar_one_or_none()
+
+            chapter_id_value = None
+
+            if existing_chapter:
+                if overwrite_existing:
+                    # 更新现有章节
+                    for key, value in chapter_data.items():
+                        if key not in ["course_code", "parent_code"]:
+                            setattr(existing_chapter, key, value)
+                    setattr(existing_chapter, "parent_id", parent_id)
+                    await db.commit()
+                    import_result["chapters"]["skipped"] += 1
+                else:
+                    import_result["chapters"]["skipped"] += 1
+                chapter_id_value = existing_chapter.id
+            else:
+                # 创建新章节
+                chapter = Chapter(
+                    course_id=course_id,
+                    parent_id=parent_id,
+                    name=chapter_data["name"],
+                    code=chapter_data["code"],
+                    description=chapter_data.get("description"),
+                    display_order=chapter_data.get("display_order", 0),
+                    is_active=chapter_data.get("is_active", True),
+                )
+                db.add(chapter)
+                await db.commit()
+                await db.refresh(chapter)
+                import_result["chapters"]["created"] += 1
+                chapter_id_value = chapter.id
+
+            if chapter_id_value is not None:
+                chapter_code_map[chapter_data["code"]] = chapter_id_value
+
+        except Exception as e:
+            import_result["errors"].append(
+                f"导入章节失败 {chapter_data.get('name', '')}: {str(e)}"
+            )
+
+    return course_code_map, chapter_code_map
+
+
+async def import_lessons(
+    db: AsyncSession,
+    data: Dict,
+    overwrite_existing: bool,
+    current_user: User,
+    course_code_map: Dict[Any, int],
+    chapter_code_map: Dict[Any, int],
+    import_result: Dict[str, Any],
+    tracker: ImportTracker,
+) -> None:
+    """导入教案"""
+    await tracker.start_stage("lessons", len(data.get("lessons") or []))
+
+    # 5. 导入教案
+    lessons = data.get("lessons") or []
+    for lesson_data in lessons:
+        await tracker.advance()
+        try:
+            # 获取课程ID
+            course_id = course_code_map.get(lesson_data["course_code"])
+            if not course_id:
+                import_result["errors"].append(
+                    f"教案 {lesson_data.get('title', '')} 的课程不存在"
+                )
+                continue
+
+            # 获取章节ID
+            chapter_id = None
+            if lesson_data.get("chapter_code"):
+                chapter_id = chapter_code_map.get(lesson_data["chapter_code"])
+                if not chapter_id:
+                    import_result["errors"].append(
+                        f"教案 {lesson_data.get('title', '')} 的章节不存在"
+                    )
+                    continue
+
+            # 检查是否已存在
+            existing = await db.execute(
+                select(Lesson).where(
+                    Lesson.course_id == course_id,
+                    Lesson.title == lesson_data["title"],
+                )
+            )
+            existing_lesson = existing.scalar_one_or_none()
+
+            if existing_lesson:
+                if overwrite_existing:
+                    # 更新现有教案
+                    for key, value in lesson_data.items():
+                        if key not in ["course_code", "chapter_code"]:
+                            setattr(existing_lesson, key, value)
+                    setattr(existing_lesson, "chapter_id", chapter_id)
+                    await db.commit()
+                    import_result["lessons"]["skipped"] += 1
+                else:
+                    import_result["lessons"]["skipped"] += 1
+            else:
+                # 创建新教案
+                # 导入的教案默认设置为PUBLISHED状态，实现共享功能
+                # 因为教师导出教案就表示愿意与他人分享
+                imported_status = lesson_data.get("status", "draft")
+                # 如果导出时是已发布状态，保持已发布；如果是草稿，也设为已发布（共享）
+                if imported_status and imported_status in ["published", "draft"]:
+                    final_status = LessonStatus.PUBLISHED
+                elif imported_status:
+                    try:
+                        final_status = LessonStatus(imported_status)
+                    except (ValueError, TypeError):
+                        final_status = LessonStatus.PUBLISHED
+                else:
+                    final_status = LessonStatus.PUBLISHED
+
+                lesson = Lesson(
+                    course_id=course_id,
+                    chapter_id=chapter_id,
+                    title=lesson_data["title"],
+                    description=lesson_data.get("description"),
+                    status=final_status,
+                    content=lesson_data.get("content", []),
+                    tags=lesson_data.get("tags", []),
+                    cover_image_url=lesson_data.get("cover_image_url"),
+                    difficulty_level=lesson_data.get("difficulty_level"),
+                    estimated_duration=lesson_data.get("estimated_duration"),
+                    reference_notes=lesson_data.get("reference_notes"),
+                    creator_id=current_user.id,
+                )
+                # 如果是已发布状态，设置发布时间
+                if final_status == LessonStatus.PUBLISHED:
+                    setattr(lesson, "published_at", datetime.utcnow())
+                db.add(lesson)
+                await db.commit()
+                await db.refresh(lesson)
+                import_result["lessons"]["created"] += 1
+
+        except Exception as e:
+            import_result["errors"].append(
+                f"导入教案失败 {lesson_data.get('title', '')}: {str(e)}"
+            )
+
+
+async def import_resources(
+    db: AsyncSession,
+    data: Dict,
+    overwrite_existing: bool,
+    current_user: User,
+    chapter_code_map: Dict[Any, int],
+    import_result: Dict[str, Any],
+    tracker: ImportTracker,
+) -> None:
+    """导入资源"""
+    await tracker.start_stage("resources", len(data.get("resources") or []))
+
+    # 6. 导入资源
+    resources = data.get("resources") or []
+    for resource_data in resources:
+        await tracker.advance()
+        try:
+            # 获取章节ID
+            chapter_id = chapter_code_map.get(resource_data["chapter_code"])
+            if not chapter_id:
+                import_result["errors"].append(
+                    f"资源 {resource_data.get('title', '')} 的章节不存在"
+                )
+                continue
+
+            # 检查是否已存在
+            existing = await db.execute(
+                select(Resource).where(
+                    Resource.chapter_id == chapter_id,
+                    Resource.title == resource_data["title"],
+                )
+            )
+            existing_resource = existing.scalar_one_or_none()
+
+            if existing_resource:
+                if overwrite_existing:
+                    # 更新现有资源
+                    for key, value in resource_data.items():
+                        if key != "chapter_code":
+                            setattr(existing_resource, key, value)
+                    await db.commit()
+                    import_result["resources"]["skipped"] += 1
+                else:
+                    import_result["resources"]["skipped"] += 1
+            else:
+                # 创建新资源
+                resource = Resource(
+                    chapter_id=chapter_id,
+                    title=resource_data["title"],
+                    description=resource_data.get("description"),
+                    resource_type=resource_data["resource_type"],
+                    file_url=resource_data.get("file_url"),
+                    file_size=resource_data.get("file_size"),
+                    page_count=resource_data.get("page_count"),
+                    thumbnail_url=resource_data.get("thumbnail_url"),
+                    is_official=resource_data.get("is_official", False),
+                    is_downloadable=resource_data.get("is_downloadable", True),
+                    is_active=resource_data.get("is_active", True),
+                    display_order=resource_data.get("display_order", 0),
+                    created_by=current_user.id,
+                )
+                db.add(resource)
+                await db.commit()
+                await db.refresh(resource)
+                import_result["resources"]["created"] += 1
+
+        except Exception as e:
+            import_result["errors"].append(
+                f"导入资源失败 {resource_data.get('title', '')}: {str(e)}"
+            )
+
+
+async def run_course_import(
+    db: AsyncSession,
+    source_path: str,
+    file_format: str,
+    overwrite_existing: bool,
+    current_user: User,
+    work_dir: str,
+    tracker: Optional[ImportTracker] = None,
+) -> Dict[str, Any]:
+    """
+    执行完整导入，返回导入结果
+
+    source_path 是上传的原始文件，work_dir 用于存放解压的资源文件。
+    tracker.state 中已完成的阶段会被跳过（用于中断后继续执行）。
+    """
+    tracker = tracker or ImportTracker()
+    state = tracker.state
+
+    # 1. 解析导入文件，解压资源
+    import_data = await asyncio.to_thread(load_import_data, source_path, file_format)
+    if not tracker.is_done("extract"):
+        await tracker.start_stage("extract", 1)
+        if file_format == "zip":
+            await asyncio.to_thread(extract_import_resources, source_path, work_dir)
+        await tracker.advance()
+        await tracker.finish_stage("extract")
+
+    # 2. 复制资源文件（每复制一个文件保存一次检查点，继续执行时跳过已复制的文件）
+    url_mapping: Dict[str, str] = state.setdefault("url_mapping", {})
+    if not tracker.is_done("copy_files"):
+        file_paths = list_import_resources(work_dir) if file_format == "zip" else []
+        await tracker.start_stage("copy_files", len(file_paths))
+        for file_path in file_paths:
+            await tracker.advance()
+            if f"resources/{os.path.basename(file_path)}" in url_mapping:
+                continue
+            await copy_import_file(file_path, url_mapping)
+            await tracker.checkpoint()
+        await tracker.finish_stage("copy_files")
+
+    data = validate_import_data(import_data, url_mapping)
+
+    # 导入统计在每个阶段完成时随检查点保存
+    import_result = state.setdefault("result", new_import_result())
+
+    # 3. 学科、年级、课程、章节
+    if not tracker.is_done("curriculum"):
+        course_code_map, chapter_code_map = await import_curriculum(
+            db, data, overwrite_existing, current_user, import_result, tracker
+        )
+        # 以键值对列表保存，保证代码的类型（字符串 / 数字）在 JSON 往返后不变
+        state["course_code_map"] = list(course_code_map.items())
+        state["chapter_code_map"] = list(chapter_code_map.items())
+        await tracker.finish_stage("curriculum")
+    else:
+        course_code_map = {code: id_ for code, id_ in state.get("course_code_map", [])}
+        chapter_code_map = {code: id_ for code, id_ in state.get("chapter_code_map", [])}
+
+    # 4. 教案
+    if not tracker.is_done("lessons"):
+        await import_lessons(
+            db, data, overwrite_existing, current_user,
+            course_code_map, chapter_code_map, import_result, tracker,
+        )
+        await tracker.finish_stage("lessons")
+
+    # 5. 资源
+    if not tracker.is_done("resources"):
+        await import_resources(
+            db, data, overwrite_existing, current_user,
+            chapter_code_map, import_result, tracker,
+        )
+        await tracker.finish_stage("resources")
+
+    return import_summary(import_result)
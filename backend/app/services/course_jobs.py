@@ -0,0 +1,439 @@
+"""
+课程导入后台任务
+
+提交导入时只把上传文件保存到工作目录并创建任务记录，立即返回任务ID；
+后台 worker 领取任务后按阶段执行 course_import.run_course_import：
+- 任务状态、进度和阶段检查点保存在 course_jobs 表中
+- worker 定期写入心跳；进程退出或崩溃后，心跳超时的任务会被重新领取，
+  从未完成的阶段继续执行
+- 领取任务使用 FOR UPDATE SKIP LOCKED，多个 worker / 多个进程不会重复执行同一任务
+- 取消请求在条目之间生效，已导入的条目会保留
+"""
+
+import asyncio
+import os
+import shutil
+import traceback
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from uuid import uuid4
+
+import aiofiles
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.course_job import CourseJob, CourseJobStatus
+from app.models.user import User
+from app.services.course_import import (
+    STAGE_LABELS,
+    ImportCancelled,
+    ImportTracker,
+    detect_import_format,
+    run_course_import,
+)
+
+# 上传文件写入磁盘的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 进度写入数据库的最小间隔（秒）
+PROGRESS_SAVE_INTERVAL = 1.0
+
+FINISHED_STATUSES = {
+    CourseJobStatus.SUCCEEDED.value,
+    CourseJobStatus.FAILED.value,
+    CourseJobStatus.CANCELLED.value,
+}
+
+
+def serialize_job(job: CourseJob) -> Dict[str, Any]:
+    """任务状态（接口返回内容）"""
+    params = job.params or {}
+    return {
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "stage": job.stage,
+        "stage_label": STAGE_LABELS.get(job.stage) if job.stage else None,
+        "progress": job.progress,
+        "message": job.message,
+        "filename": params.get("filename"),
+        "overwrite_existing": params.get("overwrite_existing", False),
+        "cancel_requested": job.cancel_requested,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class JobTracker(ImportTracker):
+    """把进度和检查点写入 course_jobs，并在写入时读取取消标记"""
+
+    def __init__(self, runner: "CourseJobRunner", job_id: int, state: Dict[str, Any]):
+        super().__init__(state)
+        self.runner = runner
+        self.job_id = job_id
+        self._last_save = 0.0
+
+    def _check_cancelled(self) -> None:
+        if self.job_id in self.runner.cancelled_jobs:
+            raise ImportCancelled()
+
+    async def start_stage(self, stage: str, total: int) -> None:
+        await super().start_stage(stage, total)
+        await self._save()
+
+    async def advance(self, count: int = 1) -> None:
+        self._check_cancelled()
+        await super().advance(count)
+        if asyncio.get_running_loop().time() - self._last_save >= PROGRESS_SAVE_INTERVAL:
+            await self._save()
+
+    async def checkpoint(self) -> None:
+        await self._save(with_state=True)
+
+    async def finish_stage(self, stage: str) -> None:
+        await super().finish_stage(stage)
+        await self._save(with_state=True)
+
+    async def _save(self, with_state: bool = False) -> None:
+        values: Dict[str, Any] = {
+            "stage": self.stage,
+            "progress": self.progress,
+            "message": self.message,
+            "heartbeat_at": datetime.utcnow(),
+        }
+        if with_state:
+            values["state"] = dict(self.state)
+        await self.runner.update_job(self.job_id, values)
+        self._last_save = asyncio.get_running_loop().time()
+        self._check_cancelled()
+
+
+class CourseJobRunner:
+    """课程导入任务的 worker 池"""
+
+    def __init__(self):
+        # 当前进程的标识，记录在领取的任务上
+        self.worker_id = uuid4().hex
+        # 已请求取消的任务（由心跳从数据库同步，本进程提交的取消立即生效）
+        self.cancelled_jobs: Set[int] = set()
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    @property
+    def jobs_dir(self) -> str:
+        return os.path.join(settings.UPLOAD_DIR, "course_jobs")
+
+    async def start(self) -> None:
+        """启动 worker（上次中断的任务会在心跳超时后被重新领取）"""
+        if self._workers or settings.COURSE_JOB_WORKERS <= 0:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker_loop())
+            for _ in range(settings.COURSE_JOB_WORKERS)
+        ]
+        print(f"✅ Course job workers started ({settings.COURSE_JOB_WORKERS})")
+
+    async def stop(self) -> None:
+        """停止 worker，正在执行的任务退回排队状态，下次启动时继续"""
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if not workers:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(CourseJob)
+                    .where(
+                        CourseJob.worker_id == self.worker_id,
+                        CourseJob.status == CourseJobStatus.RUNNING.value,
+                    )
+                    .values(status=CourseJobStatus.PENDING.value, worker_id=None)
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"警告: 退回未完成的课程导入任务失败: {str(e)}")
+
+    # ==================== 提交 / 查询 / 取消 ====================
+
+    async def submit_import(
+        self,
+        db: AsyncSession,
+        file: UploadFile,
+        overwrite_existing: bool,
+        current_user: User,
+    ) -> CourseJob:
+        """保存上传文件并创建导入任务"""
+        work_dir = os.path.join(self.jobs_dir, uuid4().hex)
+        os.makedirs(work_dir, exist_ok=True)
+        source_path = os.path.join(work_dir, "upload")
+
+        try:
+            # 分块写入磁盘，不在内存中保留整个文件
+            head = b""
+            size = 0
+            async with aiofiles.open(source_path, "wb") as f:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if not head:
+                        head = chunk[:4096]
+                    size += len(chunk)
+                    await f.write(chunk)
+
+            if size == 0:
+                raise HTTPException(400, "上传的文件为空")
+
+            file_format = detect_import_format(head, file.filename or "")
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+        job = CourseJob(
+            job_type="import",
+            status=CourseJobStatus.PENDING.value,
+            params={
+                "filename": file.filename,
+                "file_format": file_format,
+                "file_size": size,
+                "overwrite_existing": overwrite_existing,
+            },
+            work_dir=work_dir,
+            progress=0.0,
+            message="等待处理",
+            state={},
+            created_by=current_user.id,
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        self._wakeup.set()
+        return job
+
+    async def request_cancel(self, db: AsyncSession, job: CourseJob) -> CourseJob:
+        """
+        取消任务：排队中的任务直接取消，执行中的任务在下一个条目前停止
+
+        排队中 -> 已取消 用一条带状态条件的 UPDATE 完成，与 worker 领取任务互斥：
+        任务已被领取时改为设置取消标记，工作目录留给 worker 清理。
+        """
+        if job.status in FINISHED_STATUSES:
+            return job
+
+        job_id = job.id
+        work_dir = job.work_dir
+        result = await db.execute(
+            update(CourseJob)
+            .where(
+                CourseJob.id == job_id,
+                CourseJob.status == CourseJobStatus.PENDING.value,
+            )
+            .values(
+                status=CourseJobStatus.CANCELLED.value,
+                cancel_requested=True,
+                message="已取消",
+                finished_at=datetime.utcnow(),
+            )
+            .returning(CourseJob.id)
+            .execution_options(synchronize_session=False)
+        )
+        cancelled_pending = result.scalar() is not None
+        if not cancelled_pending:
+            await db.execute(
+                update(CourseJob)
+                .where(
+                    CourseJob.id == job_id,
+                    CourseJob.status.notin_(FINISHED_STATUSES),
+                )
+                .values(cancel_requested=True)
+                .execution_options(synchronize_session=False)
+            )
+            self.cancelled_jobs.add(job_id)
+        await db.commit()
+
+        if cancelled_pending:
+            self._remove_work_dir(work_dir)
+        await db.refresh(job)
+        return job
+
+    async def update_job(self, job_id: int, values: Dict[str, Any]) -> None:
+        """更新任务记录，并同步取消标记"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(CourseJob)
+                .where(CourseJob.id == job_id)
+                .values(**values)
+                .returning(CourseJob.cancel_requested)
+            )
+            if result.scalar():
+                self.cancelled_jobs.add(job_id)
+            await db.commit()
+
+    # ==================== worker ====================
+
+    async def _worker_loop(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                job_id = await self._claim_next()
+            except Exception as e:
+                print(f"❌ 领取课程导入任务失败: {str(e)}")
+                job_id = None
+
+            if job_id is None:
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=settings.COURSE_JOB_POLL_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run_job(job_id)
+
+    async def _claim_next(self) -> Optional[int]:
+        """领取一个排队中的任务，或心跳超时的执行中任务"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.COURSE_JOB_STALE_SECONDS)
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(CourseJob)
+                .where(
+                    or_(
+                        CourseJob.status == CourseJobStatus.PENDING.value,
+                        and_(
+                            CourseJob.status == CourseJobStatus.RUNNING.value,
+                            or_(
+                                CourseJob.heartbeat_at.is_(None),
+                                CourseJob.heartbeat_at < stale_before,
+                            ),
+                        ),
+                    )
+                )
+                .order_by(CourseJob.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job = result.scalar_one_or_none()
+            if job is None:
+                return None
+
+            job.status = CourseJobStatus.RUNNING.value
+            job.worker_id = self.worker_id
+            job.heartbeat_at = now
+            job.attempts = (job.attempts or 0) + 1
+            if job.started_at is None:
+                job.started_at = now
+            await db.commit()
+            return job.id
+
+    async def _heartbeat(self, job_id: int) -> None:
+        """定期写入心跳，同时读取其他进程提交的取消请求"""
+        while True:
+            await asyncio.sleep(settings.COURSE_JOB_HEARTBEAT_INTERVAL)
+            try:
+                await self.update_job(job_id, {"heartbeat_at": datetime.utcnow()})
+            except Exception as e:
+                print(f"警告: 更新课程导入任务 {job_id} 心跳失败: {str(e)}")
+
+    async def _run_job(self, job_id: int) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            async with AsyncSessionLocal() as db:
+                job = await db.get(CourseJob, job_id)
+                if job is None:
+                    return
+
+                # 导入过程中会提交或回滚会话，先取出需要的字段
+                work_dir = job.work_dir
+                params = job.params or {}
+
+                if job.cancel_requested:
+                    await self._finish(job_id, work_dir, CourseJobStatus.CANCELLED, message="已取消")
+                    return
+                if job.attempts > settings.COURSE_JOB_MAX_ATTEMPTS:
+                    await self._finish(
+                        job_id, work_dir, CourseJobStatus.FAILED, error="任务多次执行中断，已停止重试"
+                    )
+                    return
+
+                current_user = await db.get(User, job.created_by)
+                tracker = JobTracker(self, job_id, dict(job.state or {}))
+                source_path = os.path.join(work_dir, "upload")
+
+                try:
+                    if current_user is None:
+                        raise HTTPException(400, "提交任务的用户不存在")
+                    response = await run_course_import(
+                        db,
+                        source_path,
+                        params.get("file_format", "json"),
+                        params.get("overwrite_existing", False),
+                        current_user,
+                        work_dir,
+                        tracker,
+                    )
+                except ImportCancelled:
+                    await db.rollback()
+                    await self._finish(
+                        job_id, work_dir, CourseJobStatus.CANCELLED,
+                        message="已取消", result=tracker.state.get("result"),
+                    )
+                except HTTPException as e:
+                    await db.rollback()
+                    await self._finish(job_id, work_dir, CourseJobStatus.FAILED, error=str(e.detail))
+                except Exception as e:
+                    await db.rollback()
+                    print(f"❌ 课程导入任务 {job_id} 失败:\n{traceback.format_exc()}")
+                    await self._finish(job_id, work_dir, CourseJobStatus.FAILED, error=f"导入失败: {str(e)}")
+                else:
+                    await self._finish(
+                        job_id, work_dir, CourseJobStatus.SUCCEEDED,
+                        message="导入完成", result=response, progress=100.0,
+                    )
+        except Exception as e:
+            print(f"❌ 执行课程导入任务 {job_id} 出错: {str(e)}")
+        finally:
+            heartbeat.cancel()
+            self.cancelled_jobs.discard(job_id)
+
+    async def _finish(
+        self,
+        job_id: int,
+        work_dir: Optional[str],
+        status: CourseJobStatus,
+        message: Optional[str] = None,
+        error: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None,
+        progress: Optional[float] = None,
+    ) -> None:
+        """记录任务的最终状态并清理工作目录"""
+        values: Dict[str, Any] = {
+            "status": status.value,
+            "message": message or error,
+            "error": error,
+            "result": result,
+            "finished_at": datetime.utcnow(),
+        }
+        if progress is not None:
+            values["progress"] = progress
+        await self.update_job(job_id, values)
+        self._remove_work_dir(work_dir)
+
+    def _remove_work_dir(self, work_dir: Optional[str]) -> None:
+        if work_dir and os.path.abspath(work_dir).startswith(os.path.abspath(self.jobs_dir)):
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# 全局单例
+course_job_runner = CourseJobRunner()
@@ -0,0 +1,113 @@
+"""
+课程体系树缓存
+
+前端几乎每次切换页面都会请求课程体系树，而树只在学科、年级、课程、教案增删时变化。
+这里按 include_inactive 缓存序列化好的 JSON 和对应的 ETag：
+- 学科 / 年级 / 课程的增删改、教案的增删与换课程在提交后递增版本号，缓存随之失效
+  （通过 Session 事件统一处理，写入方不需要手动调用）
+- 版本号变化期间开始的构建结果不写回缓存
+- ETag 为内容哈希，多个 worker 生成的相同树具有相同 ETag；
+  客户端带 If-None-Match 且与缓存一致时直接返回 304，不访问数据库
+- 缓存在进程内，多 worker 部署时其他 worker 最多在 TTL 后看到变更
+"""
+
+import hashlib
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.curriculum import Course, Grade, Subject
+from app.models.lesson import Lesson
+
+_CHANGED_FLAG = "curriculum_tree_changed"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否包含该 ETag（忽略弱校验前缀）"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CurriculumTreeCache:
+    """按 include_inactive 缓存课程体系树的 JSON"""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = settings.CURRICULUM_TREE_CACHE_TTL if ttl is None else ttl
+        self.version = 0
+        # include_inactive -> (版本号, 过期时间, JSON, ETag)
+        self._entries: Dict[bool, Tuple[int, float, bytes, str]] = {}
+
+    def cached(self, include_inactive: bool) -> Optional[Tuple[bytes, str]]:
+        """当前版本且未过期的缓存，返回 (JSON, ETag)"""
+        entry = self._entries.get(include_inactive)
+        if entry is None:
+            return None
+        version, expires_at, body, etag = entry
+        if version != self.version or expires_at <= time.monotonic():
+            self._entries.pop(include_inactive, None)
+            return None
+        return body, etag
+
+    async def get(
+        self,
+        include_inactive: bool,
+        build: Callable[[], Awaitable[BaseModel]],
+    ) -> Tuple[bytes, str]:
+        """读取缓存，未命中时调用 build 构建并缓存"""
+        cached = self.cached(include_inactive)
+        if cached is not None:
+            return cached
+
+        version = self.version
+        body = (await build()).model_dump_json().encode()
+        etag = make_etag(body)
+        if self.ttl > 0 and version == self.version:
+            self._entries[include_inactive] = (version, time.monotonic() + self.ttl, body, etag)
+        return body, etag
+
+    def bump(self) -> None:
+        """课程体系变化后调用"""
+        self.version += 1
+        self._entries.clear()
+
+
+# 单例实例
+curriculum_tree_cache = CurriculumTreeCache()
+
+
+def _changes_tree(session: Session) -> bool:
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, (Subject, Grade, Course, Lesson)):
+            return True
+    for obj in session.dirty:
+        if isinstance(obj, (Subject, Grade, Course)) and session.is_modified(obj):
+            return True
+        # 教案内容经常保存，只有换课程会影响树（各课程的教案数）
+        if isinstance(obj, Lesson) and inspect(obj).attrs.course_id.history.has_changes():
+            return True
+    return False
+
+
+@event.listens_for(Session, "after_flush")
+def _track_curriculum_changes(session: Session, flush_context) -> None:
+    if _changes_tree(session):
+        session.info[_CHANGED_FLAG] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session: Session) -> None:
+    if session.info.pop(_CHANGED_FLAG, False):
+        curriculum_tree_cache.bump()
@@ -0,0 +1,208 @@
+"""
+管理员数据看板统计快照
+
+统计数据每张表只扫描一次（COUNT ... FILTER 一次得到各项计数），
+结果保存在 dashboard_snapshots 表中，看板接口直接读取快照：
+- 快照超过 DASHBOARD_SNAPSHOT_MAX_AGE 秒才在请求中重新统计
+- 后台每隔 DASHBOARD_SNAPSHOT_REFRESH_INTERVAL 秒刷新一次，正常情况下请求总能读到新快照
+- 管理员可以要求立即重新统计
+
+多个 worker 共享同一份快照；各进程另外在内存中保留最近读到的快照，避免重复读取。
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.curriculum import Course, Resource
+from app.models.dashboard_snapshot import DashboardSnapshot
+from app.models.lesson import Lesson, LessonStatus
+from app.models.user import User, UserRole
+
+OVERVIEW_SNAPSHOT = "admin_overview"
+
+
+async def compute_overview(db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """重新统计看板数据（每张表一次查询）"""
+    # 与用户、课程的 created_at 一致，使用服务器本地时间
+    now = now or datetime.now()
+    today_start = datetime(now.year, now.month, now.day)
+    week_start = now - timedelta(days=7)
+    month_start = now - timedelta(days=30)
+
+    users = (
+        await db.execute(
+            select(
+                func.count(),
+                func.count().filter(User.role == UserRole.ADMIN),
+                func.count().filter(User.role == UserRole.RESEARCHER),
+                func.count().filter(User.role == UserRole.TEACHER),
+                func.count().filter(User.role == UserRole.STUDENT),
+                func.count().filter(User.is_active == True),
+                func.count().filter(User.created_at >= today_start),
+                func.count().filter(User.created_at >= week_start),
+                func.count().filter(User.created_at >= month_start),
+            ).select_from(User)
+        )
+    ).one()
+
+    courses = (
+        await db.execute(
+            select(
+                func.count(),
+                func.count().filter(Course.is_active == True),
+            ).select_from(Course)
+        )
+    ).one()
+
+    lessons = (
+        await db.execute(
+            select(
+                func.count(),
+                func.count().filter(Lesson.status == LessonStatus.PUBLISHED),
+                func.count().filter(Lesson.status == LessonStatus.DRAFT),
+                func.count().filter(Lesson.created_at >= today_start),
+                func.count().filter(Lesson.created_at >= week_start),
+                func.count().filter(Lesson.created_at >= month_start),
+            ).select_from(Lesson)
+        )
+    ).one()
+
+    total_resources = (await db.execute(select(func.count()).select_from(Resource))).scalar() or 0
+
+    return {
+        "user_stats": {
+            "total_users": users[0],
+            "admin_count": users[1],
+            "researcher_count": users[2],
+            "teacher_count": users[3],
+            "student_count": users[4],
+            "active_users": users[5],
+            "inactive_users": users[0] - users[5],
+        },
+        "content_stats": {
+            "total_courses": courses[0],
+            "active_courses": courses[1],
+            "total_lessons": lessons[0],
+            "published_lessons": lessons[1],
+            "draft_lessons": lessons[2],
+            "total_resources": total_resources,
+        },
+        "activity_stats": {
+            "users_created_today": users[6],
+            "users_created_this_week": users[7],
+            "users_created_this_month": users[8],
+            "lessons_created_today": lessons[3],
+            "lessons_created_this_week": lessons[4],
+            "lessons_created_this_month": lessons[5],
+        },
+    }
+
+
+class DashboardSnapshotService:
+    """看板统计快照的读取与刷新"""
+
+    def __init__(self):
+        self._cached: Optional[Tuple[Dict[str, Any], datetime]] = None
+        self._lock = asyncio.Lock()
+        self._tasks: List[asyncio.Task] = []
+
+    @staticmethod
+    def _is_fresh(computed_at: datetime, max_age: float) -> bool:
+        return datetime.now() - computed_at < timedelta(seconds=max_age)
+
+    async def get_overview(
+        self,
+        db: AsyncSession,
+        refresh: bool = False,
+        max_age: Optional[float] = None,
+    ) -> Tuple[Dict[str, Any], datetime]:
+        """
+        读取看板快照，返回 (统计数据, 统计时间)
+
+        快照超过 max_age 秒（默认 DASHBOARD_SNAPSHOT_MAX_AGE）或 refresh=True 时重新统计。
+        """
+        if refresh:
+            return await self.refresh(db)
+
+        if max_age is None:
+            max_age = settings.DASHBOARD_SNAPSHOT_MAX_AGE
+        if self._cached is not None and self._is_fresh(self._cached[1], max_age):
+            return self._cached
+
+        snapshot = await db.get(DashboardSnapshot, OVERVIEW_SNAPSHOT, populate_existing=True)
+        if snapshot is not None and self._is_fresh(snapshot.computed_at, max_age):
+            self._cached = (snapshot.data, snapshot.computed_at)
+            return self._cached
+
+        return await self.refresh(db, max_age=max_age)
+
+    async def refresh(
+        self, db: AsyncSession, max_age: Optional[float] = None
+    ) -> Tuple[Dict[str, Any], datetime]:
+        """
+        重新统计并保存快照
+
+        同一进程内同时只统计一次；传入 max_age 时，等待期间已被其他请求刷新的快照直接复用。
+        """
+        async with self._lock:
+            if (
+                max_age is not None
+                and self._cached is not None
+                and self._is_fresh(self._cached[1], max_age)
+            ):
+                return self._cached
+
+            computed_at = datetime.now()
+            data = await compute_overview(db, computed_at)
+
+            stmt = insert(DashboardSnapshot).values(
+                name=OVERVIEW_SNAPSHOT, data=data, computed_at=computed_at
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[DashboardSnapshot.name],
+                set_={"data": stmt.excluded.data, "computed_at": stmt.excluded.computed_at},
+            )
+            await db.execute(stmt)
+            await db.commit()
+
+            self._cached = (data, computed_at)
+            return self._cached
+
+    # ==================== 后台刷新 ====================
+
+    async def start(self) -> None:
+        """启动后台定期刷新"""
+        if self._tasks or settings.DASHBOARD_SNAPSHOT_REFRESH_INTERVAL <= 0:
+            return
+        self._tasks = [asyncio.create_task(self._refresh_loop())]
+        print(f"✅ Dashboard snapshot refresh started (every {settings.DASHBOARD_SNAPSHOT_REFRESH_INTERVAL}s)")
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _refresh_loop(self) -> None:
+        interval = settings.DASHBOARD_SNAPSHOT_REFRESH_INTERVAL
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    # 多个 worker 都在刷新时，快照已被其他 worker 更新的本轮跳过
+                    await self.get_overview(db, max_age=interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"警告: 刷新数据看板快照失败: {e}")
+            await asyncio.sleep(interval)
+
+
+# 单例实例
+dashboard_snapshots = DashboardSnapshotService()
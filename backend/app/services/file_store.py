@@ -0,0 +1,312 @@
+"""
+内容寻址文件存储（去重）
+
+上传的文件按内容的 SHA-256 保存一份：
+- 实际内容存放在 storage/blobs/<前两位>/<sha256>
+- 对外 URL 仍是 /uploads/resources/<sha256>.<扩展名>，该文件是 blob 的硬链接
+  （不支持硬链接的文件系统上退化为复制），静态文件服务无需改动
+- file_blobs 表记录每个 blob 的引用次数：每次上传 +1，删除资源时 -1
+- 引用次数为 0 且超过保留时间的 blob 由 collect_garbage 删除
+- compact 把旧的 uuid 命名文件替换为 blob 的硬链接，URL 不变，重复内容只占一份空间
+
+写入顺序保证与垃圾回收并发时不会丢文件：先在数据库中增加引用，再放置文件；
+垃圾回收在删除记录的事务提交前删除文件（记录行锁期间新的引用会等待）。
+"""
+
+import asyncio
+import glob
+import hashlib
+import os
+import re
+import shutil
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from uuid import uuid4
+
+import aiofiles
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.file_blob import FileBlob
+
+# 计算哈希时每次读取的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 内容寻址文件名：<sha256>.<扩展名>
+HASHED_NAME_RE = re.compile(r"^([0-9a-f]{64})(?:\.[a-z0-9]+)?$")
+
+
+def normalize_extension(ext: Optional[str]) -> str:
+    """规范化扩展名（小写、只保留字母数字），无效时返回 bin"""
+    ext = re.sub(r"[^a-z0-9]", "", (ext or "").lower())[:16]
+    return ext or "bin"
+
+
+def hash_file(path: str) -> Tuple[str, int]:
+    """计算文件的 SHA-256 和大小（在线程中调用）"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _link_or_copy(source: str, target: str) -> None:
+    """原子地把 target 指向 source 的内容：优先硬链接，失败时复制"""
+    temp = f"{target}.{uuid4().hex}.tmp"
+    try:
+        os.link(source, temp)
+    except OSError:
+        shutil.copyfile(source, temp)
+    os.replace(temp, target)
+
+
+class FileStore:
+    """内容寻址文件存储"""
+
+    def __init__(self, root: str = settings.UPLOAD_DIR):
+        self.root = root
+        self.blobs_dir = os.path.join(root, "blobs")
+        self.resources_dir = os.path.join(root, "resources")
+        self.tmp_dir = os.path.join(root, "tmp")
+
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        os.makedirs(self.resources_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blobs_dir, sha256[:2], sha256)
+
+    def new_temp_path(self) -> str:
+        """与存储目录位于同一文件系统的临时文件路径（便于直接移动 / 硬链接）"""
+        return os.path.join(self.tmp_dir, uuid4().hex)
+
+    @staticmethod
+    def hashed_filename(sha256: str, ext: str) -> str:
+        return f"{sha256}.{normalize_extension(ext)}"
+
+    @staticmethod
+    def parse_hashed_filename(filename: str) -> Optional[str]:
+        """内容寻址文件名中的哈希；旧的 uuid 文件名返回 None"""
+        match = HASHED_NAME_RE.match(filename)
+        return match.group(1) if match else None
+
+    # ==================== 写入 ====================
+
+    async def store_bytes(self, content: bytes, ext: str) -> Dict[str, Any]:
+        """保存内存中的文件内容"""
+        temp_path = self.new_temp_path()
+        async with aiofiles.open(temp_path, "wb") as f:
+            await f.write(content)
+        sha256 = hashlib.sha256(content).hexdigest()
+        return await self.ingest(temp_path, sha256, len(content), ext, consume=True)
+
+    async def store_path(self, path: str, ext: str) -> Dict[str, Any]:
+        """
+        保存磁盘上已有的文件（例如导入时解压出的资源）
+
+        内容已存在时只增加引用，不复制文件；源文件保持不变。
+        """
+        sha256, size = await asyncio.to_thread(hash_file, path)
+        return await self.ingest(path, sha256, size, ext, consume=False)
+
+    async def ingest(
+        self,
+        source_path: str,
+        sha256: str,
+        size: int,
+        ext: str,
+        consume: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        登记一个已计算哈希的文件并放置到存储中
+
+        consume=True 时 source_path 是本存储的临时文件，处理后会被移动或删除。
+        返回 {"sha256", "size", "filename", "file_url", "deduplicated"}。
+        """
+        try:
+            is_new = await self._add_reference(sha256, size)
+            filename = self.hashed_filename(sha256, ext)
+            await asyncio.to_thread(self._place, source_path, sha256, filename, consume)
+        finally:
+            if consume and os.path.exists(source_path):
+                os.remove(source_path)
+
+        return {
+            "sha256": sha256,
+            "size": size,
+            "filename": filename,
+            "file_url": f"/uploads/resources/{filename}",
+            "deduplicated": not is_new,
+        }
+
+    def _place(self, source_path: str, sha256: str, filename: str, consume: bool) -> None:
+        """确保 blob 和对外文件名存在（在线程中调用）"""
+        blob = self.blob_path(sha256)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if consume:
+                os.replace(source_path, blob)
+            else:
+                _link_or_copy(source_path, blob)
+
+        alias = os.path.join(self.resources_dir, filename)
+        if not os.path.exists(alias):
+            _link_or_copy(blob, alias)
+
+    async def _add_reference(self, sha256: str, size: int) -> bool:
+        """增加引用次数，返回该内容是否第一次出现"""
+        now = datetime.utcnow()
+        stmt = insert(FileBlob).values(
+            sha256=sha256, size=size, ref_count=1, created_at=now, updated_at=now
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FileBlob.sha256],
+            set_={"ref_count": FileBlob.ref_count + 1, "updated_at": now},
+        ).returning(FileBlob.ref_count)
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(stmt)
+            ref_count = result.scalar_one()
+            await db.commit()
+        return ref_count == 1
+
+    # ==================== 释放 / 回收 ====================
+
+    async def release(self, filename: str) -> bool:
+        """释放一次引用（文件在垃圾回收时才真正删除），非内容寻址文件返回 False"""
+        sha256 = self.parse_hashed_filename(filename)
+        if not sha256:
+            return False
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(FileBlob)
+                .where(FileBlob.sha256 == sha256, FileBlob.ref_count > 0)
+                .values(ref_count=FileBlob.ref_count - 1, updated_at=datetime.utcnow())
+            )
+            await db.commit()
+        return result.rowcount > 0
+
+    def _remove_blob_files(self, sha256: str) -> int:
+        """删除 blob 及其所有对外文件名，返回释放的字节数（在线程中调用）"""
+        freed = 0
+        for path in [self.blob_path(sha256)] + glob.glob(
+            os.path.join(self.resources_dir, f"{sha256}.*")
+        ):
+            try:
+                stat = os.stat(path)
+                os.remove(path)
+                # 只有最后一个链接被删除时才真正释放空间
+                if stat.st_nlink <= 1:
+                    freed += stat.st_size
+            except FileNotFoundError:
+                continue
+        return freed
+
+    async def collect_garbage(
+        self, grace_seconds: Optional[int] = None, dry_run: bool = False
+    ) -> Dict[str, int]:
+        """
+        删除没有引用的 blob
+
+        - file_blobs 中引用数为 0 且超过保留时间的记录及其文件
+        - 磁盘上没有记录的 blob 文件和遗留的临时文件（同样要求超过保留时间）
+        """
+        if grace_seconds is None:
+            grace_seconds = settings.FILE_STORE_GC_GRACE_SECONDS
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        stats = {"blobs": 0, "orphans": 0, "temp_files": 0, "bytes_freed": 0}
+
+        async with AsyncSessionLocal() as db:
+            condition = (FileBlob.ref_count <= 0) & (FileBlob.updated_at < cutoff)
+            if dry_run:
+                result = await db.execute(select(FileBlob.sha256, FileBlob.size).where(condition))
+                rows = result.all()
+                stats["blobs"] = len(rows)
+                stats["bytes_freed"] = sum(size or 0 for _, size in rows)
+            else:
+                # 删除记录并在提交前删除文件：并发上传的新引用会等待行锁释放后重新创建记录和文件
+                result = await db.execute(
+                    delete(FileBlob).where(condition).returning(FileBlob.sha256)
+                )
+                for sha256 in result.scalars().all():
+                    stats["bytes_freed"] += await asyncio.to_thread(self._remove_blob_files, sha256)
+                    stats["blobs"] += 1
+                await db.commit()
+
+            # 磁盘上没有记录的 blob
+            cutoff_ts = cutoff.timestamp()
+            for prefix in sorted(os.listdir(self.blobs_dir)):
+                prefix_dir = os.path.join(self.blobs_dir, prefix)
+                if not os.path.isdir(prefix_dir):
+                    continue
+                names = [n for n in os.listdir(prefix_dir) if HASHED_NAME_RE.match(n)]
+                if not names:
+                    continue
+                result = await db.execute(select(FileBlob.sha256).where(FileBlob.sha256.in_(names)))
+                known = set(result.scalars().all())
+                for name in names:
+                    path = os.path.join(prefix_dir, name)
+                    if name in known or os.path.getmtime(path) >= cutoff_ts:
+                        continue
+                    stats["orphans"] += 1
+                    if not dry_run:
+                        stats["bytes_freed"] += await asyncio.to_thread(self._remove_blob_files, name)
+
+        # 中断的上传留下的临时文件
+        for name in os.listdir(self.tmp_dir):
+            path = os.path.join(self.tmp_dir, name)
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff_ts:
+                stats["temp_files"] += 1
+                if not dry_run:
+                    stats["bytes_freed"] += os.path.getsize(path)
+                    os.remove(path)
+
+        return stats
+
+    async def compact(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        把旧的 uuid 命名文件并入内容寻址存储
+
+        每个旧文件替换为对应 blob 的硬链接（URL 不变），内容相同的文件只占一份空间。
+        旧文件的引用无法追踪，每个旧文件名计为 blob 的一次引用，不会被垃圾回收。
+        """
+        stats = {"scanned": 0, "linked": 0, "bytes_saved": 0}
+
+        for name in sorted(os.listdir(self.resources_dir)):
+            path = os.path.join(self.resources_dir, name)
+            if self.parse_hashed_filename(name) or not os.path.isfile(path) or os.path.islink(path):
+                continue
+            stats["scanned"] += 1
+            # 已经是硬链接的文件（之前整理过）跳过
+            if os.stat(path).st_nlink > 1:
+                continue
+
+            sha256, size = await asyncio.to_thread(hash_file, path)
+            blob = self.blob_path(sha256)
+            if os.path.exists(blob):
+                stats["bytes_saved"] += size
+            stats["linked"] += 1
+            if dry_run:
+                continue
+
+            await self._add_reference(sha256, size)
+            if os.path.exists(blob):
+                await asyncio.to_thread(_link_or_copy, blob, path)
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                await asyncio.to_thread(_link_or_copy, path, blob)
+
+        return stats
+
+
+# 单例实例
+file_store = FileStore()
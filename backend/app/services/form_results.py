@@ -0,0 +1,147 @@
+"""
+表单结果统计
+
+结果接口与表单 WebSocket 房间共用同一套计数：
+- load_form_tally: 一次查询取回回答总数和所有选项的选择次数、排名合计
+- FormTally: 内存中的累计计数，学生提交后直接累加，实时推送时不再查询数据库
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# 一条语句（同一个快照）取回：
+# - 汇总行（option_id 为 NULL）：回答总数，以及快照中最大的回答 ID
+# - 每个选项一行：包含该选项的回答数（单选 / 多选），以及排名的合计与个数（排序题）
+_TALLY_SQL = """
+WITH responses AS (
+    SELECT id, answers
+    FROM form_responses
+    WHERE form_cell_id = :form_cell_id
+)
+SELECT
+    CAST(NULL AS TEXT) AS option_id,
+    COUNT(*) AS response_count,
+    CAST(NULL AS NUMERIC) AS rank_sum,
+    CAST(NULL AS BIGINT) AS rank_count,
+    MAX(id) AS last_id
+FROM responses
+UNION ALL
+SELECT
+    ans->>'option_id' AS option_id,
+    COUNT(DISTINCT r.id) AS response_count,
+    SUM(CAST(ans->>'order' AS NUMERIC)) FILTER (WHERE jsonb_typeof(ans->'order') = 'number') AS rank_sum,
+    COUNT(*) FILTER (WHERE jsonb_typeof(ans->'order') = 'number') AS rank_count,
+    CAST(NULL AS INTEGER) AS last_id
+FROM responses r
+CROSS JOIN LATERAL jsonb_array_elements(
+    CASE WHEN json_typeof(r.answers) = 'array' THEN CAST(r.answers AS jsonb) ELSE '[]'::jsonb END
+) AS ans
+WHERE ans->>'option_id' IS NOT NULL
+GROUP BY 1
+"""
+
+
+class FormTally:
+    """表单答案的累计计数"""
+
+    def __init__(self) -> None:
+        self.total_responses: int = 0
+        # option_id -> 选择了该选项的回答数
+        self.option_counts: Dict[str, int] = {}
+        # option_id -> 排名合计 / 排名个数
+        self.rank_sums: Dict[str, float] = {}
+        self.rank_counts: Dict[str, int] = {}
+
+    def add_response(self, answers: Any) -> None:
+        """累加一份回答（answers 为 [{"option_id": ..., "order": ...}, ...]）"""
+        self.total_responses += 1
+        if not isinstance(answers, list):
+            return
+
+        counted = set()
+        for ans in answers:
+            if not isinstance(ans, dict) or ans.get("option_id") is None:
+                continue
+            option_id = str(ans["option_id"])
+            # 同一份回答中重复出现的选项只计一次
+            if option_id not in counted:
+                counted.add(option_id)
+                self.option_counts[option_id] = self.option_counts.get(option_id, 0) + 1
+
+            order = ans.get("order")
+            if isinstance(order, (int, float)) and not isinstance(order, bool):
+                self.rank_sums[option_id] = self.rank_sums.get(option_id, 0.0) + order
+                self.rank_counts[option_id] = self.rank_counts.get(option_id, 0) + 1
+
+    def option_stats(
+        self,
+        cell_type: Optional[str],
+        options: Optional[List[Dict[str, Any]]],
+    ) -> List[Dict[str, Any]]:
+        """按表单类型生成选项统计（结构与 get_form_results 的 option_stats 一致）"""
+        option_stats: List[Dict[str, Any]] = []
+        if not isinstance(options, list):
+            return option_stats
+
+        if cell_type in ("single_choice", "multiple_choice"):
+            for opt in options:
+                opt_id = opt.get("id")
+                count = self.option_counts.get(str(opt_id), 0)
+                percentage = (count / self.total_responses * 100) if self.total_responses > 0 else 0
+                option_stats.append({
+                    "option_id": opt_id,
+                    "text": opt.get("text"),
+                    "count": count,
+                    "percentage": round(percentage, 2)
+                })
+
+        elif cell_type == "ranking":
+            for opt in options:
+                opt_id = opt.get("id")
+                rank_count = self.rank_counts.get(str(opt_id), 0)
+                avg_rank = self.rank_sums.get(str(opt_id), 0.0) / rank_count if rank_count else 0
+                option_stats.append({
+                    "option_id": opt_id,
+                    "text": opt.get("text"),
+                    "average_rank": round(float(avg_rank), 2)
+                })
+
+        return option_stats
+
+
+async def load_form_tally(db: AsyncSession, form_cell_id: int) -> FormTally:
+    """
+    从数据库加载表单的累计计数
+
+    不论选项有多少，只需要一次查询。
+    """
+    tally, _ = await load_form_tally_snapshot(db, form_cell_id)
+    return tally
+
+
+async def load_form_tally_snapshot(
+    db: AsyncSession, form_cell_id: int
+) -> Tuple[FormTally, Optional[int]]:
+    """
+    加载累计计数，同时返回计数快照中最大的回答 ID（还没有回答时为 None）
+
+    两者来自同一个快照。回答 ID 按写入顺序递增，调用方据此判断加载期间收到的提交是否已经计入：
+    ID 大于该值的提交不在快照中。
+    """
+    tally = FormTally()
+    last_id: Optional[int] = None
+
+    rows = await db.execute(text(_TALLY_SQL), {"form_cell_id": form_cell_id})
+    for row in rows:
+        if row.option_id is None:
+            tally.total_responses = int(row.response_count or 0)
+            last_id = row.last_id
+            continue
+        tally.option_counts[row.option_id] = int(row.response_count)
+        if row.rank_count:
+            tally.rank_sums[row.option_id] = float(row.rank_sum)
+            tally.rank_counts[row.option_id] = int(row.rank_count)
+
+    return tally, last_id
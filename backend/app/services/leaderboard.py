@@ -0,0 +1,186 @@
+"""
+正面行为积分榜
+
+积分按学生汇总，学生姓名在同一次查询中联表取得。
+班级大屏会频繁轮询积分榜，所以每个班级的排名缓存在进程内（按班级和时间窗口，带 TTL 和 LRU 容量上限）：
+- 排名按 (积分降序, 学生ID) 保存为有序列表，取前 N 名、查某个学生的名次都用二分查找
+- 新增正面行为后调用 record，直接更新已缓存的排名，不重新统计
+- 支持全部时间和本周（周一 00:00 UTC 起）两个窗口；任意起止时间的查询不缓存
+- 缓存在进程内，多 worker 部署时其他 worker 最多在 TTL 后看到新记录
+"""
+
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.classroom_assistant import PositiveBehavior
+from app.models.user import User
+
+
+@dataclass
+class LeaderboardEntry:
+    student_id: int
+    student_name: str
+    total_points: int
+    record_count: int
+
+
+def week_start(now: Optional[datetime] = None) -> datetime:
+    """now 所在周的周一 00:00（UTC）"""
+    now = now or datetime.now(timezone.utc)
+    now = now.astimezone(timezone.utc) if now.tzinfo else now.replace(tzinfo=timezone.utc)
+    monday = now - timedelta(days=now.weekday())
+    return monday.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+async def load_leaderboard_entries(
+    db: AsyncSession,
+    classroom_id: int,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+) -> List[LeaderboardEntry]:
+    """按学生汇总积分（一次查询，含学生姓名）"""
+    total_points = func.sum(PositiveBehavior.points).label("total_points")
+    query = (
+        select(
+            PositiveBehavior.student_id,
+            User.full_name,
+            User.username,
+            total_points,
+            func.count(PositiveBehavior.id).label("record_count"),
+        )
+        .join(User, User.id == PositiveBehavior.student_id)
+        .where(PositiveBehavior.classroom_id == classroom_id)
+        .group_by(PositiveBehavior.student_id, User.full_name, User.username)
+        .order_by(desc(total_points), PositiveBehavior.student_id)
+    )
+    if from_date:
+        query = query.where(PositiveBehavior.recorded_at >= from_date)
+    if to_date:
+        query = query.where(PositiveBehavior.recorded_at <= to_date)
+
+    result = await db.execute(query)
+    return [
+        LeaderboardEntry(
+            student_id=row.student_id,
+            student_name=row.full_name or row.username,
+            total_points=int(row.total_points or 0),
+            record_count=int(row.record_count or 0),
+        )
+        for row in result
+    ]
+
+
+class Leaderboard:
+    """一个班级在某个时间窗口内的排名，同分并列（1, 1, 3）"""
+
+    def __init__(self, entries: Iterable[LeaderboardEntry] = ()):
+        self._entries: Dict[int, LeaderboardEntry] = {entry.student_id: entry for entry in entries}
+        self._keys: List[Tuple[int, int]] = sorted(self._key(entry) for entry in self._entries.values())
+
+    @staticmethod
+    def _key(entry: LeaderboardEntry) -> Tuple[int, int]:
+        return (-entry.total_points, entry.student_id)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(self, student_id: int) -> Optional[LeaderboardEntry]:
+        return self._entries.get(student_id)
+
+    def rank_of(self, student_id: int) -> Optional[int]:
+        entry = self._entries.get(student_id)
+        if entry is None:
+            return None
+        return bisect_left(self._keys, (-entry.total_points,)) + 1
+
+    def top(self, limit: Optional[int] = None) -> List[Tuple[int, LeaderboardEntry]]:
+        """前 limit 名（默认全部），返回 (名次, 条目)"""
+        keys = self._keys if limit is None else self._keys[:limit]
+        ranked = []
+        for index, (_, student_id) in enumerate(keys):
+            rank = ranked[-1][0] if ranked and keys[index - 1][0] == keys[index][0] else index + 1
+            ranked.append((rank, self._entries[student_id]))
+        return ranked
+
+    def add_points(self, student_id: int, points: int) -> bool:
+        """给已在榜上的学生加分；学生不在榜上时返回 False"""
+        entry = self._entries.get(student_id)
+        if entry is None:
+            return False
+        del self._keys[bisect_left(self._keys, self._key(entry))]
+        entry.total_points += points
+        entry.record_count += 1
+        insort(self._keys, self._key(entry))
+        return True
+
+
+class LeaderboardCache:
+    """按 (班级ID, 窗口起点) 缓存排名（TTL + LRU）"""
+
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl = settings.LEADERBOARD_CACHE_TTL if ttl is None else ttl
+        self.max_size = settings.LEADERBOARD_CACHE_SIZE if max_size is None else max_size
+        self._boards: "OrderedDict[Tuple[int, Optional[datetime]], Tuple[float, Leaderboard]]" = OrderedDict()
+        # 每个班级失效时递增，防止失效前开始的查询把旧排名写回缓存
+        self._generations: Dict[int, int] = {}
+
+    def _cached(self, key: Tuple[int, Optional[datetime]]) -> Optional[Leaderboard]:
+        entry = self._boards.get(key)
+        if entry is None:
+            return None
+        expires_at, board = entry
+        if expires_at <= time.monotonic():
+            del self._boards[key]
+            return None
+        self._boards.move_to_end(key)
+        return board
+
+    async def get(
+        self, db: AsyncSession, classroom_id: int, since: Optional[datetime] = None
+    ) -> Leaderboard:
+        """读取班级排名（since 为窗口起点，None 表示全部时间），未命中时统计"""
+        key = (classroom_id, since)
+        board = self._cached(key)
+        if board is not None:
+            return board
+
+        generation = self._generations.get(classroom_id, 0)
+        board = Leaderboard(await load_leaderboard_entries(db, classroom_id, from_date=since))
+        if (
+            self.ttl > 0
+            and self.max_size > 0
+            and generation == self._generations.get(classroom_id, 0)
+        ):
+            self._boards[key] = (time.monotonic() + self.ttl, board)
+            self._boards.move_to_end(key)
+            while len(self._boards) > self.max_size:
+                self._boards.popitem(last=False)
+        return board
+
+    def record(self, classroom_id: int, student_id: int, points: int, recorded_at: datetime) -> None:
+        """新增正面行为（已提交）后调用，更新包含该记录的已缓存排名"""
+        # 正在进行的统计可能没有包含这条记录，不写入缓存
+        self._generations[classroom_id] = self._generations.get(classroom_id, 0) + 1
+        for since in (None, week_start(recorded_at)):
+            entry = self._boards.get((classroom_id, since))
+            if entry is not None and not entry[1].add_points(student_id, points):
+                # 学生首次上榜，需要姓名，下次读取时重新统计
+                self.invalidate(classroom_id)
+                return
+
+    def invalidate(self, classroom_id: int) -> None:
+        self._generations[classroom_id] = self._generations.get(classroom_id, 0) + 1
+        for key in [key for key in self._boards if key[0] == classroom_id]:
+            del self._boards[key]
+
+
+# 单例实例
+leaderboards = LeaderboardCache()
@@ -0,0 +1,116 @@
+"""
+教案列表的游标分页、全文检索与计数
+
+教案数量增长后，OFFSET 翻页越往后越慢，title ILIKE 和 DISTINCT 计数都要扫全表。这里提供：
+- 游标分页：按 (updated_at, id) 倒序，游标记录上一页最后一行的排序键，配合 ix_lessons_updated_at_id 索引
+- 检索：标题、简介、标签拼成一个检索文本，ILIKE 过滤可以走 pg_trgm 的 GIN 表达式索引；
+  数据库安装了 pg_trgm 时按 word_similarity 相关度排序，否则标题命中的排在前面
+- 估算计数：用 EXPLAIN 的预估行数代替精确 COUNT，适合只需要数量级的场景
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import Float, Text, case, cast, func, literal_column, select, text, tuple_
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, ColumnElement, Executable, Select
+
+from app.models.lesson import Lesson
+
+# 检索文本表达式，与迁移中 ix_lessons_search_trgm 的索引表达式保持一致（常量不能用绑定参数，否则无法匹配索引）。
+# 标签以 JSON 保存时中文被转义为 \uXXXX，转成 JSONB 再转文本才能按原文匹配
+SEARCH_DOCUMENT: ColumnElement = (
+    Lesson.title
+    + literal_column("' '")
+    + func.coalesce(Lesson.description, literal_column("''"))
+    + literal_column("' '")
+    + func.coalesce(cast(cast(Lesson.tags, JSONB), Text), literal_column("''"))
+)
+
+# 进程内缓存 pg_trgm 是否可用，None 表示尚未检测
+_trigram_available: Optional[bool] = None
+
+
+class InvalidCursor(ValueError):
+    """分页游标无法解析"""
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """排序键编码为 URL 安全的游标"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, ranked: bool) -> List[Any]:
+    """解析游标，返回 [相关度, updated_at, id]（ranked 为 True）或 [updated_at, id]"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != (3 if ranked else 2):
+            raise InvalidCursor(cursor)
+        *rank, updated_at, lesson_id = values
+        if not isinstance(lesson_id, int) or not all(isinstance(value, (int, float)) for value in rank):
+            raise InvalidCursor(cursor)
+        return [*(float(value) for value in rank), datetime.fromisoformat(updated_at), lesson_id]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+async def trigram_available(db: AsyncSession) -> bool:
+    """数据库是否安装了 pg_trgm 扩展（每个进程检测一次）"""
+    global _trigram_available
+    if _trigram_available is None:
+        try:
+            result = await db.execute(text("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')"))
+            _trigram_available = bool(result.scalar())
+        except Exception as exc:
+            print(f"警告: 检测 pg_trgm 扩展失败，教案检索不按相关度排序: {exc}")
+            _trigram_available = False
+    return _trigram_available
+
+
+def search_pattern(search: str) -> str:
+    """ILIKE 模式，转义用户输入中的通配符"""
+    escaped = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_rank(search: str, use_trigram: bool) -> ColumnElement:
+    """检索相关度：标题命中加 1，有 pg_trgm 时再加上检索文本的 word_similarity"""
+    rank = case((Lesson.title.ilike(search_pattern(search), escape="\\"), 1.0), else_=0.0)
+    if use_trigram:
+        rank = rank + func.word_similarity(search, SEARCH_DOCUMENT)
+    return cast(rank, Float)
+
+
+def keyset_after(sort_keys: Sequence[ColumnElement], cursor_values: Sequence[Any]) -> ColumnElement:
+    """倒序排序时位于游标之后的行"""
+    return tuple_(*sort_keys) < tuple_(*cursor_values)
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <查询>"""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+    """查询结果行数的预估值（来自执行计划，不执行查询）"""
+    plan = (await db.execute(_Explain(query.order_by(None)))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -1,32 +1,144 @@
 """
 Office文档转换服务
 将Office文档转换为PDF以便在浏览器中预览
+
+转换在后台任务中执行，不阻塞事件循环，预览接口立即返回转换状态：
+- 同时进行的转换数由 OFFICE_CONVERT_WORKERS 限制（转换槽位），超出的排队等待
+- 同一个文件同时只转换一次，重复的预览请求等待同一个任务
+- LibreOffice 是否可用只检测一次
+- 安装了 unoserver 时每个槽位保持一个常驻的 LibreOffice 进程，转换时只调用 unoconvert 客户端；
+  否则每次转换启动 soffice，但每个槽位复用各自的用户配置目录（不必每次初始化配置，并发转换也不会争用同一配置目录）
+- 转换结果先写入临时文件再改名，存在的 *_converted.pdf 总是完整的
+- 转换失败后 OFFICE_CONVERT_RETRY_AFTER 秒内不再重试
+任务状态保存在进程内；多个 worker 时各自转换，转换结果文件共享。
 """
 
+import asyncio
 import os
-import io
-import aiofiles
-from typing import Optional, Dict, Any
-from pathlib import Path
-import subprocess
+import shutil
+import socket
 import tempfile
+import time
+from contextlib import asynccontextmanager
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, cast
 
 from docx import Document
 from pptx import Presentation
-import PyPDF2
-from PIL import Image
 import fitz  # PyMuPDF
 
+from app.core.config import settings
+
+# 常驻 LibreOffice 进程（unoserver）启动等待时间（秒）
+UNOSERVER_STARTUP_TIMEOUT = 30.0
+
+# 检测 LibreOffice 版本的超时（秒）
+PROBE_TIMEOUT = 15.0
+
+
+class ConversionStatus(str, Enum):
+    """转换状态"""
+
+    READY = "ready"  # 已转换
+    CONVERTING = "converting"  # 转换中
+    FAILED = "failed"  # 转换失败
+
+
+def _save_pdf(pdf_doc: "fitz.Document", pdf_path: str) -> None:
+    """保存到同目录的临时文件后改名"""
+    temp_path = f"{pdf_path}.{os.getpid()}.tmp"
+    try:
+        pdf_doc.save(temp_path)
+        os.replace(temp_path, pdf_path)
+    finally:
+        pdf_doc.close()
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _run_process(cmd: Sequence[str], timeout: float) -> Tuple[Optional[int], str]:
+    """执行命令，返回 (退出码, 标准错误)；超时时结束进程，退出码为 None"""
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None, ""
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+    return process.returncode, stderr.decode(errors="replace").strip()
+
+
+class _ConverterSlot:
+    """转换槽位：独立的 LibreOffice 用户配置目录，以及可选的常驻 unoserver 进程"""
+
+    def __init__(self, profile_dir: str):
+        self.profile_dir = profile_dir
+        self.server: Optional[asyncio.subprocess.Process] = None
+        self.port: Optional[int] = None
+
+    @property
+    def profile_uri(self) -> str:
+        return Path(self.profile_dir).resolve().as_uri()
+
+    @property
+    def server_running(self) -> bool:
+        return self.server is not None and self.server.returncode is None
+
+    async def stop_server(self) -> None:
+        server, self.server, self.port = self.server, None, None
+        if server is None or server.returncode is not None:
+            return
+        server.terminate()
+        try:
+            await asyncio.wait_for(server.wait(), 10)
+        except asyncio.TimeoutError:
+            server.kill()
+            await server.wait()
+
 
 class OfficeConverterService:
     """Office文档转换服务"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        retry_after: Optional[float] = None,
+    ):
         self.temp_dir = tempfile.gettempdir()
+        self.workers = max(1, settings.OFFICE_CONVERT_WORKERS if workers is None else workers)
+        self.timeout = settings.OFFICE_CONVERT_TIMEOUT if timeout is None else timeout
+        self.retry_after = settings.OFFICE_CONVERT_RETRY_AFTER if retry_after is None else retry_after
+        # LibreOffice 检测结果：None 未检测，"" 不可用
+        self._soffice: Optional[str] = None
+        self._unoserver: Optional[Tuple[str, str]] = None
+        self._probe_lock: Optional[asyncio.Lock] = None
+        # 空闲的转换槽位（第一次转换时创建）
+        self._slots: Optional["asyncio.Queue[_ConverterSlot]"] = None
+        self._all_slots: List[_ConverterSlot] = []
+        # 进行中的转换任务和最近失败的转换，键为输出PDF路径
+        self._jobs: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+        self._failures: Dict[str, Tuple[float, str]] = {}
+        self.stats = {"probes": 0, "conversions": 0, "joined": 0}
 
     async def convert_to_pdf(self, file_path: str, output_path: str) -> Dict[str, Any]:
         """
-        将Office文档转换为PDF
+        将Office文档转换为PDF（占用一个转换槽位，槽位已满时等待）
 
         Args:
             file_path: 源文件路径
@@ -37,107 +149,198 @@ class OfficeConverterService:
         """
         try:
             file_ext = Path(file_path).suffix.lower()
-
-            if file_ext == ".docx":
-                return await self._convert_docx_to_pdf(file_path, output_path)
-            elif file_ext in [".ppt", ".pptx"]:
-                return await self._convert_ppt_to_pdf(file_path, output_path)
-            else:
+            if file_ext not in [".doc", ".docx", ".ppt", ".pptx"]:
                 raise ValueError(f"不支持的文档格式: {file_ext}")
 
+            async with self._slot() as slot:
+                self.stats["conversions"] += 1
+                if file_ext in [".doc", ".docx"]:
+                    return await self._convert_docx_to_pdf(file_path, output_path, slot)
+                return await self._convert_ppt_to_pdf(file_path, output_path, slot)
+
         except Exception as e:
             return {"success": False, "error": str(e), "pdf_url": None}
 
     async def _convert_docx_to_pdf(
-        self, docx_path: str, pdf_path: str
+        self, docx_path: str, pdf_path: str, slot: _ConverterSlot
     ) -> Dict[str, Any]:
-        """将DOCX转换为PDF"""
+        """将DOC/DOCX转换为PDF"""
         try:
-            # 方法1: 使用LibreOffice命令行工具（推荐）
+            # 方法1: 使用LibreOffice（推荐）
             if await self._has_libreoffice():
-                return await self._convert_with_libreoffice(docx_path, pdf_path)
+                return await self._convert_with_libreoffice(docx_path, pdf_path, slot)
 
-            # 方法2: 使用python-docx提取内容并生成简化PDF
-            return await self._convert_docx_content_to_pdf(docx_path, pdf_path)
+            # 方法2: 使用python-docx提取内容并生成简化PDF（在线程中执行）
+            if Path(docx_path).suffix.lower() == ".doc":
+                raise ValueError("转换 .doc 文档需要安装 LibreOffice")
+            return await asyncio.to_thread(self._convert_docx_content_to_pdf, docx_path, pdf_path)
 
         except Exception as e:
             return {"success": False, "error": f"DOCX转换失败: {str(e)}", "pdf_url": None}
 
-    async def _convert_ppt_to_pdf(self, ppt_path: str, pdf_path: str) -> Dict[str, Any]:
+    async def _convert_ppt_to_pdf(
+        self, ppt_path: str, pdf_path: str, slot: _ConverterSlot
+    ) -> Dict[str, Any]:
         """将PPT/PPTX转换为PDF"""
         try:
-            # 方法1: 使用LibreOffice命令行工具（推荐）
+            # 方法1: 使用LibreOffice（推荐）
             if await self._has_libreoffice():
-                return await self._convert_with_libreoffice(ppt_path, pdf_path)
+                return await self._convert_with_libreoffice(ppt_path, pdf_path, slot)
 
-            # 方法2: 使用python-pptx提取内容并生成简化PDF
-            return await self._convert_ppt_content_to_pdf(ppt_path, pdf_path)
+            # 方法2: 使用python-pptx提取内容并生成简化PDF（在线程中执行）
+            return await asyncio.to_thread(self._convert_ppt_content_to_pdf, ppt_path, pdf_path)
 
         except Exception as e:
             return {"success": False, "error": f"PPT转换失败: {str(e)}", "pdf_url": None}
 
     async def _has_libreoffice(self) -> bool:
-        """检查是否安装了LibreOffice"""
+        """检查是否安装了LibreOffice（每个进程检测一次）"""
+        if self._soffice is None:
+            if self._probe_lock is None:
+                self._probe_lock = asyncio.Lock()
+            async with self._probe_lock:
+                if self._soffice is None:
+                    self._soffice = await self._probe_libreoffice()
+        return bool(self._soffice)
+
+    async def _probe_libreoffice(self) -> str:
+        """查找可用的 LibreOffice 可执行文件，以及可选的 unoserver / unoconvert"""
+        self.stats["probes"] += 1
+        names = [settings.OFFICE_LIBREOFFICE_BINARY] if settings.OFFICE_LIBREOFFICE_BINARY else ["soffice", "libreoffice"]
+        for name in names:
+            binary = shutil.which(name)
+            if not binary:
+                continue
+            try:
+                returncode, _ = await _run_process([binary, "--version"], PROBE_TIMEOUT)
+            except OSError:
+                continue
+            if returncode == 0:
+                if settings.OFFICE_USE_UNOSERVER:
+                    server, client = shutil.which("unoserver"), shutil.which("unoconvert")
+                    self._unoserver = (server, client) if server and client else None
+                return binary
+        print("警告: 未找到 LibreOffice，Office 文档将使用内容提取方式转换为简化PDF")
+        return ""
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[_ConverterSlot]:
+        """占用一个空闲的转换槽位"""
+        if self._slots is None:
+            self._slots = asyncio.Queue()
+            base_dir = os.path.join(self.temp_dir, f"office-converter-{os.getpid()}")
+            for index in range(self.workers):
+                slot = _ConverterSlot(os.path.join(base_dir, f"profile-{index}"))
+                self._all_slots.append(slot)
+                self._slots.put_nowait(slot)
+        slot = await self._slots.get()
         try:
-            result = subprocess.run(
-                ["libreoffice", "--version"], capture_output=True, text=True, timeout=5
-            )
-            return result.returncode == 0
-        except:
+            yield slot
+        finally:
+            self._slots.put_nowait(slot)
+
+    async def _ensure_unoserver(self, slot: _ConverterSlot) -> bool:
+        """槽位的常驻 LibreOffice 进程（未安装 unoserver 或启动失败时返回 False）"""
+        if self._unoserver is None:
             return False
+        if slot.server_running:
+            return True
+
+        port, uno_port = _free_port(), _free_port()
+        slot.server = await asyncio.create_subprocess_exec(
+            self._unoserver[0],
+            "--interface", "127.0.0.1",
+            "--port", str(port),
+            "--uno-port", str(uno_port),
+            "--executable", cast(str, self._soffice),
+            "--user-installation", slot.profile_uri,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + UNOSERVER_STARTUP_TIMEOUT
+        while time.monotonic() < deadline and slot.server_running:
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", port)
+            except OSError:
+                await asyncio.sleep(0.2)
+                continue
+            writer.close()
+            await writer.wait_closed()
+            slot.port = port
+            return True
+
+        print("警告: unoserver 启动失败，改为每次转换启动 LibreOffice")
+        await slot.stop_server()
+        self._unoserver = None
+        return False
 
     async def _convert_with_libreoffice(
-        self, input_path: str, output_path: str
+        self, input_path: str, output_path: str, slot: _ConverterSlot
     ) -> Dict[str, Any]:
-        """使用LibreOffice转换文档"""
+        """使用LibreOffice转换文档（输出到临时目录，完成后移动到目标路径）"""
+        output_dir = os.path.dirname(output_path) or "."
+        work_dir = tempfile.mkdtemp(prefix=".convert-", dir=output_dir)
         try:
-            output_dir = os.path.dirname(output_path)
-
-            # 使用LibreOffice命令行转换
-            cmd = [
-                "libreoffice",
-                "--headless",
-                "--convert-to",
-                "pdf",
-                "--outdir",
-                output_dir,
-                input_path,
-            ]
-
-            result = subprocess.run(
-                cmd, capture_output=True, text=True, timeout=90
-            )  # 增加到90秒，适应大文件转换
-
-            if result.returncode == 0:
-                # 获取生成的PDF文件名
-                input_name = Path(input_path).stem
-                generated_pdf = os.path.join(output_dir, f"{input_name}.pdf")
-
-                if os.path.exists(generated_pdf) and generated_pdf != output_path:
-                    # 重命名到目标路径
-                    os.rename(generated_pdf, output_path)
-
+            generated_pdf = os.path.join(work_dir, f"{Path(input_path).stem}.pdf")
+            if await self._ensure_unoserver(slot):
+                method = "unoserver"
+                cmd = [
+                    cast(Tuple[str, str], self._unoserver)[1],
+                    "--host", "127.0.0.1",
+                    "--port", str(slot.port),
+                    "--convert-to", "pdf",
+                    input_path,
+                    generated_pdf,
+                ]
+            else:
+                method = "libreoffice"
+                cmd = [
+                    cast(str, self._soffice),
+                    f"-env:UserInstallation={slot.profile_uri}",
+                    "--headless",
+                    "--norestore",
+                    "--convert-to",
+                    "pdf",
+                    "--outdir",
+                    work_dir,
+                    input_path,
+                ]
+
+            returncode, stderr = await _run_process(cmd, self.timeout)
+            if returncode is None:
+                # 超时的常驻进程可能已经卡住，下次转换时重新启动
+                await slot.stop_server()
                 return {
-                    "success": True,
-                    "error": None,
-                    "pdf_url": output_path,
-                    "method": "libreoffice",
+                    "success": False,
+                    "error": f"LibreOffice转换超时（{self.timeout:g}秒）",
+                    "pdf_url": None,
                 }
-            else:
+            if returncode != 0 or not os.path.exists(generated_pdf):
                 return {
                     "success": False,
-                    "error": f"LibreOffice转换失败: {result.stderr}",
+                    "error": f"LibreOffice转换失败: {stderr or f'退出码 {returncode}'}",
                     "pdf_url": None,
                 }
 
+            os.replace(generated_pdf, output_path)
+            return {
+                "success": True,
+                "error": None,
+                "pdf_url": output_path,
+                "method": method,
+            }
+
         except Exception as e:
             return {
                 "success": False,
                 "error": f"LibreOffice转换异常: {str(e)}",
                 "pdf_url": None,
             }
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
-    async def _convert_docx_content_to_pdf(
+    def _convert_docx_content_to_pdf(
         self, docx_path: str, pdf_path: str
     ) -> Dict[str, Any]:
         """从DOCX提取内容并生成简化PDF"""
@@ -202,9 +405,8 @@ class OfficeConverterService:
                 page.insert_text((50, 100), "文档内容提取中...", fontsize=14)
                 page.insert_text((50, 130), "请使用其他预览方式查看完整内容", fontsize=12)
 
-            # 保存PDF
-            pdf_doc.save(pdf_path)
-            pdf_doc.close()
+            # 保存PDF（先写临时文件，完成后再改名）
+            _save_pdf(pdf_doc, pdf_path)
 
             return {
                 "success": True,
@@ -216,7 +418,7 @@ class OfficeConverterService:
         except Exception as e:
             return {"success": False, "error": f"内容提取转换失败: {str(e)}", "pdf_url": None}
 
-    async def _convert_ppt_content_to_pdf(
+    def _convert_ppt_content_to_pdf(
         self, ppt_path: str, pdf_path: str
     ) -> Dict[str, Any]:
         """从PPT/PPTX提取内容并生成简化PDF"""
@@ -308,9 +510,8 @@ class OfficeConverterService:
                 page.insert_text((50, 100), "演示文稿内容提取中...", fontsize=14)
                 page.insert_text((50, 130), "请使用其他预览方式查看完整内容", fontsize=12)
 
-            # 保存PDF
-            pdf_doc.save(pdf_path)
-            pdf_doc.close()
+            # 保存PDF（先写临时文件，完成后再改名）
+            _save_pdf(pdf_doc, pdf_path)
 
             return {
                 "success": True,
@@ -326,9 +527,84 @@ class OfficeConverterService:
                 "pdf_url": None,
             }
 
+    def _resolve_paths(self, original_file_url: str) -> Optional[Tuple[str, str, str]]:
+        """资源URL对应的 (源文件路径, 转换后PDF路径, 转换后PDF URL)"""
+        prefix = "/uploads/resources/"
+        if not original_file_url.startswith(prefix):
+            return None
+        file_path = os.path.join(settings.UPLOAD_DIR, "resources", original_file_url[len(prefix):])
+        pdf_path = file_path.rsplit(".", 1)[0] + "_converted.pdf"
+        pdf_url = original_file_url.rsplit(".", 1)[0] + "_converted.pdf"
+        return file_path, pdf_path, pdf_url
+
+    def _start_conversion(self, file_path: str, pdf_path: str) -> "asyncio.Task[Dict[str, Any]]":
+        """启动后台转换；同一个文件已在转换时返回进行中的任务"""
+        task = self._jobs.get(pdf_path)
+        if task is not None:
+            self.stats["joined"] += 1
+            return task
+
+        task = asyncio.create_task(self._run_conversion(file_path, pdf_path))
+        self._jobs[pdf_path] = task
+        task.add_done_callback(lambda _: self._jobs.pop(pdf_path, None))
+        return task
+
+    async def _run_conversion(self, file_path: str, pdf_path: str) -> Dict[str, Any]:
+        result = await self.convert_to_pdf(file_path, pdf_path)
+        if result["success"]:
+            self._failures.pop(pdf_path, None)
+            print(f"Office文档转换成功，使用方法: {result.get('method', 'unknown')}")
+        else:
+            self._failures[pdf_path] = (time.monotonic() + self.retry_after, result["error"])
+            print(f"Office文档转换失败: {result['error']}")
+        return result
+
+    def get_conversion_status(self, original_file_url: str) -> Dict[str, Any]:
+        """
+        获取Office文档的转换状态（不等待转换）
+
+        尚未转换时在后台启动转换并返回 converting；最近转换失败时返回 failed，
+        OFFICE_CONVERT_RETRY_AFTER 秒后再次请求会重新转换
+
+        Returns:
+            {"status": ConversionStatus, "pdf_url": 转换后的PDF URL, "error": 失败原因}
+        """
+        paths = self._resolve_paths(original_file_url)
+        if paths is None or not os.path.exists(paths[0]):
+            return {"status": ConversionStatus.FAILED, "pdf_url": None, "error": "源文件不存在"}
+        file_path, pdf_path, pdf_url = paths
+
+        if pdf_path not in self._jobs:
+            if os.path.exists(pdf_path):
+                return {"status": ConversionStatus.READY, "pdf_url": pdf_url, "error": None}
+            failure = self._failures.get(pdf_path)
+            if failure is not None:
+                if failure[0] > time.monotonic():
+                    return {"status": ConversionStatus.FAILED, "pdf_url": None, "error": failure[1]}
+                del self._failures[pdf_path]
+
+        self._start_conversion(file_path, pdf_path)
+        return {"status": ConversionStatus.CONVERTING, "pdf_url": None, "error": None}
+
+    async def wait_for_conversion(self, original_file_url: str) -> Dict[str, Any]:
+        """获取转换状态，正在转换时等待转换完成（返回值同 get_conversion_status）"""
+        status = self.get_conversion_status(original_file_url)
+        if status["status"] != ConversionStatus.CONVERTING:
+            return status
+        _, pdf_path, pdf_url = cast(Tuple[str, str, str], self._resolve_paths(original_file_url))
+        task = self._jobs.get(pdf_path)
+        if task is not None:
+            # 等待方断开时不取消转换，其他请求仍在等待同一个任务
+            result = await asyncio.shield(task)
+        else:
+            result = {"success": os.path.exists(pdf_path), "error": None}
+        if result["success"]:
+            return {"status": ConversionStatus.READY, "pdf_url": pdf_url, "error": None}
+        return {"status": ConversionStatus.FAILED, "pdf_url": None, "error": result["error"]}
+
     async def get_converted_pdf_url(self, original_file_url: str) -> Optional[str]:
         """
-        获取Office文档的转换PDF URL
+        获取Office文档的转换PDF URL（等待转换完成）
 
         Args:
             original_file_url: 原始文件URL
@@ -337,36 +613,21 @@ class OfficeConverterService:
             转换后的PDF URL，如果转换失败则返回None
         """
         try:
-            # 从URL提取文件路径
-            if not original_file_url.startswith("/uploads/resources/"):
-                return None
-
-            # 构建文件路径
-            file_path = original_file_url.replace(
-                "/uploads/resources/", "storage/resources/"
-            )
-            if not os.path.exists(file_path):
-                return None
-
-            # 检查是否已经转换过
-            pdf_path = file_path.rsplit(".", 1)[0] + "_converted.pdf"
-            if os.path.exists(pdf_path):
-                return pdf_path.replace("storage/resources/", "/uploads/resources/")
-
-            # 执行转换
-            result = await self.convert_to_pdf(file_path, pdf_path)
-
-            if result["success"]:
-                print(f"Office文档转换成功，使用方法: {result.get('method', 'unknown')}")
-                return pdf_path.replace("storage/resources/", "/uploads/resources/")
-            else:
-                print(f"Office文档转换失败: {result['error']}")
-                return None
-
+            status = await self.wait_for_conversion(original_file_url)
+            return status["pdf_url"]
         except Exception as e:
             print(f"获取转换PDF URL失败: {str(e)}")
             return None
 
+    async def aclose(self) -> None:
+        """取消进行中的转换并停止常驻的 LibreOffice 进程（应用关闭时调用）"""
+        jobs = list(self._jobs.values())
+        for task in jobs:
+            task.cancel()
+        await asyncio.gather(*jobs, return_exceptions=True)
+        for slot in self._all_slots:
+            await slot.stop_server()
+
 
 # 单例实例
 office_converter_service = OfficeConverterService()
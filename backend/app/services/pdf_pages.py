@@ -0,0 +1,333 @@
+"""
+PDF 分页预览图
+
+学生预览 PDF 时不必下载整个文件：按需把单页渲染为 JPEG，宽度取不小于请求宽度的最近档位
+（档位有限，同一页的缓存变体数量可控）。
+- 渲染在进程池中执行（PyMuPDF 渲染期间不释放 GIL，线程池无法利用多核），每个渲染进程缓存最近打开的文档
+- 渲染结果保存在 UPLOAD_DIR/page_cache 下，缓存键包含源文件的大小和修改时间，文件更新后自动失效；
+  缓存总大小超过 PDF_PAGE_CACHE_MAX_BYTES 时按最近使用时间淘汰
+- 同一页同一宽度同时只渲染一次
+- get_page_image 返回前读出图片内容，发送期间缓存文件被淘汰不影响响应
+- 渲染一页后在后台预先渲染后续 PDF_PAGE_PREFETCH 页（渲染进程空闲时）
+多个 worker 各自统计缓存大小，缓存目录的实际大小最多为上限的 worker 数倍。
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Set, Tuple, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# 页面图片宽度档位（像素）
+PAGE_WIDTHS = (160, 320, 480, 640, 800, 960, 1280, 1600, 2048)
+
+# 每个渲染进程保持打开的文档数
+OPEN_DOCUMENTS_PER_WORKER = 8
+
+# 渲染进程内已打开的文档：(路径, 修改时间) -> fitz.Document
+_open_documents: "OrderedDict[Tuple[str, int], object]" = OrderedDict()
+
+
+class PageOutOfRange(ValueError):
+    """页码超出文档页数"""
+
+    def __init__(self, page: int, page_count: int):
+        super().__init__(f"页码 {page} 超出范围（共 {page_count} 页）")
+        self.page = page
+        self.page_count = page_count
+
+
+def page_width(width: int) -> int:
+    """不小于 width 的最近档位（超过最大档位时取最大档位）"""
+    for candidate in PAGE_WIDTHS:
+        if candidate >= width:
+            return candidate
+    return PAGE_WIDTHS[-1]
+
+
+def resource_file_path(file_url: str) -> Optional[str]:
+    """/uploads/resources/ 下的文件URL对应的磁盘路径（不在资源目录内时返回 None）"""
+    prefix = "/uploads/resources/"
+    if not file_url.startswith(prefix):
+        return None
+    root = os.path.abspath(os.path.join(settings.UPLOAD_DIR, "resources"))
+    path = os.path.abspath(os.path.join(root, file_url[len(prefix):]))
+    if not path.startswith(root + os.sep):
+        return None
+    return path
+
+
+def _open_document(pdf_path: str, mtime_ns: int):
+    import fitz  # PyMuPDF
+
+    key = (pdf_path, mtime_ns)
+    doc = _open_documents.get(key)
+    if doc is None:
+        doc = fitz.open(pdf_path)
+        _open_documents[key] = doc
+        while len(_open_documents) > OPEN_DOCUMENTS_PER_WORKER:
+            _open_documents.popitem(last=False)[1].close()
+    _open_documents.move_to_end(key)
+    return doc
+
+
+def count_pages(pdf_path: str, mtime_ns: int) -> int:
+    """文档页数，在渲染进程中执行"""
+    return len(_open_document(pdf_path, mtime_ns))
+
+
+def render_page(
+    pdf_path: str, mtime_ns: int, page: int, width: int, output_path: str, quality: int
+) -> int:
+    """渲染一页（页码从 1 开始）为 JPEG 并写入 output_path，在渲染进程中执行，返回图片字节数"""
+    import fitz  # PyMuPDF
+
+    pdf_page = _open_document(pdf_path, mtime_ns)[page - 1]
+    zoom = width / pdf_page.rect.width
+    pixmap = pdf_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    data = pixmap.tobytes("jpeg", jpg_quality=quality)
+
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, output_path)
+    return len(data)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class PdfPageRenderer:
+    """PDF 页面渲染与磁盘缓存"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        workers: Optional[int] = None,
+        prefetch: Optional[int] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.cache_dir = cache_dir or os.path.join(settings.UPLOAD_DIR, "page_cache")
+        self.max_bytes = settings.PDF_PAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.workers = workers or settings.PDF_RENDER_WORKERS or min(4, os.cpu_count() or 1)
+        self.prefetch = settings.PDF_PAGE_PREFETCH if prefetch is None else prefetch
+        self.quality = settings.PDF_PAGE_JPEG_QUALITY
+        self._executor = executor
+        self._owns_executor = executor is None
+        # 缓存文件 -> 字节数，按最近使用排序（第一次使用时扫描缓存目录）
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+        self._index_lock: Optional[asyncio.Lock] = None
+        # 进行中的渲染（键为缓存文件路径）和后台预渲染任务
+        self._inflight: Dict[str, "asyncio.Task[str]"] = {}
+        self._prefetching: Set["asyncio.Task[str]"] = set()
+        # 源文件 -> 页数
+        self._page_counts: Dict[str, int] = {}
+        self.stats = {"hits": 0, "renders": 0, "prefetched": 0, "evicted": 0}
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # spawn 启动的子进程不继承事件循环和数据库连接
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        """在渲染进程中执行；渲染进程崩溃（如文件损坏导致 MuPDF 异常退出）后下次使用时重建进程池"""
+        executor = self._get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            if self._executor is executor and self._owns_executor:
+                self._executor = None
+                executor.shutdown(wait=False)
+            raise
+
+    @staticmethod
+    def _source_key(pdf_path: str, stat: os.stat_result) -> str:
+        identity = f"{os.path.abspath(pdf_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+        return hashlib.sha1(identity.encode()).hexdigest()[:24]
+
+    def _cache_path(self, source_key: str, page: int, width: int) -> str:
+        return os.path.join(self.cache_dir, source_key[:2], source_key, f"{page}-{width}.jpg")
+
+    def _scan_cache(self) -> "OrderedDict[str, int]":
+        """扫描缓存目录，按修改时间（最近使用时间）排序"""
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    # 渲染中的临时文件（可能属于其他 worker）
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                found.append((stat.st_mtime, path, stat.st_size))
+        found.sort()
+        return OrderedDict((path, size) for _, path, size in found)
+
+    async def _index(self) -> "OrderedDict[str, int]":
+        if self._entries is None:
+            if self._index_lock is None:
+                self._index_lock = asyncio.Lock()
+            async with self._index_lock:
+                if self._entries is None:
+                    entries = await asyncio.to_thread(self._scan_cache)
+                    self._total_bytes = sum(entries.values())
+                    self._entries = entries
+        return self._entries
+
+    def _touch(self, path: str) -> bool:
+        """缓存命中时更新最近使用时间；文件已被删除（如其他 worker 淘汰）时返回 False"""
+        entries = self._entries
+        assert entries is not None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._total_bytes -= entries.pop(path, 0)
+            return False
+        if path not in entries:
+            entries[path] = os.path.getsize(path)
+            self._total_bytes += entries[path]
+        entries.move_to_end(path)
+        return True
+
+    def _add(self, path: str, size: int) -> None:
+        """记录新的缓存文件，超过上限时淘汰最久未使用的文件"""
+        entries = self._entries
+        assert entries is not None
+        self._total_bytes += size - entries.get(path, 0)
+        entries[path] = size
+        entries.move_to_end(path)
+        while self._total_bytes > self.max_bytes and len(entries) > 1:
+            oldest, oldest_size = entries.popitem(last=False)
+            self._total_bytes -= oldest_size
+            self.stats["evicted"] += 1
+            try:
+                os.remove(oldest)
+                os.rmdir(os.path.dirname(oldest))
+            except OSError:
+                pass
+
+    async def get_page(self, pdf_path: str, page: int, width: int) -> Tuple[str, int]:
+        """
+        获取页面图片（页码从 1 开始），未缓存时渲染
+
+        Returns:
+            (缓存图片路径, 文档页数)
+
+        Raises:
+            FileNotFoundError: 源文件不存在
+            PageOutOfRange: 页码超出文档页数
+        """
+        await self._index()
+        stat = os.stat(pdf_path)
+        source_key = self._source_key(pdf_path, stat)
+        width = page_width(width)
+        page_count = self._page_counts.get(source_key)
+        if page_count is None:
+            page_count = await self._run(count_pages, pdf_path, stat.st_mtime_ns)
+            self._page_counts[source_key] = page_count
+        if not 1 <= page <= page_count:
+            raise PageOutOfRange(page, page_count)
+
+        path = self._cache_path(source_key, page, width)
+        if path not in self._inflight and self._touch(path):
+            self.stats["hits"] += 1
+        else:
+            # 等待方断开时不取消渲染，结果仍写入缓存
+            await asyncio.shield(self._render(pdf_path, stat.st_mtime_ns, page, width, path))
+
+        self._schedule_prefetch(pdf_path, stat.st_mtime_ns, source_key, page, width, page_count)
+        return path, page_count
+
+    async def get_page_image(self, pdf_path: str, page: int, width: int) -> Tuple[bytes, int]:
+        """
+        获取页面图片内容，参数和异常同 get_page
+
+        在返回前读出图片：缓存文件可能在返回路径之后、发送之前被其他渲染（或其他 worker）淘汰，
+        读取时文件已被淘汰则重新渲染一次。
+
+        Returns:
+            (JPEG 图片内容, 文档页数)
+        """
+        path, page_count = await self.get_page(pdf_path, page, width)
+        try:
+            return await asyncio.to_thread(_read_file, path), page_count
+        except FileNotFoundError:
+            # get_page 检查缓存时发现文件已不存在，会从索引中移除并重新渲染
+            path, page_count = await self.get_page(pdf_path, page, width)
+            return await asyncio.to_thread(_read_file, path), page_count
+
+    def _render(
+        self, pdf_path: str, mtime_ns: int, page: int, width: int, path: str
+    ) -> "asyncio.Task[str]":
+        """渲染任务；同一页同一宽度已在渲染时返回进行中的任务"""
+        task = self._inflight.get(path)
+        if task is None:
+            task = asyncio.create_task(self._do_render(pdf_path, mtime_ns, page, width, path))
+            self._inflight[path] = task
+            task.add_done_callback(lambda _: self._inflight.pop(path, None))
+        return task
+
+    async def _do_render(self, pdf_path: str, mtime_ns: int, page: int, width: int, path: str) -> str:
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+        size = await self._run(render_page, pdf_path, mtime_ns, page, width, path, self.quality)
+        self.stats["renders"] += 1
+        self._add(path, size)
+        return path
+
+    def _schedule_prefetch(
+        self, pdf_path: str, mtime_ns: int, source_key: str, page: int, width: int, page_count: int
+    ) -> None:
+        """渲染进程有空闲时，在后台渲染后续几页"""
+        for next_page in range(page + 1, min(page + self.prefetch, page_count) + 1):
+            if len(self._inflight) >= self.workers:
+                return
+            path = self._cache_path(source_key, next_page, width)
+            if path in self._inflight or (self._entries is not None and path in self._entries):
+                continue
+            task = self._render(pdf_path, mtime_ns, next_page, width, path)
+            self.stats["prefetched"] += 1
+            self._prefetching.add(task)
+            task.add_done_callback(self._prefetch_done)
+
+    def _prefetch_done(self, task: "asyncio.Task[str]") -> None:
+        self._prefetching.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"警告: 预渲染 PDF 页面失败: {task.exception()}")
+
+    async def wait_prefetch(self) -> None:
+        """等待进行中的预渲染完成（测试和基准测试用）"""
+        while self._prefetching:
+            await asyncio.gather(*list(self._prefetching), return_exceptions=True)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            **self.stats,
+            "cached_files": len(self._entries or {}),
+            "cached_bytes": self._total_bytes,
+            "rendering": len(self._inflight),
+        }
+
+    def shutdown(self) -> None:
+        """取消预渲染并关闭渲染进程（应用关闭时调用）"""
+        for task in list(self._prefetching):
+            task.cancel()
+        executor, self._executor = self._executor, None
+        if executor is not None and self._owns_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 单例实例
+pdf_page_renderer = PdfPageRenderer()
@@ -0,0 +1,288 @@
+"""
+学生问题相似度索引
+
+同一节课里学生经常重复提问。这里为每节课维护一个进程内的 TF-IDF 向量索引，用于：
+- 提问前查找相似问题（重复问题检测）
+- 相关问题推荐
+- 向 AI 提问时，已有相似的已解决问题则直接复用其回答
+
+文本切分：中文按单字和相邻两字切分（不依赖分词词典），英文和数字按单词切分并转小写。
+词项通过稳定哈希映射到固定维度，每节课的问题保存为 NumPy 矩阵（每行一个问题的对数词频），
+检索时按当前文档频率计算 IDF 并求余弦相似度，几千个问题的检索在毫秒级完成。
+
+- 每节课的索引在第一次使用时从数据库加载（一次查询），之后新建问题、状态变化时增量更新
+- 按 TTL 和 LRU 容量上限缓存；其他 worker 新建的问题最多在 TTL 后出现在本进程的索引中
+"""
+
+import math
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.question import Question, QuestionStatus
+
+# 词项哈希维度
+INDEX_DIM = 2048
+
+# 已有回答的问题状态
+ANSWERED_STATUSES = (QuestionStatus.ANSWERED, QuestionStatus.RESOLVED)
+
+_TOKEN_PATTERN = re.compile(r"[\u3400-\u9fff]+|[a-z0-9]+(?:[._+#-][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """中文单字 + 两字组合，英文数字按单词"""
+    tokens: List[str] = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if run[0].isascii():
+            tokens.append(run)
+            continue
+        tokens.extend(run)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def term_vector(text: str) -> np.ndarray:
+    """对数词频向量（未乘 IDF）"""
+    vector = np.zeros(INDEX_DIM, dtype=np.float32)
+    for token in tokenize(text):
+        vector[zlib.crc32(token.encode()) % INDEX_DIM] += 1.0
+    nonzero = vector > 0
+    vector[nonzero] = 1.0 + np.log(vector[nonzero])
+    return vector
+
+
+@dataclass
+class SimilarQuestion:
+    question_id: int
+    title: str
+    score: float
+
+
+class LessonQuestionIndex:
+    """一节课的问题向量"""
+
+    def __init__(self, capacity: int = 64):
+        self._vectors = np.zeros((capacity, INDEX_DIM), dtype=np.float32)
+        self._doc_freq = np.zeros(INDEX_DIM, dtype=np.float32)
+        self._ids: List[int] = []
+        self._titles: List[str] = []
+        self._rows: Dict[int, int] = {}
+        self._cell_ids: List[Optional[int]] = []
+        self._statuses: List[QuestionStatus] = []
+        self._public: List[bool] = []
+        # 乘以 IDF 并归一化后的矩阵，问题变化后在下一次检索时重新计算
+        self._idf: Optional[np.ndarray] = None
+        self._normalized: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, question_id: int) -> bool:
+        return question_id in self._rows
+
+    def add(
+        self,
+        question_id: int,
+        title: str,
+        content: Optional[str] = None,
+        cell_id: Optional[int] = None,
+        status: QuestionStatus = QuestionStatus.PENDING,
+        is_public: bool = True,
+    ) -> None:
+        """加入问题（标题和内容一起计算向量）；已存在时替换"""
+        vector = term_vector(f"{title}\n{content or ''}")
+        row = self._rows.get(question_id)
+        if row is None:
+            row = len(self._ids)
+            if row == len(self._vectors):
+                grown = np.zeros((row * 2, INDEX_DIM), dtype=np.float32)
+                grown[:row] = self._vectors
+                self._vectors = grown
+            self._ids.append(question_id)
+            self._titles.append(title)
+            self._cell_ids.append(cell_id)
+            self._statuses.append(status)
+            self._public.append(is_public)
+            self._rows[question_id] = row
+        else:
+            self._doc_freq -= self._vectors[row] > 0
+            self._titles[row] = title
+            self._cell_ids[row] = cell_id
+            self._statuses[row] = status
+            self._public[row] = is_public
+        self._vectors[row] = vector
+        self._doc_freq += vector > 0
+        self._normalized = None
+
+    def set_status(self, question_id: int, status: QuestionStatus) -> None:
+        row = self._rows.get(question_id)
+        if row is not None:
+            self._statuses[row] = status
+
+    def search(
+        self,
+        text: str,
+        limit: int = 5,
+        cell_id: Optional[int] = None,
+        statuses: Optional[Sequence[QuestionStatus]] = None,
+        public_only: bool = True,
+        exclude_id: Optional[int] = None,
+        min_score: float = 0.0,
+    ) -> List[SimilarQuestion]:
+        """余弦相似度最高的问题；指定 cell_id 时只在该 Cell 的问题中查找"""
+        count = len(self._ids)
+        if count == 0 or limit <= 0:
+            return []
+
+        if self._normalized is None:
+            self._idf = np.log((1.0 + count) / (1.0 + self._doc_freq)) + 1.0
+            weighted = self._vectors[:count] * self._idf
+            norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+            norms[norms == 0.0] = 1.0
+            self._normalized = weighted / norms
+
+        query = term_vector(text) * self._idf
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0.0:
+            return []
+        scores = self._normalized @ (query / query_norm)
+
+        mask = np.ones(count, dtype=bool)
+        if cell_id is not None:
+            mask &= np.fromiter((c == cell_id for c in self._cell_ids), dtype=bool, count=count)
+        if statuses is not None:
+            mask &= np.fromiter((s in statuses for s in self._statuses), dtype=bool, count=count)
+        if public_only:
+            mask &= np.fromiter(self._public, dtype=bool, count=count)
+        if exclude_id is not None and exclude_id in self._rows:
+            mask[self._rows[exclude_id]] = False
+        scores = np.where(mask & (scores >= min_score), scores, -1.0)
+
+        limit = min(limit, count)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            SimilarQuestion(
+                question_id=self._ids[row],
+                title=self._titles[row],
+                score=round(float(scores[row]), 4),
+            )
+            for row in top
+            if scores[row] > 0.0
+        ]
+
+
+class QuestionSimilarityIndex:
+    """按课程缓存问题索引（TTL + LRU）"""
+
+    def __init__(self, ttl: Optional[float] = None, max_lessons: Optional[int] = None):
+        self.ttl = settings.QUESTION_INDEX_TTL if ttl is None else ttl
+        self.max_lessons = settings.QUESTION_INDEX_MAX_LESSONS if max_lessons is None else max_lessons
+        self._indexes: "OrderedDict[int, Tuple[float, LessonQuestionIndex]]" = OrderedDict()
+        # 未加载的课程有变化时递增，防止变化前开始的加载写回缓存
+        self._generations: Dict[int, int] = {}
+
+    def _cached(self, lesson_id: int) -> Optional[LessonQuestionIndex]:
+        entry = self._indexes.get(lesson_id)
+        if entry is None:
+            return None
+        expires_at, index = entry
+        if expires_at <= time.monotonic():
+            del self._indexes[lesson_id]
+            return None
+        self._indexes.move_to_end(lesson_id)
+        return index
+
+    async def get(self, db: AsyncSession, lesson_id: int) -> LessonQuestionIndex:
+        """读取课程的索引，未加载时从数据库构建"""
+        index = self._cached(lesson_id)
+        if index is not None:
+            return index
+
+        generation = self._generations.get(lesson_id, 0)
+        result = await db.execute(
+            select(
+                Question.id,
+                Question.title,
+                Question.content,
+                Question.cell_id,
+                Question.status,
+                Question.is_public,
+            )
+            .where(Question.lesson_id == lesson_id)
+            .order_by(Question.id)
+        )
+        rows = result.all()
+        index = LessonQuestionIndex(capacity=max(64, 2 ** math.ceil(math.log2(len(rows) + 1))))
+        for row in rows:
+            index.add(row.id, row.title, row.content, row.cell_id, row.status, row.is_public)
+
+        if (
+            self.ttl > 0
+            and self.max_lessons > 0
+            and generation == self._generations.get(lesson_id, 0)
+        ):
+            self._indexes[lesson_id] = (time.monotonic() + self.ttl, index)
+            self._indexes.move_to_end(lesson_id)
+            while len(self._indexes) > self.max_lessons:
+                self._indexes.popitem(last=False)
+        return index
+
+    def add(self, question: Question) -> None:
+        """新建或修改问题（已提交）后调用"""
+        lesson_id = question.lesson_id
+        entry = self._indexes.get(lesson_id)
+        if entry is None:
+            self._generations[lesson_id] = self._generations.get(lesson_id, 0) + 1
+            return
+        entry[1].add(
+            question.id,
+            question.title,
+            question.content,
+            question.cell_id,
+            question.status,
+            question.is_public,
+        )
+
+    def set_status(self, lesson_id: int, question_id: int, status: QuestionStatus) -> None:
+        """问题状态变化（已提交）后调用"""
+        entry = self._indexes.get(lesson_id)
+        if entry is None:
+            self._generations[lesson_id] = self._generations.get(lesson_id, 0) + 1
+            return
+        entry[1].set_status(question_id, status)
+
+    async def find_similar(
+        self,
+        db: AsyncSession,
+        lesson_id: int,
+        text: str,
+        limit: int = 5,
+        cell_id: Optional[int] = None,
+        statuses: Optional[Sequence[QuestionStatus]] = ANSWERED_STATUSES,
+        exclude_id: Optional[int] = None,
+        min_score: float = 0.0,
+    ) -> List[SimilarQuestion]:
+        """查找课程中与 text 相似的公开问题（默认只返回已有回答的问题，statuses 为 None 时不限状态）"""
+        index = await self.get(db, lesson_id)
+        return index.search(
+            text,
+            limit=limit,
+            cell_id=cell_id,
+            statuses=statuses,
+            exclude_id=exclude_id,
+            min_score=min_score,
+        )
+
+
+# 单例实例
+question_index = QuestionSimilarityIndex()
@@ -3,6 +3,7 @@
 提供统一的 WebSocket 消息构建和目标解析
 """
 
+import json
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Literal, Optional, Union, cast, Dict, Any, List
@@ -16,6 +17,71 @@ from app.models.classroom_session import ClassSession
 from app.models.activity import ActivitySubmission
 from app.models.user import User
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
+
+
+def dumps_json(obj: Any) -> str:
+    """序列化为 JSON 文本（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=str)
+
+
+class RealtimeEvent(dict):
+    """
+    WebSocket 事件消息
+
+    与普通 dict 用法相同，但序列化结果会被缓存：同一事件发给教师、学生、
+    多个通道或通过 backplane 转发给其他 worker 时只序列化一次。
+    修改顶层字段会使缓存失效；发送后不要再修改嵌套的 data。
+    """
+
+    __slots__ = ("_encoded",)
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._encoded: Optional[str] = None
+
+    def encode(self) -> str:
+        """返回缓存的 JSON 文本"""
+        if self._encoded is None:
+            self._encoded = dumps_json(self)
+        return self._encoded
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._encoded = None
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self._encoded = None
+        super().__delitem__(key)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self._encoded = None
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        self._encoded = None
+        return super().setdefault(key, default)
+
+    def pop(self, *args: Any) -> Any:
+        self._encoded = None
+        return super().pop(*args)
+
+    def clear(self) -> None:
+        self._encoded = None
+        super().clear()
+
+
+def encode_event(event: dict) -> str:
+    """序列化事件；RealtimeEvent 复用缓存结果"""
+    if isinstance(event, RealtimeEvent):
+        return event.encode()
+    return dumps_json(event)
+
 
 @dataclass(frozen=True)
 class Channel:
@@ -59,7 +125,7 @@ def build_event(
     delivery_mode: Literal["cast", "unicast"],
     data: dict,
     ack_token: Optional[str] = None
-) -> dict:
+) -> RealtimeEvent:
     """
     构建统一的 WebSocket 事件消息
     
@@ -71,9 +137,9 @@ def build_event(
         ack_token: 可选的确认令牌
     
     返回:
-        标准化的事件消息字典
+        标准化的事件消息（RealtimeEvent，序列化结果会被缓存复用）
     """
-    return {
+    return RealtimeEvent({
         "event_id": str(uuid4()),
         "version": 1,
         "type": type,
@@ -85,7 +151,7 @@ def build_event(
         "delivery_mode": delivery_mode,
         "data": data,
         "ack_token": ack_token,
-    }
+    })
 
 
 async def resolve_teacher_targets(
@@ -202,6 +268,203 @@ async def fetch_teachers_by_lesson(
     return teacher_ids
 
 
+def _jsonb_truthy(expr: str) -> str:
+    """生成判断 JSONB 值是否为"真"的 SQL 片段（与 Python 的真值规则一致，缺失的键视为假）"""
+    return f"""COALESCE({expr} NOT IN ('null', 'false', '0', '""', '[]', '{{}}'), false)"""
+
+
+def _jsonb_key(expr: str) -> str:
+    """生成把 JSONB 标量转换为分布统计键的 SQL 片段（与 Python 的 str() 一致）"""
+    return (
+        f"(CASE jsonb_typeof({expr})"
+        f" WHEN 'boolean' THEN initcap(({expr})::text)"
+        f" WHEN 'null' THEN 'None'"
+        f" ELSE ({expr}) #>> '{{}}' END)"
+    )
+
+
+def _jsonb_number(expr: str) -> str:
+    """生成提取 JSONB 数值的 SQL 片段（非数值返回 NULL）"""
+    return (
+        f"(CASE jsonb_typeof({expr})"
+        f" WHEN 'number' THEN ({expr})::float8"
+        f" WHEN 'boolean' THEN ({expr})::boolean::int::float8"
+        f" END)"
+    )
+
+
+# 每个学生只取优先级最高的提交（已评分 > 已提交 > 已退回 > 草稿），同优先级取最近更新的
+_BEST_SUBMISSIONS_CTE = """
+WITH best AS (
+    SELECT student_id, status, score, time_spent, CAST(responses AS jsonb) AS responses
+    FROM (
+        SELECT
+            s.student_id, s.status, s.score, s.time_spent, s.responses,
+            row_number() OVER (
+                PARTITION BY s.student_id
+                ORDER BY
+                    CASE s.status
+                        WHEN :status_graded THEN 4
+                        WHEN :status_submitted THEN 3
+                        WHEN :status_returned THEN 2
+                        WHEN :status_draft THEN 1
+                        ELSE 0
+                    END DESC,
+                    s.updated_at DESC
+            ) AS rn
+        FROM activity_submissions s
+        WHERE s.cell_id = :cell_id
+          AND s.lesson_id = :lesson_id
+          {session_filter}
+    ) ranked
+    WHERE rn = 1
+)
+"""
+
+_STATUS_SUMMARY_SQL = """
+SELECT
+    status,
+    count(*) AS student_count,
+    sum(score) AS score_sum,
+    count(score) AS score_count,
+    sum(time_spent) AS time_sum,
+    count(time_spent) AS time_count
+FROM best
+GROUP BY status
+"""
+
+# 展开 responses 的每一题，在数据库中完成选项分布、知识点分布与得分汇总：
+# 对象格式的作答用 jsonb_to_record 一次取出全部字段；
+# 每道题的作答、选项、知识点展开为同一个行流，只做一轮分组聚合
+_ITEM_STATISTICS_SQL = f"""
+, answers AS (
+    SELECT e.key AS item_id, e.value AS v, jsonb_typeof(e.value) AS t, r.*
+    FROM best
+    CROSS JOIN LATERAL jsonb_each(
+        CASE WHEN jsonb_typeof(best.responses) = 'object' THEN best.responses ELSE '{{}}'::jsonb END
+    ) AS e
+    CROSS JOIN LATERAL jsonb_to_record(
+        CASE WHEN jsonb_typeof(e.value) = 'object' THEN e.value ELSE '{{}}'::jsonb END
+    ) AS r(
+        answer jsonb, value jsonb, text jsonb,
+        is_correct jsonb, correct jsonb, score jsonb, time_spent jsonb,
+        knowledge_tags jsonb, tags jsonb
+    )
+),
+facts AS (
+    SELECT
+        item_id,
+        CASE t
+            WHEN 'object' THEN
+                CASE
+                    WHEN {_jsonb_truthy("answer")} THEN answer
+                    WHEN {_jsonb_truthy("value")} THEN value
+                    ELSE text
+                END
+            WHEN 'null' THEN NULL
+            ELSE v
+        END AS answer,
+        CASE WHEN {_jsonb_truthy("knowledge_tags")} THEN knowledge_tags ELSE tags END AS tags,
+        {_jsonb_truthy("is_correct")} OR {_jsonb_truthy("correct")} AS is_correct,
+        {_jsonb_number("score")} AS score_value,
+        {_jsonb_number("time_spent")} AS time_value
+    FROM answers
+),
+stream AS (
+    -- kind 0: 每次作答；kind 1: 选项；kind 2: 知识点
+    SELECT item_id, 0 AS kind, NULL::text AS key, is_correct, score_value, time_value
+    FROM facts
+    UNION ALL
+    SELECT f.item_id, 1, {_jsonb_key("o.value")}, NULL, NULL, NULL
+    FROM facts f
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE jsonb_typeof(f.answer)
+            WHEN 'array' THEN f.answer
+            WHEN 'null' THEN '[]'::jsonb
+            ELSE jsonb_build_array(f.answer)
+        END
+    ) AS o
+    WHERE f.answer IS NOT NULL
+    UNION ALL
+    SELECT f.item_id, 2, {_jsonb_key("k.value")}, NULL, NULL, NULL
+    FROM facts f
+    CROSS JOIN LATERAL jsonb_array_elements(f.tags) AS k
+    WHERE jsonb_typeof(f.tags) = 'array'
+),
+grouped AS (
+    SELECT
+        item_id, kind, key,
+        count(*) AS n,
+        count(*) FILTER (WHERE is_correct) AS correct_count,
+        avg(score_value) AS avg_score,
+        min(score_value) AS min_score,
+        max(score_value) AS max_score,
+        avg(time_value) AS avg_time
+    FROM stream
+    GROUP BY item_id, kind, key
+)
+SELECT
+    item_id,
+    sum(n) FILTER (WHERE kind = 0) AS attempts,
+    sum(correct_count) FILTER (WHERE kind = 0) AS correct_count,
+    max(avg_score) AS avg_score,
+    max(min_score) AS min_score,
+    max(max_score) AS max_score,
+    max(avg_time) AS avg_time,
+    jsonb_object_agg(key, n) FILTER (WHERE kind = 1) AS option_distribution,
+    jsonb_object_agg(key, n) FILTER (WHERE kind = 2) AS knowledge_distribution
+FROM grouped
+GROUP BY item_id
+"""
+
+
+async def _aggregate_submissions(
+    db: AsyncSession,
+    cell_id: int,
+    lesson_id: int,
+    session_id: Optional[int] = None,
+):
+    """
+    在数据库中聚合某个 Cell 的提交
+
+    用窗口函数选出每个学生的最佳提交，再用 JSONB 函数展开 responses 做题目级统计，
+    只返回聚合后的行，不加载提交对象。
+
+    返回:
+        (按状态汇总的行, 按题目汇总的行)
+    """
+    from sqlalchemy import bindparam, text
+    from sqlalchemy.dialects.postgresql import JSONB
+    from app.models.activity import ActivitySubmissionStatus
+
+    status_type = ActivitySubmission.__table__.c.status.type
+    params = [
+        bindparam("status_graded", ActivitySubmissionStatus.GRADED, type_=status_type),
+        bindparam("status_submitted", ActivitySubmissionStatus.SUBMITTED, type_=status_type),
+        bindparam("status_returned", ActivitySubmissionStatus.RETURNED, type_=status_type),
+        bindparam("status_draft", ActivitySubmissionStatus.DRAFT, type_=status_type),
+        bindparam("cell_id", cell_id),
+        bindparam("lesson_id", lesson_id),
+    ]
+    session_filter = ""
+    if session_id:
+        session_filter = "AND s.session_id = :session_id"
+        params.append(bindparam("session_id", session_id))
+    best_cte = _BEST_SUBMISSIONS_CTE.format(session_filter=session_filter)
+
+    status_result = await db.execute(
+        text(best_cte + _STATUS_SUMMARY_SQL)
+        .bindparams(*params)
+        .columns(status=status_type)
+    )
+    item_result = await db.execute(
+        text(best_cte + _ITEM_STATISTICS_SQL)
+        .bindparams(*params)
+        .columns(option_distribution=JSONB, knowledge_distribution=JSONB)
+    )
+    return status_result.all(), item_result.all()
+
+
 async def get_submission_statistics(
     db: AsyncSession,
     cell_id: Union[int, str],  # 支持数字 ID 或 UUID 字符串
@@ -308,72 +571,26 @@ async def get_submission_statistics(
             "item_statistics": {},  # 添加空字典而不是 None
         }
     
-    # 查询所有提交，按优先级排序
-    query = (
-        sql_select(ActivitySubmission)
-        .where(ActivitySubmission.cell_id == actual_cell_id)
-        .where(ActivitySubmission.lesson_id == lesson_id)
-        .order_by(ActivitySubmission.updated_at.desc())
+    # 在数据库中选出每个学生的最佳提交并聚合，只取回聚合结果
+    status_rows, item_rows = await _aggregate_submissions(
+        db, actual_cell_id, lesson_id, session_id
     )
     
-    if session_id:
-        query = query.where(ActivitySubmission.session_id == session_id)
-    
-    submissions_result = await db.execute(query)
-    all_submissions = submissions_result.scalars().all()
-    
-    # 对每个学生，只保留优先级最高的提交
-    status_priority = {
-        ActivitySubmissionStatus.DRAFT: 1,
-        ActivitySubmissionStatus.RETURNED: 2,
-        ActivitySubmissionStatus.SUBMITTED: 3,
-        ActivitySubmissionStatus.GRADED: 4,
-    }
-    
-    student_best_submission = {}  # student_id -> submission
-    for submission in all_submissions:
-        student_id = submission.student_id
-        if student_id not in student_best_submission:
-            student_best_submission[student_id] = submission
-        else:
-            # 使用 cast 进行类型转换
-            current_status = cast(ActivitySubmissionStatus, submission.status)
-            existing_status = cast(ActivitySubmissionStatus, student_best_submission[student_id].status)
-            
-            current_priority = status_priority.get(current_status, 0)
-            existing_priority = status_priority.get(existing_status, 0)
-            
-            # 如果当前记录优先级更高，或优先级相同但更新时间更晚
-            if current_priority > existing_priority or (
-                current_priority == existing_priority and 
-                submission.updated_at > student_best_submission[student_id].updated_at
-            ):
-                student_best_submission[student_id] = submission
-    
-    # 统计各状态的数量
+    # 统计各状态的数量（基于每个学生的最佳提交）
     status_dict: dict[str, int] = {}
-    for submission in student_best_submission.values():
-        status = cast(ActivitySubmissionStatus, submission.status)
-        status_value = status.value
-        status_dict[status_value] = status_dict.get(status_value, 0) + 1
-    
-    # 计算平均分和平均用时（基于已筛选的最佳提交）
-    submitted_or_graded = [
-        s for s in student_best_submission.values()
-        if s.status in [ActivitySubmissionStatus.SUBMITTED, ActivitySubmissionStatus.GRADED]
-    ]
-    
-    avg_score = None
-    avg_time = None
-    
-    if submitted_or_graded:
-        scores = [s.score for s in submitted_or_graded if s.score is not None]
-        times = [s.time_spent for s in submitted_or_graded if s.time_spent is not None]
-        
-        if scores:
-            avg_score = sum(scores) / len(scores)
-        if times:
-            avg_time = sum(times) / len(times)
+    score_sum = score_count = time_sum = time_count = 0.0
+    for row in status_rows:
+        status = cast(ActivitySubmissionStatus, row.status)
+        status_dict[status.value] = int(row.student_count)
+        # 平均分和平均用时只统计已提交 / 已评分的提交
+        if status in (ActivitySubmissionStatus.SUBMITTED, ActivitySubmissionStatus.GRADED):
+            score_sum += float(row.score_sum or 0)
+            score_count += int(row.score_count)
+            time_sum += float(row.time_sum or 0)
+            time_count += int(row.time_count)
+    
+    avg_score = score_sum / score_count if score_count else None
+    avg_time = time_sum / time_count if time_count else None
     
     # 计算已处理的提交数（已提交+已评分+已退回）
     submitted_count = status_dict.get("submitted", 0)
@@ -384,95 +601,32 @@ async def get_submission_statistics(
     processed_count = submitted_count + graded_count + returned_count
     not_started_count = max(0, total_students - processed_count - draft_count)
     
-    # 计算题目级统计（item_statistics）
-    item_aggregates: Dict[str, Dict[str, Any]] = {}
-    for submission in student_best_submission.values():
-        responses = submission.responses or {}
-        for item_id, item_value in responses.items():
-            # 处理不同的答案格式：
-            # 1. 如果 item_value 是字符串（直接是选项ID），如 "opt1"
-            # 2. 如果 item_value 是对象，如 { "answer": "opt1" } 或 { "answer": ["opt1", "opt2"] }
-            # 3. 如果 item_value 是数组（多选题），如 ["opt1", "opt2"]
-            
-            aggregate = item_aggregates.setdefault(
-                item_id,
-                {
-                    "attempts": 0,
-                    "correct_count": 0,
-                    "scores": [],
-                    "options": {},
-                    "knowledge": {},
-                    "times": [],
-                },
-            )
-            aggregate["attempts"] += 1
-            
-            # 提取答案
-            answer = None
-            if isinstance(item_value, dict):
-                # 对象格式：{ "answer": "opt1", "correct": true, ... }
-                if item_value.get("is_correct") or item_value.get("correct"):
-                    aggregate["correct_count"] += 1
-                
-                score = item_value.get("score")
-                if isinstance(score, (int, float)):
-                    aggregate["scores"].append(float(score))
-                
-                time_spent = item_value.get("time_spent")
-                if isinstance(time_spent, (int, float)):
-                    aggregate["times"].append(float(time_spent))
-                
-                answer = item_value.get("answer") or item_value.get("value") or item_value.get("text")
-            elif isinstance(item_value, (str, int, float)):
-                # 直接是选项ID字符串或数字，如 "opt1" 或 "1"
-                answer = item_value
-            elif isinstance(item_value, list):
-                # 数组格式（多选题），如 ["opt1", "opt2"]
-                answer = item_value
-            
-            # 统计选项分布
-            if isinstance(answer, list):
-                # 多选题：答案是数组
-                for option in answer:
-                    key = str(option)
-                    aggregate["options"][key] = aggregate["options"].get(key, 0) + 1
-            elif answer is not None:
-                # 单选题：答案是单个值
-                key = str(answer)
-                aggregate["options"][key] = aggregate["options"].get(key, 0) + 1
-            
-            # 处理知识标签（仅在 item_value 是字典时）
-            if isinstance(item_value, dict):
-                knowledge_tags = item_value.get("knowledge_tags") or item_value.get("tags")
-                if isinstance(knowledge_tags, list):
-                    for tag in knowledge_tags:
-                        tag_key = str(tag)
-                        aggregate["knowledge"][tag_key] = aggregate["knowledge"].get(tag_key, 0) + 1
-    
-    # 汇总题目级统计
+    # 汇总题目级统计（item_statistics）
     item_statistics: Dict[str, Dict[str, Any]] = {}
-    for item_id, aggregate in item_aggregates.items():
-        item_stat = {
-            "attempts": aggregate["attempts"],
-            "correct_count": aggregate["correct_count"],
-            "accuracy": aggregate["correct_count"] / aggregate["attempts"] if aggregate["attempts"] > 0 else 0.0,
+    for row in item_rows:
+        attempts = int(row.attempts)
+        correct_count = int(row.correct_count)
+        item_stat: Dict[str, Any] = {
+            "attempts": attempts,
+            "correct_count": correct_count,
+            "accuracy": correct_count / attempts if attempts > 0 else 0.0,
         }
         
-        if aggregate["scores"]:
-            item_stat["avg_score"] = sum(aggregate["scores"]) / len(aggregate["scores"])
-            item_stat["min_score"] = min(aggregate["scores"])
-            item_stat["max_score"] = max(aggregate["scores"])
+        if row.avg_score is not None:
+            item_stat["avg_score"] = float(row.avg_score)
+            item_stat["min_score"] = float(row.min_score)
+            item_stat["max_score"] = float(row.max_score)
         
-        if aggregate["options"]:
-            item_stat["option_distribution"] = aggregate["options"]
+        if row.option_distribution:
+            item_stat["option_distribution"] = row.option_distribution
         
-        if aggregate["times"]:
-            item_stat["avg_time"] = sum(aggregate["times"]) / len(aggregate["times"])
+        if row.avg_time is not None:
+            item_stat["avg_time"] = float(row.avg_time)
         
-        if aggregate["knowledge"]:
-            item_stat["knowledge_distribution"] = aggregate["knowledge"]
+        if row.knowledge_distribution:
+            item_stat["knowledge_distribution"] = row.knowledge_distribution
         
-        item_statistics[item_id] = item_stat
+        item_statistics[row.item_id] = item_stat
     
     # 返回时使用原始的 cell_id（可能是 UUID 字符串）
     return {
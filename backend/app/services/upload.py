@@ -2,16 +2,20 @@
 文件上传服务
 """
 
+import asyncio
+import hashlib
 import os
-import aiofiles
-from uuid import uuid4
 from fastapi import UploadFile, HTTPException
-from typing import Optional
+from typing import Optional, Tuple
+import aiofiles
 import PyPDF2
 from PIL import Image
-import io
 
 from app.core.config import settings
+from app.services.file_store import file_store
+
+# 流式接收上传内容时每次读取的块大小
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 class UploadService:
@@ -27,7 +31,10 @@ class UploadService:
         os.makedirs(self.thumbnails_dir, exist_ok=True)
 
     async def upload_pdf(
-        self, file: UploadFile, generate_thumbnail: bool = True
+        self,
+        file: UploadFile,
+        generate_thumbnail: bool = True,
+        max_size: Optional[int] = None,
     ) -> dict:
         """
         上传 PDF 文件并提取元数据
@@ -35,6 +42,7 @@ class UploadService:
         Args:
             file: 上传的文件对象
             generate_thumbnail: 是否生成缩略图
+            max_size: 文件大小上限（字节），默认 MAX_UPLOAD_SIZE
 
         Returns:
             {
@@ -48,22 +56,102 @@ class UploadService:
         if not file.content_type or file.content_type != "application/pdf":
             raise HTTPException(400, "Only PDF files are allowed")
 
-        # 生成唯一文件名
         ext = file.filename.split(".")[-1] if file.filename else "pdf"
-        filename = f"{uuid4()}.{ext}"
-        filepath = os.path.join(self.resources_dir, filename)
 
-        # 读取文件内容
-        content = await file.read()
-        file_size = len(content)
+        # 分块写入临时文件，边写边计算哈希
+        temp_path, sha256, file_size = await self._receive(file, max_size)
+        return await self._store_pdf(temp_path, sha256, file_size, ext, generate_thumbnail)
 
-        # 保存文件
-        async with aiofiles.open(filepath, "wb") as f:
-            await f.write(content)
+    async def upload_file(
+        self,
+        file: UploadFile,
+        generate_thumbnail: bool = False,
+        max_size: Optional[int] = None,
+    ) -> dict:
+        """
+        上传通用文件
+
+        Args:
+            file: 上传的文件对象
+            generate_thumbnail: 是否生成缩略图（仅对HTML文件有效）
+            max_size: 文件大小上限（字节），默认 MAX_UPLOAD_SIZE
+
+        Returns:
+            {
+                'file_url': str,
+                'file_size': int,
+                'thumbnail_url': str (如果生成)
+            }
+        """
+        ext = file.filename.split(".")[-1] if file.filename else "bin"
+
+        # 分块写入临时文件，边写边计算哈希
+        temp_path, sha256, file_size = await self._receive(file, max_size)
+        return await self._store_file(temp_path, sha256, file_size, ext, generate_thumbnail)
+
+    async def store_assembled_file(
+        self,
+        path: str,
+        sha256: str,
+        size: int,
+        filename: str,
+        generate_thumbnail: bool = False,
+    ) -> dict:
+        """
+        保存已在存储临时目录中拼装好的文件（分片上传完成时调用）
+
+        文件会被移动进内容寻址存储，返回值与 upload_pdf / upload_file 相同。
+        """
+        ext = filename.split(".")[-1] if "." in filename else "bin"
+        if ext.lower() == "pdf":
+            return await self._store_pdf(path, sha256, size, ext, generate_thumbnail)
+        return await self._store_file(path, sha256, size, ext, generate_thumbnail)
+
+    async def _receive(self, file: UploadFile, max_size: Optional[int] = None) -> Tuple[str, str, int]:
+        """
+        把上传内容分块写入临时文件，同时计算 SHA-256 并检查大小
+
+        内存中最多只有一个分块；超过大小限制时删除临时文件并返回 413。
+        返回 (临时文件路径, sha256, 文件大小)。
+        """
+        if max_size is None:
+            max_size = settings.MAX_UPLOAD_SIZE
+
+        temp_path = file_store.new_temp_path()
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(temp_path, "wb") as out:
+                while True:
+                    chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(
+                            413, f"文件大小超过限制（最大 {max_size // (1024 * 1024)}MB）"
+                        )
+                    digest.update(chunk)
+                    await out.write(chunk)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return temp_path, digest.hexdigest(), size
+
+    async def _store_pdf(
+        self, temp_path: str, sha256: str, file_size: int, ext: str, generate_thumbnail: bool
+    ) -> dict:
+        """把临时文件存入内容寻址存储，并从磁盘上的文件提取 PDF 元数据"""
+        # 按内容哈希保存（相同内容只保存一份）
+        stored = await file_store.ingest(temp_path, sha256, file_size, ext)
+        filename = stored["filename"]
+        filepath = os.path.join(self.resources_dir, filename)
 
         # 提取 PDF 元数据
         try:
-            pdf_meta = self._extract_pdf_metadata(io.BytesIO(content))
+            pdf_meta = await asyncio.to_thread(self._extract_pdf_metadata, filepath)
         except Exception as e:
             print(f"Failed to extract PDF metadata: {e}")
             pdf_meta = {"page_count": 0}
@@ -88,34 +176,15 @@ class UploadService:
 
         return result
 
-    async def upload_file(self, file: UploadFile, generate_thumbnail: bool = False) -> dict:
-        """
-        上传通用文件
-
-        Args:
-            file: 上传的文件对象
-            generate_thumbnail: 是否生成缩略图（仅对HTML文件有效）
-
-        Returns:
-            {
-                'file_url': str,
-                'file_size': int,
-                'thumbnail_url': str (如果生成)
-            }
-        """
-        # 生成唯一文件名
-        ext = file.filename.split(".")[-1] if file.filename else "bin"
-        filename = f"{uuid4()}.{ext}"
+    async def _store_file(
+        self, temp_path: str, sha256: str, file_size: int, ext: str, generate_thumbnail: bool
+    ) -> dict:
+        """把临时文件存入内容寻址存储"""
+        # 按内容哈希保存（相同内容只保存一份）
+        stored = await file_store.ingest(temp_path, sha256, file_size, ext)
+        filename = stored["filename"]
         filepath = os.path.join(self.resources_dir, filename)
 
-        # 读取文件内容
-        content = await file.read()
-        file_size = len(content)
-
-        # 保存文件
-        async with aiofiles.open(filepath, "wb") as f:
-            await f.write(content)
-
         result = {
             "file_url": f"/uploads/resources/{filename}",
             "file_size": file_size,
@@ -132,18 +201,19 @@ class UploadService:
 
         return result
 
-    def _extract_pdf_metadata(self, file_stream: io.BytesIO) -> dict:
-        """提取 PDF 元数据"""
+    def _extract_pdf_metadata(self, pdf_path: str) -> dict:
+        """提取 PDF 元数据（直接读取磁盘文件，按需 seek，不把整个文件读入内存）"""
         try:
-            reader = PyPDF2.PdfReader(file_stream)
-            metadata = {
-                "page_count": len(reader.pages),
-            }
+            with open(pdf_path, "rb") as f:
+                reader = PyPDF2.PdfReader(f)
+                metadata = {
+                    "page_count": len(reader.pages),
+                }
 
-            # 尝试获取其他元数据
-            if reader.metadata:
-                metadata["title"] = reader.metadata.get("/Title", "")
-                metadata["author"] = reader.metadata.get("/Author", "")
+                # 尝试获取其他元数据
+                if reader.metadata:
+                    metadata["title"] = reader.metadata.get("/Title", "")
+                    metadata["author"] = reader.metadata.get("/Author", "")
 
             return metadata
         except Exception as e:
@@ -159,6 +229,11 @@ class UploadService:
         注意：这个功能需要 pdf2image 和 poppler-utils
         如果环境不支持，可以跳过缩略图生成
         """
+        # 相同内容的文件共用同一个缩略图
+        thumb_filename = f"thumb_{os.path.splitext(original_filename)[0]}.png"
+        if os.path.exists(os.path.join(self.thumbnails_dir, thumb_filename)):
+            return f"/uploads/thumbnails/{thumb_filename}"
+
         try:
             import fitz  # PyMuPDF
 
@@ -175,8 +250,7 @@ class UploadService:
             mat = fitz.Matrix(zoom, zoom)
             pix = page.get_pixmap(matrix=mat)
 
-            # 生成缩略图文件名
-            thumb_filename = f"thumb_{os.path.splitext(original_filename)[0]}.png"
+            # 缩略图路径
             thumb_path = os.path.join(self.thumbnails_dir, thumb_filename)
 
             # 保存缩略图
@@ -200,6 +274,11 @@ class UploadService:
         
         使用 Playwright 渲染 HTML 并截图
         """
+        # 相同内容的文件共用同一个缩略图
+        thumb_filename = f"thumb_{os.path.splitext(original_filename)[0]}.png"
+        if os.path.exists(os.path.join(self.thumbnails_dir, thumb_filename)):
+            return f"/uploads/thumbnails/{thumb_filename}"
+
         try:
             # 尝试使用 Playwright
             try:
@@ -209,8 +288,7 @@ class UploadService:
                 print("Install with: pip install playwright && playwright install chromium")
                 return None
 
-            # 生成缩略图文件名
-            thumb_filename = f"thumb_{os.path.splitext(original_filename)[0]}.png"
+            # 缩略图路径
             thumb_path = os.path.join(self.thumbnails_dir, thumb_filename)
 
             # 构建文件URL（使用file://协议）
@@ -243,12 +321,38 @@ class UploadService:
             print(f"Error generating HTML thumbnail: {e}")
             return None
 
+    async def import_file(self, file_path: str) -> dict:
+        """
+        登记磁盘上已有的文件（例如导入课程时解压出的资源）
+
+        内容已存在时直接复用，不再复制文件。
+
+        Returns:
+            {
+                'file_url': str,
+                'file_size': int,
+                'deduplicated': bool
+            }
+        """
+        ext = os.path.basename(file_path).split(".")[-1]
+        stored = await file_store.store_path(file_path, ext)
+        return {
+            "file_url": stored["file_url"],
+            "file_size": stored["size"],
+            "deduplicated": stored["deduplicated"],
+        }
+
     async def delete_file(self, file_url: str) -> bool:
         """删除文件"""
         try:
             # 从 URL 提取文件路径
             if file_url.startswith("/uploads/resources/"):
                 filename = file_url.replace("/uploads/resources/", "")
+
+                # 内容寻址文件可能被多处引用，只释放一次引用，由垃圾回收删除
+                if file_store.parse_hashed_filename(filename):
+                    return await file_store.release(filename)
+
                 filepath = os.path.join(self.resources_dir, filename)
 
                 if os.path.exists(filepath):
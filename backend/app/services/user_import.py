@@ -0,0 +1,391 @@
+"""
+批量导入用户
+
+按固定大小分批处理，每批只需要常数次查询：
+- 一次查询取出批内所有用户名 / 邮箱中已存在的部分
+- 班级、年级、学校、区域各一次查询完成组织信息校验（规则与单个创建用户一致）
+- 在线程池中并行计算密码哈希
+- 一条多行 INSERT ... RETURNING 插入并取回 ID
+
+每行的错误单独记录，不影响同批其他行；每批单独提交，不会长时间占用一个事务。
+也支持直接上传 CSV / XLSX 文件，边读取边分批导入。
+"""
+
+import codecs
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_password_hashes
+from app.models.curriculum import Grade
+from app.models.organization import Classroom, Region, School
+from app.models.user import User
+
+# 导入文件的列名映射（与前端导入模板一致），None 表示忽略该列
+HEADER_MAP: Dict[str, Optional[str]] = {
+    "username": "username",
+    "用户名": "username",
+    "学号/用户名": "username",
+    "学号/用户": "username",
+    "学号": "username",
+    "full_name": "full_name",
+    "姓名": "full_name",
+    "name": "full_name",
+    "真实姓名": "full_name",
+    "email": "email",
+    "邮箱": "email",
+    "password": "password",
+    "密码": "password",
+    "role": "role",
+    "角色": "role",
+    "is_active": "is_active",
+    "是否激活": "is_active",
+    "激活状态": "is_active",
+    "region_id": "region_id",
+    "区域ID": "region_id",
+    "school_id": "school_id",
+    "学校ID": "school_id",
+    "grade_id": "grade_id",
+    "年级ID": "grade_id",
+    "classroom_id": "classroom_id",
+    "班级ID": "classroom_id",
+    "备注": None,
+    "说明": None,
+    "remark": None,
+}
+
+REQUIRED_COLUMNS = ["username", "email", "password", "role"]
+
+ROLE_MAP = {
+    "admin": "admin",
+    "管理员": "admin",
+    "teacher": "teacher",
+    "教师": "teacher",
+    "student": "student",
+    "学生": "student",
+    "researcher": "researcher",
+    "教研员": "researcher",
+}
+
+TRUE_VALUES = {"true", "1", "yes", "y", "是", "激活"}
+FALSE_VALUES = {"false", "0", "no", "n", "否", "未激活"}
+
+SCOPE_FIELDS = ("region_id", "school_id", "grade_id", "classroom_id")
+
+# 每条 INSERT 最多插入的行数（asyncpg 单条语句最多 32767 个参数）
+INSERT_CHUNK_SIZE = 1000
+
+
+class UserImportError(ValueError):
+    """导入文件格式错误（整个文件无法处理）"""
+
+
+# ==================== 文件解析 ====================
+
+
+def normalize_header(header: Any) -> Optional[str]:
+    """把文件中的列名映射为字段名，支持去掉括号说明，如 “区域ID(可选)”"""
+    cleaned = str(header or "").strip().strip("\"'").strip()
+    if cleaned in HEADER_MAP:
+        return HEADER_MAP[cleaned]
+    without_brackets = cleaned.split("(")[0].split("（")[0].strip()
+    if without_brackets in HEADER_MAP:
+        return HEADER_MAP[without_brackets]
+    return cleaned or None
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ""
+    # Excel 中的数字学号会读成 float
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def parse_user_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把文件中的一行转换为创建用户的字段
+
+    Raises:
+        ValueError: 数据不合法（错误信息直接展示给用户）
+    """
+    values = {key: _cell_text(value) for key, value in raw.items()}
+
+    role_text = values.get("role", "")
+    role = ROLE_MAP.get(role_text.lower())
+    if not role:
+        raise ValueError("角色列仅支持 管理员/教研员/教师/学生（或 admin/researcher/teacher/student）")
+
+    active_text = values.get("is_active", "").lower()
+    if not active_text or active_text in TRUE_VALUES:
+        is_active = True
+    elif active_text in FALSE_VALUES:
+        is_active = False
+    else:
+        raise ValueError("是否激活列只能填写 是/否 或 true/false")
+
+    data: Dict[str, Any] = {
+        "username": values.get("username", ""),
+        "email": values.get("email", ""),
+        "password": values.get("password", ""),
+        "full_name": values.get("full_name") or None,
+        "role": role,
+        "is_active": is_active,
+    }
+    for field in SCOPE_FIELDS:
+        text = values.get(field, "")
+        if not text:
+            data[field] = None
+            continue
+        try:
+            data[field] = int(float(text))
+        except ValueError:
+            raise ValueError(f"{field} 列必须填写数字ID或留空")
+    return data
+
+
+def _rows_from_table(rows: Iterator[Sequence[Any]], first_row: int) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """第一行为表头，依次产出 (行号, {字段: 原始值})，跳过空行"""
+    try:
+        header = next(rows)
+    except StopIteration:
+        raise UserImportError("文件为空")
+
+    fields = [normalize_header(h) for h in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in fields]
+    if missing:
+        raise UserImportError(f"缺少必需的列: {', '.join(missing)}")
+
+    for offset, row in enumerate(rows, start=first_row + 1):
+        if not any(_cell_text(value) for value in row):
+            continue
+        yield offset, {
+            field: row[index] if index < len(row) else None
+            for index, field in enumerate(fields)
+            if field
+        }
+
+
+def _detect_encoding(stream: Any) -> str:
+    """根据文件开头判断编码：UTF-8（可带 BOM），否则按 GB18030（Excel 另存的 CSV）"""
+    head = stream.read(64 * 1024)
+    stream.seek(0)
+    try:
+        # 末尾可能截断在多字节字符中间，用增量解码器忽略不完整的尾部
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "gb18030"
+
+
+def iter_csv_rows(stream: Any) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """逐行读取 CSV 文件（二进制流），自动识别逗号 / 制表符分隔"""
+    text = io.TextIOWrapper(stream, encoding=_detect_encoding(stream), newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    delimiter = "\t" if "\t" in sample.split("\n", 1)[0] else ","
+    return _rows_from_table(csv.reader(text, delimiter=delimiter), first_row=1)
+
+
+def iter_xlsx_rows(stream: Any) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """以只读模式逐行读取 XLSX 第一个工作表"""
+    from openpyxl import load_workbook
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise UserImportError(f"无法读取 Excel 文件: {e}")
+
+    def rows() -> Iterator[Sequence[Any]]:
+        try:
+            yield from workbook.worksheets[0].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    return _rows_from_table(rows(), first_row=1)
+
+
+def iter_import_file(filename: str, stream: Any) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """根据扩展名选择解析方式"""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        return iter_csv_rows(stream)
+    if name.endswith(".xlsx"):
+        return iter_xlsx_rows(stream)
+    raise UserImportError("仅支持 .csv 或 .xlsx 文件（.xls 请另存为 .xlsx）")
+
+
+# ==================== 批量写入 ====================
+
+
+async def _load_scope_objects(db: AsyncSession, rows: Sequence[Any]) -> Dict[str, Any]:
+    """一次性加载批内引用的班级、年级、学校、区域"""
+    classroom_ids = {r.classroom_id for r in rows if r.classroom_id is not None}
+    classrooms: Dict[int, Any] = {}
+    if classroom_ids:
+        result = await db.execute(
+            select(Classroom.id, Classroom.grade_id, Classroom.school_id).where(
+                Classroom.id.in_(classroom_ids)
+            )
+        )
+        classrooms = {row.id: row for row in result}
+
+    grade_ids = {r.grade_id for r in rows if r.grade_id is not None}
+    grade_ids |= {c.grade_id for c in classrooms.values() if c.grade_id is not None}
+    grades: Set[int] = set()
+    if grade_ids:
+        result = await db.execute(select(Grade.id).where(Grade.id.in_(grade_ids)))
+        grades = set(result.scalars().all())
+
+    school_ids = {r.school_id for r in rows if r.school_id is not None}
+    school_ids |= {c.school_id for c in classrooms.values() if c.school_id is not None}
+    schools: Dict[int, Optional[int]] = {}
+    if school_ids:
+        result = await db.execute(
+            select(School.id, School.region_id).where(School.id.in_(school_ids))
+        )
+        schools = {school_id: region_id for school_id, region_id in result}
+
+    region_ids = {r.region_id for r in rows if r.region_id is not None}
+    region_ids |= {region_id for region_id in schools.values() if region_id is not None}
+    regions: Set[int] = set()
+    if region_ids:
+        result = await db.execute(select(Region.id).where(Region.id.in_(region_ids)))
+        regions = set(result.scalars().all())
+
+    return {"classrooms": classrooms, "grades": grades, "schools": schools, "regions": regions}
+
+
+def resolve_scope(row: Any, scope: Dict[str, Any]) -> Dict[str, Optional[int]]:
+    """
+    在内存中校验并补全组织信息（与 admin_users._validate_scope_ids 规则一致）
+
+    Raises:
+        ValueError: 引用的组织不存在或不匹配
+    """
+    resolved: Dict[str, Optional[int]] = {field: getattr(row, field) for field in SCOPE_FIELDS}
+
+    if row.classroom_id is not None:
+        classroom = scope["classrooms"].get(row.classroom_id)
+        if classroom is None:
+            raise ValueError("班级不存在")
+        resolved["grade_id"] = classroom.grade_id
+        resolved["school_id"] = classroom.school_id
+
+    if resolved["grade_id"] is not None and resolved["grade_id"] not in scope["grades"]:
+        raise ValueError("年级不存在")
+
+    if resolved["school_id"] is not None:
+        if resolved["school_id"] not in scope["schools"]:
+            raise ValueError("学校不存在")
+        school_region_id = scope["schools"][resolved["school_id"]]
+        if resolved["region_id"] is None:
+            resolved["region_id"] = school_region_id
+        elif resolved["region_id"] != school_region_id:
+            raise ValueError("学校与区域不匹配")
+
+    if resolved["region_id"] is not None and resolved["region_id"] not in scope["regions"]:
+        raise ValueError("区域不存在")
+
+    return resolved
+
+
+async def bulk_create_users(
+    db: AsyncSession,
+    rows: Sequence[Tuple[int, Any]],
+) -> Tuple[List[int], List[str]]:
+    """
+    批量创建一批用户（不提交事务）
+
+    Args:
+        rows: [(行号, 用户数据)]，用户数据需要有 username / email / password /
+              full_name / role / is_active 以及组织 ID 属性
+
+    Returns:
+        (按行号顺序创建成功的用户 ID, 错误信息列表)
+    """
+    errors: List[str] = []
+    if not rows:
+        return [], errors
+
+    usernames = {r.username for _, r in rows}
+    emails = {str(r.email) for _, r in rows}
+    result = await db.execute(
+        select(User.username, User.email).where(
+            or_(User.username.in_(usernames), User.email.in_(emails))
+        )
+    )
+    taken_usernames: Set[str] = set()
+    taken_emails: Set[str] = set()
+    for username, email in result:
+        taken_usernames.add(username)
+        taken_emails.add(email)
+
+    scope = await _load_scope_objects(db, [r for _, r in rows])
+
+    accepted: List[Tuple[int, Any, Dict[str, Optional[int]]]] = []
+    for row_no, row in rows:
+        email = str(row.email)
+        # 同一批内重复的用户名 / 邮箱与数据库中已存在的同样处理
+        if row.username in taken_usernames:
+            errors.append(f"第{row_no}行：用户名 {row.username} 已存在")
+            continue
+        if email in taken_emails:
+            errors.append(f"第{row_no}行：邮箱 {email} 已存在")
+            continue
+        try:
+            scope_ids = resolve_scope(row, scope)
+        except ValueError as e:
+            errors.append(f"第{row_no}行：{e}")
+            continue
+        taken_usernames.add(row.username)
+        taken_emails.add(email)
+        accepted.append((row_no, row, scope_ids))
+
+    if not accepted:
+        return [], errors
+
+    hashed_passwords = await get_password_hashes([row.password for _, row, _ in accepted])
+
+    now = datetime.utcnow()
+    values = [
+        {
+            "username": row.username,
+            "email": str(row.email),
+            "hashed_password": hashed,
+            "full_name": row.full_name,
+            "role": row.role,
+            "is_active": row.is_active if row.is_active is not None else True,
+            "is_superuser": False,
+            "created_at": now,
+            "updated_at": now,
+            **scope_ids,
+        }
+        for (_, row, scope_ids), hashed in zip(accepted, hashed_passwords)
+    ]
+    # 并发导入时与其他事务冲突的行会被跳过，按用户名找出来报告错误
+    inserted: Dict[str, int] = {}
+    for start in range(0, len(values), INSERT_CHUNK_SIZE):
+        result = await db.execute(
+            insert(User)
+            .values(values[start:start + INSERT_CHUNK_SIZE])
+            .on_conflict_do_nothing()
+            .returning(User.id, User.username)
+        )
+        inserted.update({username: user_id for user_id, username in result})
+
+    created_ids: List[int] = []
+    for row_no, row, _ in accepted:
+        user_id = inserted.get(row.username)
+        if user_id is None:
+            errors.append(f"第{row_no}行：用户名 {row.username} 或邮箱 {row.email} 已存在")
+        else:
+            created_ids.append(user_id)
+
+    return created_ids, errors
@@ -3,19 +3,136 @@ WebSocket 连接管理器
 支持学生和教师的双角色连接管理
 """
 
-from typing import Dict, Optional, List
+from typing import Any, Awaitable, Callable, Dict, Optional, List, Set
 from fastapi import WebSocket
 from starlette.websockets import WebSocketState
+import asyncio
 import json
 from datetime import datetime
 
+from app.core.config import settings
 from app.models.user import UserRole
+from app.services.realtime import encode_event
+from app.services.ws_backplane import Backplane, create_backplane
+
+
+class OutboundConnection:
+    """
+    单个 WebSocket 的发送队列
+
+    广播时只把消息放入队列（不等待网络），由后台写任务逐条发送，
+    慢连接不会拖慢其他连接。每次发送有超时，队列满时按策略处理：
+    - drop_oldest: 丢弃最旧的消息
+    - drop_newest: 丢弃新消息
+    - evict: 断开该连接
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        *,
+        queue_size: int,
+        send_timeout: float,
+        policy: str,
+        on_failure: Callable[["OutboundConnection", str], None],
+    ):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.send_timeout = send_timeout
+        self.policy = policy
+        self.on_failure = on_failure
+        self.dropped_count = 0
+        self.closed = False
+        self._writer: Optional[asyncio.Task] = None
+
+    def enqueue(self, message_text: str) -> bool:
+        """放入发送队列，返回 False 表示连接已失效"""
+        if self.closed:
+            return False
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+
+        try:
+            self.queue.put_nowait(message_text)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+                self.queue.task_done()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped_count += 1
+            self.queue.put_nowait(message_text)
+            return True
+
+        if self.policy == "drop_newest":
+            self.dropped_count += 1
+            return True
+
+        self._fail("发送队列已满")
+        return False
+
+    async def join(self):
+        """等待队列中的消息全部发送完（连接失效时立即返回）"""
+        await self.queue.join()
+
+    async def close(self):
+        """停止写任务"""
+        self.closed = True
+        self._drain()
+        writer = self._writer
+        if writer is not None and not writer.done() and writer is not asyncio.current_task():
+            writer.cancel()
+            try:
+                await writer
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def _run(self):
+        """后台写任务"""
+        while not self.closed:
+            message_text = await self.queue.get()
+            try:
+                await asyncio.wait_for(
+                    self.websocket.send_text(message_text),
+                    timeout=self.send_timeout,
+                )
+            except asyncio.TimeoutError:
+                self._fail(f"发送超时（>{self.send_timeout}s）")
+            except Exception as e:
+                self._fail(str(e))
+            finally:
+                self.queue.task_done()
+
+    def _fail(self, reason: str):
+        if self.closed:
+            return
+        self.closed = True
+        self._drain()
+        self.on_failure(self, reason)
+
+    def _drain(self):
+        """丢弃未发送的消息，避免 join() 永久等待"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+            self.queue.task_done()
 
 
 class ConnectionManager:
-    """管理所有 WebSocket 连接"""
+    """
+    管理所有 WebSocket 连接
+
+    连接只保存在本进程内；广播类消息先投递给本地连接，再发布到 backplane，
+    由其他 worker 投递给各自的本地连接。
+    """
     
-    def __init__(self):
+    def __init__(self, backplane: Optional[Backplane] = None):
+        # 跨 worker 消息总线
+        self.backplane: Backplane = backplane or create_backplane()
+        
         # 学生连接：{channel_key: {user_id: WebSocket}}
         # channel_key 格式: "session:{session_id}" 或 "lesson:{lesson_id}"
         self.student_connections: Dict[str, Dict[int, WebSocket]] = {}
@@ -25,11 +142,78 @@ class ConnectionManager:
         
         # 旧版兼容：{session_id: {student_id: WebSocket}}
         self.active_connections: Dict[int, Dict[int, WebSocket]] = {}
+        
+        # 发送队列：{id(WebSocket): OutboundConnection}
+        self.outbound: Dict[int, OutboundConnection] = {}
+        
+        # 清理失效连接的后台任务（保留引用，避免任务执行中被回收）
+        self._eviction_tasks: Set[asyncio.Task] = set()
+        
+        # 其他模块注册的总线消息处理函数：{kind: handler}
+        self._backplane_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[None]]] = {}
     
     def _make_channel_key(self, scope: str, id: int) -> str:
         """生成通道键"""
         return f"{scope}:{id}"
     
+    async def start(self):
+        """订阅 backplane（应用启动时调用）"""
+        await self.backplane.start(self._handle_backplane_message)
+    
+    async def stop(self):
+        """取消订阅 backplane（应用关闭时调用）"""
+        await self.backplane.stop()
+    
+    def register_backplane_handler(
+        self,
+        kind: str,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+    ):
+        """
+        注册自定义总线消息的处理函数（如表单累计计数、认证缓存失效）
+        
+        handler 接收其他 worker 通过 publish_to_workers 发布的 payload。
+        """
+        self._backplane_handlers[kind] = handler
+    
+    async def publish_to_workers(self, kind: str, payload: Dict[str, Any]):
+        """把自定义消息发布给其他 worker（本进程不会收到，调用方自行处理本地部分）"""
+        await self.backplane.publish({"kind": kind, "message": json.dumps(payload)})
+    
+    async def _handle_backplane_message(self, envelope: Dict[str, Any]):
+        """处理其他 worker 发布的消息，投递给本进程的连接"""
+        kind = envelope.get("kind")
+        message_text = envelope.get("message")
+        if not isinstance(message_text, str):
+            return
+        
+        handler = self._backplane_handlers.get(kind) if isinstance(kind, str) else None
+        if handler is not None:
+            await handler(json.loads(message_text))
+        elif kind == "session":
+            await self._deliver_to_session(
+                message_text,
+                int(envelope["session_id"]),
+                envelope.get("exclude_student_id"),
+            )
+        elif kind == "role":
+            await self._deliver_to_role(
+                message_text,
+                envelope["scope"],
+                int(envelope["channel_id"]),
+                envelope.get("user_ids") or [],
+                UserRole(envelope["role"]),
+            )
+        elif kind == "broadcast":
+            for role in (UserRole.TEACHER, UserRole.STUDENT):
+                await self._deliver_to_role(
+                    message_text,
+                    envelope["scope"],
+                    int(envelope["channel_id"]),
+                    [],
+                    role,
+                )
+    
     async def connect_v2(
         self,
         *,
@@ -56,8 +240,8 @@ class ConnectionManager:
             store[channel_key] = {}
         
         # 如果用户已有连接，先断开旧连接
-        if user_id in store[channel_key]:
-            old_ws = store[channel_key][user_id]
+        old_ws = store[channel_key].get(user_id)
+        if old_ws is not None and old_ws is not websocket:
             if old_ws.client_state == WebSocketState.CONNECTED:
                 try:
                     await old_ws.close()
@@ -66,6 +250,8 @@ class ConnectionManager:
         
         # 注册新连接
         store[channel_key][user_id] = websocket
+        if old_ws is not None and old_ws is not websocket:
+            await self._release_outbound(old_ws)
         
         role_name = "教师" if role == UserRole.TEACHER else "学生"
         print(f"✅ {role_name} {user_id} 连接到 {scope} {channel_id}")
@@ -86,7 +272,10 @@ class ConnectionManager:
                 pass
         
         # 注册新连接
+        old_ws = self.active_connections[session_id].get(student_id)
         self.active_connections[session_id][student_id] = websocket
+        if old_ws is not None and old_ws is not websocket:
+            await self._release_outbound(old_ws)
         
         # 同时注册到新版存储
         await self.connect_v2(
@@ -121,7 +310,9 @@ class ConnectionManager:
         store = self.teacher_connections if role == UserRole.TEACHER else self.student_connections
         
         if channel_key in store:
-            store[channel_key].pop(user_id, None)
+            websocket = store[channel_key].pop(user_id, None)
+            if websocket is not None:
+                await self._release_outbound(websocket)
             
             role_name = "教师" if role == UserRole.TEACHER else "学生"
             print(f"🔌 {role_name} {user_id} 断开连接（{scope} {channel_id}）")
@@ -136,8 +327,9 @@ class ConnectionManager:
         
         if session_id in self.active_connections:
             if student_id in self.active_connections[session_id]:
-                del self.active_connections[session_id][student_id]
+                websocket = self.active_connections[session_id].pop(student_id)
                 print(f"🔌 学生 {student_id} 断开连接（会话 {session_id}）")
+                await self._release_outbound(websocket)
             
             # 如果会话没有连接了，删除会话记录
             if not self.active_connections[session_id]:
@@ -152,6 +344,19 @@ class ConnectionManager:
             role=UserRole.STUDENT
         )
     
+    def send_to_websocket(self, websocket: WebSocket, message: Any) -> bool:
+        """
+        回复单个连接（如欢迎消息、心跳响应），message 为事件字典或已序列化的文本
+
+        与广播共用该连接的发送队列，保证每个连接只有一个发送方。
+        连接需已通过 connect/connect_v2 注册，断开时随连接一起清理；
+        未注册或已断开的连接直接丢弃消息并返回 False，不为其创建发送队列。
+        """
+        if id(websocket) not in self.outbound and not self._is_registered(websocket):
+            return False
+        message_text = message if isinstance(message, str) else encode_event(message)
+        return self._enqueue(websocket, message_text)
+    
     async def send_personal_message(
         self,
         message: dict,
@@ -163,12 +368,7 @@ class ConnectionManager:
         if session_id in self.active_connections:
             if student_id in self.active_connections[session_id]:
                 websocket = self.active_connections[session_id][student_id]
-                try:
-                    await websocket.send_text(json.dumps(message))
-                except Exception as e:
-                    print(f"❌ 发送消息失败（学生 {student_id}）: {str(e)}")
-                    # 连接已断开，清理
-                    await self.disconnect(session_id, student_id)
+                self._enqueue(websocket, encode_event(message))
     
     async def broadcast_to_session(
         self,
@@ -176,36 +376,43 @@ class ConnectionManager:
         session_id: int,
         exclude_student_id: Optional[int] = None,
     ):
-        """广播消息给会话内所有学生"""
-        
-        if session_id not in self.active_connections:
-            return
+        """广播消息给会话内所有学生（包括其他 worker 上的连接）"""
         
         # 添加时间戳
         if "timestamp" not in message:
             message["timestamp"] = datetime.utcnow().isoformat()
         
-        message_text = json.dumps(message)
+        message_text = encode_event(message)
+        
+        await self._deliver_to_session(message_text, session_id, exclude_student_id)
+        await self.backplane.publish({
+            "kind": "session",
+            "session_id": session_id,
+            "exclude_student_id": exclude_student_id,
+            "message": message_text,
+        })
+    
+    async def _deliver_to_session(
+        self,
+        message_text: str,
+        session_id: int,
+        exclude_student_id: Optional[int] = None,
+    ):
+        """投递消息给本进程内该会话的学生连接"""
         
-        # 记录要删除的连接（发送失败的）
-        disconnected_students = []
+        if session_id not in self.active_connections:
+            return
         
-        for student_id, websocket in self.active_connections[session_id].items():
+        # 只入队不等待，发送失败/超时的连接由写任务回调清理
+        for student_id, websocket in list(self.active_connections[session_id].items()):
             # 跳过排除的学生
             if exclude_student_id and student_id == exclude_student_id:
                 continue
             
-            try:
-                await websocket.send_text(message_text)
-            except Exception as e:
-                print(f"❌ 广播失败（学生 {student_id}）: {str(e)}")
-                disconnected_students.append(student_id)
-        
-        # 清理断开的连接
-        for student_id in disconnected_students:
-            await self.disconnect(session_id, student_id)
+            self._enqueue(websocket, message_text)
         
-        print(f"📢 广播消息到会话 {session_id}（{len(self.active_connections[session_id])} 人）")
+        online_count = self.get_session_connections_count(session_id)
+        print(f"📢 广播消息到会话 {session_id}（本进程 {online_count} 人）")
     
     def get_session_connections_count(self, session_id: int) -> int:
         """获取会话的在线人数"""
@@ -285,8 +492,17 @@ class ConnectionManager:
             scope: 通道范围
             channel_id: 通道ID
         """
-        await self.send_to_teacher(event, scope, channel_id, [])
-        await self.send_to_student(event, scope, channel_id, [])
+        message_text = encode_event(event)
+        
+        for role in (UserRole.TEACHER, UserRole.STUDENT):
+            await self._deliver_to_role(message_text, scope, channel_id, [], role)
+        
+        await self.backplane.publish({
+            "kind": "broadcast",
+            "scope": scope,
+            "channel_id": channel_id,
+            "message": message_text,
+        })
     
     async def _send_to_role(
         self,
@@ -297,7 +513,7 @@ class ConnectionManager:
         role: UserRole
     ):
         """
-        内部方法：发送消息给指定角色的用户
+        内部方法：发送消息给指定角色的用户（包括其他 worker 上的连接）
         
         参数:
             event: 事件消息
@@ -306,6 +522,27 @@ class ConnectionManager:
             user_ids: 用户ID列表（None表示广播）
             role: 用户角色
         """
+        message_text = encode_event(event)
+        
+        await self._deliver_to_role(message_text, scope, channel_id, user_ids, role)
+        await self.backplane.publish({
+            "kind": "role",
+            "scope": scope,
+            "channel_id": channel_id,
+            "user_ids": list(user_ids or []),
+            "role": role.value,
+            "message": message_text,
+        })
+    
+    async def _deliver_to_role(
+        self,
+        message_text: str,
+        scope: str,
+        channel_id: int,
+        user_ids: List[int],
+        role: UserRole
+    ):
+        """投递已序列化的消息给本进程内指定角色的连接"""
         channel_key = self._make_channel_key(scope, channel_id)
         store = self.teacher_connections if role == UserRole.TEACHER else self.student_connections
         
@@ -315,30 +552,80 @@ class ConnectionManager:
         recipients = store[channel_key]
         delivery_list = user_ids if user_ids else list(recipients.keys())
         
-        message_text = json.dumps(event)
-        disconnected_users = []
-        
+        # 只入队不等待，发送失败/超时的连接由写任务回调清理
         for user_id in delivery_list:
             websocket = recipients.get(user_id)
             if not websocket:
                 continue
             
-            try:
-                await websocket.send_text(message_text)
-            except Exception as e:
-                print(f"❌ 发送消息失败（用户 {user_id}）: {str(e)}")
-                disconnected_users.append(user_id)
-        
-        # 清理断开的连接
-        for user_id in disconnected_users:
-            await self.disconnect_v2(
-                scope=scope,
-                channel_id=channel_id,
-                user_id=user_id,
-                role=role
+            self._enqueue(websocket, message_text)
+    
+    def _enqueue(self, websocket: WebSocket, message_text: str) -> bool:
+        """把消息放入连接的发送队列"""
+        outbound = self.outbound.get(id(websocket))
+        if outbound is None:
+            outbound = OutboundConnection(
+                websocket,
+                queue_size=settings.WS_SEND_QUEUE_SIZE,
+                send_timeout=settings.WS_SEND_TIMEOUT,
+                policy=settings.WS_SLOW_CONSUMER_POLICY,
+                on_failure=self._on_outbound_failure,
             )
+            self.outbound[id(websocket)] = outbound
+        return outbound.enqueue(message_text)
+    
+    async def flush(self):
+        """等待本进程所有发送队列清空（测试和压测使用）"""
+        await asyncio.gather(*(outbound.join() for outbound in list(self.outbound.values())))
+    
+    def _is_registered(self, websocket: WebSocket) -> bool:
+        """连接是否仍在任一存储中"""
+        for store in (self.student_connections, self.teacher_connections, self.active_connections):
+            for recipients in store.values():
+                for ws in recipients.values():
+                    if ws is websocket:
+                        return True
+        return False
+    
+    async def _release_outbound(self, websocket: WebSocket):
+        """连接不再被引用时停止其写任务"""
+        if self._is_registered(websocket):
+            return
+        outbound = self.outbound.pop(id(websocket), None)
+        if outbound is not None:
+            await outbound.close()
+    
+    def _on_outbound_failure(self, outbound: OutboundConnection, reason: str):
+        """写任务发送失败/超时/队列溢出时回调"""
+        print(f"❌ 发送消息失败，断开连接: {reason}")
+        task = asyncio.create_task(self._evict(outbound.websocket))
+        self._eviction_tasks.add(task)
+        task.add_done_callback(self._eviction_tasks.discard)
+    
+    async def _evict(self, websocket: WebSocket):
+        """从所有存储中移除失效连接并关闭它"""
+        for session_id, recipients in list(self.active_connections.items()):
+            for student_id, ws in list(recipients.items()):
+                if ws is websocket:
+                    del recipients[student_id]
+            if not recipients:
+                del self.active_connections[session_id]
+        
+        for store in (self.student_connections, self.teacher_connections):
+            for channel_key, recipients in list(store.items()):
+                for user_id, ws in list(recipients.items()):
+                    if ws is websocket:
+                        del recipients[user_id]
+                if not recipients:
+                    del store[channel_key]
+        
+        await self._release_outbound(websocket)
+        
+        try:
+            await asyncio.wait_for(websocket.close(), timeout=settings.WS_SEND_TIMEOUT)
+        except Exception:
+            pass
 
 
 # 全局单例
 manager = ConnectionManager()
-
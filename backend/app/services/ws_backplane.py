@@ -0,0 +1,244 @@
+"""
+WebSocket 跨进程消息总线（Backplane）
+
+多 worker 部署时，每个进程只持有自己的 WebSocket 连接。
+ConnectionManager 把需要广播的消息发布到总线，所有 worker 订阅后各自投递给本地连接。
+
+提供两种实现：
+- InMemoryBackplane: 进程内总线（默认 / 测试用，也可以在同一进程内模拟多个 worker）
+- RedisBackplane: 基于 Redis Pub/Sub，使用 REDIS_* 配置
+"""
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from app.core.config import settings
+
+# 总线消息处理函数：接收已解码的信封（envelope）
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class Backplane:
+    """消息总线基类"""
+
+    def __init__(self) -> None:
+        # 当前进程的唯一标识，用于忽略自己发布的消息
+        self.node_id: str = uuid4().hex
+        self._handler: Optional[MessageHandler] = None
+
+    async def start(self, handler: MessageHandler) -> None:
+        """开始订阅，收到其他 worker 的消息时调用 handler"""
+        self._handler = handler
+
+    async def stop(self) -> None:
+        """停止订阅并释放资源"""
+        self._handler = None
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        """发布消息给所有 worker"""
+        raise NotImplementedError
+
+    async def _dispatch(self, envelope: Dict[str, Any]) -> None:
+        """把收到的消息交给 handler（跳过本进程发布的消息）"""
+        if self._handler is None or envelope.get("origin") == self.node_id:
+            return
+        try:
+            await self._handler(envelope)
+        except Exception as e:
+            print(f"❌ 处理总线消息失败: {str(e)}")
+
+
+def encode_envelope(envelope: Dict[str, Any]) -> bytes:
+    """
+    编码总线消息：首行为 JSON 头，其后为原样的消息文本
+
+    消息文本已经是序列化好的 JSON，直接拼接，避免再次转义。
+    """
+    header = {k: v for k, v in envelope.items() if k != "message"}
+    message = envelope.get("message") or ""
+    return json.dumps(header).encode() + b"\n" + message.encode()
+
+
+def decode_envelope(data: bytes) -> Dict[str, Any]:
+    """解码 encode_envelope 的结果"""
+    header, _, message = data.partition(b"\n")
+    envelope = json.loads(header)
+    envelope["message"] = message.decode()
+    return envelope
+
+
+class InMemoryHub:
+    """进程内的共享总线，多个 InMemoryBackplane 挂在同一个 hub 上即可模拟多 worker"""
+
+    def __init__(self) -> None:
+        self.subscribers: List["InMemoryBackplane"] = []
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        for subscriber in list(self.subscribers):
+            await subscriber._dispatch(envelope)
+
+
+class InMemoryBackplane(Backplane):
+    """进程内总线（单 worker 部署或测试使用）"""
+
+    def __init__(self, hub: Optional[InMemoryHub] = None) -> None:
+        super().__init__()
+        self.hub = hub or InMemoryHub()
+
+    async def start(self, handler: MessageHandler) -> None:
+        await super().start(handler)
+        if self not in self.hub.subscribers:
+            self.hub.subscribers.append(self)
+
+    async def stop(self) -> None:
+        if self in self.hub.subscribers:
+            self.hub.subscribers.remove(self)
+        await super().stop()
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        envelope.setdefault("origin", self.node_id)
+        await self.hub.publish(envelope)
+
+
+class RedisBackplane(Backplane):
+    """基于 Redis Pub/Sub 的总线（多 worker / 多实例部署）"""
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        db: int = 0,
+        password: Optional[str] = None,
+        channel: str = "inspireed:ws",
+    ) -> None:
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.channel = channel
+        self._redis: Any = None
+        self._pubsub: Any = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler) -> None:
+        """
+        连接 Redis 并订阅频道
+
+        Redis 不可用时不阻止应用启动：本进程内的投递照常进行，
+        由后台任务继续重连，连上后再开始跨 worker 转发。
+        """
+        from redis import asyncio as aioredis
+
+        await super().start(handler)
+        self._redis = aioredis.Redis(
+            host=self.host,
+            port=self.port,
+            db=self.db,
+            password=self.password,
+        )
+        try:
+            await self._subscribe()
+        except Exception as e:
+            print(f"⚠️ WebSocket 总线无法连接 Redis {self.host}:{self.port}，暂时只在本进程内投递，后台重连: {str(e)}")
+        self._listener = asyncio.create_task(self._listen())
+
+    async def _subscribe(self) -> None:
+        """建立新的订阅连接"""
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(self.channel)
+        except Exception:
+            await self._close_pubsub(pubsub)
+            raise
+        self._pubsub = pubsub
+        print(f"✅ WebSocket 总线已连接 Redis {self.host}:{self.port}/{self.db}")
+
+    async def _close_pubsub(self, pubsub: Any) -> None:
+        try:
+            await pubsub.close()
+        except Exception:
+            pass
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.channel)
+            except Exception:
+                pass
+            await self._close_pubsub(self._pubsub)
+            self._pubsub = None
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception:
+                pass
+            self._redis = None
+        await super().stop()
+
+    async def publish(self, envelope: Dict[str, Any]) -> None:
+        if self._redis is None:
+            return
+        envelope.setdefault("origin", self.node_id)
+        try:
+            await self._redis.publish(self.channel, encode_envelope(envelope))
+        except Exception as e:
+            print(f"❌ 发布总线消息失败: {str(e)}")
+
+    async def _listen(self) -> None:
+        """后台任务：持续读取订阅消息，连接断开后重连（间隔逐步加长，最多 30 秒）"""
+        retry_delay = 1.0
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                retry_delay = 1.0
+                async for message in self._pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        envelope = decode_envelope(message["data"])
+                    except (TypeError, ValueError, UnicodeDecodeError):
+                        continue
+                    await self._dispatch(envelope)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Redis 订阅中断，{retry_delay:.0f} 秒后重试: {str(e)}")
+            if self._pubsub is not None:
+                await self._close_pubsub(self._pubsub)
+                self._pubsub = None
+            await asyncio.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 30.0)
+
+
+def create_backplane() -> Backplane:
+    """
+    根据配置创建总线
+
+    WS_BACKPLANE=redis 时使用 Redis；未安装 redis 包时退回进程内总线。
+    """
+    if settings.WS_BACKPLANE == "redis":
+        try:
+            import redis.asyncio  # noqa: F401
+        except ImportError:
+            print("⚠️ 未安装 redis 包，WebSocket 总线退回进程内模式（多 worker 间不会互通）")
+            return InMemoryBackplane()
+        return RedisBackplane(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD,
+            channel=settings.WS_BACKPLANE_CHANNEL,
+        )
+    return InMemoryBackplane()
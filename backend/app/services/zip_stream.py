@@ -0,0 +1,162 @@
+"""
+流式 ZIP 打包
+
+边读取文件边输出 ZIP 字节块，不在内存中缓存整个压缩包：
+- 文件内容按块读取、压缩后立即交给响应
+- 条目内容可以是异步生成器（例如逐个教案生成的 data.json）
+- 占用内存只与块大小和条目数量有关，与导出总大小无关
+
+写入使用标准库 zipfile 的“不可回退流”模式（数据描述符 + ZIP64），
+生成的文件可以被常见解压工具和 zipfile 正常读取。
+"""
+
+import asyncio
+import io
+import os
+import zipfile
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Iterable, Tuple, Union
+
+# 每次读取 / 输出的块大小
+CHUNK_SIZE = 1024 * 1024
+
+# 本身已压缩的文件直接存储，避免浪费 CPU
+STORED_EXTENSIONS = {
+    ".zip", ".gz", ".rar", ".7z",
+    ".mp4", ".mov", ".avi", ".mkv", ".webm", ".mp3", ".m4a", ".aac", ".ogg",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp",
+    ".docx", ".pptx", ".xlsx",
+}
+
+# 条目内容：bytes / str（直接写入）、磁盘文件（FileSource），或逐块产生内容的异步迭代器
+EntryContent = Union[bytes, str, "FileSource", AsyncIterable[Union[bytes, str]]]
+ZipEntry = Tuple[str, EntryContent]
+
+
+class FileSource:
+    """磁盘上的文件，打包时按块读取"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+
+class _ChunkSink(io.RawIOBase):
+    """zipfile 的输出目标：只记录写入的数据，由 ZipStream 取走"""
+
+    def __init__(self) -> None:
+        self._chunks: list = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        if data:
+            self._chunks.append(bytes(data))
+            self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStream:
+    """流式 ZIP 写入器：每次写入后调用 drain() 取出已生成的字节"""
+
+    def __init__(self, compression: int = zipfile.ZIP_DEFLATED):
+        self._sink = _ChunkSink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=compression, allowZip64=True)
+        self.compression = compression
+
+    def open(self, arcname: str, compress_type: int = None):
+        """开始写入一个条目，返回可写的文件对象"""
+        info = zipfile.ZipInfo(arcname, date_time=datetime.now().timetuple()[:6])
+        info.compress_type = self.compression if compress_type is None else compress_type
+        info.external_attr = 0o644 << 16
+        return self._zip.open(info, mode="w", force_zip64=True)
+
+    def drain(self) -> bytes:
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """写入中央目录并返回剩余字节"""
+        self._zip.close()
+        return self._sink.drain()
+
+
+def compress_type_for(arcname: str) -> int:
+    """根据扩展名选择压缩方式"""
+    if os.path.splitext(arcname)[1].lower() in STORED_EXTENSIONS:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _copy_chunk(source, target, chunk_size: int) -> bool:
+    """读取一块并写入 ZIP 条目（在线程中执行），读完返回 False"""
+    data = source.read(chunk_size)
+    if not data:
+        return False
+    target.write(data)
+    return True
+
+
+async def stream_zip(
+    entries: Union[Iterable[ZipEntry], AsyncIterable[ZipEntry]],
+    chunk_size: int = CHUNK_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    把条目依次打包为 ZIP，逐块产出字节（可直接交给 StreamingResponse）
+
+    entries 可以是异步生成器，这样后面的条目（例如文件清单）可以依赖前面条目的处理结果。
+    文件读取和压缩在线程中进行，不阻塞事件循环。
+    """
+    zs = ZipStream()
+
+    async def iterate_entries():
+        if hasattr(entries, "__aiter__"):
+            async for entry in entries:  # type: ignore[union-attr]
+                yield entry
+        else:
+            for entry in entries:  # type: ignore[union-attr]
+                yield entry
+
+    async for arcname, content in iterate_entries():
+        if isinstance(content, FileSource):
+            try:
+                source = open(content.path, "rb")
+            except OSError as e:
+                # 文件不存在或无法读取时跳过该文件，继续打包其他内容
+                print(f"警告: 无法添加文件 {content.path}: {str(e)}")
+                continue
+            with source:
+                with zs.open(arcname, compress_type_for(arcname)) as target:
+                    while await asyncio.to_thread(_copy_chunk, source, target, chunk_size):
+                        data = zs.drain()
+                        if data:
+                            yield data
+        elif isinstance(content, (bytes, str)):
+            with zs.open(arcname) as target:
+                target.write(content.encode("utf-8") if isinstance(content, str) else content)
+        else:
+            pending = 0
+            with zs.open(arcname) as target:
+                async for piece in content:
+                    data = piece.encode("utf-8") if isinstance(piece, str) else piece
+                    target.write(data)
+                    pending += len(data)
+                    if pending >= chunk_size:
+                        pending = 0
+                        data = zs.drain()
+                        if data:
+                            yield data
+
+        data = zs.drain()
+        if data:
+            yield data
+
+    yield zs.close()
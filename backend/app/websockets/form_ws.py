@@ -4,7 +4,7 @@ Form WebSocket Handler - 互动表单实时通信
 
 import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, cast
 
 from fastapi import WebSocket, WebSocketDisconnect, Query
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,17 +14,100 @@ from app.core.database import get_db
 from app.api.deps import get_current_user_from_token
 from app.models.user import User, UserRole
 from app.models.form_cell import FormCell, FormResponse
+from app.services.form_results import FormTally, load_form_tally_snapshot
 from app.services.websocket_manager import manager
 
 logger = logging.getLogger(__name__)
 
-
 class FormWebSocketHandler:
     """表单WebSocket处理器"""
 
     def __init__(self):
         self.active_form_rooms: Dict[int, Dict[str, Any]] = {}
         # 每个form_cell_id对应一个房间，存储房间状态
+        # tally 为房间内的答案累计计数（FormTally），首次需要时从数据库加载，
+        # 之后每次提交直接累加，推送结果时不再查询数据库。
+        # 多 worker 部署时，提交通过 WebSocket 总线同步给其他 worker 的房间；
+        # 每次开始投票会从数据库重新加载。
+        manager.register_backplane_handler("form_response", self._on_remote_response)
+
+    def _get_room(self, form_cell_id: int) -> Dict[str, Any]:
+        """获取房间状态（不存在时创建）"""
+        if form_cell_id not in self.active_form_rooms:
+            self.active_form_rooms[form_cell_id] = {
+                "is_active": False,
+                "participants": set(),
+                "response_count": 0,
+                "cell_type": None,
+                "options": [],
+                "tally": None,
+                # 进行中的加载各自缓存加载期间收到的提交：[[(response_id, answers), ...], ...]
+                "loading": []
+            }
+        return self.active_form_rooms[form_cell_id]
+
+    async def _get_tally(self, form_cell_id: int, db: AsyncSession) -> FormTally:
+        """获取房间的累计计数，尚未加载时从数据库加载"""
+        room = self._get_room(form_cell_id)
+        if room["tally"] is None:
+            return await self._load_tally(form_cell_id, db)
+        return room["tally"]
+
+    async def _load_tally(self, form_cell_id: int, db: AsyncSession) -> FormTally:
+        """
+        从数据库重新加载累计计数
+
+        加载期间收到的提交先缓存起来，加载完成后只补上查询快照中没有的部分
+        （回答 ID 大于快照中最大 ID 的提交），既不会漏掉也不会重复计数。
+        """
+        room = self._get_room(form_cell_id)
+        pending: List[Tuple[int, Any]] = []
+        room["loading"].append(pending)
+        try:
+            tally, last_id = await load_form_tally_snapshot(db, form_cell_id)
+        finally:
+            room["loading"].remove(pending)
+
+        for response_id, answers in pending:
+            if last_id is None or response_id > last_id:
+                tally.add_response(answers)
+        room["tally"] = tally
+        return tally
+
+    def _apply_response(self, form_cell_id: int, response_id: int, answers: Any) -> None:
+        """把一份提交计入本进程房间的累计计数（计数尚未加载且没有进行中的加载时无需处理）"""
+        room = self.active_form_rooms.get(form_cell_id)
+        if room is None:
+            return
+        for pending in room["loading"]:
+            pending.append((response_id, answers))
+        if room["tally"] is not None:
+            room["tally"].add_response(answers)
+
+    async def record_response(self, form_cell_id: int, response_id: int, answers: Any) -> None:
+        """提交已写入数据库后调用：计入本进程的累计计数，并同步给其他 worker"""
+        self._apply_response(form_cell_id, response_id, answers)
+        await manager.publish_to_workers("form_response", {
+            "form_cell_id": form_cell_id,
+            "response_id": response_id,
+            "answers": answers,
+        })
+
+    async def _on_remote_response(self, payload: Dict[str, Any]) -> None:
+        """其他 worker 收到的提交"""
+        self._apply_response(
+            int(payload["form_cell_id"]), int(payload["response_id"]), payload.get("answers")
+        )
+
+    def _results_event(self, form_cell_id: int, tally: FormTally) -> Dict[str, Any]:
+        """构建结果推送消息（包含完整的选项分布）"""
+        room = self._get_room(form_cell_id)
+        return {
+            "type": "results_update",
+            "form_cell_id": form_cell_id,
+            "total_responses": tally.total_responses,
+            "option_stats": tally.option_stats(room["cell_type"], room["options"])
+        }
 
     async def handle_connection(
         self,
@@ -75,16 +158,13 @@ class FormWebSocketHandler:
             role=user_role
         )
 
-        # 初始化房间状态（如果不存在）
-        if form_cell_id not in self.active_form_rooms:
-            self.active_form_rooms[form_cell_id] = {
-                "is_active": False,
-                "participants": set(),
-                "response_count": 0
-            }
+        # 初始化房间状态（如果不存在），记录表单类型和选项用于生成统计
+        room = self._get_room(form_cell_id)
+        room["cell_type"] = form_cell.cell_type
+        room["options"] = form_cell.options
 
         # 添加参与者
-        self.active_form_rooms[form_cell_id]["participants"].add(current_user.id)
+        room["participants"].add(current_user.id)
 
         role_name = "教师" if user_role == UserRole.TEACHER else "学生"
         logger.info(
@@ -92,13 +172,13 @@ class FormWebSocketHandler:
         )
 
         # 发送欢迎消息
-        await websocket.send_text(json.dumps({
+        manager.send_to_websocket(websocket, {
             "type": "connection_established",
             "form_cell_id": form_cell_id,
             "user_id": current_user.id,
             "role": user_role.value,
             "is_active": self.active_form_rooms[form_cell_id]["is_active"]
-        }))
+        })
 
         # 发送当前统计（如果表单已激活）
         if self.active_form_rooms[form_cell_id]["is_active"]:
@@ -160,10 +240,10 @@ class FormWebSocketHandler:
         if message_type == "form_start":
             # 教师开始投票
             if current_user.role != UserRole.TEACHER:
-                await websocket.send_text(json.dumps({
+                manager.send_to_websocket(websocket, {
                     "type": "error",
                     "detail": "只有教师可以开始投票"
-                }))
+                })
                 return
 
             await self._handle_form_start(form_cell_id, db)
@@ -171,10 +251,10 @@ class FormWebSocketHandler:
         elif message_type == "form_stop":
             # 教师停止投票
             if current_user.role != UserRole.TEACHER:
-                await websocket.send_text(json.dumps({
+                manager.send_to_websocket(websocket, {
                     "type": "error",
                     "detail": "只有教师可以停止投票"
-                }))
+                })
                 return
 
             await self._handle_form_stop(form_cell_id, db)
@@ -182,10 +262,10 @@ class FormWebSocketHandler:
         elif message_type == "form_submit":
             # 学生提交答案
             if current_user.role != UserRole.STUDENT:
-                await websocket.send_text(json.dumps({
+                manager.send_to_websocket(websocket, {
                     "type": "error",
                     "detail": "只有学生可以提交答案"
-                }))
+                })
                 return
 
             await self._handle_form_submit(
@@ -200,14 +280,19 @@ class FormWebSocketHandler:
 
     async def _handle_form_start(self, form_cell_id: int, db: AsyncSession):
         """处理开始投票"""
-        if form_cell_id not in self.active_form_rooms:
-            self.active_form_rooms[form_cell_id] = {
-                "is_active": False,
-                "participants": set(),
-                "response_count": 0
-            }
+        room = self._get_room(form_cell_id)
+
+        # 重新加载表单配置和累计计数，之后的提交在内存中累加
+        result = await db.execute(
+            select(FormCell).where(FormCell.id == form_cell_id)
+        )
+        form_cell = result.scalar_one_or_none()
+        if form_cell:
+            room["cell_type"] = form_cell.cell_type
+            room["options"] = form_cell.options
+        await self._load_tally(form_cell_id, db)
 
-        self.active_form_rooms[form_cell_id]["is_active"] = True
+        room["is_active"] = True
 
         # 广播开始消息给所有用户
         await manager.broadcast(
@@ -289,6 +374,7 @@ class FormWebSocketHandler:
             # 更新房间计数
             if form_cell_id in self.active_form_rooms:
                 self.active_form_rooms[form_cell_id]["response_count"] += 1
+            await self.record_response(form_cell_id, cast(int, form_response.id), answers)
 
             # 发送确认消息给学生
             await manager.send_to_student(
@@ -337,44 +423,22 @@ class FormWebSocketHandler:
     ):
         """发送当前结果统计"""
         try:
-            # 获取表单响应数
-            from sqlalchemy import func, text as sql_text
-
-            count_result = await db.execute(
-                select(func.count(FormResponse.id))
-                .where(FormResponse.form_cell_id == form_cell_id)
-            )
-            total_responses = count_result.scalar() or 0
+            tally = await self._get_tally(form_cell_id, db)
 
             # 发送当前统计
-            await websocket.send_text(json.dumps({
-                "type": "results_update",
-                "form_cell_id": form_cell_id,
-                "total_responses": total_responses
-            }))
+            manager.send_to_websocket(websocket, self._results_event(form_cell_id, tally))
 
         except Exception as e:
             logger.error(f"Error sending current results: {e}")
 
     async def _broadcast_results_update(self, form_cell_id: int, db: AsyncSession):
-        """广播结果更新"""
+        """广播结果更新（使用房间内的累计计数，不查询数据库）"""
         try:
-            from sqlalchemy import func
-
-            # 获取表单响应数
-            count_result = await db.execute(
-                select(func.count(FormResponse.id))
-                .where(FormResponse.form_cell_id == form_cell_id)
-            )
-            total_responses = count_result.scalar() or 0
+            tally = await self._get_tally(form_cell_id, db)
 
             # 广播结果更新
             await manager.broadcast(
-                event={
-                    "type": "results_update",
-                    "form_cell_id": form_cell_id,
-                    "total_responses": total_responses
-                },
+                event=self._results_event(form_cell_id, tally),
                 scope="form",
                 channel_id=form_cell_id
             )
@@ -0,0 +1,130 @@
+"""
+AI问答服务基准测试
+
+在本机启动一个 OpenAI 兼容的假服务（固定响应延迟），模拟课堂上全班学生同时提问：
+每轮对每个问题，所有学生同时提问（问题的空白和标点略有不同），共进行若干轮。
+对比两种实现：
+- 旧实现：每次提问新建 httpx.AsyncClient，每个提问都调用上游
+- 新实现：AIQAService（连接池 + 请求合并 + 回答缓存）
+输出上游调用次数、TCP 连接数、命中率（缓存命中 + 合并）以及提问延迟。
+假服务使用 HTTP，真实接口的 TLS 握手开销不包含在结果中。
+
+用法:
+    python scripts/bench_ai_qa.py [--students 40] [--questions 5] [--rounds 3] [--latency 0.3]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+
+from app.services.ai_qa import AIQAService
+
+
+def create_fake_openai(latency: float) -> FastAPI:
+    """OpenAI 兼容的 /chat/completions，记录调用次数和客户端连接"""
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.connections = set()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.calls += 1
+        app.state.connections.add(request.client)
+        await asyncio.sleep(latency)
+        return {
+            "choices": [{"message": {"role": "assistant", "content": "这是一个模拟的回答。"}}],
+            "usage": {"total_tokens": 20},
+        }
+
+    return app
+
+
+async def legacy_ask(base_url: str, question: str) -> None:
+    """旧实现：每次提问新建客户端"""
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        response = await client.post(
+            f"{base_url}/chat/completions",
+            headers={"Authorization": "Bearer sk-bench"},
+            json={"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": question}]},
+        )
+        response.raise_for_status()
+
+
+async def run_classroom(ask, args) -> list:
+    """按轮次模拟全班提问，返回每次提问的延迟（毫秒）"""
+    latencies = []
+
+    async def timed(question: str) -> None:
+        start = time.perf_counter()
+        await ask(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    for _ in range(args.rounds):
+        for q in range(args.questions):
+            await asyncio.gather(*(
+                timed(f"第{q}个知识点是什么{'？' if s % 2 else ''}" + " " * (s % 3))
+                for s in range(args.students)
+            ))
+    return latencies
+
+
+def report(label: str, app: FastAPI, latencies: list, requests: int, hits: int) -> None:
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label}")
+    print(f"  提问 {requests} 次，上游调用 {app.state.calls} 次，TCP 连接 {len(app.state.connections)} 个")
+    print(f"  命中率 {hits / requests:6.1%}（缓存命中 + 合并）")
+    print(
+        f"  延迟 平均 {statistics.mean(latencies):7.1f} ms   "
+        f"p50 {statistics.median(latencies):7.1f} ms   p95 {p95:7.1f} ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="AI问答服务基准测试")
+    parser.add_argument("--students", type=int, default=40, help="每个班级的学生数")
+    parser.add_argument("--questions", type=int, default=5, help="不同问题数")
+    parser.add_argument("--rounds", type=int, default=3, help="每个问题重复提问的轮数")
+    parser.add_argument("--latency", type=float, default=0.3, help="假服务响应延迟（秒）")
+    args = parser.parse_args()
+
+    for label in ("旧实现 (每次新建客户端)", "新实现 (连接池 + 合并 + 缓存)"):
+        app = create_fake_openai(args.latency)
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        base_url = f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+        server = uvicorn.Server(uvicorn.Config(app, log_level="warning", backlog=4096))
+        serve_task = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        try:
+            if label.startswith("旧"):
+                latencies = await run_classroom(lambda question: legacy_ask(base_url, question), args)
+                report(label, app, latencies, len(latencies), 0)
+            else:
+                service = AIQAService()
+                service.openai_api_key = "sk-bench"
+                service.openai_base_url = base_url
+                latencies = await run_classroom(service.ask_question, args)
+                stats = service.stats
+                report(label, app, latencies, stats["requests"], stats["cache_hits"] + stats["coalesced"])
+                await service.aclose()
+        finally:
+            server.should_exit = True
+            await serve_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+"""
+请求认证开销基准测试
+
+对比每个请求认证当前用户的三种方式：
+- 旧实现：select(User) + 3 个 selectinload（区域、学校、年级），每次 4 次查询
+- 缓存未命中：一次 JOIN 查询加载 Principal
+- 缓存命中：只解码 JWT，不访问数据库
+
+统计每次认证的耗时中位数与 SQL 语句数。需要已有用户数据的 PostgreSQL 数据库（使用 DATABASE_URI 配置）。
+
+用法:
+    python scripts/bench_auth.py [--user-id 1] [--repeat 500]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from jose import jwt
+from sqlalchemy import event, select
+from sqlalchemy.orm import selectinload
+
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, close_db, engine
+from app.core.security import create_access_token
+from app.models.user import User
+from app.services.auth_cache import principal_cache
+
+statement_count = 0
+
+
+def count_statements(conn, cursor, statement, parameters, context, executemany):
+    global statement_count
+    statement_count += 1
+
+
+async def legacy_get_current_user(token: str, db) -> User:
+    """旧实现（与改造前的 get_current_user 一致）"""
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    result = await db.execute(
+        select(User)
+        .options(
+            selectinload(User.region),
+            selectinload(User.school),
+            selectinload(User.grade),
+        )
+        .where(User.id == int(payload["sub"]))
+    )
+    user = result.scalar_one()
+    user.region_name = user.region.name if user.region else None  # type: ignore[attr-defined]
+    user.school_name = user.school.name if user.school else None  # type: ignore[attr-defined]
+    user.grade_name = user.grade.name if user.grade else None  # type: ignore[attr-defined]
+    return user
+
+
+async def timed(fn, repeat: int):
+    """返回 (每次耗时中位数 µs, 每次 SQL 语句数)"""
+    global statement_count
+    samples = []
+    statement_count = 0
+    for _ in range(repeat):
+        # 每次认证使用新的会话，与真实请求一致
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            await fn(db)
+            samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+    return samples[len(samples) // 2], statement_count / repeat
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="请求认证开销基准测试")
+    parser.add_argument("--user-id", type=int, default=None, help="用于测试的用户 ID（默认取第一个激活用户）")
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statements)
+    try:
+        user_id = args.user_id
+        if user_id is None:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(User.id).where(User.is_active == True).order_by(User.id).limit(1)
+                )
+                user_id = result.scalar_one_or_none()
+        if user_id is None:
+            print("❌ 数据库中没有激活的用户")
+            return
+
+        token = create_access_token(subject=user_id)
+
+        async def run_legacy(db):
+            await legacy_get_current_user(token, db)
+
+        async def run_miss(db):
+            principal_cache.clear()
+            await get_current_user(token, db)
+
+        async def run_hit(db):
+            await get_current_user(token, db)
+
+        print("=" * 72)
+        print(f"用户 {user_id}，每种方式重复 {args.repeat} 次取中位数")
+        print("=" * 72)
+        for label, fn in [
+            ("旧实现 (selectinload)", run_legacy),
+            ("缓存未命中 (JOIN)", run_miss),
+            ("缓存命中", run_hit),
+        ]:
+            if fn is run_hit:
+                principal_cache.clear()
+                async with AsyncSessionLocal() as db:
+                    await get_current_user(token, db)
+            median_us, statements = await timed(fn, args.repeat)
+            print(f"{label:<24} {median_us:10.1f} µs/请求   SQL {statements:4.1f} 条/请求")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statements)
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
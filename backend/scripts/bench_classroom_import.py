@@ -0,0 +1,193 @@
+"""
+班级成员批量导入基准测试
+
+对比 batch_import_classroom_members 的两种实现：
+- 旧实现：每行依次按学籍号 / 邮箱 / 用户名 / 学号 / 姓名查找用户，
+  再查询已有成员关系并逐行 flush + refresh
+- 新实现：按标识类型分级批量匹配，一条多行 upsert 写入成员关系
+
+在事务中创建临时学生并导入到已有班级，名单混合使用学籍号、用户名、邮箱、姓名，
+结束后回滚，不影响现有数据。统计两种实现的耗时与 SQL 语句数。
+需要已执行迁移且至少有一个班级的 PostgreSQL 数据库（使用 DATABASE_URI 配置）。
+
+用法:
+    python scripts/bench_classroom_import.py [--classroom-id 1] [--students 60]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import selectinload
+
+from app.core.database import AsyncSessionLocal, close_db, engine
+from app.core.security import get_password_hash
+from app.models.classroom_assistant import ClassroomMembership, RoleInClass
+from app.models.organization import Classroom
+from app.models.user import User, UserRole
+from app.schemas.classroom_assistant import ClassroomMemberBatchItem
+from app.services.classroom_member_import import import_classroom_members
+
+statement_count = 0
+
+
+def count_statements(conn, cursor, statement, parameters, context, executemany):
+    global statement_count
+    statement_count += 1
+
+
+async def legacy_find_user(db, item: ClassroomMemberBatchItem, classroom_id: int):
+    """旧实现的逐行查找（与改造前的 find_user_by_identifiers 一致）"""
+    if item.user_id:
+        return await db.get(User, item.user_id)
+    if item.student_id_number:
+        user = (await db.execute(select(User).where(User.student_id_number == item.student_id_number))).scalar_one_or_none()
+        if user:
+            return user
+    if item.email:
+        user = (await db.execute(select(User).where(User.email == item.email))).scalar_one_or_none()
+        if user:
+            return user
+    if item.username:
+        user = (await db.execute(select(User).where(User.username == item.username))).scalar_one_or_none()
+        if user:
+            return user
+    if item.student_no:
+        membership = (await db.execute(
+            select(ClassroomMembership)
+            .options(selectinload(ClassroomMembership.user))
+            .where(ClassroomMembership.student_no == item.student_no, ClassroomMembership.classroom_id == classroom_id)
+        )).scalar_one_or_none()
+        if membership and membership.user:
+            return membership.user
+        membership = (await db.execute(
+            select(ClassroomMembership)
+            .options(selectinload(ClassroomMembership.user))
+            .where(ClassroomMembership.student_no == item.student_no)
+            .limit(1)
+        )).scalar_one_or_none()
+        if membership and membership.user:
+            return membership.user
+    if item.full_name:
+        users = (await db.execute(select(User).where(User.full_name.ilike(f"%{item.full_name}%")))).scalars().all()
+        if len(users) == 1:
+            return users[0]
+        for user in users:
+            if user.full_name == item.full_name:
+                return user
+    return None
+
+
+async def legacy_import(db, classroom_id: int, members):
+    """旧实现的逐行导入"""
+    created = 0
+    for item in members:
+        user = await legacy_find_user(db, item, classroom_id)
+        if not user:
+            continue
+        existing = (await db.execute(
+            select(ClassroomMembership).where(
+                ClassroomMembership.classroom_id == classroom_id,
+                ClassroomMembership.user_id == user.id,
+            )
+        )).scalar_one_or_none()
+        if existing:
+            continue
+        membership = ClassroomMembership(
+            classroom_id=classroom_id,
+            user_id=user.id,
+            role_in_class=item.role_in_class,
+            student_no=item.student_no,
+            seat_no=item.seat_no,
+            is_active=True,
+        )
+        db.add(membership)
+        await db.flush()
+        await db.refresh(membership)
+        created += 1
+    return created
+
+
+async def new_import(db, classroom_id: int, members):
+    memberships, _ = await import_classroom_members(db, classroom_id, members)
+    return len(memberships)
+
+
+def build_roster(prefix: str, count: int):
+    """生成名单：依次用学籍号、用户名、邮箱、姓名标识学生"""
+    members = []
+    for i in range(count):
+        kind = i % 4
+        item = {"seat_no": i + 1, "role_in_class": RoleInClass.STUDENT}
+        if kind == 0:
+            item["student_id_number"] = f"{prefix}-sid-{i}"
+        elif kind == 1:
+            item["username"] = f"{prefix}_u{i}"
+        elif kind == 2:
+            item["email"] = f"{prefix}_u{i}@bench.local"
+        else:
+            item["full_name"] = f"测试学生{prefix}{i:03d}"
+        members.append(ClassroomMemberBatchItem(**item))
+    return members
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="班级成员批量导入基准测试")
+    parser.add_argument("--classroom-id", type=int, default=None, help="导入到的班级 ID（默认取第一个班级）")
+    parser.add_argument("--students", type=int, default=60)
+    args = parser.parse_args()
+
+    global statement_count
+    async with AsyncSessionLocal() as db:
+        classroom_id = args.classroom_id
+        if classroom_id is None:
+            classroom_id = (await db.execute(select(Classroom.id).order_by(Classroom.id).limit(1))).scalar_one_or_none()
+        if classroom_id is None:
+            print("❌ 数据库中没有班级")
+            return
+
+        prefix = uuid.uuid4().hex[:8]
+        password_hash = get_password_hash("bench-password")
+        await db.execute(insert(User), [
+            {
+                "username": f"{prefix}_u{i}",
+                "email": f"{prefix}_u{i}@bench.local",
+                "full_name": f"测试学生{prefix}{i:03d}",
+                "student_id_number": f"{prefix}-sid-{i}",
+                "hashed_password": password_hash,
+                "role": UserRole.STUDENT,
+                "is_active": True,
+            }
+            for i in range(args.students)
+        ])
+        members = build_roster(prefix, args.students)
+
+        print("=" * 72)
+        print(f"班级 {classroom_id}，名单 {args.students} 名学生（学籍号/用户名/邮箱/姓名各占 1/4）")
+        print("=" * 72)
+        event.listen(engine.sync_engine, "before_cursor_execute", count_statements)
+        try:
+            for label, fn in [("旧实现 (逐行)", legacy_import), ("新实现 (批量)", new_import)]:
+                savepoint = await db.begin_nested()
+                statement_count = 0
+                start = time.perf_counter()
+                created = await fn(db, classroom_id, members)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                statements = statement_count
+                await savepoint.rollback()
+                print(f"{label:<16} 导入 {created:4d} 人   {elapsed_ms:8.1f} ms   SQL {statements:5d} 条")
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", count_statements)
+            await db.rollback()
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
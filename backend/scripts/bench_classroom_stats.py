@@ -0,0 +1,305 @@
+"""
+班级统计基准测试
+
+对比 get_classroom_stats 的两种实现：
+- 旧实现：每次请求按时间区间扫描考勤、正面行为、纪律、值日原始记录（7 次聚合查询）
+- 新实现：累加 classroom_daily_stats 中区间内的每日汇总（1 次查询）
+
+在事务中生成一年的模拟数据（默认 50 个班级，每班 40 名学生，工作日每天一次点名，
+另有正面行为、纪律、值日记录），补建每日汇总，然后分别统计最近 30 天和全年，
+核对两种实现的结果一致。结束后回滚，不影响现有数据。
+需要已执行迁移的 PostgreSQL 数据库（使用 DATABASE_URI 配置）。
+
+用法:
+    python scripts/bench_classroom_stats.py [--classrooms 50] [--students 40] [--days 365]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import case, event, func, insert, join, select
+
+from app.core.database import AsyncSessionLocal, close_db, engine
+from app.models.classroom_assistant import (
+    AttendanceEntry,
+    AttendanceSession,
+    AttendanceStatus,
+    DisciplineEventType,
+    DisciplineRecord,
+    DutyAssignment,
+    DutyAssignmentStatus,
+    PositiveBehavior,
+    PositiveBehaviorType,
+)
+from app.models.curriculum import Grade
+from app.models.organization import Classroom, Region, School
+from app.models.user import User, UserRole
+from app.services.classroom_stats import load_period_stats, rebuild_daily_stats
+
+statement_count = 0
+
+
+def count_statements(conn, cursor, statement, parameters, context, executemany):
+    global statement_count
+    statement_count += 1
+
+
+async def insert_rows(db, model, rows, returning=None):
+    """批量插入（executemany），返回 returning 列的值"""
+    if returning is not None:
+        return list((await db.scalars(insert(model).returning(returning, sort_by_parameter_order=True), rows)).all())
+    await db.execute(insert(model), rows)
+    return []
+
+
+async def legacy_stats(db, classroom_id, from_date, to_date):
+    """旧实现：按区间扫描原始记录（与改造前的 get_classroom_stats 一致）"""
+    total_sessions = (await db.execute(
+        select(func.count(AttendanceSession.id)).where(
+            AttendanceSession.classroom_id == classroom_id,
+            AttendanceSession.started_at >= from_date,
+            AttendanceSession.started_at <= to_date,
+        )
+    )).scalar() or 0
+    attendance = (await db.execute(
+        select(*[
+            func.sum(case((AttendanceEntry.status == status, 1), else_=0))
+            for status in (AttendanceStatus.PRESENT, AttendanceStatus.LATE, AttendanceStatus.LEAVE, AttendanceStatus.ABSENT)
+        ])
+        .select_from(join(AttendanceSession, AttendanceEntry, AttendanceSession.id == AttendanceEntry.session_id))
+        .where(
+            AttendanceSession.classroom_id == classroom_id,
+            AttendanceSession.started_at >= from_date,
+            AttendanceSession.started_at <= to_date,
+        )
+    )).one()
+
+    in_positive = (
+        PositiveBehavior.classroom_id == classroom_id,
+        PositiveBehavior.recorded_at >= from_date,
+        PositiveBehavior.recorded_at <= to_date,
+    )
+    positive = (await db.execute(
+        select(func.sum(PositiveBehavior.points), func.count(PositiveBehavior.id)).where(*in_positive)
+    )).one()
+    points_by_type = dict((await db.execute(
+        select(PositiveBehavior.behavior_type, func.sum(PositiveBehavior.points))
+        .where(*in_positive)
+        .group_by(PositiveBehavior.behavior_type)
+    )).all())
+
+    in_discipline = (
+        DisciplineRecord.classroom_id == classroom_id,
+        DisciplineRecord.recorded_at >= from_date,
+        DisciplineRecord.recorded_at <= to_date,
+    )
+    discipline_records = (await db.execute(
+        select(func.count(DisciplineRecord.id)).where(*in_discipline)
+    )).scalar() or 0
+    records_by_type = dict((await db.execute(
+        select(DisciplineRecord.event_type, func.count(DisciplineRecord.id))
+        .where(*in_discipline)
+        .group_by(DisciplineRecord.event_type)
+    )).all())
+
+    duty = (await db.execute(
+        select(
+            func.count(DutyAssignment.id),
+            func.sum(case((DutyAssignment.status == DutyAssignmentStatus.COMPLETED, 1), else_=0)),
+        ).where(
+            DutyAssignment.classroom_id == classroom_id,
+            DutyAssignment.duty_date >= from_date,
+            DutyAssignment.duty_date <= to_date,
+        )
+    )).one()
+
+    return {
+        "attendance_sessions": total_sessions,
+        "attendance_present": int(attendance[0] or 0),
+        "attendance_late": int(attendance[1] or 0),
+        "attendance_leave": int(attendance[2] or 0),
+        "attendance_absent": int(attendance[3] or 0),
+        "positive_records": positive[1],
+        "positive_points": int(positive[0] or 0),
+        "positive_points_by_type": {t.value: int(p) for t, p in points_by_type.items()},
+        "discipline_records": discipline_records,
+        "discipline_by_type": {t.value: n for t, n in records_by_type.items()},
+        "duty_assignments": duty[0],
+        "duty_completed": int(duty[1] or 0),
+    }
+
+
+async def create_dataset(db, args, rng):
+    """生成模拟数据，返回班级ID列表与记录数"""
+    prefix = uuid.uuid4().hex[:8]
+    region_id = (await db.execute(
+        insert(Region).values(name=f"基准区域{prefix}", code=f"bench-{prefix}", level=3).returning(Region.id)
+    )).scalar_one()
+    school_id = (await db.execute(
+        insert(School).values(
+            name=f"基准学校{prefix}", code=f"bench-{prefix}", region_id=region_id, school_type="初中"
+        ).returning(School.id)
+    )).scalar_one()
+    grade_id = (await db.execute(
+        insert(Grade).values(name=f"基准年级{prefix}", level=rng.randint(10**6, 10**9)).returning(Grade.id)
+    )).scalar_one()
+    classroom_ids = await insert_rows(db, Classroom, [
+        {"name": f"基准{prefix}-{i + 1}班", "school_id": school_id, "grade_id": grade_id}
+        for i in range(args.classrooms)
+    ], returning=Classroom.id)
+
+    user_ids = await insert_rows(db, User, [
+        {
+            "username": f"{prefix}_u{i}",
+            "email": f"{prefix}_u{i}@bench.local",
+            "hashed_password": "bench",
+            "role": UserRole.STUDENT if i % (args.students + 1) else UserRole.TEACHER,
+            "is_active": True,
+        }
+        for i in range(args.classrooms * (args.students + 1))
+    ], returning=User.id)
+
+    counts = {"sessions": 0, "entries": 0, "positive": 0, "discipline": 0, "duty": 0}
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    school_days = [
+        today - timedelta(days=offset)
+        for offset in range(args.days)
+        if (today - timedelta(days=offset)).weekday() < 5
+    ]
+    statuses = [AttendanceStatus.PRESENT] * 90 + [AttendanceStatus.LATE] * 5 + [AttendanceStatus.LEAVE] * 3 + [AttendanceStatus.ABSENT] * 2
+    behavior_types = list(PositiveBehaviorType)
+    event_types = list(DisciplineEventType)
+
+    for index, classroom_id in enumerate(classroom_ids):
+        members = user_ids[index * (args.students + 1):(index + 1) * (args.students + 1)]
+        teacher_id, students = members[0], members[1:]
+
+        session_ids = await insert_rows(db, AttendanceSession, [
+            {
+                "classroom_id": classroom_id,
+                "initiated_by_user_id": teacher_id,
+                "started_at": day + timedelta(hours=8),
+                "ended_at": day + timedelta(hours=8, minutes=5),
+            }
+            for day in school_days
+        ], returning=AttendanceSession.id)
+        entries = [
+            {
+                "session_id": session_id,
+                "student_id": student_id,
+                "status": rng.choice(statuses),
+                "updated_by_user_id": teacher_id,
+            }
+            for session_id in session_ids
+            for student_id in students
+        ]
+        await insert_rows(db, AttendanceEntry, entries)
+
+        positives, disciplines, duties = [], [], []
+        for day in school_days:
+            for _ in range(rng.randint(5, 15)):
+                positives.append({
+                    "classroom_id": classroom_id,
+                    "student_id": rng.choice(students),
+                    "behavior_type": rng.choice(behavior_types),
+                    "points": rng.randint(1, 3),
+                    "recorded_by_user_id": teacher_id,
+                    "recorded_at": day + timedelta(hours=rng.randint(8, 16), minutes=rng.randint(0, 59)),
+                })
+            for _ in range(rng.randint(0, 4)):
+                disciplines.append({
+                    "classroom_id": classroom_id,
+                    "student_id": rng.choice(students),
+                    "event_type": rng.choice(event_types),
+                    "recorded_by_user_id": teacher_id,
+                    "recorded_at": day + timedelta(hours=rng.randint(8, 16), minutes=rng.randint(0, 59)),
+                })
+            for student_id in rng.sample(students, 2):
+                duties.append({
+                    "classroom_id": classroom_id,
+                    "duty_date": day,
+                    "assignee_user_id": student_id,
+                    "status": DutyAssignmentStatus.COMPLETED if rng.random() < 0.9 else DutyAssignmentStatus.PENDING,
+                })
+        await insert_rows(db, PositiveBehavior, positives)
+        await insert_rows(db, DisciplineRecord, disciplines)
+        await insert_rows(db, DutyAssignment, duties)
+
+        counts["sessions"] += len(session_ids)
+        counts["entries"] += len(entries)
+        counts["positive"] += len(positives)
+        counts["discipline"] += len(disciplines)
+        counts["duty"] += len(duties)
+
+    return classroom_ids, counts, today
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="班级统计基准测试")
+    parser.add_argument("--classrooms", type=int, default=50)
+    parser.add_argument("--students", type=int, default=40, help="每班学生数")
+    parser.add_argument("--days", type=int, default=365, help="模拟数据覆盖的天数")
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+
+    global statement_count
+    rng = random.Random(args.seed)
+    async with AsyncSessionLocal() as db:
+        try:
+            start = time.perf_counter()
+            classroom_ids, counts, today = await create_dataset(db, args, rng)
+            print("=" * 72)
+            print(
+                f"{len(classroom_ids)} 个班级，点名 {counts['sessions']} 次 / 考勤 {counts['entries']} 条，"
+                f"正面行为 {counts['positive']} 条，纪律 {counts['discipline']} 条，值日 {counts['duty']} 条"
+            )
+            print(f"生成数据 {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            first_day = (today - timedelta(days=args.days)).date()
+            rows = 0
+            for classroom_id in classroom_ids:
+                rows += await rebuild_daily_stats(db, classroom_id, first_day, today.date())
+            print(f"补建每日汇总 {rows} 行，{(time.perf_counter() - start) * 1000:.0f} ms")
+            print("=" * 72)
+
+            event.listen(engine.sync_engine, "before_cursor_execute", count_statements)
+            try:
+                end_of_today = today + timedelta(days=1) - timedelta(microseconds=1)
+                for period_days in (30, args.days):
+                    from_date = today - timedelta(days=period_days - 1)
+                    timings = {}
+                    results = {}
+                    for label, fn in [
+                        ("旧实现 (扫描原始记录)", lambda cid: legacy_stats(db, cid, from_date, end_of_today)),
+                        ("新实现 (每日汇总)", lambda cid: load_period_stats(db, cid, from_date, end_of_today)),
+                    ]:
+                        statement_count = 0
+                        start = time.perf_counter()
+                        results[label] = [await fn(classroom_id) for classroom_id in classroom_ids]
+                        timings[label] = ((time.perf_counter() - start) * 1000, statement_count)
+
+                    legacy, rollup = results.values()
+                    consistent = "一致" if legacy == rollup else "不一致"
+                    print(f"最近 {period_days} 天，{len(classroom_ids)} 个班级各统计一次（结果{consistent}）")
+                    for label, (elapsed_ms, statements) in timings.items():
+                        per_request = elapsed_ms / len(classroom_ids)
+                        print(f"  {label:<18} {elapsed_ms:8.1f} ms   每次 {per_request:6.2f} ms   SQL {statements:5d} 条")
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", count_statements)
+        finally:
+            await db.rollback()
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,127 @@
+"""
+PDF 分页预览图基准测试
+
+生成一个含文字、矢量图形和图片的测试 PDF（也可以用 --pdf 指定真实文件），依次测试：
+- 冷缓存渲染吞吐：用 1..N 个渲染进程渲染所有页面，输出每秒页数和每个进程（核）每秒页数
+- 缓存命中的请求延迟
+- 学生查看第 1 页需要传输的字节数：整个 PDF 与第 1 页图片对比
+缓存写入临时目录，测试结束后删除。
+
+用法:
+    python scripts/bench_pdf_pages.py [--pages 60] [--width 960] [--workers 4] [--pdf path/to/file.pdf]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from app.services.pdf_pages import PdfPageRenderer
+
+
+def make_photo(seed: int, width: int = 1200, height: int = 800) -> bytes:
+    """类似照片的 JPEG（渐变 + 噪声，每页不同）"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x * 255 // width, y * 255 // height, (x + y + seed * 40) % 256], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 25, base.shape), 0, 255).astype(np.uint8)
+    return fitz.Pixmap(fitz.csRGB, width, height, pixels.tobytes(), False).tobytes("jpeg", jpg_quality=85)
+
+
+def make_pdf(path: str, pages: int) -> None:
+    """每页一段文字、若干矢量图形和一张照片"""
+    doc = fitz.open()
+    for i in range(pages):
+        image = make_photo(i)
+        page = doc.new_page()
+        page.insert_text((72, 72), f"第 {i + 1} 页 Page {i + 1}", fontsize=20, fontname="china-s")
+        text = "The quick brown fox jumps over the lazy dog. " * 40
+        page.insert_textbox(fitz.Rect(72, 90, 520, 300), text, fontsize=10)
+        for j in range(30):
+            page.draw_circle((100 + j * 14, 330 + (j % 5) * 6), 8 + j % 4, color=(0, 0, 1), fill=(0.9, 0.5, j / 30))
+        page.insert_image(fitz.Rect(72, 400, 520, 700), stream=image)
+    doc.save(path, deflate=True)
+    doc.close()
+
+
+async def render_all(pdf_path: str, cache_dir: str, pages: int, width: int, workers: int) -> float:
+    """冷缓存渲染所有页面（并发数等于进程数），返回耗时（秒）；进程启动时间不计入"""
+    renderer = PdfPageRenderer(cache_dir=cache_dir, workers=workers, prefetch=0)
+    # 预热：启动所有渲染进程并打开文档
+    await asyncio.gather(*(renderer.get_page(pdf_path, 1, 160) for _ in range(workers)))
+
+    queue = list(range(1, pages + 1))
+
+    async def worker():
+        while queue:
+            await renderer.get_page(pdf_path, queue.pop(0), width)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    elapsed = time.perf_counter() - start
+    renderer.shutdown()
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="PDF 分页预览图基准测试")
+    parser.add_argument("--pages", type=int, default=60, help="生成的测试 PDF 页数")
+    parser.add_argument("--width", type=int, default=960, help="渲染宽度（像素）")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="最多测试的渲染进程数")
+    parser.add_argument("--pdf", help="使用指定的 PDF 文件代替生成的测试文件")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench-pdf-pages-")
+    try:
+        pdf_path = args.pdf
+        if not pdf_path:
+            pdf_path = os.path.join(work_dir, "bench.pdf")
+            make_pdf(pdf_path, args.pages)
+        with fitz.open(pdf_path) as doc:
+            pages = len(doc)
+        print(f"PDF: {pages} 页，{os.path.getsize(pdf_path) / 1024 / 1024:.1f} MB，渲染宽度 {args.width}px")
+        print(f"CPU 核数: {os.cpu_count()}")
+
+        print("\n冷缓存渲染吞吐")
+        for workers in range(1, args.workers + 1):
+            cache_dir = os.path.join(work_dir, f"cache-{workers}")
+            elapsed = await render_all(pdf_path, cache_dir, pages, args.width, workers)
+            print(
+                f"  {workers} 个进程: {pages / elapsed:7.1f} 页/秒   "
+                f"每进程 {pages / elapsed / workers:6.1f} 页/秒   单页 {elapsed / pages * 1000 * workers:6.1f} ms"
+            )
+
+        renderer = PdfPageRenderer(cache_dir=os.path.join(work_dir, "cache-1"), workers=1, prefetch=0)
+        # 第一次请求需要启动渲染进程读取页数，不计入
+        await renderer.get_page(pdf_path, 1, args.width)
+        latencies = []
+        for page in range(1, pages + 1):
+            start = time.perf_counter()
+            path, _ = await renderer.get_page(pdf_path, page, args.width)
+            latencies.append((time.perf_counter() - start) * 1000)
+        first_page, _ = await renderer.get_page(pdf_path, 1, args.width)
+        renderer.shutdown()
+        print("\n缓存命中")
+        print(f"  平均 {statistics.mean(latencies):.3f} ms   最大 {max(latencies):.3f} ms（渲染次数 {renderer.stats['renders']}）")
+
+        pdf_bytes = os.path.getsize(pdf_path)
+        page_bytes = os.path.getsize(first_page)
+        print("\n查看第 1 页的传输量")
+        print(f"  整个 PDF {pdf_bytes / 1024:9.1f} KB")
+        print(f"  第 1 页图 {page_bytes / 1024:9.1f} KB（{pdf_bytes / page_bytes:.0f} 倍差距）")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
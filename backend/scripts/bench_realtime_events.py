@@ -0,0 +1,113 @@
+"""
+实时事件序列化微基准
+
+模拟一次统计更新的投递路径：build_event → 发给教师 → 发给学生 → 经 backplane 转发，
+对比每一步各自 json.dumps（旧实现）与 RealtimeEvent 只序列化一次的耗时。
+
+用法:
+    python scripts/bench_realtime_events.py [--events 20000] [--items 10]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.realtime import Channel, build_event, encode_event, orjson
+from app.services.ws_backplane import encode_envelope
+
+
+def make_stats(items: int) -> dict:
+    """构造与 get_submission_statistics 结构相同的统计数据"""
+    return {
+        "cell_id": "5f0c2a4e-8d7b-4c1e-9a55-1b2c3d4e5f60",
+        "lesson_id": 12,
+        "total_students": 40,
+        "submitted_count": 31,
+        "draft_count": 4,
+        "not_started_count": 5,
+        "average_score": 82.5,
+        "average_time_spent": 415,
+        "item_statistics": {
+            f"q{i}": {
+                "attempts": 35,
+                "correct_count": 27,
+                "accuracy": 27 / 35,
+                "avg_score": 7.7,
+                "option_distribution": {"A": 20, "B": 8, "C": 5, "D": 2},
+                "knowledge_distribution": {"分数的意义": 12, "通分": 9},
+            }
+            for i in range(items)
+        },
+    }
+
+
+def run_legacy(events: int, stats: dict) -> float:
+    """旧路径：普通 dict，教师、学生、backplane 各序列化一次"""
+    channel = Channel(scope="session", id=1)
+    start = time.perf_counter()
+    for _ in range(events):
+        event = dict(
+            build_event(
+                type="submission_statistics_updated",
+                channel=channel,
+                delivery_mode="cast",
+                data=stats,
+            )
+        )
+        teacher_text = json.dumps(event)
+        student_text = json.dumps(event)
+        json.dumps({"kind": "broadcast", "scope": "session", "channel_id": 1, "message": student_text})
+        assert teacher_text
+    return time.perf_counter() - start
+
+
+def run_encoded_once(events: int, stats: dict) -> float:
+    """新路径：RealtimeEvent 序列化一次，各处复用"""
+    channel = Channel(scope="session", id=1)
+    start = time.perf_counter()
+    for _ in range(events):
+        event = build_event(
+            type="submission_statistics_updated",
+            channel=channel,
+            delivery_mode="cast",
+            data=stats,
+        )
+        teacher_text = encode_event(event)
+        student_text = encode_event(event)
+        encode_envelope({"kind": "broadcast", "scope": "session", "channel_id": 1, "message": student_text})
+        assert teacher_text is student_text
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="实时事件序列化微基准")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--items", type=int, default=10)
+    args = parser.parse_args()
+
+    stats = make_stats(args.items)
+    size = len(encode_event(build_event(
+        type="submission_statistics_updated",
+        channel=Channel(scope="session", id=1),
+        delivery_mode="cast",
+        data=stats,
+    )))
+
+    legacy = run_legacy(args.events, stats)
+    encoded = run_encoded_once(args.events, stats)
+
+    print("=" * 70)
+    print(f"{args.events} 个事件，每个约 {size} 字节，JSON 编码器: {'orjson' if orjson else 'json'}")
+    print("=" * 70)
+    print(f"逐步序列化   {legacy:.3f}s  {legacy / args.events * 1e6:8.1f}µs/事件")
+    print(f"只序列化一次 {encoded:.3f}s  {encoded / args.events * 1e6:8.1f}µs/事件")
+    print(f"加速比       {legacy / encoded:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+课堂提交统计基准测试
+
+对比 get_submission_statistics 的两种实现：
+- 旧实现：加载全部提交对象，在 Python 中挑选每个学生的最佳提交并遍历 responses
+- 新实现：窗口函数 + JSONB 聚合在数据库中完成，只返回聚合结果
+
+在临时表中生成模拟提交（会话结束即删除，不影响现有数据），
+分别在 50 / 500 / 5000 条提交规模下统计耗时与应用进程 CPU 时间，并校验两种实现结果一致。
+需要已执行迁移的 PostgreSQL 数据库（使用 DATABASE_URI 配置）。
+
+用法:
+    python scripts/bench_submission_statistics.py [--sizes 50,500,5000] [--items 10] [--repeat 10]
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert, select, text
+
+from app.core.database import AsyncSessionLocal
+from app.models.activity import ActivitySubmission, ActivitySubmissionStatus
+from app.services.realtime import get_submission_statistics
+
+CELL_ID = 1
+LESSON_ID = 1
+
+STATUS_PRIORITY = {
+    ActivitySubmissionStatus.DRAFT: 1,
+    ActivitySubmissionStatus.RETURNED: 2,
+    ActivitySubmissionStatus.SUBMITTED: 3,
+    ActivitySubmissionStatus.GRADED: 4,
+}
+
+
+def make_response(rng: random.Random, item: int):
+    """随机生成一道题的作答，覆盖 responses 支持的几种格式"""
+    kind = rng.random()
+    options = ["A", "B", "C", "D"]
+    if kind < 0.2:
+        return rng.choice(options)
+    if kind < 0.3:
+        return rng.sample(options, rng.randint(1, 3))
+    answer = rng.choice(options) if item % 3 else rng.sample(options, 2)
+    value = {
+        "answer": answer,
+        "correct": rng.random() < 0.6,
+        "time_spent": rng.randint(5, 120),
+    }
+    if rng.random() < 0.8:
+        value["score"] = rng.choice([0, 5, 10])
+    if rng.random() < 0.5:
+        value["knowledge_tags"] = rng.sample(["分数", "通分", "约分", "比较大小"], 2)
+    return value
+
+
+def make_rows(size: int, items: int, seed: int = 42):
+    """生成模拟提交：约三分之二的学生数，部分学生有多条提交"""
+    rng = random.Random(seed)
+    students = max(1, size * 2 // 3)
+    base = datetime(2026, 1, 1)
+    statuses = list(STATUS_PRIORITY)
+    rows = []
+    for i in range(size):
+        status = rng.choice(statuses)
+        rows.append({
+            "id": i + 1,
+            "cell_id": CELL_ID,
+            "lesson_id": LESSON_ID,
+            "student_id": i if i < students else rng.randrange(students),
+            "responses": {f"q{j}": make_response(rng, j) for j in range(items)},
+            "score": rng.choice([None, rng.uniform(0, 100)]),
+            "time_spent": rng.choice([None, rng.randint(30, 900)]),
+            "status": status,
+            "attempt_no": 1,
+            "auto_graded": False,
+            "is_late": False,
+            "created_at": base,
+            "updated_at": base + timedelta(seconds=rng.randint(0, 3600)),
+        })
+    return rows
+
+
+async def legacy_statistics(db, cell_id: int, lesson_id: int) -> dict:
+    """旧实现：取回全部提交对象，在 Python 中聚合（与改造前的逻辑一致）"""
+    result = await db.execute(
+        select(ActivitySubmission)
+        .where(ActivitySubmission.cell_id == cell_id)
+        .where(ActivitySubmission.lesson_id == lesson_id)
+        .order_by(ActivitySubmission.updated_at.desc())
+    )
+    best = {}
+    for submission in result.scalars().all():
+        existing = best.get(submission.student_id)
+        if existing is None:
+            best[submission.student_id] = submission
+            continue
+        current_priority = STATUS_PRIORITY.get(submission.status, 0)
+        existing_priority = STATUS_PRIORITY.get(existing.status, 0)
+        if current_priority > existing_priority or (
+            current_priority == existing_priority and submission.updated_at > existing.updated_at
+        ):
+            best[submission.student_id] = submission
+
+    status_dict = {}
+    for submission in best.values():
+        status_dict[submission.status.value] = status_dict.get(submission.status.value, 0) + 1
+    done = [
+        s for s in best.values()
+        if s.status in (ActivitySubmissionStatus.SUBMITTED, ActivitySubmissionStatus.GRADED)
+    ]
+    scores = [s.score for s in done if s.score is not None]
+    times = [s.time_spent for s in done if s.time_spent is not None]
+
+    items = {}
+    for submission in best.values():
+        for item_id, value in (submission.responses or {}).items():
+            agg = items.setdefault(item_id, {
+                "attempts": 0, "correct_count": 0, "scores": [], "times": [],
+                "options": {}, "knowledge": {},
+            })
+            agg["attempts"] += 1
+            answer = None
+            if isinstance(value, dict):
+                if value.get("is_correct") or value.get("correct"):
+                    agg["correct_count"] += 1
+                if isinstance(value.get("score"), (int, float)):
+                    agg["scores"].append(float(value["score"]))
+                if isinstance(value.get("time_spent"), (int, float)):
+                    agg["times"].append(float(value["time_spent"]))
+                answer = value.get("answer") or value.get("value") or value.get("text")
+                tags = value.get("knowledge_tags") or value.get("tags")
+                if isinstance(tags, list):
+                    for tag in tags:
+                        agg["knowledge"][str(tag)] = agg["knowledge"].get(str(tag), 0) + 1
+            elif isinstance(value, (str, int, float, list)):
+                answer = value
+            for option in answer if isinstance(answer, list) else ([] if answer is None else [answer]):
+                agg["options"][str(option)] = agg["options"].get(str(option), 0) + 1
+
+    item_statistics = {}
+    for item_id, agg in items.items():
+        stat = {
+            "attempts": agg["attempts"],
+            "correct_count": agg["correct_count"],
+            "accuracy": agg["correct_count"] / agg["attempts"],
+        }
+        if agg["scores"]:
+            stat["avg_score"] = sum(agg["scores"]) / len(agg["scores"])
+            stat["min_score"] = min(agg["scores"])
+            stat["max_score"] = max(agg["scores"])
+        if agg["options"]:
+            stat["option_distribution"] = agg["options"]
+        if agg["times"]:
+            stat["avg_time"] = sum(agg["times"]) / len(agg["times"])
+        if agg["knowledge"]:
+            stat["knowledge_distribution"] = agg["knowledge"]
+        item_statistics[item_id] = stat
+
+    return {
+        "submitted_count": status_dict.get("submitted", 0) + status_dict.get("graded", 0),
+        "draft_count": status_dict.get("draft", 0),
+        "average_score": sum(scores) / len(scores) if scores else None,
+        "average_time_spent": int(sum(times) / len(times)) if times else 0,
+        "item_statistics": item_statistics,
+    }
+
+
+def same(a, b) -> bool:
+    """递归比较统计结果（浮点数允许误差）"""
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    return a == b
+
+
+async def timed(fn, repeat: int):
+    """返回 (耗时中位数, 应用进程 CPU 时间中位数, 结果)，单位毫秒"""
+    samples = []
+    cpu_samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = await fn()
+        cpu_samples.append((time.process_time() - cpu_start) * 1000)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    cpu_samples.sort()
+    return samples[len(samples) // 2], cpu_samples[len(cpu_samples) // 2], result
+
+
+async def bench_size(size: int, items: int, repeat: int):
+    async with AsyncSessionLocal() as db:
+        # 临时表与正式表同名，在当前会话中优先于 public.activity_submissions
+        await db.execute(text(
+            "CREATE TEMP TABLE activity_submissions "
+            "(LIKE public.activity_submissions INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        await db.execute(insert(ActivitySubmission.__table__), make_rows(size, items))
+
+        async def run_legacy():
+            db.expunge_all()
+            return await legacy_statistics(db, CELL_ID, LESSON_ID)
+
+        async def run_sql():
+            return await get_submission_statistics(db, CELL_ID, LESSON_ID)
+
+        legacy_ms, legacy_cpu, legacy = await timed(run_legacy, repeat)
+        sql_ms, sql_cpu, current = await timed(run_sql, repeat)
+        await db.rollback()
+
+    matched = same(legacy, {k: current[k] for k in legacy})
+    print(
+        f"{size:>6} 条提交  "
+        f"旧实现 {legacy_ms:8.2f}ms (CPU {legacy_cpu:7.2f}ms)  "
+        f"数据库聚合 {sql_ms:8.2f}ms (CPU {sql_cpu:7.2f}ms)  "
+        f"结果一致: {'是' if matched else '否'}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="课堂提交统计基准测试")
+    parser.add_argument("--sizes", default="50,500,5000")
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"每份提交 {args.items} 道题，每个规模重复 {args.repeat} 次取中位数")
+    print("CPU 为应用进程自身的 CPU 时间（不含数据库），即占用事件循环的时间")
+    print("=" * 80)
+    for size in (int(s) for s in args.sizes.split(",")):
+        await bench_size(size, args.items, args.repeat)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,153 @@
+"""
+WebSocket 广播延迟压测
+
+向 500 个模拟连接广播消息，其中少量连接很慢（模拟网络差的学生），
+对比逐个 await 发送（旧实现）与发送队列 + 写任务（ConnectionManager）
+的投递延迟 p50 / p99。
+
+用法:
+    python scripts/bench_ws_fanout.py [--sockets 500] [--messages 20] [--slow-ratio 0.02]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from starlette.websockets import WebSocketState
+
+from app.core.config import settings
+from app.models.user import UserRole
+from app.services.websocket_manager import ConnectionManager
+from app.services.ws_backplane import InMemoryBackplane
+
+
+class FakeWebSocket:
+    """模拟 WebSocket：每次发送耗时 delay 秒，记录每条消息的到达时间"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.client_state = WebSocketState.CONNECTED
+        self.received_at: dict = {}
+
+    async def send_text(self, text: str):
+        await asyncio.sleep(self.delay)
+        self.received_at[json.loads(text)["seq"]] = time.perf_counter()
+
+    async def close(self):
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+def make_sockets(count: int, slow_ratio: float, slow_delay: float):
+    rng = random.Random(42)
+    sockets = []
+    for i in range(count):
+        if rng.random() < slow_ratio:
+            sockets.append(FakeWebSocket(slow_delay))
+        else:
+            sockets.append(FakeWebSocket(rng.uniform(0.0001, 0.001)))
+    return sockets
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def collect_latencies(sockets, sent_at):
+    latencies = []
+    for ws in sockets:
+        for seq, start in sent_at.items():
+            if seq in ws.received_at:
+                latencies.append((ws.received_at[seq] - start) * 1000)
+    return latencies
+
+
+async def bench_sequential(sockets, messages: int):
+    """旧实现：逐个 await send_text"""
+    sent_at = {}
+    for seq in range(messages):
+        text = json.dumps({"type": "navigate", "seq": seq})
+        sent_at[seq] = time.perf_counter()
+        for ws in sockets:
+            await ws.send_text(text)
+    return collect_latencies(sockets, sent_at)
+
+
+async def bench_queued(sockets, messages: int):
+    """新实现：ConnectionManager 发送队列"""
+    manager = ConnectionManager(backplane=InMemoryBackplane())
+    await manager.start()
+    for user_id, ws in enumerate(sockets):
+        await manager.connect_v2(
+            websocket=ws,  # type: ignore[arg-type]
+            scope="session",
+            channel_id=1,
+            user_id=user_id,
+            role=UserRole.STUDENT,
+        )
+
+    sent_at = {}
+    for seq in range(messages):
+        sent_at[seq] = time.perf_counter()
+        await manager.send_to_student({"type": "navigate", "seq": seq}, "session", 1, [])
+    await manager.flush()
+    await manager.stop()
+    return collect_latencies(sockets, sent_at)
+
+
+def report(name, latencies, expected):
+    print(
+        f"{name:<12} 投递 {len(latencies)}/{expected}  "
+        f"p50={percentile(latencies, 50):8.2f}ms  "
+        f"p99={percentile(latencies, 99):8.2f}ms  "
+        f"max={max(latencies) if latencies else 0:8.2f}ms  "
+        f"mean={statistics.mean(latencies) if latencies else 0:8.2f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="WebSocket 广播延迟压测")
+    parser.add_argument("--sockets", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--slow-ratio", type=float, default=0.02)
+    parser.add_argument("--slow-delay", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # 避免 print 日志干扰结果
+    sys.stdout = open(os.devnull, "w")
+    try:
+        seq_latencies = await bench_sequential(
+            make_sockets(args.sockets, args.slow_ratio, args.slow_delay), args.messages
+        )
+        queued_latencies = await bench_queued(
+            make_sockets(args.sockets, args.slow_ratio, args.slow_delay), args.messages
+        )
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys.__stdout__
+
+    expected = args.sockets * args.messages
+    print("=" * 80)
+    print(
+        f"{args.sockets} 个连接 × {args.messages} 条消息，"
+        f"慢连接比例 {args.slow_ratio:.0%}（每次发送 {args.slow_delay * 1000:.0f}ms），"
+        f"发送超时 {settings.WS_SEND_TIMEOUT}s，策略 {settings.WS_SLOW_CONSUMER_POLICY}"
+    )
+    print("=" * 80)
+    report("逐个发送", seq_latencies, expected)
+    report("发送队列", queued_latencies, expected)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+文件存储整理与垃圾回收
+
+- gc: 删除引用数为 0 且超过保留时间的文件、没有记录的 blob、遗留的临时文件
+  和过期的分片上传会话
+- compact: 把 storage/resources 中旧的 uuid 命名文件替换为 blob 的硬链接，
+  URL 不变，内容重复的文件只占一份空间
+
+用法:
+    python scripts/file_store_gc.py gc [--grace-seconds 86400] [--dry-run]
+    python scripts/file_store_gc.py compact [--dry-run]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.core.database import close_db
+from app.services.chunked_upload import chunked_upload_service
+from app.services.file_store import file_store
+
+
+def format_size(size: int) -> str:
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="文件存储整理与垃圾回收")
+    parser.add_argument("command", choices=["gc", "compact"])
+    parser.add_argument("--grace-seconds", type=int, default=None, help="未被引用的文件保留时间（秒）")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不修改文件")
+    args = parser.parse_args()
+
+    prefix = "🔍 [dry-run] " if args.dry_run else ""
+    try:
+        if args.command == "gc":
+            stats = await file_store.collect_garbage(args.grace_seconds, dry_run=args.dry_run)
+            print(
+                f"{prefix}✅ 回收 {stats['blobs']} 个无引用文件、{stats['orphans']} 个无记录文件、"
+                f"{stats['temp_files']} 个临时文件，释放 {format_size(stats['bytes_freed'])}"
+            )
+            if not args.dry_run:
+                sessions = await asyncio.to_thread(chunked_upload_service.purge_expired)
+                print(f"✅ 清理 {sessions} 个过期的分片上传会话")
+        else:
+            stats = await file_store.compact(dry_run=args.dry_run)
+            print(
+                f"{prefix}✅ 扫描 {stats['scanned']} 个旧文件，并入 {stats['linked']} 个，"
+                f"去重节省 {format_size(stats['bytes_saved'])}"
+            )
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+补建班级每日统计汇总
+
+根据已有的考勤、正面行为、纪律、值日记录重新计算 classroom_daily_stats。
+执行 add_classroom_daily_stats 迁移后运行一次；之后记录写入时会自动更新汇总，
+只有直接修改过原始记录或修改了 CLASSROOM_STATS_TIMEZONE 时才需要再次运行。逐个班级计算并提交。
+
+用法:
+    python scripts/rebuild_classroom_daily_stats.py [--classroom-id 1] [--from 2026-01-01] [--to 2026-12-31]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date, datetime
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import func, select, union_all
+
+from app.core.database import AsyncSessionLocal, close_db
+from app.models.classroom_assistant import (
+    AttendanceSession,
+    DisciplineRecord,
+    DutyAssignment,
+    PositiveBehavior,
+)
+from app.services.classroom_stats import rebuild_daily_stats, stats_day
+
+
+async def classroom_ranges(db, classroom_id=None):
+    """每个有记录的班级最早、最晚的记录时间"""
+    moments = union_all(
+        select(AttendanceSession.classroom_id.label("classroom_id"), AttendanceSession.started_at.label("at")),
+        select(PositiveBehavior.classroom_id, PositiveBehavior.recorded_at),
+        select(DisciplineRecord.classroom_id, DisciplineRecord.recorded_at),
+        select(DutyAssignment.classroom_id, DutyAssignment.duty_date),
+    ).subquery()
+    query = (
+        select(moments.c.classroom_id, func.min(moments.c.at), func.max(moments.c.at))
+        .group_by(moments.c.classroom_id)
+        .order_by(moments.c.classroom_id)
+    )
+    if classroom_id is not None:
+        query = query.where(moments.c.classroom_id == classroom_id)
+    return (await db.execute(query)).all()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="补建班级每日统计汇总")
+    parser.add_argument("--classroom-id", type=int, default=None, help="只处理该班级（默认全部班级）")
+    parser.add_argument("--from", dest="from_day", type=date.fromisoformat, default=None, help="开始日期（统计时区，默认最早记录）")
+    parser.add_argument("--to", dest="to_day", type=date.fromisoformat, default=None, help="结束日期（统计时区，默认最晚记录）")
+    args = parser.parse_args()
+
+    async with AsyncSessionLocal() as db:
+        ranges = await classroom_ranges(db, args.classroom_id)
+        if not ranges:
+            print("没有需要汇总的记录")
+            return
+
+        total_rows = 0
+        started = datetime.now()
+        for classroom_id, first_at, last_at in ranges:
+            start_day = args.from_day or stats_day(first_at)
+            end_day = args.to_day or stats_day(last_at)
+            if start_day > end_day:
+                continue
+            try:
+                rows = await rebuild_daily_stats(db, classroom_id, start_day, end_day)
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                print(f"❌ 班级 {classroom_id} 汇总失败: {e}")
+                continue
+            total_rows += rows
+            print(f"✅ 班级 {classroom_id}: {start_day} ~ {end_day}，写入 {rows} 行")
+
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"完成：{len(ranges)} 个班级，共 {total_rows} 行，耗时 {elapsed:.1f}s")
+    await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+"""
+测试公共夹具
+"""
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import engine
+
+
+@pytest.fixture
+async def db():
+    """
+    连接配置的数据库（DATABASE_URI），测试结束后整体回滚
+
+    被测代码中的 commit 只提交到保存点，不会写入数据库；数据库不可用时跳过测试。
+    """
+    try:
+        conn = await engine.connect()
+    except Exception as exc:
+        pytest.skip(f"数据库不可用: {exc}")
+
+    transaction = await conn.begin()
+    session = AsyncSession(
+        bind=conn,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+    try:
+        yield session
+    finally:
+        await session.close()
+        await transaction.rollback()
+        await conn.close()
+        # 每个测试使用独立的事件循环，不复用连接池中的连接
+        await engine.dispose()
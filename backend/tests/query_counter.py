@@ -0,0 +1,52 @@
+"""
+SQL 语句计数工具
+
+用于查询次数回归测试：统计代码块中实际执行的 SQL 语句，
+确保列表 / 详情接口的查询次数不随数据量增长（避免 N+1 查询）。
+
+用法:
+    with QueryCounter() as counter:
+        await get_learning_paths(db=db, skip=0, limit=100, published_only=True)
+    assert counter.count == 1, counter.report()
+"""
+
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.database import engine as default_engine
+
+# 测试夹具的保存点等事务控制语句不计入
+IGNORED_PREFIXES = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryCounter:
+    """在上下文内记录引擎执行的每条 SQL 语句"""
+
+    def __init__(self, engine: Optional[AsyncEngine] = None):
+        self.engine = engine or default_engine
+        self.statements: List[str] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(IGNORED_PREFIXES):
+            return
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def report(self) -> str:
+        """列出执行过的语句，作为断言失败时的提示信息"""
+        lines = [f"共执行 {self.count} 条 SQL:"]
+        lines.extend(f"  {i + 1}. {' '.join(sql.split())[:200]}" for i, sql in enumerate(self.statements))
+        return "\n".join(lines)
@@ -0,0 +1,150 @@
+"""
+活动统计增量聚合测试：增量结果必须与全量重算一致
+"""
+
+import json
+import random
+
+from app.services.activity_statistics import StatisticsAggregate, build_contribution
+
+STATUSES = ["draft", "submitted", "graded", "returned"]
+OPTIONS = ["A", "B", "C", "D"]
+TAGS = ["分数的意义", "通分", "约分"]
+
+
+def random_responses(rng):
+    responses = {}
+    for item_id in rng.sample(["q1", "q2", "q3", "q4"], rng.randint(0, 4)):
+        if rng.random() < 0.1:
+            # 非字典答案不参与题目统计
+            responses[item_id] = rng.choice(OPTIONS)
+            continue
+        item = {"is_correct": rng.random() < 0.6}
+        if rng.random() < 0.5:
+            item["answer"] = rng.sample(OPTIONS, rng.randint(1, 3))
+        else:
+            item["answer"] = rng.choice(OPTIONS)
+        if rng.random() < 0.7:
+            item["score"] = rng.choice([0, 2.5, 5, 10])
+        if rng.random() < 0.5:
+            item["time_spent"] = rng.randint(5, 120)
+        if rng.random() < 0.4:
+            item["knowledge_tags"] = rng.sample(TAGS, rng.randint(1, 2))
+        responses[item_id] = item
+    return responses
+
+
+def random_submission(rng):
+    return build_contribution(
+        status=rng.choice(STATUSES),
+        score=rng.choice([None, 0, 60, 72.5, 88, 100]),
+        time_spent=rng.choice([None, 30, 95, 300]),
+        responses=random_responses(rng),
+    )
+
+
+def reload(aggregate):
+    """模拟写入数据库再读回 aggregate_state"""
+    return StatisticsAggregate.from_state(json.loads(json.dumps(aggregate.to_state())))
+
+
+def test_incremental_matches_full_recompute():
+    rng = random.Random(2024)
+    submissions = {}
+    incremental = StatisticsAggregate.from_contributions([])
+
+    for step in range(2000):
+        action = rng.random()
+        if action < 0.35 or not submissions:
+            submission_id = step
+            after = random_submission(rng)
+            submissions[submission_id] = after
+            changes = [(None, after)]
+        elif action < 0.9:
+            submission_id = rng.choice(list(submissions))
+            before = submissions[submission_id]
+            after = random_submission(rng)
+            submissions[submission_id] = after
+            changes = [(before, after)]
+        else:
+            submission_id = rng.choice(list(submissions))
+            changes = [(submissions.pop(submission_id), None)]
+
+        incremental = reload(incremental)
+        for before, after in changes:
+            if before is not None:
+                incremental.add(before, -1)
+            if after is not None:
+                incremental.add(after, 1)
+        assert incremental.is_consistent()
+
+        if step % 100 == 0:
+            full = StatisticsAggregate.from_contributions(submissions.values())
+            assert incremental.summary() == full.summary()
+            assert incremental.item_summaries() == full.item_summaries()
+
+    full = StatisticsAggregate.from_contributions(submissions.values())
+    assert incremental.summary() == full.summary()
+    assert incremental.item_summaries() == full.item_summaries()
+    assert incremental.to_state() == full.to_state()
+
+
+def test_summary_fields():
+    contributions = [
+        build_contribution(
+            status="graded",
+            score=80,
+            time_spent=100,
+            responses={"q1": {"answer": ["A", "B"], "is_correct": True, "score": 5}},
+        ),
+        build_contribution(
+            status="submitted",
+            score=60,
+            time_spent=51,
+            responses={"q1": {"answer": "A", "is_correct": False, "score": 0}},
+        ),
+        build_contribution(status="draft", score=None, time_spent=None, responses={"q1": "A"}),
+    ]
+    aggregate = StatisticsAggregate.from_contributions(contributions)
+
+    summary = aggregate.summary()
+    assert summary["total_students"] == 3
+    assert summary["draft_count"] == 1
+    assert summary["submitted_count"] == 1
+    assert summary["graded_count"] == 1
+    assert summary["average_score"] == 70
+    assert summary["highest_score"] == 80
+    assert summary["lowest_score"] == 60
+    assert summary["average_time_spent"] == 75
+
+    item = aggregate.item_summaries()["q1"]
+    assert item["attempts"] == 2
+    assert item["accuracy"] == 0.5
+    assert item["avg_score"] == 2.5
+    assert item["option_distribution"] == {"A": 2, "B": 1}
+    assert item["score_values"] == [0.0, 5.0]
+
+
+def test_removing_unknown_contribution_is_detected():
+    aggregate = StatisticsAggregate.from_contributions([])
+    aggregate.add(
+        build_contribution(status="graded", score=90, time_spent=None, responses={}),
+        -1,
+    )
+    assert not aggregate.is_consistent()
+
+
+async def test_unchanged_contribution_does_not_lock_statistics():
+    """贡献没有变化的保存不查询（不锁定）统计记录"""
+    from app.services.activity_statistics import apply_submission_changes
+
+    class NoQuerySession:
+        async def execute(self, *args, **kwargs):
+            raise AssertionError("不应查询统计记录")
+
+    responses = random_responses(random.Random(7))
+    before = build_contribution(status="draft", score=None, time_spent=30, responses=responses)
+    after = build_contribution(status="draft", score=None, time_spent=30, responses=dict(responses))
+
+    assert await apply_submission_changes(NoQuerySession(), 1, 1, [(before, after)]) is None
+    assert await apply_submission_changes(NoQuerySession(), 1, 1, []) is None
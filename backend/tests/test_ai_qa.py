@@ -0,0 +1,319 @@
+"""
+AI问答服务测试：使用本地 OpenAI 兼容的假服务，验证请求合并、回答缓存、并发限制与流式回答
+"""
+
+import asyncio
+import json
+import uuid
+
+import httpx
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from app.services.ai_qa import AIQAService, AIStreamEvent, sse_answer_events
+
+
+def _fake_openai(delay: float = 0.05):
+    """OpenAI 兼容的 /chat/completions，记录调用次数和最大并发数"""
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.active = 0
+    app.state.max_active = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(payload: dict):
+        app.state.calls += 1
+        if payload.get("stream"):
+            return StreamingResponse(_stream_chunks(["光合", "作用", "是……"]), media_type="text/event-stream")
+        app.state.active += 1
+        app.state.max_active = max(app.state.max_active, app.state.active)
+        await asyncio.sleep(delay)
+        app.state.active -= 1
+        return {
+            "choices": [{"message": {"role": "assistant", "content": f"回答#{app.state.calls}"}}],
+            "usage": {"total_tokens": 12},
+        }
+
+    return app
+
+
+async def _stream_chunks(texts):
+    for text in texts:
+        chunk = {"choices": [{"delta": {"content": text}}]}
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def _service(app, **kwargs) -> AIQAService:
+    service = AIQAService(transport=httpx.ASGITransport(app=app), **kwargs)
+    service.openai_api_key = "sk-test"
+    service.openai_base_url = "http://fake-openai/v1"
+    return service
+
+
+async def test_identical_questions_coalesced_and_cached():
+    app = _fake_openai()
+    service = _service(app, cache_ttl=60, cache_size=10)
+    cell = {"type": "text", "html": "<p>光合作用</p>"}
+
+    # 40 个学生同时问同一个问题（空白、大小写、句末标点不同）
+    questions = [f"什么是光合作用{'？' if i % 2 else ''}" + " " * (i % 3) for i in range(40)]
+    responses = await asyncio.gather(*(
+        service.ask_question(question, context="Cell ID: 1", lesson_title="生物", cell_content=cell)
+        for question in questions
+    ))
+    assert app.state.calls == 1
+    assert {response.answer for response in responses} == {"回答#1"}
+    assert service.stats["coalesced"] == 39
+
+    cached = await service.ask_question("什么是光合作用", context="Cell ID: 1", lesson_title="生物", cell_content=cell)
+    assert cached.answer == "回答#1" and app.state.calls == 1
+    assert service.stats["cache_hits"] == 1
+
+    # Cell 内容变化后是新的问题
+    changed = await service.ask_question(
+        "什么是光合作用", context="Cell ID: 1", lesson_title="生物", cell_content={**cell, "html": "<p>呼吸作用</p>"}
+    )
+    assert changed.answer == "回答#2"
+    await service.aclose()
+
+
+async def test_concurrency_limited_and_connection_reused():
+    app = _fake_openai()
+    service = _service(app, cache_ttl=0, max_concurrency=3)
+
+    responses = await asyncio.gather(*(service.ask_question(f"问题{i}") for i in range(10)))
+    assert app.state.calls == 10 and app.state.max_active <= 3
+    assert all(response.model_used == service.default_model for response in responses)
+
+    client = service._client
+    await service.ask_question("问题0")
+    assert service._client is client and app.state.calls == 11
+    await service.aclose()
+
+
+async def test_mock_fallback_not_cached():
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def unavailable():
+        return Response(status_code=503)
+
+    service = _service(app, cache_ttl=60)
+    service._get_mock_response = _instant_mock
+    await service.ask_question("问题")
+    await service.ask_question("问题")
+    assert service.stats["upstream_calls"] == 2 and service.stats["cache_hits"] == 0
+    await service.aclose()
+
+
+async def _instant_mock(prompt):
+    return {"answer": "模拟回答", "confidence": 0.75, "is_mock": True}
+
+
+def _gated_service():
+    """流式上游发送第一个片段后等待 release 再发送其余片段（ASGITransport 会缓冲整个响应）"""
+    calls = []
+    release = asyncio.Event()
+
+    def chunk(text):
+        return f"data: {json.dumps({'choices': [{'delta': {'content': text}}]}, ensure_ascii=False)}\n\n".encode()
+
+    class GatedStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield chunk("光合")
+            await release.wait()
+            yield chunk("作用") + chunk("是……") + b"data: [DONE]\n\n"
+
+    async def handler(request):
+        calls.append(request)
+        return httpx.Response(200, stream=GatedStream())
+
+    service = AIQAService(transport=httpx.MockTransport(handler), cache_ttl=60, max_concurrency=1)
+    service.openai_api_key = "sk-test"
+    service.openai_base_url = "http://fake-openai/v1"
+    return service, calls, release
+
+
+async def test_stream_question_tokens_and_cache():
+    app = _fake_openai()
+    service = _service(app, cache_ttl=60)
+
+    events = [event async for event in service.stream_question("什么是光合作用", lesson_title="生物")]
+    assert [event.delta for event in events[:-1]] == ["光合", "作用", "是……"]
+    result = events[-1].result
+    assert events[-1].done and result.answer == "光合作用是……"
+    assert result.first_token_time is not None and result.first_token_time <= result.response_time
+    assert service.summary()["first_token_ms_p50"] >= 0
+
+    # 完整回答进入缓存，非流式提问直接命中
+    cached = await service.ask_question("什么是光合作用？", lesson_title="生物")
+    assert cached.answer == "光合作用是……" and app.state.calls == 1
+    await service.aclose()
+
+
+async def test_stream_closed_early_releases_upstream():
+    service, calls, release = _gated_service()
+
+    stream = service.stream_question("问题")
+    assert (await stream.__anext__()).delta == "光合"
+    await stream.aclose()
+    assert service._limiter._value == 1
+
+    # 未完成的回答不缓存
+    release.set()
+    events = [event async for event in service.stream_question("问题")]
+    assert events[-1].result.answer == "光合作用是……" and len(calls) == 2
+    await service.aclose()
+
+
+async def test_identical_streams_share_upstream():
+    """相同问题的流式提问共用一个上游流：后加入者先收到已有片段，先离开者不影响其他人"""
+    service, calls, release = _gated_service()
+    first = service.stream_question("什么是光合作用")
+    assert (await first.__anext__()).delta == "光合"
+    second = service.stream_question("什么是光合作用？")
+    assert (await second.__anext__()).delta == "光合"
+    leaver = service.stream_question("什么是光合作用")
+    assert (await leaver.__anext__()).delta == "光合"
+    await leaver.aclose()
+
+    release.set()
+    rest = [event async for event in second]
+    assert "".join(event.delta for event in rest[:-1]) == "作用是……"
+    assert rest[-1].result.answer == "光合作用是……"
+    events = [event async for event in first]
+    assert events[-1].result.answer == "光合作用是……"
+    assert len(calls) == 1 and service.stats["coalesced"] == 2
+    assert not service._streams and service._limiter._value == 1
+    await service.aclose()
+
+
+async def test_slow_reader_pauses_upstream():
+    """最慢的客户端落后 stream_buffer 个片段时暂停读取上游，离开的客户端不再拖慢其他人"""
+    sent = []
+
+    class CountingStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for i in range(20):
+                sent.append(i)
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': str(i)}}]})}\n\n".encode()
+            yield b"data: [DONE]\n\n"
+
+    async def handler(request):
+        return httpx.Response(200, stream=CountingStream())
+
+    service = AIQAService(transport=httpx.MockTransport(handler), cache_ttl=60, stream_buffer=2)
+    service.openai_api_key = "sk-test"
+    service.openai_base_url = "http://fake-openai/v1"
+
+    slow = service.stream_question("问题")
+    fast = service.stream_question("问题")
+    assert (await slow.__anext__()).delta == "0"
+    assert [(await fast.__anext__()).delta for _ in range(3)] == ["0", "1", "2"]
+    for _ in range(20):
+        await asyncio.sleep(0)
+    assert len(sent) <= 4
+
+    await slow.aclose()
+    events = [event async for event in fast]
+    assert events[-1].result.answer == "".join(str(i) for i in range(20)) and len(sent) == 20
+    await service.aclose()
+
+
+async def test_stream_mock_fallback_reports_mock_model():
+    service = AIQAService(cache_ttl=60)
+    service.openai_api_key = ""
+    service._get_mock_response = _instant_mock
+    events = [event async for event in service.stream_question("问题")]
+    assert events[-1].result.answer == "模拟回答" and events[-1].result.model_used == "mock"
+
+
+async def test_stream_waits_for_inflight_question():
+    """相同问题的非流式请求正在进行时，流式提问等待它并一次返回完整回答"""
+    app = _fake_openai()
+    service = _service(app, cache_ttl=60)
+
+    asking = asyncio.ensure_future(service.ask_question("问题"))
+    await asyncio.sleep(0)
+    events = [event async for event in service.stream_question("问题")]
+    assert [event.delta for event in events[:-1]] == ["回答#1"]
+    assert (await asking).answer == "回答#1" and app.state.calls == 1
+    await service.aclose()
+
+
+async def test_sse_events_and_error():
+    async def answer():
+        yield AIStreamEvent(delta="部分")
+        raise httpx.ReadError("连接中断")
+
+    finished = []
+
+    async def finish(result):
+        finished.append(result)
+        return {}
+
+    events = [chunk.decode() async for chunk in sse_answer_events(answer(), finish)]
+    assert events[0] == 'event: token\ndata: {"text": "部分"}\n\n'
+    assert events[1].startswith("event: error\n") and not finished
+
+
+async def _create_qa_cell(db):
+    """创建教师、课程和一个问答 Cell"""
+    from app.models.cell import Cell, CellType
+    from app.models.curriculum import Course, Grade, Subject
+    from app.models.lesson import Lesson, LessonStatus
+    from app.models.user import User, UserRole
+
+    prefix = uuid.uuid4().hex[:8]
+    teacher = User(username=f"t_{prefix}", email=f"{prefix}@test.local", hashed_password="x", role=UserRole.TEACHER)
+    subject = Subject(name=f"学科{prefix}", code=f"s-{prefix}")
+    grade = Grade(name=f"年级{prefix}", level=int(prefix, 16) % 10**9 + 100)
+    db.add_all([teacher, subject, grade])
+    await db.flush()
+    course = Course(subject_id=subject.id, grade_id=grade.id, name="课程")
+    db.add(course)
+    await db.flush()
+    lesson = Lesson(title="生物", creator_id=teacher.id, course_id=course.id, status=LessonStatus.DRAFT)
+    db.add(lesson)
+    await db.flush()
+    cell = Cell(lesson_id=lesson.id, cell_type=CellType.QA, content={"question": ""})
+    db.add(cell)
+    await db.flush()
+    return teacher, cell
+
+
+async def test_cell_stream_persists_answer(db, monkeypatch):
+    from app.api.v1 import cells
+    from app.schemas.cell import QAQuestionRequest
+
+    teacher, cell = await _create_qa_cell(db)
+    service = _service(_fake_openai(), cache_ttl=0)
+    monkeypatch.setattr(cells, "ai_qa_service", service)
+    response = await cells.ask_question(
+        cell.id, QAQuestionRequest(question="什么是光合作用"), stream=True, db=db, current_user=teacher
+    )
+    body = "".join([chunk.decode() async for chunk in response.body_iterator])
+    assert body.count("event: token") == 3 and "event: done" in body
+
+    await db.refresh(cell)
+    assert cell.content["answer"] == "光合作用是……" and cell.content["isAIAnswer"] is True
+    await service.aclose()
+
+
+async def test_cell_repeat_question_hits_cache(db, monkeypatch):
+    """保存的上一次问答不改变缓存键：同一 Cell 上重复提问只调用一次上游"""
+    from app.api.v1 import cells
+    from app.schemas.cell import QAQuestionRequest
+
+    teacher, cell = await _create_qa_cell(db)
+    app = _fake_openai()
+    service = _service(app, cache_ttl=60)
+    monkeypatch.setattr(cells, "ai_qa_service", service)
+    for _ in range(2):
+        response = await cells.ask_question(
+            cell.id, QAQuestionRequest(question="什么是光合作用"), stream=False, db=db, current_user=teacher
+        )
+        assert response.answer == "回答#1"
+    assert app.state.calls == 1 and service.stats["cache_hits"] == 1
+    await service.aclose()
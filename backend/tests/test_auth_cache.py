@@ -0,0 +1,138 @@
+"""
+认证用户缓存测试
+"""
+
+import dataclasses
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.user import UserRole
+from app.schemas.user import UserResponse
+from app.services import auth_cache
+from app.services.auth_cache import Principal, PrincipalCache
+
+
+def make_principal(user_id: int = 1, **overrides) -> Principal:
+    now = datetime(2026, 1, 1)
+    user = SimpleNamespace(
+        id=user_id,
+        email=f"u{user_id}@example.com",
+        username=f"user{user_id}",
+        hashed_password="secret",
+        full_name="张三",
+        role=UserRole.TEACHER,
+        is_active=True,
+        is_superuser=False,
+        student_id_number=None,
+        avatar_url=None,
+        region_id=3,
+        school_id=5,
+        grade_id=None,
+        classroom_id=None,
+        created_at=now,
+        updated_at=now,
+        last_login=None,
+    )
+    for key, value in overrides.items():
+        setattr(user, key, value)
+    return Principal.from_user(user, region_name="海淀区", school_name="第一小学")
+
+
+def test_principal_is_frozen_and_serializable():
+    principal = make_principal()
+    assert not hasattr(principal, "hashed_password")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        principal.role = UserRole.ADMIN  # type: ignore[misc]
+
+    response = UserResponse.model_validate(principal)
+    assert response.username == "user1"
+    assert response.role == UserRole.TEACHER
+    assert (response.region_name, response.school_name, response.grade_name) == (
+        "海淀区",
+        "第一小学",
+        None,
+    )
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(auth_cache.time, "monotonic", lambda: clock[0])
+    cache = PrincipalCache(ttl=10, max_size=2)
+
+    cache.put(make_principal(1))
+    cache.put(make_principal(2))
+    assert cache.get(1) is not None  # 1 变为最近使用
+    cache.put(make_principal(3))
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+
+    clock[0] += 10
+    assert cache.get(1) is None
+
+
+async def test_load_uses_cache_and_invalidation(monkeypatch):
+    calls = []
+
+    async def fake_load(db, user_id):
+        calls.append(user_id)
+        return make_principal(user_id)
+
+    monkeypatch.setattr(auth_cache, "load_principal", fake_load)
+    cache = PrincipalCache(ttl=60, max_size=10)
+
+    assert (await cache.load(None, 7)).id == 7
+    await cache.load(None, 7)
+    assert calls == [7]
+
+    cache.invalidate(7)
+    await cache.load(None, 7)
+    assert calls == [7, 7]
+    assert cache.stats()["hits"] == 1
+
+
+async def test_invalidation_during_load_is_not_overwritten(monkeypatch):
+    cache = PrincipalCache(ttl=60, max_size=10)
+
+    async def slow_load(db, user_id):
+        # 查询进行中用户被管理员修改
+        cache.invalidate(user_id)
+        return make_principal(user_id, is_active=True)
+
+    monkeypatch.setattr(auth_cache, "load_principal", slow_load)
+    await cache.load(None, 9)
+    assert cache.get(9) is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PrincipalCache(ttl=0, max_size=10)
+    cache.put(make_principal(1))
+    assert cache.get(1) is None
+
+
+async def test_invalidation_reaches_other_workers(monkeypatch):
+    """管理员在一个 worker 上禁用用户后，其他 worker 的缓存同时失效"""
+    from app.services.websocket_manager import ConnectionManager
+    from app.services.ws_backplane import InMemoryBackplane, InMemoryHub
+
+    hub = InMemoryHub()
+    worker_a, worker_b = ConnectionManager(InMemoryBackplane(hub)), ConnectionManager(InMemoryBackplane(hub))
+    await worker_a.start()
+    await worker_b.start()
+    monkeypatch.setattr(auth_cache, "manager", worker_a)
+
+    cache_a, cache_b = PrincipalCache(ttl=60, max_size=10), PrincipalCache(ttl=60, max_size=10)
+    worker_b.register_backplane_handler(auth_cache.INVALIDATION_MESSAGE, cache_b._on_remote_invalidation)
+    for cache in (cache_a, cache_b):
+        cache.put(make_principal(1))
+        cache.put(make_principal(2))
+
+    await cache_a.invalidate_all_workers(1)
+    assert cache_a.get(1) is None and cache_b.get(1) is None
+    assert cache_b.get(2) is not None
+
+    await cache_a.clear_all_workers()
+    assert cache_b.get(2) is None
+    await worker_a.stop()
+    await worker_b.stop()
@@ -0,0 +1,139 @@
+"""
+流式上传与分片上传测试
+"""
+
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+from app.services import chunked_upload
+from app.services.chunked_upload import ChunkedUploadService
+from app.services.upload import upload_service
+
+
+async def stream(*pieces):
+    for piece in pieces:
+        yield piece
+
+
+async def test_receive_streams_hash_and_enforces_size():
+    content = os.urandom(2 * 1024 * 1024 + 5)
+    temp_path, sha256, size = await upload_service._receive(
+        UploadFile(io.BytesIO(content), filename="a.bin"), max_size=len(content)
+    )
+    try:
+        assert (sha256, size) == (hashlib.sha256(content).hexdigest(), len(content))
+        with open(temp_path, "rb") as f:
+            assert f.read() == content
+    finally:
+        os.remove(temp_path)
+
+    # 超过大小限制时返回 413，且不留下临时文件
+    before = set(os.listdir(os.path.dirname(temp_path)))
+    with pytest.raises(HTTPException) as exc:
+        await upload_service._receive(
+            UploadFile(io.BytesIO(content), filename="a.bin"), max_size=1024 * 1024
+        )
+    assert exc.value.status_code == 413
+    assert set(os.listdir(os.path.dirname(temp_path))) == before
+
+
+async def test_chunked_upload_out_of_order_and_resume(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHUNKED_UPLOAD_CHUNK_SIZE", 10)
+    service = ChunkedUploadService(root=str(tmp_path))
+    content = b"0123456789abcdefghijKLMNO"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    status = await service.create_session(1, "video.mp4", len(content), sha256)
+    upload_id = status["upload_id"]
+    assert status["chunk_count"] == 3 and status["received_chunks"] == []
+
+    # 其他用户看不到该会话
+    with pytest.raises(HTTPException) as exc:
+        await service.get_status(upload_id, 2)
+    assert exc.value.status_code == 404
+
+    # 乱序上传，分片可以分多次到达
+    await service.write_chunk(upload_id, 1, 2, stream(b"KLM", b"NO"))
+    await service.write_chunk(upload_id, 1, 0, stream(content[:10]))
+
+    # 长度不对的分片不会被记录
+    with pytest.raises(HTTPException):
+        await service.write_chunk(upload_id, 1, 1, stream(b"short"))
+    with pytest.raises(HTTPException):
+        await service.complete(upload_id, 1)
+
+    # 断点续传：查询缺少的分片后补传
+    status = await service.get_status(upload_id, 1)
+    assert status["received_chunks"] == [0, 2]
+    assert status["uploaded_size"] == 15
+    await service.write_chunk(upload_id, 1, 1, stream(content[10:20]))
+
+    stored = {}
+
+    async def fake_store(path, digest, size, filename, generate_thumbnail=False):
+        with open(path, "rb") as f:
+            stored["content"] = f.read()
+        os.remove(path)
+        return {"file_url": f"/uploads/resources/{digest}.mp4", "file_size": size}
+
+    monkeypatch.setattr(chunked_upload.upload_service, "store_assembled_file", fake_store)
+    result = await service.complete(upload_id, 1)
+
+    assert stored["content"] == content
+    assert result == {
+        "file_url": f"/uploads/resources/{sha256}.mp4",
+        "file_size": len(content),
+        "filename": "video.mp4",
+    }
+    assert os.listdir(tmp_path) == []
+
+
+async def test_chunked_upload_checksum_mismatch(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHUNKED_UPLOAD_CHUNK_SIZE", 4)
+    service = ChunkedUploadService(root=str(tmp_path))
+    status = await service.create_session(1, "a.pdf", 4, "0" * 64)
+    await service.write_chunk(status["upload_id"], 1, 0, stream(b"abcd"))
+
+    with pytest.raises(HTTPException) as exc:
+        await service.complete(status["upload_id"], 1)
+    assert exc.value.status_code == 400
+    assert os.listdir(tmp_path) == []
+
+
+async def test_failed_retry_clears_received_marker(tmp_path, monkeypatch):
+    """已接收的分片重传失败后按未上传处理，重新上传完整后恢复"""
+    monkeypatch.setattr(settings, "CHUNKED_UPLOAD_CHUNK_SIZE", 4)
+    service = ChunkedUploadService(root=str(tmp_path))
+    upload_id = (await service.create_session(1, "a.pdf", 8))["upload_id"]
+    await service.write_chunk(upload_id, 1, 0, stream(b"abcd"))
+    await service.write_chunk(upload_id, 1, 1, stream(b"efgh"))
+
+    async def disconnected():
+        yield b"XY"
+        raise ConnectionResetError("client disconnected")
+
+    with pytest.raises(ConnectionResetError):
+        await service.write_chunk(upload_id, 1, 0, disconnected())
+    with pytest.raises(HTTPException):
+        await service.write_chunk(upload_id, 1, 1, stream(b"efghi"))
+    status = await service.get_status(upload_id, 1)
+    assert status["received_chunks"] == []
+    assert os.listdir(os.path.join(tmp_path, upload_id, "received")) == []
+
+    await service.write_chunk(upload_id, 1, 0, stream(b"abcd"))
+    assert (await service.get_status(upload_id, 1))["received_chunks"] == [0]
+
+
+def test_purge_expired_sessions(tmp_path):
+    service = ChunkedUploadService(root=str(tmp_path))
+    old = tmp_path / ("a" * 32)
+    old.mkdir()
+    (old / "meta.json").write_text("{}")
+    os.utime(old / "meta.json", (0, 0))
+    assert service.purge_expired() == 1
+    assert not old.exists()
@@ -0,0 +1,30 @@
+"""
+批量导入班级成员：姓名匹配与错误信息测试
+"""
+
+from types import SimpleNamespace
+
+from app.schemas.classroom_assistant import ClassroomMemberBatchItem
+from app.services.classroom_member_import import describe_identifiers, match_full_name
+
+
+def _user(user_id, full_name):
+    return SimpleNamespace(id=user_id, full_name=full_name)
+
+
+def test_match_full_name_rules():
+    candidates = [_user(1, "李明"), _user(2, "李明明"), _user(3, "王芳"), _user(4, None)]
+
+    # 唯一包含
+    assert match_full_name("王", candidates).id == 3
+    assert match_full_name("明明", candidates).id == 2
+    # 多个包含时取完全同名
+    assert match_full_name("李明", candidates).id == 1
+    # 多个包含且没有同名、或没有包含
+    assert match_full_name("李", candidates) is None
+    assert match_full_name("赵", candidates) is None
+
+
+def test_describe_identifiers_lists_provided_fields():
+    item = ClassroomMemberBatchItem(user_id=7, full_name="张三", student_no="01")
+    assert describe_identifiers(item) == "用户ID=7, 姓名=张三, 学号=01"
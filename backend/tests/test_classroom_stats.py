@@ -0,0 +1,171 @@
+"""
+班级每日统计汇总测试：汇总与原始记录一致，区间统计只读取一次汇总表
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from app.models.classroom_assistant import (
+    AttendanceEntry,
+    AttendanceSession,
+    AttendanceStatus,
+    DisciplineEventType,
+    DisciplineRecord,
+    DutyAssignment,
+    DutyAssignmentStatus,
+    PositiveBehavior,
+    PositiveBehaviorType,
+)
+from app.models.curriculum import Grade
+from app.models.organization import Classroom, Region, School
+from app.models.user import User, UserRole
+from app.services.classroom_stats import load_period_stats, refresh_daily_stats
+from tests.query_counter import QueryCounter
+
+
+async def _create_classroom(db):
+    prefix = uuid.uuid4().hex[:8]
+    region = Region(name="测试区域", code=f"r-{prefix}", level=3)
+    db.add(region)
+    await db.flush()
+    school = School(name="测试学校", code=f"s-{prefix}", region_id=region.id, school_type="初中")
+    grade = Grade(name=f"测试年级{prefix}", level=int(prefix, 16) % 10**9 + 100)
+    db.add_all([school, grade])
+    await db.flush()
+    classroom = Classroom(name="测试班级", school_id=school.id, grade_id=grade.id)
+    users = [
+        User(username=f"{prefix}_{i}", email=f"{prefix}_{i}@test.local", hashed_password="x", role=UserRole.STUDENT)
+        for i in range(3)
+    ]
+    db.add(classroom)
+    db.add_all(users)
+    await db.flush()
+    return classroom.id, [user.id for user in users]
+
+
+async def test_period_stats_match_records(db):
+    classroom_id, (teacher_id, alice, bob) = await _create_classroom(db)
+    day1 = datetime(2026, 3, 2, 8, tzinfo=timezone.utc)
+    day2 = day1 + timedelta(days=1)
+
+    for started_at, statuses in ((day1, (AttendanceStatus.PRESENT, AttendanceStatus.LATE)),
+                                 (day2, (AttendanceStatus.PRESENT, AttendanceStatus.ABSENT))):
+        session_id = (await db.execute(
+            insert(AttendanceSession)
+            .values(classroom_id=classroom_id, initiated_by_user_id=teacher_id, started_at=started_at)
+            .returning(AttendanceSession.id)
+        )).scalar_one()
+        await db.execute(insert(AttendanceEntry), [
+            {"session_id": session_id, "student_id": student_id, "status": status, "updated_by_user_id": teacher_id}
+            for student_id, status in zip((alice, bob), statuses)
+        ])
+    await db.execute(insert(PositiveBehavior), [
+        {"classroom_id": classroom_id, "student_id": alice, "behavior_type": PositiveBehaviorType.CORRECT_ANSWER,
+         "points": 3, "recorded_by_user_id": teacher_id, "recorded_at": day1},
+        {"classroom_id": classroom_id, "student_id": bob, "behavior_type": PositiveBehaviorType.CORRECT_ANSWER,
+         "points": 3, "recorded_by_user_id": teacher_id, "recorded_at": day2},
+        {"classroom_id": classroom_id, "student_id": alice, "behavior_type": PositiveBehaviorType.OTHER,
+         "points": 1, "recorded_by_user_id": teacher_id, "recorded_at": day2},
+    ])
+    await db.execute(insert(DisciplineRecord).values(
+        classroom_id=classroom_id, student_id=bob, event_type=DisciplineEventType.OTHER,
+        recorded_by_user_id=teacher_id, recorded_at=day2,
+    ))
+    await db.execute(insert(DutyAssignment), [
+        {"classroom_id": classroom_id, "duty_date": day1, "assignee_user_id": alice, "status": DutyAssignmentStatus.COMPLETED},
+        {"classroom_id": classroom_id, "duty_date": day2, "assignee_user_id": bob, "status": DutyAssignmentStatus.PENDING},
+    ])
+    await refresh_daily_stats(db, classroom_id, day1, day2)
+
+    with QueryCounter() as counter:
+        totals = await load_period_stats(db, classroom_id, day1, day2)
+    assert counter.count == 1, counter.report()
+    assert totals["attendance_sessions"] == 2
+    assert (totals["attendance_present"], totals["attendance_late"], totals["attendance_absent"]) == (2, 1, 1)
+    assert totals["positive_records"] == 3 and totals["positive_points"] == 7
+    assert totals["positive_points_by_type"] == {"correct_answer": 6, "other": 1}
+    assert totals["discipline_by_type"] == {"other": 1}
+    assert (totals["duty_assignments"], totals["duty_completed"]) == (2, 1)
+
+    # 学生个人：考勤次数为本人的考勤记录数
+    mine = await load_period_stats(db, classroom_id, day1, day2, student_id=alice)
+    assert mine["attendance_sessions"] == 2 and mine["attendance_present"] == 2
+    assert mine["positive_points_by_type"] == {"correct_answer": 3, "other": 1}
+    assert mine["discipline_records"] == 0
+
+    # 只统计区间内的日期
+    first_day = await load_period_stats(db, classroom_id, day1, day1)
+    assert first_day["attendance_sessions"] == 1 and first_day["positive_points"] == 3
+
+    # 新增记录后刷新当天的汇总
+    await db.execute(insert(PositiveBehavior).values(
+        classroom_id=classroom_id, student_id=bob, behavior_type=PositiveBehaviorType.OTHER,
+        points=1, recorded_by_user_id=teacher_id, recorded_at=day1,
+    ))
+    await refresh_daily_stats(db, classroom_id, day1)
+    totals = await load_period_stats(db, classroom_id, day1, day2)
+    assert totals["positive_records"] == 4 and totals["positive_points_by_type"]["other"] == 2
+
+
+async def test_days_follow_stats_timezone(db, monkeypatch):
+    """本地凌晨（UTC 前一天）的记录计入本地当天"""
+    from app.core.config import settings
+    from app.services.classroom_stats import stats_day
+
+    monkeypatch.setattr(settings, "CLASSROOM_STATS_TIMEZONE", "Asia/Shanghai")
+    classroom_id, (teacher_id, alice, _) = await _create_classroom(db)
+    early_morning = datetime(2026, 3, 1, 23, 30, tzinfo=timezone.utc)  # 北京时间 3 月 2 日 07:30
+    late_evening = datetime(2026, 3, 2, 15, 30, tzinfo=timezone.utc)  # 北京时间 3 月 2 日 23:30
+    assert stats_day(early_morning) == stats_day(late_evening) == datetime(2026, 3, 2).date()
+    # 不带时区的时间按 UTC 解释
+    assert stats_day(datetime(2026, 3, 1, 16)) == datetime(2026, 3, 2).date()
+
+    await db.execute(insert(PositiveBehavior), [
+        {"classroom_id": classroom_id, "student_id": alice, "behavior_type": PositiveBehaviorType.OTHER,
+         "points": points, "recorded_by_user_id": teacher_id, "recorded_at": recorded_at}
+        for points, recorded_at in ((1, early_morning), (2, late_evening), (4, late_evening + timedelta(hours=1)))
+    ])
+    await refresh_daily_stats(db, classroom_id, early_morning, late_evening + timedelta(hours=1))
+
+    # "今天"：从本地零点（UTC 前一天 16:00）到现在
+    today = await load_period_stats(db, classroom_id, datetime(2026, 3, 1, 16), late_evening)
+    assert today["positive_records"] == 2 and today["positive_points"] == 3
+    next_day = await load_period_stats(
+        db, classroom_id, late_evening + timedelta(hours=1), late_evening + timedelta(hours=2)
+    )
+    assert next_day["positive_points"] == 4
+
+
+async def test_attendance_endpoints_refresh_stats_without_autoflush(db):
+    """接口通过 ORM 会话写入（与 AsyncSessionLocal 一样不自动刷新），汇总包含本次写入"""
+    from app.api.v1 import classroom_assistant
+    from app.models.classroom_assistant import ClassroomMembership, RoleInClass
+    from app.models.user import User
+    from app.schemas.classroom_assistant import AttendanceEntryUpdate, AttendanceSessionCreate
+
+    db.sync_session.autoflush = False
+    classroom_id, (teacher_id, alice, bob) = await _create_classroom(db)
+    teacher = ClassroomMembership(
+        classroom_id=classroom_id, user_id=teacher_id, role_in_class=RoleInClass.HEAD_TEACHER_PRIMARY
+    )
+    db.add_all([teacher] + [
+        ClassroomMembership(classroom_id=classroom_id, user_id=student_id, role_in_class=RoleInClass.STUDENT)
+        for student_id in (alice, bob)
+    ])
+    await db.flush()
+
+    session = await classroom_assistant.create_attendance_session(
+        classroom_id, AttendanceSessionCreate(), db=db, membership=teacher
+    )
+    today = datetime.now(timezone.utc)
+    stats = await load_period_stats(db, classroom_id, today, today)
+    assert stats["attendance_sessions"] == 1 and stats["attendance_present"] == 2
+
+    await classroom_assistant.update_attendance_entry(
+        session.id, bob, AttendanceEntryUpdate(status=AttendanceStatus.LATE),
+        db=db, current_user=await db.get(User, teacher_id),
+    )
+    stats = await load_period_stats(db, classroom_id, today, today)
+    assert stats["attendance_present"] == 1 and stats["attendance_late"] == 1
@@ -0,0 +1,143 @@
+"""
+课程导入阶段测试
+"""
+
+import json
+import os
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.course_import import (
+    ImportTracker,
+    detect_import_format,
+    extract_import_resources,
+    list_import_resources,
+    load_import_data,
+    validate_import_data,
+)
+
+
+def make_import_zip(path, data, resources):
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("data.json", json.dumps(data, ensure_ascii=False))
+        for name, content in resources.items():
+            archive.writestr(f"resources/{name}", content)
+
+
+def test_detect_import_format():
+    assert detect_import_format(b"PK\x03\x04rest", "courses.zip") == "zip"
+    # 扩展名与内容不一致时以内容为准
+    assert detect_import_format(b"PK\x03\x04rest", "courses.json") == "zip"
+    assert detect_import_format(b"\xef\xbb\xbf  {\"data\": {}}", "courses.zip") == "json"
+    with pytest.raises(HTTPException):
+        detect_import_format(b"hello", "courses.txt")
+
+
+def test_zip_import_extract_and_url_mapping(tmp_path):
+    source = tmp_path / "import.zip"
+    data = {
+        "data": {
+            "lessons": [{
+                "title": "第一课",
+                "content": [{"type": "video", "content": {"videoUrl": "/uploads/resources/a.mp4"}}],
+            }],
+            "resources": [{"title": "讲义", "file_url": "/uploads/resources/b.pdf"}],
+        }
+    }
+    make_import_zip(source, data, {"a.mp4": b"video", "b.pdf": b"%PDF"})
+
+    assert load_import_data(str(source), "zip") == data
+
+    work_dir = tmp_path / "work"
+    extract_import_resources(str(source), str(work_dir))
+    assert [os.path.basename(p) for p in list_import_resources(str(work_dir))] == ["a.mp4", "b.pdf"]
+
+    mapping = {
+        "/uploads/resources/a.mp4": "/uploads/resources/new-a.mp4",
+        "/uploads/resources/b.pdf": "/uploads/resources/new-b.pdf",
+    }
+    result = validate_import_data(data, mapping)
+    assert result["lessons"][0]["content"][0]["content"]["videoUrl"] == "/uploads/resources/new-a.mp4"
+    assert result["resources"][0]["file_url"] == "/uploads/resources/new-b.pdf"
+    # 原始数据不被修改
+    assert data["data"]["resources"][0]["file_url"] == "/uploads/resources/b.pdf"
+
+
+def test_zip_without_data_json(tmp_path):
+    source = tmp_path / "import.zip"
+    with zipfile.ZipFile(source, "w") as archive:
+        archive.writestr("other.json", "{}")
+
+    with pytest.raises(HTTPException) as exc_info:
+        load_import_data(str(source), "zip")
+    assert "data.json" in exc_info.value.detail
+
+
+async def test_tracker_progress_and_checkpoints():
+    tracker = ImportTracker()
+    await tracker.start_stage("extract", 1)
+    await tracker.advance()
+    await tracker.finish_stage("extract")
+    await tracker.start_stage("copy_files", 4)
+    await tracker.advance()
+    await tracker.advance()
+
+    # extract 权重 10，copy_files 权重 30 完成一半
+    assert tracker.progress == 25.0
+    assert tracker.message == "复制资源文件 (2/4)"
+
+    # 从检查点恢复时已完成的阶段会被跳过
+    resumed = ImportTracker(json.loads(json.dumps(tracker.state)))
+    assert resumed.is_done("extract")
+    assert not resumed.is_done("copy_files")
+
+
+async def test_cancel_races_with_worker_claim(db, tmp_path, monkeypatch):
+    """取消与领取竞争：已被领取的任务只设置取消标记，不删除工作目录"""
+    import uuid
+
+    from sqlalchemy import update
+
+    from app.core.config import settings
+    from app.models.course_job import CourseJob, CourseJobStatus
+    from app.models.user import User, UserRole
+    from app.services.course_jobs import CourseJobRunner
+
+    prefix = uuid.uuid4().hex[:8]
+    admin = User(username=f"a_{prefix}", email=f"a{prefix}@test.local", hashed_password="x", role=UserRole.ADMIN)
+    db.add(admin)
+    await db.flush()
+
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    runner = CourseJobRunner()
+    jobs = []
+    for name in ("claimed", "pending"):
+        work_dir = tmp_path / "course_jobs" / name
+        work_dir.mkdir(parents=True)
+        job = CourseJob(status=CourseJobStatus.PENDING.value, work_dir=str(work_dir), params={}, state={},
+                        created_by=admin.id)
+        db.add(job)
+        jobs.append(job)
+    await db.commit()
+    claimed, pending = jobs
+
+    # worker 在取消请求读取任务之后领取了任务
+    await db.execute(
+        update(CourseJob)
+        .where(CourseJob.id == claimed.id)
+        .values(status=CourseJobStatus.RUNNING.value, worker_id="other")
+        .execution_options(synchronize_session=False)
+    )
+    assert claimed.status == CourseJobStatus.PENDING.value
+
+    claimed = await runner.request_cancel(db, claimed)
+    assert claimed.status == CourseJobStatus.RUNNING.value and claimed.cancel_requested
+    assert claimed.id in runner.cancelled_jobs
+    assert os.path.isdir(claimed.work_dir)
+
+    pending = await runner.request_cancel(db, pending)
+    assert pending.status == CourseJobStatus.CANCELLED.value and pending.cancel_requested
+    assert pending.finished_at is not None and pending.id not in runner.cancelled_jobs
+    assert not os.path.exists(pending.work_dir)
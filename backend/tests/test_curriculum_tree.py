@@ -0,0 +1,93 @@
+"""
+课程体系树缓存测试：ETag 条件请求、版本号失效
+"""
+
+import uuid
+
+from app.models.curriculum import Course, Grade, Subject
+from app.models.lesson import Lesson
+from app.models.user import User, UserRole
+from app.services.curriculum_tree import CurriculumTreeCache, curriculum_tree_cache, etag_matches
+from app.schemas.curriculum import CurriculumTreeResponse
+from tests.query_counter import QueryCounter
+
+
+def _tree(total_subjects=0):
+    return CurriculumTreeResponse(
+        subjects=[], total_subjects=total_subjects, total_grades=0, total_courses=0, total_lessons=0
+    )
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+async def test_cache_versioning():
+    cache = CurriculumTreeCache(ttl=60)
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return _tree(len(builds))
+
+    body, etag = await cache.get(False, build)
+    assert await cache.get(False, build) == (body, etag) and len(builds) == 1
+
+    cache.bump()
+    assert cache.cached(False) is None
+    new_body, new_etag = await cache.get(False, build)
+    assert new_etag != etag and len(builds) == 2
+
+    # 构建期间版本变化：结果不写回缓存
+    async def racing_build():
+        cache.bump()
+        return _tree(99)
+
+    await cache.get(True, racing_build)
+    assert cache.cached(True) is None
+
+
+async def test_mutations_bump_version(db):
+    prefix = uuid.uuid4().hex[:8]
+    subject = Subject(name=f"学科{prefix}", code=f"s-{prefix}")
+    grade = Grade(name=f"年级{prefix}", level=int(prefix, 16) % 10**9 + 100)
+    user = User(username=f"u_{prefix}", email=f"{prefix}@test.local", hashed_password="x", role=UserRole.TEACHER)
+    db.add_all([subject, grade, user])
+    await db.flush()
+    courses = [Course(subject_id=subject.id, grade_id=grade.id, name=f"课程{i}") for i in range(2)]
+    db.add_all(courses)
+    await db.flush()
+    lesson = Lesson(title="教案", creator_id=user.id, course_id=courses[0].id)
+    db.add(lesson)
+
+    version = curriculum_tree_cache.version
+    await db.commit()
+    assert curriculum_tree_cache.version == version + 1
+
+    # 只改教案内容不影响树
+    lesson.title = "新标题"
+    await db.commit()
+    assert curriculum_tree_cache.version == version + 1
+
+    lesson.course_id = courses[1].id
+    await db.commit()
+    assert curriculum_tree_cache.version == version + 2
+
+
+async def test_tree_endpoint_not_modified(db):
+    from app.api.v1.curriculum import get_curriculum_tree
+
+    curriculum_tree_cache.bump()
+    response = await get_curriculum_tree(include_inactive=False, if_none_match=None, db=db, current_user=None)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    CurriculumTreeResponse.model_validate_json(response.body)
+
+    with QueryCounter() as counter:
+        response = await get_curriculum_tree(include_inactive=False, if_none_match=etag, db=db, current_user=None)
+    assert response.status_code == 304 and response.headers["etag"] == etag
+    assert counter.count == 0
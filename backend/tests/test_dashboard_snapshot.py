@@ -0,0 +1,45 @@
+"""
+管理员数据看板快照测试：每张表一次统计查询，快照有效期内不再统计
+"""
+
+from datetime import datetime, timedelta
+
+from app.models.dashboard_snapshot import DashboardSnapshot
+from app.services.dashboard_snapshot import OVERVIEW_SNAPSHOT, DashboardSnapshotService, compute_overview
+from tests.query_counter import QueryCounter
+
+
+async def test_compute_overview_one_query_per_table(db):
+    with QueryCounter() as counter:
+        data = await compute_overview(db)
+
+    assert counter.count == 4, counter.report()
+    users = data["user_stats"]
+    assert users["inactive_users"] == users["total_users"] - users["active_users"]
+
+
+async def test_overview_served_from_snapshot(db):
+    service = DashboardSnapshotService()
+
+    data, computed_at = await service.get_overview(db, max_age=300)
+    snapshot = await db.get(DashboardSnapshot, OVERVIEW_SNAPSHOT)
+    assert snapshot.computed_at == computed_at
+
+    # 本进程已有快照：不访问数据库
+    with QueryCounter() as counter:
+        assert await service.get_overview(db, max_age=300) == (data, computed_at)
+    assert counter.count == 0
+
+    # 其他进程：只读取快照
+    other = DashboardSnapshotService()
+    with QueryCounter() as counter:
+        _, other_computed_at = await other.get_overview(db, max_age=300)
+    assert counter.count == 1 and other_computed_at == computed_at
+
+    # 快照过期或要求刷新时重新统计
+    snapshot.computed_at = datetime.now() - timedelta(seconds=600)
+    await db.flush()
+    _, refreshed_at = await other.get_overview(db, max_age=0)
+    assert refreshed_at > computed_at
+    _, forced_at = await service.get_overview(db, refresh=True)
+    assert forced_at >= refreshed_at
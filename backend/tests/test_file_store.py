@@ -0,0 +1,56 @@
+"""
+内容寻址文件存储测试（不依赖数据库的部分）
+"""
+
+import hashlib
+import os
+
+from app.services.file_store import FileStore, hash_file, normalize_extension
+
+
+def test_normalize_extension():
+    assert normalize_extension("PDF") == "pdf"
+    assert normalize_extension(".tar.gz") == "targz"
+    assert normalize_extension("") == "bin"
+    assert normalize_extension(None) == "bin"
+    assert normalize_extension("../x") == "x"
+
+
+def test_hashed_filename_roundtrip():
+    sha256 = hashlib.sha256(b"hello").hexdigest()
+    filename = FileStore.hashed_filename(sha256, "PNG")
+    assert filename == f"{sha256}.png"
+    assert FileStore.parse_hashed_filename(filename) == sha256
+    # 旧的 uuid 文件名不属于内容寻址存储
+    assert FileStore.parse_hashed_filename("0f8fad5b-d9cb-469f-a165-70867728950e.png") is None
+
+
+def test_hash_file(tmp_path):
+    path = tmp_path / "data.bin"
+    content = os.urandom(3 * 1024 * 1024 + 17)
+    path.write_bytes(content)
+    assert hash_file(str(path)) == (hashlib.sha256(content).hexdigest(), len(content))
+
+
+def test_place_links_blob_and_alias(tmp_path):
+    store = FileStore(root=str(tmp_path))
+    content = b"same content"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    # 第一次放置：临时文件移动为 blob，对外文件名指向同一内容
+    temp = store.new_temp_path()
+    with open(temp, "wb") as f:
+        f.write(content)
+    store._place(temp, sha256, store.hashed_filename(sha256, "txt"), consume=True)
+    blob = store.blob_path(sha256)
+    alias = os.path.join(store.resources_dir, f"{sha256}.txt")
+    assert not os.path.exists(temp)
+    assert os.path.samefile(blob, alias)
+
+    # 不消费源文件时源文件保持不变，不同扩展名共享同一个 blob
+    source = tmp_path / "source.pdf"
+    source.write_bytes(content)
+    store._place(str(source), sha256, store.hashed_filename(sha256, "pdf"), consume=False)
+    assert source.read_bytes() == content
+    assert os.path.samefile(blob, os.path.join(store.resources_dir, f"{sha256}.pdf"))
+    assert os.listdir(os.path.dirname(blob)) == [sha256]
@@ -0,0 +1,146 @@
+"""
+表单结果累计计数测试
+"""
+
+from datetime import datetime, timedelta
+
+from app.services.form_results import FormTally
+
+OPTIONS = [
+    {"id": "a", "text": "选项A"},
+    {"id": "b", "text": "选项B"},
+    {"id": "c", "text": "选项C"},
+]
+
+
+def test_choice_counts_and_percentages():
+    tally = FormTally()
+    tally.add_response([{"option_id": "a"}, {"option_id": "b"}])
+    tally.add_response([{"option_id": "a"}, {"option_id": "a"}])
+    tally.add_response([{"option_id": "c"}])
+    tally.add_response([])
+
+    stats = {s["option_id"]: s for s in tally.option_stats("multiple_choice", OPTIONS)}
+    assert tally.total_responses == 4
+    # 同一份回答中重复的选项只计一次
+    assert stats["a"]["count"] == 2
+    assert stats["a"]["percentage"] == 50.0
+    assert stats["b"]["count"] == 1
+    assert stats["c"]["percentage"] == 25.0
+
+
+def test_ranking_average():
+    tally = FormTally()
+    tally.add_response([
+        {"option_id": "a", "order": 1},
+        {"option_id": "b", "order": 2},
+        {"option_id": "c", "order": 3},
+    ])
+    tally.add_response([
+        {"option_id": "a", "order": 2},
+        {"option_id": "b", "order": 1},
+        {"option_id": "c", "order": "x"},
+    ])
+
+    stats = {s["option_id"]: s for s in tally.option_stats("ranking", OPTIONS)}
+    assert stats["a"]["average_rank"] == 1.5
+    assert stats["b"]["average_rank"] == 1.5
+    assert stats["c"]["average_rank"] == 3.0
+
+
+def test_unknown_type_and_malformed_answers():
+    tally = FormTally()
+    tally.add_response({"option_id": "a"})
+    tally.add_response(["a", None, {"order": 1}])
+
+    assert tally.total_responses == 2
+    assert tally.option_counts == {}
+    assert tally.option_stats("text", OPTIONS) == []
+    assert tally.option_stats("single_choice", OPTIONS)[0]["count"] == 0
+
+
+async def _make_form(db, cell_type="multiple_choice"):
+    import uuid
+
+    from app.models.form_cell import FormCell
+    from app.models.user import User, UserRole
+
+    prefix = uuid.uuid4().hex[:8]
+    teacher = User(username=f"t_{prefix}", email=f"t{prefix}@test.local", hashed_password="x", role=UserRole.TEACHER)
+    db.add(teacher)
+    await db.flush()
+    form_cell = FormCell(cell_type=cell_type, options=OPTIONS, created_by=teacher.id)
+    db.add(form_cell)
+    await db.flush()
+    return form_cell
+
+
+async def _add_response(db, form_cell, answers):
+    from app.models.form_cell import FormResponse
+
+    response = FormResponse(form_cell_id=form_cell.id, answers=answers)
+    db.add(response)
+    await db.flush()
+    return response
+
+
+async def test_load_matches_in_memory_tally(db):
+    from app.services.form_results import load_form_tally
+
+    form_cell = await _make_form(db, "ranking")
+    expected = FormTally()
+    for answers in (
+        [{"option_id": "a", "order": 1}, {"option_id": "b", "order": 2}],
+        [{"option_id": "b", "order": 1}, {"option_id": "a", "order": 2}, {"option_id": "c", "order": "x"}],
+        [],
+    ):
+        await _add_response(db, form_cell, answers)
+        expected.add_response(answers)
+
+    tally = await load_form_tally(db, form_cell.id)
+    assert tally.total_responses == 3
+    assert tally.option_stats("ranking", OPTIONS) == expected.option_stats("ranking", OPTIONS)
+    assert tally.option_counts == expected.option_counts
+
+
+async def test_room_tally_counts_responses_during_load_once(db, monkeypatch):
+    """加载期间本进程和其他 worker 的提交各计一次，其他 worker 的提交同步到房间计数"""
+    from app.websockets import form_ws
+
+    form_cell = await _make_form(db)
+    await _add_response(db, form_cell, [{"option_id": "a"}])
+    handler = form_ws.FormWebSocketHandler()
+    handler._get_room(form_cell.id)
+
+    published = []
+
+    async def publish(kind, payload):
+        published.append((kind, payload))
+
+    monkeypatch.setattr(form_ws.manager, "publish_to_workers", publish)
+    real_load = form_ws.load_form_tally_snapshot
+
+    async def racing_load(db, form_cell_id):
+        # 查询之前写入的提交已在快照中（提交时间早于任何时间窗口也一样）；
+        # 查询之后其他 worker 的提交不在快照中
+        local = await _add_response(db, form_cell, [{"option_id": "b"}])
+        local.submitted_at = datetime.utcnow() - timedelta(days=1)
+        await db.flush()
+        await handler.record_response(form_cell_id, local.id, [{"option_id": "b"}])
+        result = await real_load(db, form_cell_id)
+        await handler._on_remote_response(
+            {"form_cell_id": form_cell_id, "response_id": 10**9, "answers": [{"option_id": "c"}]}
+        )
+        return result
+
+    monkeypatch.setattr(form_ws, "load_form_tally_snapshot", racing_load)
+    tally = await handler._get_tally(form_cell.id, db)
+    assert tally.total_responses == 3
+    assert tally.option_counts == {"a": 1, "b": 1, "c": 1}
+    assert published[0][0] == "form_response" and published[0][1]["answers"] == [{"option_id": "b"}]
+
+    await handler._on_remote_response(
+        {"form_cell_id": form_cell.id, "response_id": 10**9 + 1, "answers": [{"option_id": "a"}]}
+    )
+    assert handler.active_form_rooms[form_cell.id]["tally"].option_counts["a"] == 2
+    assert handler.active_form_rooms[form_cell.id]["loading"] == []
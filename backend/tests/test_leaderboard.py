@@ -0,0 +1,93 @@
+"""
+正面行为积分榜测试：排名结构、本周窗口、一次查询统计与缓存更新
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+
+from app.models.classroom_assistant import PositiveBehavior, PositiveBehaviorType
+from app.models.curriculum import Grade
+from app.models.organization import Classroom, Region, School
+from app.models.user import User, UserRole
+from app.services.leaderboard import Leaderboard, LeaderboardCache, LeaderboardEntry, week_start
+from tests.query_counter import QueryCounter
+
+
+def _entry(student_id, points):
+    return LeaderboardEntry(student_id=student_id, student_name=f"学生{student_id}", total_points=points, record_count=1)
+
+
+def test_leaderboard_ranks_ties_and_updates():
+    board = Leaderboard([_entry(1, 5), _entry(2, 9), _entry(3, 5), _entry(4, 1)])
+
+    assert [(rank, entry.student_id) for rank, entry in board.top()] == [(1, 2), (2, 1), (2, 3), (4, 4)]
+    assert [entry.student_id for _, entry in board.top(2)] == [2, 1]
+    assert board.rank_of(3) == 2 and board.rank_of(99) is None
+
+    assert board.add_points(4, 9)
+    assert board.rank_of(4) == 1 and board.rank_of(2) == 2 and board.rank_of(1) == 3
+    assert board.get(4).record_count == 2
+    assert not board.add_points(99, 1)
+
+
+def test_week_start_is_monday_utc():
+    assert week_start(datetime(2026, 10, 17, 15, 30, tzinfo=timezone.utc)) == datetime(2026, 10, 12, tzinfo=timezone.utc)
+    # 北京时间周一 07:00 仍属于上一周（UTC 周日 23:00）
+    beijing = timezone(timedelta(hours=8))
+    assert week_start(datetime(2026, 10, 12, 7, tzinfo=beijing)) == datetime(2026, 10, 5, tzinfo=timezone.utc)
+
+
+async def test_cached_leaderboard_one_query_and_updates(db):
+    prefix = uuid.uuid4().hex[:8]
+    region = Region(name="测试区域", code=f"r-{prefix}", level=3)
+    db.add(region)
+    await db.flush()
+    school = School(name="测试学校", code=f"s-{prefix}", region_id=region.id, school_type="初中")
+    grade = Grade(name=f"测试年级{prefix}", level=int(prefix, 16) % 10**9 + 100)
+    db.add_all([school, grade])
+    await db.flush()
+    classroom = Classroom(name="测试班级", school_id=school.id, grade_id=grade.id)
+    users = [
+        User(username=f"{prefix}_{i}", email=f"{prefix}_{i}@test.local", full_name=f"学生{i}",
+             hashed_password="x", role=UserRole.STUDENT)
+        for i in range(4)
+    ]
+    db.add(classroom)
+    db.add_all(users)
+    await db.flush()
+    teacher, alice, bob, carol = users
+
+    now = datetime.now(timezone.utc)
+    last_week = week_start(now) - timedelta(days=1)
+    await db.execute(insert(PositiveBehavior), [
+        {"classroom_id": classroom.id, "student_id": student.id, "behavior_type": PositiveBehaviorType.OTHER,
+         "points": points, "recorded_by_user_id": teacher.id, "recorded_at": recorded_at}
+        for student, points, recorded_at in (
+            (alice, 3, now), (alice, 2, last_week), (bob, 4, now), (bob, 1, now),
+        )
+    ])
+
+    cache = LeaderboardCache(ttl=60, max_size=10)
+    with QueryCounter() as counter:
+        board = await cache.get(db, classroom.id)
+    assert counter.count == 1, counter.report()
+    assert [(entry.student_name, entry.total_points) for _, entry in board.top()] == [("学生1", 5), ("学生2", 5)]
+
+    week = await cache.get(db, classroom.id, since=week_start(now))
+    assert [(entry.student_id, entry.total_points) for _, entry in week.top()] == [(bob.id, 5), (alice.id, 3)]
+
+    # 已缓存的排名直接更新，不再查询
+    cache.record(classroom.id, alice.id, 3, now)
+    with QueryCounter() as counter:
+        board = await cache.get(db, classroom.id)
+        week = await cache.get(db, classroom.id, since=week_start(now))
+    assert counter.count == 0
+    assert board.rank_of(alice.id) == 1 and week.rank_of(alice.id) == 1 and week.get(alice.id).total_points == 6
+
+    # 新上榜的学生需要重新统计
+    cache.record(classroom.id, carol.id, 1, now)
+    with QueryCounter() as counter:
+        await cache.get(db, classroom.id)
+    assert counter.count == 1
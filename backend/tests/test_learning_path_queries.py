@@ -0,0 +1,86 @@
+"""
+学习路径列表 / 详情接口的查询次数回归测试
+
+查询次数不能随路径数、课程数增长。需要已执行迁移的数据库，不可用时跳过。
+"""
+
+import uuid
+
+from app.models.curriculum import Course, Grade, Subject
+from app.models.learning_path import LearningPath, LearningPathLesson
+from app.models.lesson import Lesson
+from app.models.user import User, UserRole
+from tests.query_counter import QueryCounter
+
+
+async def _seed(db, path_count: int, lessons_per_path: int):
+    """创建 path_count 条已发布路径，每条包含 lessons_per_path 节课，返回路径列表"""
+    suffix = uuid.uuid4().hex[:8]
+    user = User(
+        username=f"lp_{suffix}",
+        email=f"lp_{suffix}@example.com",
+        full_name="路径作者",
+        hashed_password="x",
+        role=UserRole.TEACHER,
+    )
+    subject = Subject(name=f"学科{suffix}", code=f"s{suffix}")
+    grade = Grade(name=f"年级{suffix}", level=1000 + int(suffix[:4], 16))
+    db.add_all([user, subject, grade])
+    await db.flush()
+    course = Course(subject_id=subject.id, grade_id=grade.id, name=f"课程{suffix}")
+    db.add(course)
+    await db.flush()
+
+    lessons = [
+        Lesson(title=f"课{i}", creator_id=user.id, course_id=course.id, content=[])
+        for i in range(lessons_per_path)
+    ]
+    db.add_all(lessons)
+    await db.flush()
+
+    paths = []
+    for i in range(path_count):
+        path = LearningPath(title=f"路径{i}", creator_id=user.id, is_published=True)
+        path.path_lessons = [
+            LearningPathLesson(lesson_id=lesson.id, order_index=lessons_per_path - j)
+            for j, lesson in enumerate(lessons)
+        ]
+        paths.append(path)
+    db.add_all(paths)
+    await db.flush()
+    # 清空会话，避免接口直接命中已加载的对象
+    db.expunge_all()
+    return paths
+
+
+async def test_list_query_count_is_constant(db):
+    from app.api.v1.learning_paths import get_learning_paths
+
+    await _seed(db, path_count=3, lessons_per_path=2)
+    with QueryCounter() as small:
+        await get_learning_paths(db=db, skip=0, limit=100, published_only=True)
+
+    await _seed(db, path_count=30, lessons_per_path=2)
+    with QueryCounter() as large:
+        items = await get_learning_paths(db=db, skip=0, limit=100, published_only=True)
+
+    assert len(items) >= 33
+    assert large.count == small.count == 1, large.report()
+    assert all(item.lesson_count == 2 and item.creator_name == "路径作者" for item in items[:33])
+
+
+async def test_detail_query_count_is_constant(db):
+    from app.api.v1.learning_paths import get_learning_path
+
+    counts = []
+    for lessons_per_path in (1, 20):
+        [path] = await _seed(db, path_count=1, lessons_per_path=lessons_per_path)
+        with QueryCounter() as counter:
+            detail = await get_learning_path(db=db, path_id=path.id)
+        counts.append(counter.count)
+
+        assert detail.lesson_count == lessons_per_path
+        assert detail.creator_name == "路径作者"
+        assert [lesson.order_index for lesson in detail.lessons] == list(range(1, lessons_per_path + 1))
+
+    assert counts[0] == counts[1] <= 2, counts
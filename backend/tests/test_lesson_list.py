@@ -0,0 +1,93 @@
+"""
+教案列表测试：游标分页、检索与估算计数
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models.curriculum import Course, Grade, Subject
+from app.models.lesson import Lesson, LessonStatus
+from app.models.user import User, UserRole
+from app.services.lesson_search import decode_cursor, encode_cursor, search_pattern
+
+
+def test_cursor_round_trip():
+    updated_at = datetime(2026, 10, 17, 8, 30, 15, 123456)
+    assert decode_cursor(encode_cursor([updated_at, 42]), ranked=False) == [updated_at, 42]
+    assert decode_cursor(encode_cursor([1.25, updated_at, 42]), ranked=True) == [1.25, updated_at, 42]
+    assert search_pattern("50%_a\\b") == "%50\\%\\_a\\\\b%"
+    for bad in ("not-base64!", encode_cursor([updated_at, 42])[:-2], encode_cursor(["x", 1])):
+        with pytest.raises(ValueError):
+            decode_cursor(bad, ranked=False)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor([updated_at, 42]), ranked=True)
+
+
+async def _list(db, user, **params):
+    from app.api.v1.lessons import list_lessons
+
+    defaults = dict(
+        page=1, page_size=20, cursor=None, count="exact", status=None, search=None, course_id=None,
+        chapter_id=None, subject_id=None, grade_id=None, creator_only=True,
+    )
+    return await list_lessons(**{**defaults, **params}, db=db, current_user=user)
+
+
+async def test_keyset_pages_and_search(db):
+    prefix = uuid.uuid4().hex[:8]
+    subject = Subject(name=f"学科{prefix}", code=f"s-{prefix}")
+    # 响应中的年级 level 限定 1-12 且唯一，优先复用已有年级
+    grade = (await db.execute(select(Grade).where(Grade.level == 1))).scalar_one_or_none()
+    grade = grade or Grade(name=f"年级{prefix}", level=1)
+    user = User(username=f"u_{prefix}", email=f"{prefix}@test.local", hashed_password="x", role=UserRole.TEACHER)
+    db.add_all([subject, grade, user])
+    await db.flush()
+    course = Course(subject_id=subject.id, grade_id=grade.id, name="课程")
+    db.add(course)
+    await db.flush()
+
+    base = datetime(2026, 1, 1)
+    lessons = [
+        Lesson(title=f"教案{i}", creator_id=user.id, course_id=course.id, status=LessonStatus.DRAFT,
+               updated_at=base + timedelta(hours=i // 2))
+        for i in range(7)
+    ]
+    lessons[1].title = "光合作用"
+    lessons[5].description = "复习光合作用的过程"
+    lessons[6].tags = ["光合作用"]
+    db.add_all(lessons)
+    await db.flush()
+
+    # 同一 updated_at 的教案按 id 区分，翻页不重复不遗漏
+    seen, cursor = [], None
+    while True:
+        response = await _list(db, user, page_size=3, cursor=cursor)
+        assert response.total == 7 and not response.total_is_estimate
+        seen += [item.id for item in response.items]
+        cursor = response.next_cursor
+        if cursor is None:
+            break
+    expected = sorted(lessons, key=lambda lesson: (lesson.updated_at, lesson.id), reverse=True)
+    assert seen == [lesson.id for lesson in expected]
+
+    # 标题、简介、标签都参与检索，标题命中的排在前面
+    response = await _list(db, user, search="光合", page_size=2)
+    assert response.total == 3
+    assert response.items[0].id == lessons[1].id
+    rest = await _list(db, user, search="光合", page_size=2, cursor=response.next_cursor)
+    assert {item.id for item in response.items + rest.items} == {lessons[1].id, lessons[5].id, lessons[6].id}
+    assert rest.next_cursor is None
+
+    # 检索词中的通配符按字面匹配
+    assert (await _list(db, user, search="%")).total == 0
+
+    estimated = await _list(db, user, count="estimated")
+    assert estimated.total_is_estimate and estimated.total >= 0
+
+    with pytest.raises(HTTPException) as exc_info:
+        await _list(db, user, search="光合", cursor=encode_cursor([base, 1]))
+    assert exc_info.value.status_code == 400
@@ -0,0 +1,124 @@
+"""
+Office文档转换服务测试：使用假的 soffice 脚本，验证后台转换、同一文件只转换一次、
+转换槽位上限、LibreOffice 检测只执行一次以及失败后不立即重试
+"""
+
+import asyncio
+import json
+import os
+import stat
+import sys
+import time
+
+from app.core.config import settings
+from app.services.office_converter import ConversionStatus, OfficeConverterService
+
+FAKE_SOFFICE = """#!{python}
+import json, os, sys, time
+log = {log!r}
+args = sys.argv[1:]
+if args == ["--version"]:
+    with open(log, "a") as f:
+        f.write(json.dumps({{"probe": True}}) + "\\n")
+    print("LibreOffice 7.6")
+    sys.exit(0)
+source = args[-1]
+outdir = args[args.index("--outdir") + 1]
+start = time.time()
+time.sleep({delay})
+with open(log, "a") as f:
+    f.write(json.dumps({{"source": source, "profile": args[0], "start": start, "end": time.time()}}) + "\\n")
+if "broken" in source:
+    sys.stderr.write("source file is corrupt")
+    sys.exit(1)
+name = os.path.splitext(os.path.basename(source))[0] + ".pdf"
+with open(os.path.join(outdir, name), "w") as f:
+    f.write("%PDF-1.4 fake")
+"""
+
+
+def _setup(tmp_path, monkeypatch, delay=0.3):
+    log = tmp_path / "soffice.log"
+    script = tmp_path / "soffice"
+    script.write_text(FAKE_SOFFICE.format(python=sys.executable, log=str(log), delay=delay))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(settings, "OFFICE_LIBREOFFICE_BINARY", str(script))
+    monkeypatch.setattr(settings, "OFFICE_USE_UNOSERVER", False)
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    (tmp_path / "resources").mkdir()
+    return log
+
+
+def _records(log):
+    return [json.loads(line) for line in log.read_text().splitlines()]
+
+
+async def test_preview_does_not_block_and_converts_once(tmp_path, monkeypatch):
+    log = _setup(tmp_path, monkeypatch)
+    (tmp_path / "resources" / "slides.pptx").write_bytes(b"pptx")
+    service = OfficeConverterService(workers=2, timeout=10, retry_after=60)
+
+    # 10 个并发预览请求立即返回，只启动一次转换
+    started = time.monotonic()
+    statuses = [service.get_conversion_status("/uploads/resources/slides.pptx") for _ in range(10)]
+    assert time.monotonic() - started < 0.1
+    assert {status["status"] for status in statuses} == {ConversionStatus.CONVERTING}
+
+    # 转换期间事件循环保持响应
+    ticks = 0
+    waiter = asyncio.ensure_future(service.wait_for_conversion("/uploads/resources/slides.pptx"))
+    while not waiter.done():
+        await asyncio.sleep(0.01)
+        ticks += 1
+    assert ticks > 10
+    assert waiter.result() == {
+        "status": ConversionStatus.READY, "pdf_url": "/uploads/resources/slides_converted.pdf", "error": None,
+    }
+    assert (tmp_path / "resources" / "slides_converted.pdf").read_text() == "%PDF-1.4 fake"
+    assert not [name for name in os.listdir(tmp_path / "resources") if name.startswith(".convert-")]
+
+    ready = service.get_conversion_status("/uploads/resources/slides.pptx")
+    assert ready["status"] == ConversionStatus.READY
+    records = _records(log)
+    assert sum("probe" in record for record in records) == 1
+    assert sum("source" in record for record in records) == 1
+    assert service.stats["joined"] == 10  # 9 个重复预览 + 等待方
+    await service.aclose()
+
+
+async def test_worker_limit_and_profile_per_slot(tmp_path, monkeypatch):
+    log = _setup(tmp_path, monkeypatch, delay=0.2)
+    urls = []
+    for i in range(4):
+        (tmp_path / "resources" / f"doc{i}.docx").write_bytes(b"docx")
+        urls.append(f"/uploads/resources/doc{i}.docx")
+    service = OfficeConverterService(workers=2, timeout=10)
+
+    results = await asyncio.gather(*(service.wait_for_conversion(url) for url in urls))
+    assert all(result["status"] == ConversionStatus.READY for result in results)
+
+    conversions = [record for record in _records(log) if "source" in record]
+    assert len(conversions) == 4 and service.stats["probes"] == 1
+    # 同一时刻最多 2 个转换，每个槽位使用自己的配置目录
+    for record in conversions:
+        overlapping = [other for other in conversions if other["start"] < record["end"] and record["start"] < other["end"]]
+        assert len(overlapping) <= 2
+        assert len({other["profile"] for other in overlapping}) == len(overlapping)
+    assert len({record["profile"] for record in conversions}) == 2
+    await service.aclose()
+
+
+async def test_failed_conversion_not_retried_immediately(tmp_path, monkeypatch):
+    log = _setup(tmp_path, monkeypatch, delay=0)
+    (tmp_path / "resources" / "broken.docx").write_bytes(b"docx")
+    service = OfficeConverterService(workers=1, timeout=10, retry_after=60)
+
+    result = await service.wait_for_conversion("/uploads/resources/broken.docx")
+    assert result["status"] == ConversionStatus.FAILED and "corrupt" in result["error"]
+    again = service.get_conversion_status("/uploads/resources/broken.docx")
+    assert again["status"] == ConversionStatus.FAILED
+    assert sum("source" in record for record in _records(log)) == 1
+
+    missing = service.get_conversion_status("/uploads/resources/missing.docx")
+    assert missing["status"] == ConversionStatus.FAILED
+    await service.aclose()
@@ -0,0 +1,59 @@
+"""
+密码哈希线程池测试
+"""
+
+import asyncio
+import time
+
+from app.core.security import (
+    PasswordHasher,
+    get_password_hashes,
+    verify_password,
+    verify_password_async,
+)
+
+
+async def test_hashes_in_pool_without_blocking_event_loop():
+    passwords = [f"password{i}" for i in range(8)]
+    ticks = 0
+    done = False
+
+    async def ticker():
+        nonlocal ticks
+        while not done:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(ticker())
+    hashes = await get_password_hashes(passwords)
+    done = True
+    await task
+
+    assert len(hashes) == len(passwords)
+    for password, hashed in zip(passwords, hashes):
+        assert verify_password(password, hashed)
+    assert await verify_password_async("password0", hashes[0])
+    assert not await verify_password_async("wrong", hashes[0])
+    # 哈希期间事件循环仍在运行其他协程
+    assert ticks > 1
+
+
+async def test_pool_stats_track_queue_depth():
+    hasher = PasswordHasher(workers=1)
+    seen = []
+
+    def slow(value):
+        time.sleep(0.05)
+        return value
+
+    async def probe():
+        await asyncio.sleep(0.01)
+        seen.append(hasher.stats())
+
+    results = await asyncio.gather(
+        hasher.run(slow, 1), hasher.run(slow, 2), hasher.run(slow, 3), probe()
+    )
+    assert results[:3] == [1, 2, 3]
+    assert seen[0]["active"] == 1 and seen[0]["queued"] == 2
+    assert hasher.stats() == {"workers": 1, "active": 0, "queued": 0, "completed": 3}
+    hasher.shutdown()
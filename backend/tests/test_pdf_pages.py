@@ -0,0 +1,141 @@
+"""
+PDF 分页预览图测试：宽度档位、磁盘缓存与 LRU 淘汰、同一页只渲染一次、预渲染后续页
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+import pytest
+
+from app.services.pdf_pages import PageOutOfRange, PdfPageRenderer, page_width
+
+
+def _make_pdf(path, pages=6):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1}", fontsize=24)
+        page.draw_rect(fitz.Rect(72, 100, 400, 300 + i * 20), color=(0, 0, 1), fill=(0.8, 0.9, 1))
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+
+def _renderer(tmp_path, **kwargs):
+    kwargs.setdefault("prefetch", 0)
+    return PdfPageRenderer(
+        cache_dir=str(tmp_path / "cache"), workers=1, executor=ThreadPoolExecutor(1), **kwargs
+    )
+
+
+def test_page_width_buckets():
+    assert page_width(100) == 160 and page_width(640) == 640 and page_width(641) == 800
+    assert page_width(5000) == 2048
+
+
+async def test_render_cache_and_single_flight(tmp_path):
+    pdf = _make_pdf(tmp_path / "a.pdf")
+    renderer = _renderer(tmp_path)
+
+    path, page_count = await renderer.get_page(pdf, 1, 500)
+    assert page_count == 6 and path.endswith("1-640.jpg")
+    assert fitz.Pixmap(path).width == 640
+
+    # 同一档位命中缓存；同一页的并发请求只渲染一次
+    assert (await renderer.get_page(pdf, 1, 600))[0] == path
+    results = await asyncio.gather(*(renderer.get_page(pdf, 3, 300) for _ in range(8)))
+    assert len({result[0] for result in results}) == 1
+    assert renderer.stats["renders"] == 2 and renderer.stats["hits"] == 1
+
+    with pytest.raises(PageOutOfRange):
+        await renderer.get_page(pdf, 7, 300)
+    with pytest.raises(FileNotFoundError):
+        await renderer.get_page(str(tmp_path / "missing.pdf"), 1, 300)
+
+    # 源文件更新后缓存失效
+    _make_pdf(tmp_path / "a.pdf", pages=2)
+    os.utime(pdf, ns=(1, 1))
+    new_path, page_count = await renderer.get_page(pdf, 1, 500)
+    assert page_count == 2 and new_path != path
+
+    # 新实例（进程重启）从缓存目录恢复索引
+    restarted = _renderer(tmp_path)
+    await restarted.get_page(pdf, 1, 500)
+    assert restarted.stats["hits"] == 1 and restarted.stats["renders"] == 0
+    assert restarted.summary()["cached_files"] == 3
+
+
+async def test_prefetch_following_pages(tmp_path):
+    pdf = _make_pdf(tmp_path / "a.pdf")
+    renderer = _renderer(tmp_path, prefetch=2)
+
+    await renderer.get_page(pdf, 5, 320)
+    await renderer.wait_prefetch()
+    # 只预渲染到最后一页
+    assert renderer.stats["prefetched"] == 1
+    await renderer.get_page(pdf, 6, 320)
+    assert renderer.stats["hits"] == 1 and renderer.stats["renders"] == 2
+
+
+async def test_lru_eviction(tmp_path):
+    pdf = _make_pdf(tmp_path / "a.pdf")
+    renderer = _renderer(tmp_path, max_bytes=10**9)
+    first, _ = await renderer.get_page(pdf, 1, 640)
+    second, _ = await renderer.get_page(pdf, 2, 640)
+    renderer.max_bytes = renderer.summary()["cached_bytes"] + os.path.getsize(first) // 2
+
+    # 第 1 页最近被访问过，淘汰第 2 页
+    await renderer.get_page(pdf, 1, 640)
+    third, _ = await renderer.get_page(pdf, 3, 640)
+    assert os.path.exists(first) and os.path.exists(third) and not os.path.exists(second)
+    assert renderer.stats["evicted"] == 1
+    assert renderer.summary()["cached_bytes"] <= renderer.max_bytes
+
+    # 被淘汰的页面再次请求时重新渲染
+    await renderer.get_page(pdf, 2, 640)
+    assert os.path.exists(second) and renderer.stats["renders"] == 4
+
+
+async def test_page_image_survives_eviction_before_read(tmp_path):
+    """返回路径后、读取前文件被淘汰（其他渲染或其他 worker）时重新渲染，不返回错误"""
+    pdf = _make_pdf(tmp_path / "a.pdf")
+    renderer = _renderer(tmp_path)
+    path, _ = await renderer.get_page(pdf, 1, 640)
+    expected = open(path, "rb").read()
+
+    get_page = renderer.get_page
+
+    async def get_page_then_evict(*args):
+        result = await get_page(*args)
+        if renderer.stats["renders"] == 1:
+            os.remove(result[0])
+        return result
+
+    renderer.get_page = get_page_then_evict
+    image, page_count = await renderer.get_page_image(pdf, 1, 640)
+    assert image == expected and page_count == 6 and renderer.stats["renders"] == 2
+
+
+async def test_crashed_renderer_returns_503(tmp_path, monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+
+    from fastapi import HTTPException
+
+    from app.api.v1 import resources
+
+    pdf = _make_pdf(tmp_path / "a.pdf")
+
+    class FakeDB:
+        async def get(self, model, resource_id):
+            return type("Resource", (), {"file_url": "/uploads/resources/a.pdf"})()
+
+    async def broken(*args):
+        raise BrokenProcessPool("渲染进程异常退出")
+
+    monkeypatch.setattr(resources, "resource_file_path", lambda url: pdf)
+    monkeypatch.setattr(resources.pdf_page_renderer, "get_page_image", broken)
+    with pytest.raises(HTTPException) as exc_info:
+        await resources.get_resource_page(1, 1, width=640, db=FakeDB(), current_user=None)
+    assert exc_info.value.status_code == 503
@@ -0,0 +1,102 @@
+"""
+问题相似度索引测试：切分与检索排序、过滤条件，以及提问时复用相似问题的回答
+"""
+
+import uuid
+
+from app.models.question import QuestionStatus
+from app.services.question_index import LessonQuestionIndex, QuestionSimilarityIndex, tokenize
+
+
+def test_tokenize_mixed_text():
+    assert tokenize("光合作用 and ATP-synthase?") == [
+        "光", "合", "作", "用", "光合", "合作", "作用", "and", "atp-synthase",
+    ]
+
+
+def test_search_ranking_and_filters():
+    index = LessonQuestionIndex(capacity=2)
+    index.add(1, "什么是光合作用", "叶绿体里发生了什么", cell_id=10, status=QuestionStatus.RESOLVED)
+    index.add(2, "呼吸作用的产物", None, cell_id=10, status=QuestionStatus.ANSWERED)
+    index.add(3, "光合作用需要哪些条件", None, cell_id=20, status=QuestionStatus.PENDING)
+    index.add(4, "光合作用是什么", None, status=QuestionStatus.RESOLVED, is_public=False)
+    assert len(index) == 4
+
+    matches = index.search("光合作用是什么？", limit=3)
+    assert [match.question_id for match in matches] == [1, 3, 2]
+    assert matches[0].title == "什么是光合作用" and 0 < matches[0].score <= 1
+
+    assert [m.question_id for m in index.search("光合作用", cell_id=20)] == [3]
+    answered = index.search("光合作用", statuses=(QuestionStatus.ANSWERED, QuestionStatus.RESOLVED))
+    assert [m.question_id for m in answered] == [1, 2]
+    assert [m.question_id for m in index.search("光合作用", exclude_id=1, limit=1)] == [3]
+    assert index.search("光合作用", min_score=0.99) == []
+    assert index.search("完全无关 xyz") == []
+
+    # 状态变化和内容替换在下一次检索时生效
+    index.set_status(3, QuestionStatus.RESOLVED)
+    index.add(2, "光合作用的产物", None, cell_id=10, status=QuestionStatus.ANSWERED)
+    answered = index.search("光合作用", statuses=(QuestionStatus.RESOLVED,))
+    assert {m.question_id for m in answered} == {1, 3}
+    assert index.search("光合作用的产物", limit=1)[0].question_id == 2
+
+
+async def test_create_question_reuses_resolved_answer(db, monkeypatch):
+    from app.api.v1 import questions
+    from app.models.curriculum import Course, Grade, Subject
+    from app.models.lesson import Lesson, LessonStatus
+    from app.models.question import Answer, AnswererType, AskType, Question
+    from app.models.user import User, UserRole
+    from app.schemas.question import QuestionCreate
+
+    prefix = uuid.uuid4().hex[:8]
+    teacher = User(username=f"t_{prefix}", email=f"t{prefix}@test.local", hashed_password="x", role=UserRole.TEACHER)
+    student = User(username=f"s_{prefix}", email=f"s{prefix}@test.local", hashed_password="x", role=UserRole.STUDENT)
+    subject = Subject(name=f"学科{prefix}", code=f"s-{prefix}")
+    grade = Grade(name=f"年级{prefix}", level=int(prefix, 16) % 10**9 + 100)
+    db.add_all([teacher, student, subject, grade])
+    await db.flush()
+    course = Course(subject_id=subject.id, grade_id=grade.id, name="课程")
+    db.add(course)
+    await db.flush()
+    lesson = Lesson(title="生物", creator_id=teacher.id, course_id=course.id, status=LessonStatus.PUBLISHED)
+    db.add(lesson)
+    await db.flush()
+    resolved = Question(
+        lesson_id=lesson.id, student_id=student.id, title="什么是光合作用",
+        content="光合作用是什么意思", status=QuestionStatus.RESOLVED,
+    )
+    db.add(resolved)
+    await db.flush()
+    teacher_text = [{"id": "1", "cell_type": "text", "content": {"text": "<p>绿色植物利用光能……</p>"}}]
+    db.add_all([
+        Answer(question_id=resolved.id, answerer_type=AnswererType.AI, content=[{"id": "ai"}], ai_model="mock"),
+        Answer(question_id=resolved.id, answerer_type=AnswererType.TEACHER, answerer_id=teacher.id,
+               content=teacher_text),
+    ])
+    await db.flush()
+
+    index = QuestionSimilarityIndex(ttl=60, max_lessons=10)
+    monkeypatch.setattr(questions, "question_index", index)
+
+    created = await questions.create_question(
+        QuestionCreate(title="光合作用是什么？", content="什么是光合作用", lesson_id=lesson.id, ask_type=AskType.AI),
+        db=db, current_user=student,
+    )
+    assert created.status == QuestionStatus.ANSWERED
+    (answer,) = created.answers
+    assert answer.ai_model == "similar-question" and answer.content[1:] == teacher_text
+
+    # 新问题进入索引；不相似的问题仍使用AI回答
+    assert created.id in await index.get(db, lesson.id)
+    other = await questions.create_question(
+        QuestionCreate(title="细胞分裂有几个阶段", content="有丝分裂", lesson_id=lesson.id, ask_type=AskType.AI),
+        db=db, current_user=student,
+    )
+    assert other.answers[0].ai_model != "similar-question"
+
+    similar = await questions.get_similar_questions(
+        lesson_id=lesson.id, text="光合作用", cell_id=None, answered_only=True, limit=5, db=db, current_user=student,
+    )
+    assert {item.id for item in similar["items"]} == {resolved.id, created.id}
+    assert similar["items"][0].score >= similar["items"][1].score
@@ -0,0 +1,109 @@
+"""
+批量导入用户：文件解析与组织信息校验测试
+"""
+
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.user_import import (
+    UserImportError,
+    iter_import_file,
+    parse_user_row,
+    resolve_scope,
+)
+
+TEMPLATE_HEADER = "学号/用户名,姓名,邮箱,密码,角色,是否激活,区域ID(可选),学校ID(可选),年级ID(可选),班级ID(可选),备注\n"
+
+
+def test_csv_rows_gbk_and_row_numbers():
+    content = (
+        TEMPLATE_HEADER
+        + "202301001,张慧,a@example.com,pw1,学生,是,1,101,3,1001,备注\n"
+        + ",,,,,,,,,,\n"
+        + "teacher01,李老师,b@example.com,pw2,教师,否,,,,,\n"
+    ).encode("gb18030")
+
+    rows = list(iter_import_file("users.csv", io.BytesIO(content)))
+    assert [row_no for row_no, _ in rows] == [2, 4]
+
+    first = parse_user_row(rows[0][1])
+    assert first["username"] == "202301001"
+    assert first["full_name"] == "张慧"
+    assert first["role"] == "student"
+    assert first["is_active"] is True
+    assert (first["region_id"], first["school_id"], first["grade_id"], first["classroom_id"]) == (1, 101, 3, 1001)
+
+    second = parse_user_row(rows[1][1])
+    assert second["role"] == "teacher" and second["is_active"] is False
+    assert second["classroom_id"] is None
+
+
+def test_xlsx_rows_and_numeric_usernames():
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["username", "email", "password", "role"])
+    sheet.append([202301002, "c@example.com", "pw", "student"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    [(row_no, raw)] = list(iter_import_file("users.xlsx", buffer))
+    assert row_no == 2
+    assert parse_user_row(raw)["username"] == "202301002"
+
+
+def test_blank_is_active_defaults_to_active():
+    """是否激活留空（CSV 空字符串、Excel 空单元格）时按激活处理，与前端 .xls 解析一致"""
+    content = (TEMPLATE_HEADER + "u1,,a@example.com,pw,学生,,,,,,\n").encode()
+    [(_, raw)] = list(iter_import_file("users.csv", io.BytesIO(content)))
+    assert parse_user_row(raw)["is_active"] is True
+    row = {"username": "u2", "email": "b@example.com", "password": "pw", "role": "学生", "is_active": None}
+    assert parse_user_row(row)["is_active"] is True
+
+
+def test_invalid_files_and_rows():
+    with pytest.raises(UserImportError):
+        iter_import_file("users.xls", io.BytesIO(b""))
+    with pytest.raises(UserImportError, match="缺少必需的列"):
+        list(iter_import_file("users.csv", io.BytesIO("姓名,邮箱\n张三,a@b.com\n".encode())))
+    with pytest.raises(ValueError, match="角色"):
+        parse_user_row({"username": "u", "email": "e", "password": "p", "role": "校长"})
+    with pytest.raises(ValueError, match="school_id"):
+        parse_user_row({"username": "u", "email": "e", "password": "p", "role": "学生", "school_id": "一小"})
+
+
+def make_row(**scope):
+    values = {"region_id": None, "school_id": None, "grade_id": None, "classroom_id": None}
+    values.update(scope)
+    return SimpleNamespace(**values)
+
+
+def test_resolve_scope_matches_single_user_rules():
+    scope = {
+        "classrooms": {1001: SimpleNamespace(id=1001, grade_id=3, school_id=101)},
+        "grades": {3},
+        "schools": {101: 1, 102: 2},
+        "regions": {1, 2},
+    }
+
+    # 班级决定年级和学校，学校补全区域
+    assert resolve_scope(make_row(classroom_id=1001), scope) == {
+        "region_id": 1,
+        "school_id": 101,
+        "grade_id": 3,
+        "classroom_id": 1001,
+    }
+    assert resolve_scope(make_row(), scope) == make_row().__dict__
+
+    for row, message in [
+        (make_row(classroom_id=9), "班级不存在"),
+        (make_row(grade_id=9), "年级不存在"),
+        (make_row(school_id=9), "学校不存在"),
+        (make_row(school_id=101, region_id=2), "学校与区域不匹配"),
+        (make_row(region_id=9), "区域不存在"),
+    ]:
+        with pytest.raises(ValueError, match=message):
+            resolve_scope(row, scope)
@@ -0,0 +1,222 @@
+"""
+WebSocket 跨 worker 消息总线测试
+"""
+
+from app.services.ws_backplane import InMemoryBackplane, InMemoryHub
+
+
+async def test_publish_reaches_other_workers_only():
+    """消息发布后，其他 worker 收到，本进程不会重复收到"""
+    hub = InMemoryHub()
+    worker_a = InMemoryBackplane(hub)
+    worker_b = InMemoryBackplane(hub)
+    worker_c = InMemoryBackplane(hub)
+
+    received = {"a": [], "b": [], "c": []}
+
+    def make_handler(name):
+        async def handler(envelope):
+            received[name].append(envelope)
+
+        return handler
+
+    await worker_a.start(make_handler("a"))
+    await worker_b.start(make_handler("b"))
+    await worker_c.start(make_handler("c"))
+
+    await worker_a.publish({"kind": "broadcast", "scope": "session", "channel_id": 1, "message": "{}"})
+
+    assert received["a"] == []
+    assert len(received["b"]) == 1
+    assert len(received["c"]) == 1
+    assert received["b"][0]["origin"] == worker_a.node_id
+
+
+async def test_stopped_worker_no_longer_receives():
+    """停止订阅后不再收到消息"""
+    hub = InMemoryHub()
+    worker_a = InMemoryBackplane(hub)
+    worker_b = InMemoryBackplane(hub)
+    received = []
+
+    async def handler(envelope):
+        received.append(envelope)
+
+    await worker_a.start(handler)
+    await worker_b.start(handler)
+    await worker_b.stop()
+
+    await worker_a.publish({"kind": "session", "session_id": 1, "message": "{}"})
+
+    assert received == []
+
+
+def test_envelope_round_trip_keeps_message_text():
+    """消息文本原样拼接在头部之后，不会被再次转义"""
+    from app.services.ws_backplane import decode_envelope, encode_envelope
+
+    message_text = '{"type": "navigate", "data": {"title": "第一课\\n引入"}}'
+    envelope = {"kind": "role", "scope": "session", "channel_id": 3, "message": message_text}
+
+    data = encode_envelope(envelope)
+
+    assert data.endswith(message_text.encode())
+    assert decode_envelope(data) == envelope
+
+
+async def test_redis_unavailable_falls_back_and_reconnects(monkeypatch):
+    """Redis 不可用时启动不报错，后台重连成功后开始接收消息"""
+    import asyncio
+    import sys
+    import types
+
+    from app.services.ws_backplane import RedisBackplane, encode_envelope
+
+    attempts = []
+    inbox: asyncio.Queue = asyncio.Queue()
+
+    class FakePubSub:
+        async def subscribe(self, channel):
+            attempts.append(channel)
+            if len(attempts) < 3:
+                raise ConnectionError("Connection refused")
+
+        async def listen(self):
+            while True:
+                yield {"type": "message", "data": await inbox.get()}
+
+        async def unsubscribe(self, channel):
+            pass
+
+        async def close(self):
+            pass
+
+    class FakeRedis:
+        def __init__(self, **kwargs):
+            pass
+
+        def pubsub(self, **kwargs):
+            return FakePubSub()
+
+        async def close(self):
+            pass
+
+    fake_asyncio = types.ModuleType("redis.asyncio")
+    fake_asyncio.Redis = FakeRedis
+    fake_redis = types.ModuleType("redis")
+    fake_redis.asyncio = fake_asyncio
+    monkeypatch.setitem(sys.modules, "redis", fake_redis)
+    monkeypatch.setitem(sys.modules, "redis.asyncio", fake_asyncio)
+    monkeypatch.setattr(asyncio, "sleep", _fast_sleep(asyncio.sleep))
+
+    received = []
+
+    async def handler(envelope):
+        received.append(envelope)
+
+    backplane = RedisBackplane(host="127.0.0.1", port=1)
+    await backplane.start(handler)
+    assert len(attempts) == 1 and backplane._pubsub is None
+
+    await inbox.put(encode_envelope({"kind": "session", "session_id": 1, "origin": "other", "message": "{}"}))
+    for _ in range(100):
+        if received:
+            break
+        await asyncio.sleep(0.01)
+    assert len(attempts) == 3 and received[0]["session_id"] == 1
+    await backplane.stop()
+
+
+def _fast_sleep(real_sleep):
+    """把重连等待缩短为 0"""
+
+    async def sleep(delay, *args, **kwargs):
+        await real_sleep(0)
+
+    return sleep
+
+
+async def test_direct_replies_share_connection_queue():
+    """单个连接的回复与广播经同一个发送队列按顺序发送，失效连接的清理任务被保留到结束"""
+    import asyncio
+    import json
+
+    from starlette.websockets import WebSocketState
+
+    from app.models.user import UserRole
+    from app.services.websocket_manager import ConnectionManager
+
+    class FakeWebSocket:
+        client_state = WebSocketState.CONNECTED
+
+        def __init__(self, fail=False):
+            self.sent = []
+            self.active_sends = 0
+            self.max_active_sends = 0
+            self.fail = fail
+
+        async def send_text(self, text):
+            if self.fail:
+                raise RuntimeError("connection reset")
+            self.active_sends += 1
+            self.max_active_sends = max(self.max_active_sends, self.active_sends)
+            await asyncio.sleep(0)
+            self.sent.append(text)
+            self.active_sends -= 1
+
+        async def close(self):
+            pass
+
+    manager = ConnectionManager(InMemoryBackplane())
+    websocket = FakeWebSocket()
+    await manager.connect_v2(websocket=websocket, scope="form", channel_id=1, user_id=7, role=UserRole.TEACHER)
+
+    manager.send_to_websocket(websocket, {"type": "connection_established"})
+    await manager.broadcast({"type": "form_started"}, "form", 1)
+    manager.send_to_websocket(websocket, '{"type": "pong"}')
+    await manager.flush()
+    assert [json.loads(text)["type"] for text in websocket.sent] == ["connection_established", "form_started", "pong"]
+    assert websocket.max_active_sends == 1
+
+    broken = FakeWebSocket(fail=True)
+    await manager.connect_v2(websocket=broken, scope="form", channel_id=1, user_id=8, role=UserRole.STUDENT)
+    manager.send_to_websocket(broken, {"type": "connection_established"})
+    await manager.flush()
+    assert len(manager._eviction_tasks) == 1
+    await asyncio.gather(*manager._eviction_tasks)
+    assert not manager._eviction_tasks
+    assert manager.student_connections == {} and id(broken) not in manager.outbound
+    await manager.disconnect_v2(scope="form", channel_id=1, user_id=7, role=UserRole.TEACHER)
+
+
+async def test_direct_reply_to_unregistered_socket_is_dropped():
+    """未注册或已断开的连接不创建发送队列"""
+    from starlette.websockets import WebSocketState
+
+    from app.models.user import UserRole
+    from app.services.websocket_manager import ConnectionManager
+
+    class FakeWebSocket:
+        client_state = WebSocketState.CONNECTED
+
+        def __init__(self):
+            self.sent = []
+
+        async def send_text(self, text):
+            self.sent.append(text)
+
+        async def close(self):
+            pass
+
+    manager = ConnectionManager(InMemoryBackplane())
+    stranger = FakeWebSocket()
+    assert manager.send_to_websocket(stranger, {"type": "pong"}) is False
+    assert manager.outbound == {}
+
+    websocket = FakeWebSocket()
+    await manager.connect_v2(websocket=websocket, scope="form", channel_id=1, user_id=7, role=UserRole.TEACHER)
+    assert manager.send_to_websocket(websocket, {"type": "pong"}) is True
+    await manager.flush()
+    await manager.disconnect_v2(scope="form", channel_id=1, user_id=7, role=UserRole.TEACHER)
+    assert manager.send_to_websocket(websocket, {"type": "pong"}) is False
+    assert manager.outbound == {} and len(websocket.sent) == 1
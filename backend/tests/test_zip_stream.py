@@ -0,0 +1,85 @@
+"""
+流式 ZIP 打包测试
+"""
+
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+from app.services.zip_stream import FileSource, stream_zip
+
+
+def current_rss() -> int:
+    """当前进程的常驻内存（字节）"""
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def test_stream_zip_round_trip(tmp_path):
+    """各类条目打包后可被 zipfile 正常读取"""
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(os.urandom(300_000))
+    notes = tmp_path / "notes.txt"
+    notes.write_text("课堂笔记" * 1000, encoding="utf-8")
+
+    async def lessons():
+        yield '{"lessons": ['
+        for i in range(3):
+            yield ("," if i else "") + json.dumps({"title": f"第{i}课"}, ensure_ascii=False)
+        yield "]}"
+
+    async def entries():
+        yield "data.json", lessons()
+        yield "resources/clip.mp4", FileSource(str(video))
+        yield "resources/notes.txt", FileSource(str(notes))
+        yield "resources/missing.pdf", FileSource(str(tmp_path / "missing.pdf"))
+        yield "manifest.json", json.dumps({"file_count": 2})
+
+    data = b"".join([chunk async for chunk in stream_zip(entries(), chunk_size=64 * 1024)])
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == [
+            "data.json",
+            "resources/clip.mp4",
+            "resources/notes.txt",
+            "manifest.json",
+        ]
+        assert json.loads(archive.read("data.json"))["lessons"][2]["title"] == "第2课"
+        assert archive.read("resources/clip.mp4") == video.read_bytes()
+        assert archive.read("resources/notes.txt") == notes.read_bytes()
+        # 已压缩的媒体文件直接存储，文本文件压缩
+        assert archive.getinfo("resources/clip.mp4").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("resources/notes.txt").compress_type == zipfile.ZIP_DEFLATED
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="需要 /proc 统计内存")
+async def test_stream_zip_large_tree_bounded_memory(tmp_path):
+    """导出约 2 GB 的文件树时内存占用与导出大小无关"""
+    resources = tmp_path / "resources"
+    resources.mkdir()
+    total = 0
+    for i in range(4):
+        # 稀疏文件：不占用磁盘空间，读取时返回 512 MB 的零字节
+        path = resources / f"video_{i}.mp4"
+        with open(path, "wb") as f:
+            f.truncate(512 * 1024 * 1024)
+        total += 512 * 1024 * 1024
+
+    async def entries():
+        yield "data.json", json.dumps({"lessons": []})
+        for path in sorted(resources.iterdir()):
+            yield f"resources/{path.name}", FileSource(str(path))
+
+    baseline = current_rss()
+    peak = baseline
+    size = 0
+    async for chunk in stream_zip(entries()):
+        size += len(chunk)
+        peak = max(peak, current_rss())
+
+    assert size > total
+    assert peak - baseline < 64 * 1024 * 1024
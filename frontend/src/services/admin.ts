@@ -167,10 +167,10 @@ export interface ClassroomListResponse {
 
 export const adminService = {
   /**
-   * 获取数据看板概览
+   * 获取数据看板概览（服务端定期统计的快照，refresh 为 true 时立即重新统计）
    */
-  async getDashboardOverview(): Promise<DashboardOverview> {
-    return await api.get('/admin/dashboard/overview')
+  async getDashboardOverview(refresh = false): Promise<DashboardOverview> {
+    return await api.get('/admin/dashboard/overview', { params: { refresh } })
   },
 
   /**
@@ -241,6 +241,15 @@ export const adminService = {
     return await api.post('/admin/users/batch-import', { users })
   },
 
+  /**
+   * 上传CSV/XLSX文件批量导入用户（服务端解析，错误行号对应文件行号）
+   */
+  async batchImportUsersFile(file: File): Promise<BatchImportResult> {
+    const formData = new FormData()
+    formData.append('file', file)
+    return await api.post('/admin/users/batch-import/file', formData, { timeout: 300000 })
+  },
+
   /**
    * 下载导入模板
    */
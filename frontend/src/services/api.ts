@@ -94,6 +94,31 @@ class ApiService {
     return response.data
   }
 
+  /**
+   * 条件请求：带上次响应的 ETag（If-None-Match），内容未变化时服务器返回 304，notModified 为 true
+   */
+  async getConditional<T>(
+    url: string,
+    etag?: string,
+    config?: AxiosRequestConfig
+  ): Promise<{ data?: T; etag?: string; notModified: boolean }> {
+    const response = await this.axiosInstance.get<T>(url, {
+      ...config,
+      headers: {
+        'Cache-Control': 'no-cache',
+        ...(etag ? { 'If-None-Match': etag } : {}),
+        ...config?.headers,
+      },
+      validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+    })
+    const notModified = response.status === 304
+    return {
+      data: notModified ? undefined : response.data,
+      etag: response.headers['etag'] ?? etag,
+      notModified,
+    }
+  }
+
   async post<T>(url: string, data?: any, config?: AxiosRequestConfig): Promise<T> {
     const response = await this.axiosInstance.post<T>(url, data, config)
     return response.data
@@ -114,6 +139,79 @@ class ApiService {
     return response.data
   }
 
+  /**
+   * POST 并读取 SSE 响应（EventSource 只支持 GET）：每个事件调用 onEvent(事件名, 数据)
+   * signal 中止时断开连接，服务器随之停止生成
+   */
+  async postStream(
+    url: string,
+    data: unknown,
+    onEvent: (event: string, data: any) => void,
+    signal?: AbortSignal
+  ): Promise<void> {
+    await this.fetchStream('POST', url, data, onEvent, signal)
+  }
+
+  /**
+   * GET 并读取 SSE 响应（EventSource 不能携带 Authorization 头）
+   */
+  async getStream(
+    url: string,
+    onEvent: (event: string, data: any) => void,
+    signal?: AbortSignal
+  ): Promise<void> {
+    await this.fetchStream('GET', url, undefined, onEvent, signal)
+  }
+
+  private async fetchStream(
+    method: 'GET' | 'POST',
+    url: string,
+    data: unknown,
+    onEvent: (event: string, data: any) => void,
+    signal?: AbortSignal
+  ): Promise<void> {
+    const token = localStorage.getItem('access_token')
+    const response = await fetch(`${API_BASE_URL}${url}`, {
+      method,
+      headers: {
+        ...(method === 'POST' ? { 'Content-Type': 'application/json' } : {}),
+        Accept: 'text/event-stream',
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      body: method === 'POST' ? JSON.stringify(data) : undefined,
+      signal,
+    })
+    if (response.status === 401) {
+      localStorage.removeItem('access_token')
+      window.location.href = '/login'
+    }
+    if (!response.ok || !response.body) {
+      const detail = await response.json().catch(() => null)
+      throw new Error(detail?.detail || `请求失败 (${response.status})`)
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+    for (;;) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += value
+      let boundary = buffer.indexOf('\n\n')
+      while (boundary >= 0) {
+        const block = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+        let event = 'message'
+        const dataLines: string[] = []
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim()
+          else if (line.startsWith('data:')) dataLines.push(line.slice(5).trimStart())
+        }
+        if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')))
+        boundary = buffer.indexOf('\n\n')
+      }
+    }
+  }
+
   async downloadFile(url: string, config?: AxiosRequestConfig): Promise<Blob> {
     const response = await this.axiosInstance.get(url, {
       ...config,
@@ -37,6 +37,49 @@ class AssistantService {
       throw new Error(error.response?.data?.detail || 'AI 助手服务暂不可用')
     }
   }
+
+  /**
+   * 流式提问：回答片段到达时调用 onToken，返回完整响应（含首个片段延迟 first_token_ms）
+   */
+  async streamStudentAssistant(
+    payload: AssistantRequest,
+    onToken: (text: string) => void,
+    signal?: AbortSignal
+  ): Promise<AssistantResponse> {
+    return this.stream(`${this.studentBasePath}/query?stream=true`, payload, onToken, signal)
+  }
+
+  async streamTeacherAssistant(
+    payload: TeacherAssistantRequest,
+    onToken: (text: string) => void,
+    signal?: AbortSignal
+  ): Promise<TeacherAssistantResponse> {
+    return this.stream(`${this.teacherBasePath}/query?stream=true`, payload, onToken, signal)
+  }
+
+  private async stream(
+    url: string,
+    payload: AssistantRequest,
+    onToken: (text: string) => void,
+    signal?: AbortSignal
+  ): Promise<AssistantResponse> {
+    let result: AssistantResponse | null = null
+    let errorDetail: string | null = null
+    await api.postStream(
+      url,
+      payload,
+      (event, data) => {
+        if (event === 'token') onToken(data.text)
+        else if (event === 'done') result = data
+        else if (event === 'error') errorDetail = data.detail
+      },
+      signal
+    )
+    if (!result) {
+      throw new Error(errorDetail || 'AI 助手服务暂不可用')
+    }
+    return result
+  }
 }
 
 export const assistantService = new AssistantService()
@@ -303,6 +303,8 @@ export const classroomAssistantService = {
     params?: {
       fromDate?: string
       toDate?: string
+      period?: 'week'
+      limit?: number
     }
   ): Promise<PositiveBehaviorLeaderboardEntry[]> {
     const snakeParams = params ? camelToSnake(params) : undefined
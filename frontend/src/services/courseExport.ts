@@ -12,6 +12,26 @@ export interface CourseImportOptions {
   overwrite_existing?: boolean
 }
 
+export type ImportJobStatus = 'pending' | 'running' | 'succeeded' | 'failed' | 'cancelled'
+
+export interface ImportJob {
+  job_id: number
+  job_type: string
+  status: ImportJobStatus
+  stage: string | null
+  stage_label: string | null
+  progress: number
+  message: string | null
+  filename: string | null
+  overwrite_existing: boolean
+  cancel_requested: boolean
+  result: ImportResult | null
+  error: string | null
+  created_at: string | null
+  started_at: string | null
+  finished_at: string | null
+}
+
 export interface ImportResult {
   message: string
   result: {
@@ -84,22 +104,58 @@ class CourseExportService {
 
   /**
    * 导入课程数据
+   *
+   * 提交后台导入任务并轮询进度，任务完成后返回导入结果。
+   * 导入失败或被取消时抛出与接口错误相同结构的异常（error.response.data.detail）。
    */
   async importCourses(
     file: File, 
-    options: CourseImportOptions = {}
+    options: CourseImportOptions = {},
+    onProgress?: (job: ImportJob) => void
   ): Promise<ImportResult> {
+    let job = await this.submitImportJob(file, options)
+    onProgress?.(job)
+
+    while (job.status === 'pending' || job.status === 'running') {
+      await new Promise(resolve => setTimeout(resolve, 1000))
+      job = await this.getImportJob(job.job_id)
+      onProgress?.(job)
+    }
+
+    if (job.status !== 'succeeded' || !job.result) {
+      const detail = job.status === 'cancelled' ? '导入已取消' : (job.error || '导入失败')
+      throw Object.assign(new Error(detail), { response: { data: { detail } } })
+    }
+    return job.result
+  }
+
+  /**
+   * 提交后台导入任务
+   */
+  async submitImportJob(file: File, options: CourseImportOptions = {}): Promise<ImportJob> {
     const formData = new FormData()
     formData.append('file', file)
     formData.append('overwrite_existing', options.overwrite_existing?.toString() || 'false')
 
-    // api.post 已经返回了 response.data，所以直接返回 response 即可
-    const response = await api.post<ImportResult>('/course-export/import', formData, {
+    return api.post<ImportJob>('/course-export/import/jobs', formData, {
       headers: {
         'Content-Type': 'multipart/form-data'
       }
     })
-    return response
+  }
+
+  /**
+   * 查询导入任务状态
+   */
+  async getImportJob(jobId: number): Promise<ImportJob> {
+    return api.get<ImportJob>(`/course-export/import/jobs/${jobId}`)
+  }
+
+  /**
+   * 取消导入任务
+   */
+  async cancelImportJob(jobId: number): Promise<ImportJob> {
+    return api.post<ImportJob>(`/course-export/import/jobs/${jobId}/cancel`)
   }
 
   /**
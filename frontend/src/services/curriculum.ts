@@ -17,6 +17,9 @@ import type {
   CourseMergeResponse
 } from '@/types/curriculum'
 
+// 最近一次获取的课程体系树及其 ETag（按 includeInactive），用于条件请求
+const curriculumTreeCache = new Map<boolean, { etag: string; tree: CurriculumTree }>()
+
 export const curriculumService = {
   // ==================== Subject APIs ====================
   
@@ -119,9 +122,22 @@ export const curriculumService = {
    * 获取完整的课程体系树形结构
    */
   async getCurriculumTree(includeInactive = false): Promise<CurriculumTree> {
-    return await api.get('/curriculum/tree', {
+    const cached = curriculumTreeCache.get(includeInactive)
+    const result = await api.getConditional<CurriculumTree>('/curriculum/tree', cached?.etag, {
       params: { include_inactive: includeInactive }
     })
+    if (result.notModified && cached) {
+      // 调用方可能修改返回的树，返回副本
+      return structuredClone(cached.tree)
+    }
+    if (result.data === undefined) {
+      // 本地没有缓存却收到 304（不应出现），重新完整请求
+      return await api.get('/curriculum/tree', { params: { include_inactive: includeInactive } })
+    }
+    if (result.etag) {
+      curriculumTreeCache.set(includeInactive, { etag: result.etag, tree: structuredClone(result.data) })
+    }
+    return result.data
   },
 
   // ==================== Helper Functions ====================
@@ -35,6 +35,8 @@ class LessonService {
         params: {
           page: params?.page || 1,
           page_size: params?.page_size || 20,
+          cursor: params?.cursor,
+          count: params?.count,
           status: params?.status,
           search: params?.search,
           course_id: params?.course_id,
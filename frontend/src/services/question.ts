@@ -9,6 +9,7 @@ import type {
   QuestionListItem,
   QuestionListResponse,
   QuestionStats,
+  SimilarQuestionListResponse,
   AnswerCreate,
   AnswerUpdate,
   Answer,
@@ -85,6 +86,33 @@ class QuestionService {
     }
   }
 
+  /**
+   * 查找课程中的相似问题（提问前提示，避免重复提问）
+   * @param lessonId 课程ID
+   * @param text 问题标题和内容
+   * @param params 查询参数
+   * @returns 相似问题列表
+   */
+  async findSimilarQuestions(
+    lessonId: number,
+    text: string,
+    params?: {
+      cell_id?: number
+      answered_only?: boolean
+      limit?: number
+    }
+  ): Promise<SimilarQuestionListResponse> {
+    try {
+      const response = await api.get<SimilarQuestionListResponse>(`${this.basePath}/similar`, {
+        params: { lesson_id: lessonId, text, ...params }
+      })
+      return response
+    } catch (error: any) {
+      console.error('Failed to find similar questions:', error)
+      throw new Error(error.response?.data?.detail || '查找相似问题失败')
+    }
+  }
+
   /**
    * 获取问题详情
    * @param id 问题ID
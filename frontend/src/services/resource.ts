@@ -227,10 +227,37 @@ export const resourceService = {
     can_preview_directly: boolean
     preview_url: string
     converted_to_pdf?: boolean
+    conversion_status?: 'ready' | 'converting' | 'failed' | null
     conversion_error?: string
   }> {
     const response = await api.get(`/resources/${resourceId}/preview`)
     return response
+  },
+
+  /**
+   * 获取 PDF 单页预览图（页码从 1 开始），返回图片 Blob
+   * @param width 图片宽度（像素），服务器按档位向上取整
+   */
+  async getPageImage(resourceId: number, page: number, width: number = 960): Promise<Blob> {
+    return api.downloadFile(`/resources/${resourceId}/pages/${page}`, { params: { width } })
+  },
+
+  /**
+   * 等待Office文档的PDF转换完成（conversion_status 为 converting 时调用）
+   * @returns 转换成功时返回转换后的PDF地址，失败时抛出错误
+   */
+  async waitForConversion(resourceId: number, signal?: AbortSignal): Promise<string> {
+    const result: { previewUrl?: string; error?: string } = {}
+    await api.getStream(
+      `/resources/${resourceId}/preview/events`,
+      (event, data) => {
+        if (event === 'converted') result.previewUrl = data.preview_url
+        else if (event === 'failed') result.error = data.error
+      },
+      signal
+    )
+    if (result.previewUrl) return result.previewUrl
+    throw new Error(result.error || '转换失败')
   }
 }
 
@@ -0,0 +1,114 @@
+/**
+ * 文件上传服务（分片上传、断点续传）
+ */
+import api from './api'
+
+export interface UploadResult {
+  file_url: string
+  file_size: number
+  filename: string
+}
+
+export interface ChunkedUploadStatus {
+  upload_id: string
+  filename: string
+  total_size: number
+  chunk_size: number
+  chunk_count: number
+  received_chunks: number[]
+  uploaded_size: number
+  complete: boolean
+}
+
+export interface ChunkedUploadOptions {
+  /** 进度回调（0-100） */
+  onProgress?: (percent: number) => void
+  /** 继续之前中断的上传会话 */
+  uploadId?: string
+  /** 会话创建后回调，可保存 upload_id 用于断点续传 */
+  onSession?: (status: ChunkedUploadStatus) => void
+  /** 同时上传的分片数 */
+  concurrency?: number
+  /** 单个分片失败后的重试次数 */
+  retries?: number
+}
+
+class UploadService {
+  /**
+   * 分片上传文件
+   *
+   * 文件按服务端给出的分片大小切分后逐片上传，失败的分片会自动重试；
+   * 传入 uploadId 时先查询已上传的分片，只补传缺少的部分。
+   */
+  async uploadChunked(file: File, options: ChunkedUploadOptions = {}): Promise<UploadResult> {
+    const { onProgress, concurrency = 3, retries = 3 } = options
+
+    let status = options.uploadId
+      ? await this.getChunkedUpload(options.uploadId)
+      : await api.post<ChunkedUploadStatus>('/upload/chunked', {
+          filename: file.name,
+          total_size: file.size,
+        })
+    options.onSession?.(status)
+
+    const received = new Set(status.received_chunks)
+    const pending: number[] = []
+    for (let index = 0; index < status.chunk_count; index++) {
+      if (!received.has(index)) pending.push(index)
+    }
+
+    let uploaded = status.uploaded_size
+    onProgress?.(Math.round((uploaded * 100) / status.total_size))
+
+    const uploadOne = async (index: number) => {
+      const start = index * status.chunk_size
+      const chunk = file.slice(start, Math.min(start + status.chunk_size, file.size))
+      for (let attempt = 0; ; attempt++) {
+        try {
+          await api.put(`/upload/chunked/${status.upload_id}/chunks/${index}`, chunk, {
+            headers: { 'Content-Type': 'application/octet-stream' },
+            timeout: 120000,
+          })
+          break
+        } catch (error: any) {
+          // 4xx 错误（会话不存在、分片不合法等）重试也不会成功
+          const code = error.response?.status
+          if (attempt >= retries || (code && code >= 400 && code < 500)) throw error
+          await new Promise(resolve => setTimeout(resolve, 1000 * (attempt + 1)))
+        }
+      }
+      uploaded += chunk.size
+      onProgress?.(Math.round((uploaded * 100) / status.total_size))
+    }
+
+    const workers = Array.from({ length: Math.min(concurrency, pending.length) }, async () => {
+      while (pending.length > 0) {
+        await uploadOne(pending.shift() as number)
+      }
+    })
+    await Promise.all(workers)
+
+    const result = await api.post<UploadResult>(`/upload/chunked/${status.upload_id}/complete`, undefined, {
+      timeout: 300000,
+    })
+    onProgress?.(100)
+    return result
+  }
+
+  /**
+   * 查询分片上传进度
+   */
+  async getChunkedUpload(uploadId: string): Promise<ChunkedUploadStatus> {
+    return api.get<ChunkedUploadStatus>(`/upload/chunked/${uploadId}`)
+  }
+
+  /**
+   * 取消分片上传
+   */
+  async abortChunkedUpload(uploadId: string): Promise<void> {
+    await api.delete(`/upload/chunked/${uploadId}`)
+  }
+}
+
+export const uploadService = new UploadService()
+export default uploadService
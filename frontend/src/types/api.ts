@@ -28,6 +28,10 @@ export interface PaginatedResponse<T> {
 export interface LessonListParams {
   page?: number
   page_size?: number
+  /** 上一页返回的 next_cursor，指定后忽略 page */
+  cursor?: string
+  /** 总数计算方式：exact 精确（默认）、estimated 估算 */
+  count?: 'exact' | 'estimated'
   status?: LessonStatus
   search?: string
   course_id?: number
@@ -40,7 +44,12 @@ export interface LessonListParams {
 /**
  * 教案列表响应类型
  */
-export type LessonListResponse = PaginatedResponse<Lesson>
+export interface LessonListResponse extends PaginatedResponse<Lesson> {
+  /** 下一页游标，没有更多数据时为 null */
+  next_cursor?: string | null
+  /** total 是否为估算值 */
+  total_is_estimate?: boolean
+}
 
 /**
  * API 错误响应
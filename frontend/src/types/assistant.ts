@@ -50,6 +50,8 @@ export interface AssistantResponse {
   model_used?: string
   confidence?: number
   response_time_ms?: number
+  /** 流式回答首个片段的延迟（毫秒） */
+  first_token_ms?: number
   context_used?: string[]
 }
 
@@ -215,6 +215,7 @@ export interface PositiveBehaviorLeaderboardEntry {
   studentName: string
   totalPoints: number
   recordCount: number
+  rank?: number | null
 }
 
 // ==================== 纪律记录 ====================
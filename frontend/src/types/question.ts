@@ -138,6 +138,25 @@ export interface QuestionListResponse {
   has_more: boolean
 }
 
+/**
+ * 相似问题
+ */
+export interface SimilarQuestion {
+  id: number
+  title: string
+  content: string
+  status: QuestionStatus
+  cell_id?: number
+  score: number // 相似度（0-1）
+}
+
+/**
+ * 相似问题列表（按相似度降序）
+ */
+export interface SimilarQuestionListResponse {
+  items: SimilarQuestion[]
+}
+
 /**
  * 问题统计
  */